@@ -0,0 +1,114 @@
+# bench_arquivamento.py
+#
+# Compara o arquivamento original (grava cada PNG em disco, compacta com
+# zipfile lendo os arquivos e os apaga) com o zip gravado em segundo plano
+# a partir da memória, em disco (níveis de compressão 0, 1 e 6) ou no S3
+# (multipart upload no cliente local). Mede o tempo no caminho da
+# resposta, o tempo até o zip ficar pronto e os bytes escritos pelo
+# processo (wchar de /proc/self/io).
+#
+# Uso: python -m benchmarks.bench_arquivamento [--paginas 40]
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+
+from benchmarks.bench_pipeline import gerar_pdf
+from benchmarks.stubs import StubS3Client
+from services.arquivamento import Arquivador
+from services.processa_arquivos import PoliticaRenderizacao, renderizar_pagina
+
+
+def bytes_escritos() -> int:
+    try:
+        with open("/proc/self/io") as f:
+            for linha in f:
+                if linha.startswith("wchar:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def original(imagens, pasta):
+    """
+    Fluxo anterior, todo no caminho da resposta.
+    """
+    caminhos = []
+    for nome, dados in imagens:
+        caminho = os.path.join(pasta, nome)
+        with open(caminho, "wb") as f:
+            f.write(dados)
+        caminhos.append(caminho)
+    zip_path = os.path.join(pasta, "original.zip")
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        for caminho in caminhos:
+            zipf.write(caminho, os.path.basename(caminho))
+    for caminho in caminhos:
+        os.remove(caminho)
+    return os.path.getsize(zip_path)
+
+
+def medir_original(imagens, pasta):
+    escritos = bytes_escritos()
+    inicio = time.perf_counter()
+    tamanho = original(imagens, pasta)
+    total = time.perf_counter() - inicio
+    return total, total, bytes_escritos() - escritos, tamanho
+
+
+def medir_novo(imagens, pasta, destino, nivel, s3=None):
+    arquivador = Arquivador(destino=destino, nivel=nivel, bucket="bench-local")
+    escritos = bytes_escritos()
+    inicio = time.perf_counter()
+    arquivo = arquivador.abrir(f"novo_{destino}_{nivel}.zip", pasta, s3=s3)
+    for nome, dados in imagens:
+        arquivo.adicionar(nome, dados)
+    arquivo.concluir()
+    resposta = time.perf_counter() - inicio
+    arquivo.aguardar()
+    total = time.perf_counter() - inicio
+    if arquivo.status != "concluido":
+        raise RuntimeError(arquivo.erro)
+    return resposta, total, bytes_escritos() - escritos, arquivo.bytes_escritos
+
+
+def executar(paginas):
+    conteudo = gerar_pdf(paginas)
+    politica = PoliticaRenderizacao()
+    imagens = [(f"pagina_{n}.png", renderizar_pagina(conteudo, n, politica)["imagem"])
+               for n in range(paginas)]
+    total_imagens = sum(len(dados) for _, dados in imagens)
+    print(f"{paginas} imagens PNG, {total_imagens / 1024 / 1024:.1f} MB")
+
+    pasta = tempfile.mkdtemp(prefix="bench_arquivamento_")
+    try:
+        casos = [("original (disco, 0)", lambda: medir_original(imagens, pasta))]
+        for nivel in (0, 1, 6):
+            casos.append((f"memória -> disco, {nivel}",
+                          lambda nivel=nivel: medir_novo(imagens, pasta, "disco", nivel)))
+        s3 = StubS3Client(latencia=0.02)
+        casos.append(("memória -> S3, 0",
+                      lambda: medir_novo(imagens, pasta, "s3", 0, s3=s3)))
+
+        for nome, medir in casos:
+            resposta, total, escritos, tamanho = medir()
+            print(f"  {nome:<22} resposta {resposta * 1000:8.1f} ms  "
+                  f"zip pronto {total * 1000:8.1f} ms  "
+                  f"escrito pelo processo {escritos / 1024 / 1024:6.1f} MB  "
+                  f"zip {tamanho / 1024 / 1024:6.1f} MB")
+        print(f"  requisições ao S3: {s3.requisicoes}")
+    finally:
+        shutil.rmtree(pasta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paginas", type=int, default=40)
+    args = parser.parse_args()
+    executar(args.paginas)
@@ -0,0 +1,53 @@
+# bench_busca.py
+#
+# Compara a busca de várias palavras-chave com o índice invertido
+# (find_multiple_keywords) com o laço anterior, que chama
+# find_keyword_blocks para cada palavra-chave.
+# Uso: python -m benchmarks.bench_busca
+
+from benchmarks.bench_parser import medir
+from benchmarks.sintetico import gerar_resposta
+from services.textract.busca import IndicePalavras
+from services.textract.parser import as_document, find_keyword_blocks, find_multiple_keywords
+
+TAMANHO = 50_000
+QUANTIDADES = [1, 10, 100, 500]
+
+
+def laco(document, keywords):
+    return {keyword: find_keyword_blocks(document, keyword) for keyword in keywords}
+
+
+def indice(document, keywords):
+    # Índice novo a cada execução: inclui a sua construção
+    indice_palavras = IndicePalavras()
+    indice_palavras.adicionar(document.blocks_of('WORD'))
+    return indice_palavras.buscar_varias(keywords)
+
+
+def executar():
+    response = gerar_resposta(TAMANHO)
+    document = as_document(response)
+    print(f"{len(response['Blocks'])} blocos, {len(document.blocks_of('WORD'))} palavras")
+    print(f"{'keywords':>9} {'laço s':>9} {'índice s':>9} {'consulta s':>11} {'ganho':>7} {'igual':>6}")
+
+    for quantidade in QUANTIDADES:
+        # Mistura de buscas exatas, parciais e sem resultado (sem acentos,
+        # para os dois métodos retornarem o mesmo)
+        keywords = [f"Campo{i * 37}:" if i % 3 == 0 else
+                    f"Campo{i * 11}" if i % 3 == 1 else f"inexistente{i}"
+                    for i in range(quantidade)]
+
+        t_laco = medir(laco, document, keywords)
+        t_indice = medir(indice, document, keywords)
+        # Índice já construído (ex.: /search sobre documentos processados)
+        document.word_index
+        t_consulta = medir(find_multiple_keywords, document, keywords)
+
+        igual = laco(document, keywords) == find_multiple_keywords(document, keywords)
+        print(f"{quantidade:>9} {t_laco:>9.4f} {t_indice:>9.4f} {t_consulta:>11.5f} "
+              f"{t_laco / t_indice:>6.1f}x {str(igual):>6}")
+
+
+if __name__ == "__main__":
+    executar()
@@ -0,0 +1,73 @@
+# bench_clientes_aws.py
+#
+# Compara a criação de clientes boto3 a cada requisição (comportamento
+# anterior) com o registro de clientes criado no startup (services/aws.py).
+# As chamadas ao Textract são respondidas pelo Stubber do botocore, então
+# o tempo medido é só o do lado do cliente (sessão, credenciais, modelos
+# do serviço, assinatura); com rede real, o reuso do pool de conexões
+# ainda evita o handshake TCP/TLS a cada requisição.
+# Uso: python -m benchmarks.bench_clientes_aws
+
+import os
+import statistics
+import time
+
+import boto3
+from botocore.stub import Stubber
+
+from services.aws import ClientesAWS
+
+REQUISICOES = 50
+RESPOSTA = {"DocumentMetadata": {"Pages": 1}, "Blocks": []}
+
+# Credenciais fictícias: nenhuma chamada sai da máquina
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "teste")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "teste")
+
+
+def chamar(textract):
+    with Stubber(textract) as stubber:
+        stubber.add_response("analyze_document", RESPOSTA)
+        textract.analyze_document(
+            Document={"Bytes": b"x"}, FeatureTypes=["FORMS", "TABLES", "LAYOUT"])
+
+
+def por_requisicao():
+    """
+    Comportamento anterior: clientes textract e s3 criados a cada chamada.
+    """
+    inicio = time.perf_counter()
+    textract = boto3.client("textract", region_name="us-east-1")
+    boto3.client("s3", region_name="us-east-1")
+    chamar(textract)
+    return (time.perf_counter() - inicio) * 1000
+
+
+def com_registro(clientes):
+    inicio = time.perf_counter()
+    chamar(clientes.textract())
+    return (time.perf_counter() - inicio) * 1000
+
+
+def executar():
+    # Antes: o custo de criação aparece em toda requisição, inclusive na primeira
+    tempos = [por_requisicao() for _ in range(REQUISICOES)]
+    print(f"{'por_requisicao':<22} primeira={tempos[0]:>8.2f}ms "
+          f"mediana={statistics.median(tempos):>7.2f}ms "
+          f"p95={sorted(tempos)[int(REQUISICOES * 0.95) - 1]:>7.2f}ms")
+
+    # Depois: o custo vai para o startup e as requisições só reutilizam o cliente
+    clientes = ClientesAWS()
+    inicio = time.perf_counter()
+    clientes.iniciar()
+    startup = (time.perf_counter() - inicio) * 1000
+    tempos = [com_registro(clientes) for _ in range(REQUISICOES)]
+    print(f"{'registro':<22} primeira={tempos[0]:>8.2f}ms "
+          f"mediana={statistics.median(tempos):>7.2f}ms "
+          f"p95={sorted(tempos)[int(REQUISICOES * 0.95) - 1]:>7.2f}ms "
+          f"(startup {startup:.2f}ms)")
+    clientes.encerrar()
+
+
+if __name__ == "__main__":
+    executar()
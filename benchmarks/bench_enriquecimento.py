@@ -0,0 +1,99 @@
+# bench_enriquecimento.py
+#
+# Enriquecimento das páginas de vários documentos processados ao mesmo
+# tempo, com o cliente local do Bedrock (latência até o primeiro token e
+# ritmo de tokens fixos). Compara uma invocação por página com os lotes
+# por orçamento de tokens, e mede o tempo até cada página ficar pronta
+# (streaming) e uma segunda passada sobre os mesmos documentos (cache pelo
+# hash do texto normalizado: espaços e maiúsculas diferentes).
+#
+# Uso: python -m benchmarks.bench_enriquecimento [--documentos 10] [--paginas 4]
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from benchmarks.sintetico import gerar_resposta
+from benchmarks.stubs import StubBedrockClient
+from services.cache import ResultadoCache
+from services import enriquecimento as modulo_enriquecimento
+from services.enriquecimento import Enriquecedor, SessaoEnriquecimento
+from services.textract.parser import extract_text
+
+# Intervalo (s) entre as páginas de um documento (ritmo do Textract)
+INTERVALO_PAGINAS = 0.1
+
+
+def textos_documentos(documentos, paginas):
+    return [[extract_text(gerar_resposta(300, seed=documento * 1000 + pagina))
+             for pagina in range(paginas)] for documento in range(documentos)]
+
+
+def processar(enriquecedor, documentos):
+    """
+    Um thread por documento, adicionando as páginas no ritmo do Textract.
+    Retorna o tempo (s) até cada página ficar pronta e o total.
+    """
+    inicio = time.perf_counter()
+    prontas = []
+    lock = threading.Lock()
+
+    def ao_resultado(resultado):
+        if resultado["erro"]:
+            raise RuntimeError(resultado["erro"])
+        with lock:
+            prontas.append(time.perf_counter() - inicio)
+
+    def documento(textos):
+        sessao = SessaoEnriquecimento(enriquecedor, ao_resultado)
+        for pagina, texto in enumerate(textos):
+            time.sleep(INTERVALO_PAGINAS)
+            sessao.adicionar(pagina, texto)
+        sessao.concluir()
+
+    threads = [threading.Thread(target=documento, args=(textos,)) for textos in documentos]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return prontas, time.perf_counter() - inicio
+
+
+def executar(n_documentos, n_paginas):
+    documentos = textos_documentos(n_documentos, n_paginas)
+    # Mesmo conteúdo com espaços e maiúsculas diferentes (outra digitalização)
+    variantes = [[texto.upper().replace(" ", "  ") for texto in textos] for textos in documentos]
+    print(f"{n_documentos} documentos x {n_paginas} páginas")
+
+    diretorio = tempfile.mkdtemp(prefix="bench_enriquecimento_")
+    modulo_enriquecimento.cache = ResultadoCache(diretorio=diretorio)
+    casos = [
+        ("uma invocação por página", dict(max_paginas_lote=1, usar_cache=False), [documentos]),
+        ("lotes por orçamento", dict(usar_cache=False), [documentos]),
+        ("lotes + cache (2a passada)", dict(usar_cache=True), [documentos, variantes]),
+    ]
+    try:
+        for nome, opcoes, passadas in casos:
+            cliente = StubBedrockClient()
+            enriquecedor = Enriquecedor(cliente=cliente, **opcoes)
+            for passada in passadas:
+                prontas, total = processar(enriquecedor, passada)
+            enriquecedor.encerrar()
+            metricas = enriquecedor.metricas()
+            print(f"  {nome:<27} total {total:6.2f}s  primeira {min(prontas):5.2f}s  "
+                  f"média {sum(prontas) / len(prontas):5.2f}s  "
+                  f"invocações {metricas['invocacoes']:>3}  "
+                  f"tokens entrada {cliente.tokens_entrada:>6}  "
+                  f"cache {metricas['hits_cache']:>3}")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documentos", type=int, default=10)
+    parser.add_argument("--paginas", type=int, default=4)
+    args = parser.parse_args()
+    executar(args.documentos, args.paginas)
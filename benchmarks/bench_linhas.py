@@ -0,0 +1,96 @@
+# bench_linhas.py
+#
+# Compara o extrator alternativo baseado em linhas (índice espacial + busca
+# de vários padrões) com a varredura original O(itens x linhas), para
+# catálogos de 13 a 5.000 coberturas.
+# Uso: python -m benchmarks.bench_linhas
+
+import random
+
+from benchmarks.bench_parser import medir
+from services.textract.parser import extract_insurance_data_from_lines
+
+CATALOGOS = [13, 40, 100, 1_000, 5_000]
+LINHAS_POR_PAGINA = 60
+PAGINAS = 20
+
+
+def varredura_original(response, expected_items):
+    """
+    Implementação anterior: uma varredura das linhas por item e outra
+    para encontrar as linhas na mesma altura.
+    """
+    line_blocks = []
+    for block in response['Blocks']:
+        if block['BlockType'] == 'LINE':
+            geometry = block.get('Geometry', {}).get('BoundingBox', {})
+            line_blocks.append({'text': block['Text'], 'page': block['Page'],
+                                'left': geometry.get('Left', 0),
+                                'top': geometry.get('Top', 0)})
+    line_blocks.sort(key=lambda x: (x['page'], x['top'], x['left']))
+
+    insurance_data = []
+    for item in expected_items:
+        desc_line = None
+        for line in line_blocks:
+            if item.lower() in line['text'].lower():
+                desc_line = line
+                break
+        if desc_line:
+            same_height_lines = [
+                line for line in line_blocks
+                if line['page'] == desc_line['page'] and
+                abs(line['top'] - desc_line['top']) < 0.01 and
+                line['left'] > desc_line['left']]
+            same_height_lines.sort(key=lambda x: x['left'])
+            insurance_data.append({
+                "Descrição": item,
+                "Limite Máximo Indenização": same_height_lines[0]['text'] if same_height_lines else "Não contratada",
+                "Prêmio Líquido": same_height_lines[1]['text'] if len(same_height_lines) > 1 else "R$ 0,00",
+            })
+    return insurance_data
+
+
+def gerar_documento(catalogo, seed=0):
+    """
+    Páginas com uma cobertura por linha (descrição, limite e prêmio), usando
+    metade do catálogo; a outra metade não aparece no documento.
+    """
+    rnd = random.Random(seed)
+    presentes = rnd.sample(catalogo, len(catalogo) // 2)
+    blocks = []
+    for pagina in range(1, PAGINAS + 1):
+        for linha in range(LINHAS_POR_PAGINA):
+            top = 0.05 + linha * 0.015
+            descricao = presentes[(pagina * LINHAS_POR_PAGINA + linha) % len(presentes)] \
+                if presentes else "Sem cobertura"
+            for coluna, texto in enumerate([descricao, f"R$ {rnd.randint(1, 900)}.000,00",
+                                            f"R$ {rnd.randint(1, 900)},00"]):
+                blocks.append({
+                    'Id': f"l-{pagina}-{linha}-{coluna}", 'BlockType': 'LINE',
+                    'Text': texto, 'Page': pagina, 'Confidence': 99.0,
+                    'Geometry': {'BoundingBox': {'Left': 0.05 + coluna * 0.35, 'Top': top,
+                                                 'Width': 0.3, 'Height': 0.01}}})
+    return {'Blocks': blocks}
+
+
+def executar():
+    print(f"{'itens':>7} {'linhas':>7} {'original s':>11} {'indice s':>9} {'ganho':>7} {'igual':>6}")
+    for n_itens in CATALOGOS:
+        catalogo = [f"Cobertura {i:05d} - Danos tipo {i % 7}" for i in range(n_itens)]
+        response = gerar_documento(catalogo)
+        n_linhas = len(response['Blocks'])
+
+        t_original = medir(varredura_original, response, catalogo)
+        # O índice é construído a cada execução (documento novo), como no parser
+        t_indice = medir(lambda: extract_insurance_data_from_lines(
+            {'Blocks': response['Blocks']}, catalogo))
+
+        igual = varredura_original(response, catalogo) == \
+            extract_insurance_data_from_lines(response, catalogo)
+        print(f"{n_itens:>7} {n_linhas:>7} {t_original:>11.4f} {t_indice:>9.4f} "
+              f"{t_original / t_indice:>6.1f}x {str(igual):>6}")
+
+
+if __name__ == "__main__":
+    executar()
@@ -0,0 +1,102 @@
+# bench_lote.py
+#
+# Compara um pacote de cotações com documentos de tamanhos variados enviado
+# como N uploads separados (todos ao mesmo tempo, cada um com o seu fluxo
+# no agendador) com o mesmo pacote em um único lote (/upload/batch), com e
+# sem prioridade para os documentos menores. Mede o tempo até o primeiro
+# documento, o tempo médio até cada documento ficar pronto e o total. O
+# Textract é o cliente local com latência; a cota de TPS limita o total.
+#
+# Uso: python -m benchmarks.bench_lote [--latencia 0.3] [--tps 8]
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("BUSCA_ATIVA", "false")
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+os.environ.setdefault("CACHE_ATIVO", "false")
+os.environ.setdefault("PERSISTIR_PAGINAS", "false")
+
+from benchmarks.bench_pipeline import gerar_pdf
+from benchmarks.stubs import StubTextractClient
+from services.aws import clientes_aws
+from services.executor import executor
+from services.lote import LOTE_MAX_PAGINAS, ProcessadorLotes
+from services.processa_arquivos import processa_arquivos
+from services.textract import scheduler as modulo_scheduler
+from services.textract.scheduler import TextractScheduler
+from services.textract import textract as modulo_textract
+
+# Páginas de cada documento do pacote (na ordem de envio)
+PACOTE = [24, 2, 1, 16, 3, 1, 12, 2, 4, 1, 8, 2]
+
+
+def documentos_do_pacote(pdfs):
+    return [{"indice": indice, "filename": f"cotacao_{indice}.pdf", "conteudo": conteudo,
+             "hash": None, "process_id": f"bench-{indice}"}
+            for indice, conteudo in enumerate(pdfs)]
+
+
+async def separados(pdfs):
+    """
+    Um upload por documento, todos ao mesmo tempo (como o cliente faz hoje).
+    """
+    inicio = time.perf_counter()
+    prontos = []
+
+    async def upload(indice, conteudo):
+        await executor.executar(
+            processa_arquivos, conteudo, f"cotacao_{indice}.pdf", "bench",
+            max_paginas=LOTE_MAX_PAGINAS, process_id=f"bench-{indice}")
+        prontos.append(time.perf_counter() - inicio)
+
+    await asyncio.gather(*(upload(indice, conteudo) for indice, conteudo in enumerate(pdfs)))
+    return prontos
+
+
+async def em_lote(pdfs, priorizar_pequenos):
+    inicio = time.perf_counter()
+    prontos = []
+    processador = ProcessadorLotes()
+    async for linha in processador.processar(documentos_do_pacote(pdfs), "bench",
+                                             priorizar_pequenos):
+        if linha["status"] != 200:
+            raise RuntimeError(linha["error"])
+        prontos.append(time.perf_counter() - inicio)
+    return prontos
+
+
+def executar(latencia, tps):
+    clientes_aws.registrar("textract", StubTextractClient(latencia=latencia, n_blocks=300))
+
+    print(f"{len(PACOTE)} documentos, {sum(PACOTE)} páginas; Textract {latencia}s/chamada, "
+          f"{tps} TPS")
+    pdfs = [gerar_pdf(paginas) for paginas in PACOTE]
+    casos = [
+        ("uploads separados", lambda: separados(pdfs)),
+        ("lote, ordem de envio", lambda: em_lote(pdfs, False)),
+        ("lote, menores primeiro", lambda: em_lote(pdfs, True)),
+    ]
+    for nome, caso in casos:
+        # Agendador novo a cada caso (mesma cota, fila vazia)
+        agendador = TextractScheduler(max_em_voo=4, tps=tps)
+        modulo_scheduler.scheduler = modulo_textract.scheduler = agendador
+        executor.iniciar()
+        try:
+            prontos = asyncio.run(caso())
+        finally:
+            executor.encerrar()
+            agendador.encerrar()
+        print(f"  {nome:<24} primeiro {min(prontos):6.2f}s  "
+              f"médio {sum(prontos) / len(prontos):6.2f}s  total {max(prontos):6.2f}s  "
+              f"({sum(PACOTE) / max(prontos):.1f} páginas/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latencia", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=8)
+    args = parser.parse_args()
+    executar(args.latencia, args.tps)
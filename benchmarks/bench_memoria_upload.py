@@ -0,0 +1,100 @@
+# bench_memoria_upload.py
+#
+# Pico de memória (RSS) da ingestão de N uploads concorrentes de 50 MB:
+# leitura integral com 'await file.read()' (original) x leitura em blocos
+# com ler_upload (que mapeia o arquivo temporário do upload em vez de
+# copiá-lo). Cada modo roda em um subprocesso para medir o pico isolado.
+#
+# Uso: python -m benchmarks.bench_memoria_upload [--uploads 8] [--mb 50]
+
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from services.ingestao import ler_upload
+
+
+class UploadEmDisco:
+    """
+    Imita o UploadFile do Starlette, cujo conteúdo acima de 1 MB fica em disco
+    (o SpooledTemporaryFile passa para o disco ao exceder o limite).
+    """
+
+    def __init__(self, caminho):
+        self._arquivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        with open(caminho, "rb") as origem:
+            shutil.copyfileobj(origem, self._arquivo)
+        self._arquivo.seek(0)
+        self.file = self._arquivo
+        self.size = os.path.getsize(caminho)
+
+    async def read(self, tamanho=-1):
+        return self._arquivo.read(tamanho)
+
+    def close(self):
+        self._arquivo.close()
+
+
+def rss_maximo_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def ingerir(modo, caminho):
+    upload = UploadEmDisco(caminho)
+    try:
+        if modo == "original":
+            conteudo = await upload.read()
+            # O pipeline original ainda copiava o conteúdo para um arquivo temporário
+            with tempfile.NamedTemporaryFile(suffix=".pdf") as temp_file:
+                temp_file.write(conteudo)
+        else:
+            conteudo, _ = await ler_upload(upload, max_bytes=1 << 40)
+        return len(conteudo), conteudo
+    finally:
+        upload.close()
+
+
+async def executar_modo(modo, caminho, uploads):
+    resultados = await asyncio.gather(*[ingerir(modo, caminho) for _ in range(uploads)])
+    # Mantém os buffers vivos até o fim, como os uploads concorrentes em andamento
+    return sum(tamanho for tamanho, _ in resultados)
+
+
+def filho(modo, caminho, uploads):
+    base = rss_maximo_mb()
+    total = asyncio.run(executar_modo(modo, caminho, uploads))
+    print(f"{modo:<10} uploads={uploads} bytes={total} "
+          f"rss_base={base:.0f}MB rss_pico={rss_maximo_mb():.0f}MB")
+
+
+def principal(uploads, mb):
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(b"%PDF-1.7\n")
+        f.write(os.urandom(mb * 1024 * 1024))
+        caminho = f.name
+    try:
+        for modo in ("original", "blocos"):
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_memoria_upload",
+                            "--filho", modo, "--arquivo", caminho, "--uploads", str(uploads)],
+                           check=True)
+    finally:
+        os.unlink(caminho)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--mb", type=int, default=50)
+    parser.add_argument("--filho")
+    parser.add_argument("--arquivo")
+    args = parser.parse_args()
+    if args.filho:
+        filho(args.filho, args.arquivo, args.uploads)
+    else:
+        principal(args.uploads, args.mb)
@@ -0,0 +1,171 @@
+# bench_parser.py
+#
+# Microbenchmark de cada função de services/textract/parser.py sobre
+# respostas sintéticas de 10k a 100k blocos e sobre respostas com o layout
+# real das cotações (benchmarks/pdfs.py). Cada função é medida "fria", a
+# partir da resposta bruta (inclui a indexação do documento), e "quente",
+# sobre um TextractDocument já indexado e com os índices preguiçosos
+# construídos. Com --saida, os tempos são gravados em JSON para comparação
+# com uma execução anterior (benchmarks/resultados.py).
+#
+# Uso: python -m benchmarks.bench_parser [--tamanhos 10000 100000]
+#      [--saida parser.json] [--comparar base.json]
+
+import argparse
+import contextlib
+import gc
+import io
+import time
+
+from benchmarks.sintetico import gerar_resposta
+from services.templates import registro_templates
+from services.textract.parser import (
+    as_document,
+    extract_text,
+    map_word_id,
+    get_key_map,
+    get_kv_map,
+    find_keyword_blocks,
+    find_multiple_keywords,
+    get_block_coordinates,
+    extract_insurance_table_data,
+    extract_insurance_data_from_lines,
+)
+
+TAMANHOS = [10_000, 25_000, 50_000, 100_000]
+REPETICOES = 3
+PALAVRAS_CHAVE = ["cobertura", "prêmio", "vigência", "franquia", "R$"]
+
+
+def medir(func, *args):
+    """
+    Retorna o melhor tempo de REPETICOES execuções, com o GC desligado
+    (mesma abordagem do timeit) e os prints do parser silenciados.
+    """
+    melhor = float('inf')
+    gc.disable()
+    try:
+        for _ in range(REPETICOES):
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                func(*args)
+            melhor = min(melhor, time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+    return melhor
+
+
+def funcoes(template):
+    """
+    Chamada de cada função do parser a partir de um documento (bruto ou indexado).
+    """
+    def coordenadas(document):
+        document = as_document(document)
+        for block in document.blocks:
+            get_block_coordinates(block)
+
+    def kv(document):
+        document = as_document(document)
+        word_map = map_word_id(document)
+        get_key_map(document, word_map)
+        get_kv_map(document, word_map)
+
+    return {
+        "as_document": as_document,
+        "extract_text": extract_text,
+        "map_word_id": map_word_id,
+        "get_key_map+get_kv_map": kv,
+        "find_keyword_blocks": lambda d: find_keyword_blocks(d, "cobertura"),
+        "find_multiple_keywords": lambda d: find_multiple_keywords(d, PALAVRAS_CHAVE),
+        "get_block_coordinates": coordenadas,
+        "extract_insurance_table_data": lambda d: extract_insurance_table_data(d, template),
+        "extract_insurance_data_from_lines":
+            lambda d: extract_insurance_data_from_lines(d, template.itens, template),
+    }
+
+
+def medir_resposta(response, template):
+    """
+    Tempos (s) de cada função, fria (resposta bruta) e quente (documento indexado).
+    """
+    document = as_document(response)
+    tempos = {}
+    for nome, func in funcoes(template).items():
+        # Primeira chamada constrói os índices preguiçosos usados pela função
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(document)
+        tempos[nome] = {"frio": medir(func, response), "quente": medir(func, document)}
+    return tempos
+
+
+def respostas_cotacoes(n=10):
+    """
+    Respostas no formato do Textract com o layout das cotações sintéticas.
+    """
+    import fitz  # PyMuPDF
+
+    from benchmarks.pdfs import gerar_cotacao
+    from services.pdf_nativo import pagina_para_blocos
+
+    respostas = []
+    for seed in range(n):
+        doc = fitz.open(stream=gerar_cotacao(1, linhas_tabela=8 + seed % 10, seed=seed),
+                        filetype="pdf")
+        respostas.append(pagina_para_blocos(doc[0]))
+        doc.close()
+    return respostas
+
+
+def executar(tamanhos=TAMANHOS):
+    registro_templates.carregar()
+    template = registro_templates.padrao()
+    cenarios = {}
+
+    # Cotação real: uma página com ~400 blocos (soma de 10 páginas diferentes)
+    cotacoes = respostas_cotacoes()
+    blocos = sum(len(r["Blocks"]) for r in cotacoes)
+    tempos = [medir_resposta(r, template) for r in cotacoes]
+    cenarios["cotacao"] = {"blocos": blocos, "tempos": {
+        nome: {modo: sum(t[nome][modo] for t in tempos) for modo in ("frio", "quente")}
+        for nome in tempos[0]}}
+
+    for n in tamanhos:
+        response = gerar_resposta(n)
+        cenarios[f"sintetico_{n}"] = {"blocos": len(response["Blocks"]),
+                                      "tempos": medir_resposta(response, template)}
+
+    print(f"{'função':<34}" + "".join(f"{nome:>26}" for nome in cenarios))
+    print(f"{'':<34}" + "".join(f"{'frio':>13}{'quente':>13}" for _ in cenarios))
+    for nome in funcoes(template):
+        linha = f"{nome:<34}"
+        for cenario in cenarios.values():
+            tempo = cenario["tempos"][nome]
+            linha += f"{tempo['frio'] * 1000:>11.2f}ms{tempo['quente'] * 1000:>11.2f}ms"
+        print(linha)
+    print(f"{'blocos':<34}" + "".join(f"{c['blocos']:>26}" for c in cenarios.values()))
+    return cenarios
+
+
+def metricas_planas(cenarios):
+    """
+    Tempos em ms no formato de resultados.comparar ("cenario.funcao.modo").
+    """
+    return {f"{cenario}.{nome}.{modo}_ms": round(tempo * 1000, 4)
+            for cenario, dados in cenarios.items()
+            for nome, modos in dados["tempos"].items()
+            for modo, tempo in modos.items()}
+
+
+if __name__ == "__main__":
+    from benchmarks import resultados
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS)
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+    metricas = metricas_planas(executar(args.tamanhos))
+    if args.saida:
+        resultados.salvar(args.saida, "parser", vars(args), metricas)
+    if args.comparar:
+        resultados.comparar(metricas, resultados.carregar(args.comparar))
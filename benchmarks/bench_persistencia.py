@@ -0,0 +1,61 @@
+# bench_persistencia.py
+#
+# Compara a gravação item a item (.save()) com o PersistenciaService (BatchWriteItem)
+# contra o DynamoDB Local (RAGPaginaModel.Meta.host).
+#
+# Uso: DYNAMODB_LOCAL=true python -m benchmarks.bench_persistencia [--paginas 200]
+
+import argparse
+import time
+from uuid import uuid4
+
+from services.persistencia import (
+    PersistenciaService,
+    criar_tabelas,
+    ler_paginas,
+    montar_itens_paginas,
+)
+
+
+def executar(paginas):
+    criar_tabelas()
+    resultados = [{"pagina": i, "resultados": [{"Descrição": f"Cobertura {i}"}]}
+                  for i in range(paginas)]
+
+    arquivo_id = str(uuid4())
+    inicio = time.perf_counter()
+    for item in montar_itens_paginas(arquivo_id, "bench.pdf", "bench", resultados):
+        item.save()
+    t_individual = time.perf_counter() - inicio
+
+    servico = PersistenciaService()
+    arquivo_id_lote = str(uuid4())
+    inicio = time.perf_counter()
+    servico.salvar(montar_itens_paginas(
+        arquivo_id_lote, "bench.pdf", "bench", resultados))
+    t_lote = time.perf_counter() - inicio
+
+    servico_wb = PersistenciaService()
+    arquivo_id_wb = str(uuid4())
+    inicio = time.perf_counter()
+    for item in montar_itens_paginas(arquivo_id_wb, "bench.pdf", "bench", resultados):
+        servico_wb.enfileirar(item)
+    t_enfileirar = time.perf_counter() - inicio
+    servico_wb.encerrar()
+    t_wb = time.perf_counter() - inicio
+
+    lidas = ler_paginas(arquivo_id_lote)
+    print(f"itens={paginas}")
+    print(f"save() individual: {t_individual:.3f}s")
+    print(f"batch_write:       {t_lote:.3f}s ({t_individual / t_lote:.1f}x) {servico.metricas()}")
+    print(f"write-behind:      {t_enfileirar * 1000:.1f}ms no caminho da requisição, "
+          f"{t_wb:.3f}s até o flush {servico_wb.metricas()}")
+    print(f"query única: {len(lidas)} páginas lidas, ordem_ok="
+          f"{[p.pagina for p in lidas] == list(range(paginas))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paginas", type=int, default=200)
+    args = parser.parse_args()
+    executar(args.paginas)
@@ -0,0 +1,128 @@
+# bench_pipeline.py
+#
+# Compara o processamento em lotes (renderizar o lote inteiro, depois o OCR
+# do lote inteiro, depois a extração) com o pipeline por página de
+# processa_arquivos: tempo até o primeiro resultado, tempo total e pico de
+# memória alocada no processo principal. O Textract é o cliente local que
+# injeta latência.
+#
+# Uso: python -m benchmarks.bench_pipeline [--paginas 10 40] [--latencia 0.5]
+
+import argparse
+import os
+import time
+import tracemalloc
+
+# O índice de busca guarda as palavras de todas as páginas por desenho;
+# desligado, o pico de memória compara apenas o processamento
+os.environ.setdefault("BUSCA_ATIVA", "false")
+
+import fitz  # PyMuPDF
+
+from benchmarks.stubs import StubTextractClient
+from services.aws import PERFIL_AGENDADO, clientes_aws
+from services.executor import executor
+from services.processa_arquivos import (
+    PoliticaRenderizacao, processa_arquivos, renderizar_pagina)
+from services.textract.scheduler import scheduler
+from services.textract.textract import FEATURE_TYPES, extrair_pagina
+
+# Tamanho do lote do processamento original
+PAGINAS_POR_LOTE = 10
+
+
+def gerar_pdf(paginas: int) -> bytes:
+    """
+    PDF com texto desenhado como imagem (sem camada de texto), para que
+    todas as páginas passem pela renderização e pelo OCR.
+    """
+    texto = fitz.open()
+    doc = fitz.open()
+    for i in range(paginas):
+        page = texto.new_page()
+        for linha in range(40):
+            page.insert_text((50, 60 + linha * 18),
+                             f"Cotação {i} - Cobertura {linha}: R$ {linha * 137},00")
+        # A página vai para o PDF final apenas como imagem: sem texto extraível
+        pix = page.get_pixmap(dpi=110)
+        imagem = doc.new_page(width=page.rect.width, height=page.rect.height)
+        imagem.insert_image(imagem.rect, stream=pix.tobytes("png"))
+    conteudo = doc.tobytes(deflate=True, garbage=3)
+    doc.close()
+    texto.close()
+    return conteudo
+
+
+def em_lotes(conteudo, paginas, marcar_primeira):
+    """
+    Reproduz o fluxo anterior: cada etapa espera o lote inteiro da anterior.
+    """
+    politica = PoliticaRenderizacao()
+    resultados = []
+    for inicio in range(0, paginas, PAGINAS_POR_LOTE):
+        numeros = range(inicio, min(inicio + PAGINAS_POR_LOTE, paginas))
+        futures = [executor.renderizar(renderizar_pagina, conteudo, n, politica, False)
+                   for n in numeros]
+        imagens = [future.result()["imagem"] for future in futures]
+        respostas = scheduler.analisar_documentos(
+            clientes_aws.textract(perfil=PERFIL_AGENDADO), imagens, FEATURE_TYPES)
+        for n, response in zip(numeros, respostas):
+            resultados_pagina, _ = extrair_pagina(response, f"pagina_{n}")
+            resultados.extend(resultados_pagina)
+            marcar_primeira()
+    return resultados
+
+
+def em_pipeline(conteudo, paginas, marcar_primeira):
+    def ao_progresso(tipo, dados):
+        if tipo == "pagina":
+            marcar_primeira()
+
+    resultado = processa_arquivos(
+        conteudo, "bench.pdf", "bench", persistir_paginas=False,
+        extrair_nativo=False, usar_cache=False, max_paginas=paginas,
+        ao_progresso=ao_progresso, persistir_dynamodb=False)
+    return resultado["textract_result"]["resultados"]
+
+
+def medir(func, conteudo, paginas):
+    primeira = []
+    inicio = time.perf_counter()
+
+    def marcar_primeira():
+        if not primeira:
+            primeira.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    resultados = func(conteudo, paginas, marcar_primeira)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultados, primeira[0], time.perf_counter() - inicio, pico / 1024 / 1024
+
+
+def executar(tamanhos, latencia):
+    executor.iniciar()
+    stub = StubTextractClient(latencia=latencia, n_blocks=500)
+    clientes_aws.registrar("textract", stub)
+    try:
+        for paginas in tamanhos:
+            conteudo = gerar_pdf(paginas)
+            print(f"{paginas} páginas, latência do OCR {latencia}s")
+            referencia = None
+            for nome, func in (("lotes", em_lotes), ("pipeline", em_pipeline)):
+                resultados, primeira, total, pico = medir(func, conteudo, paginas)
+                if referencia is None:
+                    referencia = resultados
+                print(f"  {nome:<9} primeiro resultado {primeira:6.2f}s  "
+                      f"total {total:6.2f}s  pico {pico:6.1f} MB  "
+                      f"{'' if resultados == referencia else '(resultados diferentes!)'}")
+    finally:
+        executor.encerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paginas", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--latencia", type=float, default=0.5)
+    args = parser.parse_args()
+    executar(args.paginas, args.latencia)
@@ -0,0 +1,108 @@
+# bench_recuperacao.py
+#
+# Índice de recuperação (services/indice_vetorial.py) com o codificador
+# local: vazão da indexação das páginas, latência das consultas (p50/p95)
+# com o top-k do NumPy sobre a matriz mapeada em memória comparada com a
+# varredura em Python puro, o custo de acrescentar um documento a um
+# índice grande (sem reconstrução) e o tempo para reabrir o índice.
+#
+# Uso: python -m benchmarks.bench_recuperacao [--trechos 10000 100000]
+
+import argparse
+import heapq
+import shutil
+import tempfile
+import time
+
+from benchmarks.sintetico import gerar_resposta
+from services.indice_vetorial import IndiceVetorial
+from services.textract.parser import as_document
+
+CONSULTAS = ["prêmio líquido total", "Campo12 R$", "cobertura franquia",
+             "seguradora vigência", "valor da parcela"]
+REPETICOES = 40
+# Respostas distintas usadas para montar o índice (repetidas em documentos diferentes)
+RESPOSTAS = 50
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def varredura_python(indice, consulta, k):
+    """
+    Top-k sem NumPy: produto escalar trecho a trecho.
+    """
+    vetor = indice.codificador.codificar([consulta])[0].tolist()
+    linhas = indice._vetores[:indice._n].tolist()
+    return heapq.nlargest(k, range(len(linhas)),
+                          key=lambda i: sum(a * b for a, b in zip(linhas[i], vetor)))
+
+
+def medir_consultas(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        for consulta in CONSULTAS:
+            inicio = time.perf_counter()
+            funcao(consulta)
+            tempos.append(time.perf_counter() - inicio)
+    return percentil(tempos, 0.5) * 1000, percentil(tempos, 0.95) * 1000
+
+
+def executar(tamanhos):
+    documentos = [as_document(gerar_resposta(1500, seed=seed)) for seed in range(RESPOSTAS)]
+    diretorio = tempfile.mkdtemp(prefix="bench_recuperacao_")
+    try:
+        indice = IndiceVetorial(diretorio)
+        indice.abrir()
+        paginas = 0
+        tempo_indexacao = 0.0
+        print(f"{'trechos':>8} {'páginas':>8} {'indexação':>11} {'consulta p50':>12} "
+              f"{'p95':>8} {'python p50':>10} {'+doc 10 págs':>12} {'reabrir':>8} {'MB':>6}")
+        for tamanho in tamanhos:
+            # Indexa documentos de 10 páginas até o tamanho do cenário
+            inicio = time.perf_counter()
+            while indice._n < tamanho:
+                process_id = f"doc-{paginas // 10}"
+                if paginas % 10 == 0:
+                    indice.registrar_documento(process_id, f"{process_id}.pdf", "bench")
+                indice.adicionar_pagina(process_id, paginas % 10 + 1,
+                                        documentos[paginas % RESPOSTAS])
+                paginas += 1
+            tempo_indexacao += time.perf_counter() - inicio
+
+            p50, p95 = medir_consultas(lambda consulta: indice.consultar(consulta, 5))
+            python_p50 = None
+            if indice._n <= 20_000:
+                inicio = time.perf_counter()
+                varredura_python(indice, CONSULTAS[0], 5)
+                python_p50 = (time.perf_counter() - inicio) * 1000
+
+            # Um documento novo entra sem reconstruir o índice
+            inicio = time.perf_counter()
+            indice.registrar_documento("novo", "novo.pdf", "bench")
+            for pagina in range(10):
+                indice.adicionar_pagina("novo", pagina + 1, documentos[pagina])
+            incremento = (time.perf_counter() - inicio) * 1000
+            indice.remover_documento("novo")
+
+            estatisticas = indice.estatisticas()
+            indice.encerrar()
+            indice = IndiceVetorial(diretorio)
+            indice.abrir()
+            python = f"{python_p50:>8.1f}ms" if python_p50 is not None else f"{'-':>10}"
+            print(f"{estatisticas['trechos']:>8} {paginas:>8} "
+                  f"{paginas / tempo_indexacao:>7.0f} p/s {p50:>10.2f}ms {p95:>6.2f}ms "
+                  f"{python} {incremento:>10.1f}ms {indice.tempo_abertura_ms:>6.0f}ms "
+                  f"{estatisticas['bytes_vetores'] / 1024 / 1024:>6.1f}")
+        indice.encerrar()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trechos", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    executar(args.trechos)
@@ -0,0 +1,84 @@
+# bench_renderizacao.py
+#
+# Compara políticas de renderização (DPI, formato, tons de cinza) em um corpus de PDFs:
+# tamanho do payload, tempo de codificação e, com --textract, latência e precisão
+# da extração em relação à política original (PNG colorido a 2x).
+#
+# Uso: python -m benchmarks.bench_renderizacao benchmarks/fixtures [--textract]
+
+import argparse
+import glob
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from services.processa_arquivos import PoliticaRenderizacao
+from services.textract.parser import extract_text
+
+POLITICAS = {
+    "original_png_2x": dict(dpi_min=144, dpi_base=144, dpi_max=144),
+    "adaptativa_png": dict(),
+    "adaptativa_png_cinza": dict(tons_de_cinza=True),
+    "adaptativa_jpeg_80": dict(formato="jpeg", qualidade_jpeg=80),
+    "adaptativa_jpeg_60_cinza": dict(formato="jpeg", qualidade_jpeg=60, tons_de_cinza=True),
+}
+
+
+def palavras(response):
+    return set(extract_text(response, "WORD").lower().split())
+
+
+def executar(pasta, usar_textract):
+    arquivos = sorted(glob.glob(os.path.join(pasta, "*.pdf")))
+    if not arquivos:
+        print(f"Nenhum PDF encontrado em {pasta}")
+        return
+
+    textract = None
+    if usar_textract:
+        from services.aws import clientes_aws
+        textract = clientes_aws.textract()
+
+    referencia = {}
+    print(f"{'politica':<26} {'bytes/pág':>10} {'enc ms/pág':>11} {'ocr ms/pág':>11} {'recall':>8}")
+    for nome, parametros in POLITICAS.items():
+        politica = PoliticaRenderizacao(**parametros)
+        total_bytes = total_enc = total_ocr = 0.0
+        recalls = []
+        paginas = 0
+
+        for arquivo in arquivos:
+            doc = fitz.open(arquivo)
+            for page in doc:
+                imagem, relatorio = politica.renderizar(page)
+                total_bytes += relatorio["bytes"]
+                total_enc += relatorio["tempo_codificacao_ms"]
+                paginas += 1
+
+                if textract is not None:
+                    inicio = time.perf_counter()
+                    response = textract.analyze_document(
+                        Document={'Bytes': imagem}, FeatureTypes=["FORMS", "TABLES"])
+                    total_ocr += (time.perf_counter() - inicio) * 1000
+                    chave = (arquivo, page.number)
+                    obtidas = palavras(response)
+                    if chave not in referencia:
+                        referencia[chave] = obtidas
+                    esperadas = referencia[chave]
+                    if esperadas:
+                        recalls.append(len(obtidas & esperadas) / len(esperadas))
+            doc.close()
+
+        recall = f"{sum(recalls) / len(recalls):.3f}" if recalls else "-"
+        ocr = f"{total_ocr / paginas:.0f}" if textract is not None else "-"
+        print(f"{nome:<26} {total_bytes / paginas:>10.0f} {total_enc / paginas:>11.1f} {ocr:>11} {recall:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pasta", nargs="?", default="benchmarks/fixtures")
+    parser.add_argument("--textract", action="store_true",
+                        help="Chama o AWS Textract para medir latência e precisão")
+    args = parser.parse_args()
+    executar(args.pasta, args.textract)
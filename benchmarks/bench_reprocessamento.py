@@ -0,0 +1,130 @@
+# bench_reprocessamento.py
+#
+# Arquivo das respostas brutas no formato colunar (services/textract/
+# colunar.py) comparado ao JSON do Textract: tamanho em disco, tempo de
+# gravação e tempo para abrir a resposta e extrair os dados (json.load +
+# TextractDocument contra mmap + DocumentoColunar). Depois processa
+# cotações sintéticas pelo pipeline (Textract local), reprocessa o arquivo
+# com 1 e N processos e confere que os resultados são os mesmos.
+#
+# Uso: python -m benchmarks.bench_reprocessamento [--documentos 40] [--processos 4]
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Os processos de renderização reimportam este módulo: reaproveitam o diretório
+_DIRETORIO = (os.environ.get("BENCH_REPROCESSAMENTO_DIRETORIO")
+              or tempfile.mkdtemp(prefix="bench_reprocessamento_"))
+os.environ["BENCH_REPROCESSAMENTO_DIRETORIO"] = _DIRETORIO
+os.environ.setdefault("RESPOSTAS_DIRETORIO", _DIRETORIO)
+os.environ.setdefault("RESPOSTAS_ARQUIVAR", "true")
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+os.environ.setdefault("CACHE_ATIVO", "false")
+os.environ.setdefault("PERSISTIR_PAGINAS", "false")
+os.environ.setdefault("BUSCA_ATIVA", "false")
+os.environ.setdefault("RECUPERACAO_ATIVA", "false")
+
+from benchmarks.bench_parser import respostas_cotacoes
+from benchmarks.pdfs import gerar_corpus, gravar_respostas
+from benchmarks.sintetico import gerar_resposta
+from benchmarks.stubs import RespostasGravadas, StubTextractClient
+from services.arquivo_respostas import arquivo_respostas
+from services.aws import clientes_aws
+from services.executor import executor
+from services.processa_arquivos import processa_arquivos
+from services.reprocessamento import reprocessar
+from services.templates import registro_templates
+from services.textract.colunar import carregar, codificar
+from services.textract.document import TextractDocument
+from services.textract.textract import extrair_resultados_pagina
+
+REPETICOES = 5
+
+
+def melhor(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000
+
+
+def comparar_formatos(diretorio):
+    print(f"{'resposta':<10} {'blocos':>7} {'JSON':>9} {'colunar':>9} {'gravar':>8} "
+          f"{'abrir JSON':>11} {'abrir col':>10} {'extrair JSON':>13} {'extrair col':>12}")
+    casos = [("cotação", respostas_cotacoes(1)[0]), ("10k", gerar_resposta(10_000)),
+             ("100k", gerar_resposta(100_000))]
+    for nome, resposta in casos:
+        caminho_json = os.path.join(diretorio, f"{nome}.json")
+        caminho_colunar = os.path.join(diretorio, f"{nome}.tcol")
+        with open(caminho_json, "w", encoding="utf-8") as f:
+            json.dump(resposta, f)
+        dados = codificar(resposta)
+        with open(caminho_colunar, "wb") as f:
+            f.write(dados)
+
+        def abrir_json():
+            with open(caminho_json, encoding="utf-8") as f:
+                return TextractDocument(json.load(f))
+
+        gravar = melhor(lambda: codificar(resposta))
+        t_json = melhor(abrir_json)
+        t_colunar = melhor(lambda: carregar(caminho_colunar))
+        e_json = melhor(lambda: extrair_resultados_pagina(abrir_json()))
+        e_colunar = melhor(lambda: extrair_resultados_pagina(carregar(caminho_colunar)))
+        print(f"{nome:<10} {len(resposta['Blocks']):>7} "
+              f"{os.path.getsize(caminho_json) / 1024:>7.0f}KB {len(dados) / 1024:>7.0f}KB "
+              f"{gravar:>6.1f}ms {t_json:>9.1f}ms {t_colunar:>8.2f}ms "
+              f"{e_json:>11.1f}ms {e_colunar:>10.1f}ms")
+
+
+def executar(n_documentos, processos):
+    registro_templates.carregar()
+    gravacoes = os.path.join(_DIRETORIO, "gravacoes")
+    try:
+        comparar_formatos(_DIRETORIO)
+
+        # Cotações processadas pelo pipeline: as respostas vão para o arquivo
+        gravar_respostas(gravacoes)
+        clientes_aws.registrar("textract", StubTextractClient(
+            latencia=0.0, respostas=RespostasGravadas(gravacoes)))
+        executor.iniciar()
+        originais = {}
+        inicio = time.perf_counter()
+        for item in gerar_corpus(n_documentos):
+            resultado = processa_arquivos(item["conteudo"], item["nome"], "bench",
+                                          persistir_paginas=False)
+            originais[resultado["process_id"]] = resultado["textract_result"]["resultados"]
+        processamento = time.perf_counter() - inicio
+        executor.encerrar()
+        arquivo_respostas.encerrar()
+        metricas = arquivo_respostas.metricas()
+        print(f"\n{n_documentos} documentos processados em {processamento:.1f}s; "
+              f"{metricas['paginas']} páginas arquivadas ({metricas['objetos_novos']} objetos, "
+              f"{metricas['bytes_gravados'] / 1024:.0f} KB, "
+              f"{metricas['tempo_medio_ms']} ms/página)")
+
+        for n in sorted({1, processos}):
+            saida = os.path.join(_DIRETORIO, f"reprocessamento_{n}.jsonl")
+            resumo = reprocessar(_DIRETORIO, saida, n)
+            with open(saida, encoding="utf-8") as f:
+                iguais = all(originais[r["process_id"]] == r["resultados"]
+                             for r in map(json.loads, f))
+            print(f"reprocessamento com {n} processo(s): {resumo['paginas']} páginas em "
+                  f"{resumo['tempo_s']:.2f}s ({resumo['paginas_por_s']} páginas/s), "
+                  f"resultados iguais ao processamento original: {iguais}")
+    finally:
+        shutil.rmtree(_DIRETORIO, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documentos", type=int, default=40)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    executar(args.documentos, args.processos)
@@ -0,0 +1,50 @@
+# bench_scheduler.py
+#
+# Compara a análise sequencial das páginas com o TextractScheduler concorrente,
+# usando o cliente local que injeta latência e throttling.
+# Uso: python -m benchmarks.bench_scheduler
+
+import time
+
+from benchmarks.stubs import StubTextractClient
+from services.textract.scheduler import TextractScheduler
+
+PAGINAS = 10
+LATENCIA = 0.3
+FEATURE_TYPES = ["FORMS", "TABLES", "LAYOUT"]
+
+
+def sequencial(client, payloads):
+    return [client.analyze_document(Document={'Bytes': p}, FeatureTypes=FEATURE_TYPES)
+            for p in payloads]
+
+
+def executar():
+    # Payloads de tamanhos distintos para identificar a ordem das respostas
+    payloads = [b"x" * (i + 1) for i in range(PAGINAS)]
+
+    client = StubTextractClient(latencia=LATENCIA, n_blocks=50)
+    inicio = time.perf_counter()
+    esperado = sequencial(client, payloads)
+    t_seq = time.perf_counter() - inicio
+    print(f"sequencial: {t_seq:.2f}s")
+
+    for max_em_voo, tps, taxa_throttling in [(4, 10, 0.0), (8, 20, 0.0), (8, 20, 0.2)]:
+        client = StubTextractClient(
+            latencia=LATENCIA, taxa_throttling=taxa_throttling, n_blocks=50, seed=1)
+        scheduler = TextractScheduler(
+            max_em_voo=max_em_voo, tps=tps, max_tentativas=8, backoff_base=0.05)
+        inicio = time.perf_counter()
+        respostas = scheduler.analisar_documentos(
+            client, payloads, FEATURE_TYPES)
+        t = time.perf_counter() - inicio
+        scheduler.encerrar()
+
+        na_ordem = respostas == esperado
+        print(f"em_voo={max_em_voo} tps={tps} throttling={taxa_throttling:.0%}: "
+              f"{t:.2f}s ({t_seq / t:.1f}x), pico_em_voo={client.pico_em_voo}, "
+              f"retentativas={scheduler.throttles}, ordem_ok={na_ordem}")
+
+
+if __name__ == "__main__":
+    executar()
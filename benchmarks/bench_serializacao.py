@@ -0,0 +1,87 @@
+# bench_serializacao.py
+#
+# Mede o tempo de CPU por página economizado ao remover a ida e volta por
+# JSON (montar_json -> json.loads) e as impressões com indent=2 do caminho
+# quente, e compara a serialização da resposta com json e com orjson.
+# Uso: python -m benchmarks.bench_serializacao
+
+import contextlib
+import json
+import os
+import time
+
+from benchmarks.sintetico import gerar_resposta
+from services.textract.textract import extrair_pagina
+from utils.respostas import orjson, serializar
+
+PAGINAS = 20
+BLOCOS_POR_PAGINA = 3_000
+REPETICOES = 3
+
+
+def consolidar(respostas, nomes):
+    """
+    Extrai cada página e consolida os resultados na ordem das páginas, como
+    o pipeline de processa_arquivos.
+    """
+    resultados = []
+    for nome, response in zip(nomes, respostas):
+        resultados_pagina, _ = extrair_pagina(response, nome)
+        resultados.extend(resultados_pagina)
+    return {"success": True, "total_arquivos": len(respostas), "resultados": resultados}
+
+
+def trabalho_removido(consolidado):
+    """
+    Reproduz o que era feito a mais antes, sobre os mesmos resultados:
+    por página, a impressão da tabela, o dumps(indent=2) + loads dos pares
+    chave-valor e, ao fim, a impressão dos resultados consolidados.
+    """
+    resultados = consolidado["resultados"]
+    for i in range(0, len(resultados), 2):
+        tabela, chave_valor = resultados[i], resultados[i + 1]
+        print(json.dumps(tabela, indent=2, ensure_ascii=False))
+        json.loads(json.dumps(chave_valor, indent=2, ensure_ascii=False))
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+def medir(func):
+    melhor = float('inf')
+    for _ in range(REPETICOES):
+        # O stdout vai para /dev/null: inclui o custo das escritas, sem o terminal
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            inicio = time.process_time()
+            func()
+            melhor = min(melhor, time.process_time() - inicio)
+    return melhor
+
+
+def executar():
+    respostas = [gerar_resposta(BLOCOS_POR_PAGINA, seed) for seed in range(PAGINAS)]
+    nomes = [f"pagina_{i}.png" for i in range(PAGINAS)]
+
+    consolidado = {}
+
+    def depois():
+        consolidado.update(consolidar(respostas, nomes))
+
+    t_depois = medir(depois)
+    t_removido = medir(lambda: trabalho_removido(consolidado))
+    t_antes = t_depois + t_removido
+
+    print(f"{PAGINAS} páginas de ~{BLOCOS_POR_PAGINA} blocos (tempo de CPU)")
+    print(f"antes:  {t_antes / PAGINAS * 1000:8.2f} ms/página")
+    print(f"depois: {t_depois / PAGINAS * 1000:8.2f} ms/página "
+          f"({t_removido / PAGINAS * 1000:.2f} ms/página economizados, "
+          f"{t_removido / t_antes:.0%})")
+
+    resposta = {"status": 200, "result": {"textract_result": consolidado}}
+    t_json = medir(lambda: json.dumps(resposta, ensure_ascii=False).encode("utf-8"))
+    t_resposta = medir(lambda: serializar(resposta))
+    print(f"resposta: json {t_json * 1000:.2f} ms, "
+          f"{'orjson' if orjson is not None else 'json compacto'} {t_resposta * 1000:.2f} ms "
+          f"({len(serializar(resposta))} bytes)")
+
+
+if __name__ == "__main__":
+    executar()
@@ -0,0 +1,135 @@
+# bench_tabelas.py
+#
+# Compara a reconstrução das tabelas de extract_insurance_table_data: a
+# versão anterior (células em dicts, agrupadas em dict de dicts por linha)
+# com a representação colunar de services/textract/tabela.py, em tabelas
+# sintéticas grandes (células mescladas e tabelas que continuam em várias
+# páginas). Confere que a saída é idêntica e mede o tempo e o pico de
+# memória da extração (a indexação do documento fica de fora).
+#
+# Uso: python -m benchmarks.bench_tabelas
+
+import gc
+import time
+import tracemalloc
+
+from benchmarks.sintetico import gerar_tabelas
+from services.templates import registro_templates
+from services.textract.parser import as_document, extract_insurance_table_data
+
+# (tabelas, linhas por tabela, colunas, páginas por tabela)
+CENARIOS = [
+    (1, 1_000, 3, 1),
+    (1, 10_000, 3, 1),
+    (20, 1_000, 3, 5),
+    (5, 5_000, 6, 10),
+]
+REPETICOES = 5
+
+
+def original(document, template):
+    """
+    Reconstrução anterior das tabelas (sem o método alternativo por linhas).
+    """
+    colunas = template.colunas
+    word_map = document.word_map
+    line_map = document.line_map
+    insurance_data = []
+    for block in document.blocks_of('TABLE'):
+        cells = []
+        for cell_id in document.child_ids(block['Id']):
+            cell_block = document.get(cell_id)
+            if cell_block and cell_block['BlockType'] == 'CELL':
+                child_texts = []
+                for child_id in document.child_ids(cell_id):
+                    if child_id in word_map:
+                        child_texts.append(word_map[child_id])
+                    elif child_id in line_map:
+                        child_texts.append(line_map[child_id])
+                cell_text = " ".join(child_texts).strip()
+                cells.append({
+                    'text': cell_text,
+                    'row': cell_block.get('RowIndex', 0),
+                    'col': cell_block.get('ColumnIndex', 0),
+                    'confidence': cell_block.get('Confidence', 0)
+                })
+
+        cells_by_row = {}
+        for cell in cells:
+            row = cell['row']
+            if row not in cells_by_row:
+                cells_by_row[row] = {}
+            cells_by_row[row][cell['col']] = cell['text']
+
+        for row_num in sorted(cells_by_row.keys()):
+            if row_num == 1:
+                continue
+            row_data = cells_by_row[row_num]
+            if all(col in row_data for col in range(1, len(colunas) + 1)):
+                valores = [row_data[col].strip()
+                           for col in range(1, len(colunas) + 1)]
+                if all(valores) and not template.eh_cabecalho(valores[0]):
+                    insurance_data.append(dict(zip(colunas, valores)))
+    return insurance_data
+
+
+def novo(document, template):
+    return extract_insurance_table_data(document, template)
+
+
+def documento(response):
+    # Documento indexado, com os mapas de palavras e linhas já calculados
+    document = as_document(response)
+    document.word_map
+    document.line_map
+    return document
+
+
+def medir(funcao, response, template):
+    melhor = float('inf')
+    resultado = None
+    gc.disable()
+    try:
+        for _ in range(REPETICOES):
+            document = documento(response)
+            inicio = time.perf_counter()
+            resultado = funcao(document, template)
+            melhor = min(melhor, time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+
+    document = documento(response)
+    tracemalloc.start()
+    funcao(document, template)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico, resultado, document
+
+
+def executar():
+    template = registro_templates.padrao()
+    print(f"{'tabelas':>7} {'linhas':>7} {'cols':>4} {'págs':>4} {'células':>8} "
+          f"{'original':>9} {'colunar':>9} {'2a chamada':>10} "
+          f"{'pico orig':>9} {'pico col':>9} {'itens':>7}")
+    for n_tabelas, n_linhas, n_colunas, paginas in CENARIOS:
+        response = gerar_tabelas(n_tabelas, n_linhas, n_colunas, paginas)
+        celulas = sum(1 for block in response['Blocks'] if block['BlockType'] == 'CELL')
+
+        t_orig, pico_orig, esperado, _ = medir(original, response, template)
+        t_novo, pico_novo, obtido, document = medir(novo, response, template)
+        if obtido != esperado:
+            raise AssertionError("Saída diferente da versão anterior")
+
+        # Outro template sobre o mesmo documento: as tabelas já estão montadas
+        inicio = time.perf_counter()
+        novo(document, template)
+        t_cache = time.perf_counter() - inicio
+
+        print(f"{n_tabelas:>7} {n_linhas:>7} {n_colunas:>4} {paginas:>4} {celulas:>8} "
+              f"{t_orig * 1000:>7.1f}ms {t_novo * 1000:>7.1f}ms {t_cache * 1000:>8.1f}ms "
+              f"{pico_orig / 1024 / 1024:>7.1f}MB {pico_novo / 1024 / 1024:>7.1f}MB "
+              f"{len(obtido):>7}")
+
+
+if __name__ == "__main__":
+    executar()
@@ -0,0 +1,78 @@
+# bench_textract_assincrono.py
+#
+# Compara, em um PDF digitalizado com muitas páginas, o modo síncrono (uma
+# imagem por página com AnalyzeDocument) com o modo assíncrono (o PDF vai
+# uma vez para o S3 e é analisado por StartDocumentAnalysis, com os blocos
+# lidos via GetDocumentAnalysis/NextToken). S3 e Textract são os clientes
+# locais de benchmarks/stubs.py, que também validam o fluxo sem rede.
+#
+# Uso: python -m benchmarks.bench_textract_assincrono [--paginas 40]
+
+import argparse
+import os
+import time
+
+# Bucket fictício: o S3 é o cliente local
+os.environ.setdefault("S3_BUCKET", "bench-local")
+os.environ.setdefault("BUSCA_ATIVA", "false")
+
+from benchmarks.bench_pipeline import gerar_pdf
+from benchmarks.stubs import StubS3Client, StubTextractClient
+from services.aws import clientes_aws
+from services.executor import executor
+from services.processa_arquivos import processa_arquivos
+
+
+def executar_modo(conteudo, paginas, assincrono):
+    primeira = []
+    inicio = time.perf_counter()
+
+    def ao_progresso(tipo, dados):
+        if tipo == "pagina" and not primeira:
+            primeira.append(time.perf_counter() - inicio)
+
+    resultado = processa_arquivos(
+        conteudo, "bench.pdf", "bench", persistir_paginas=False,
+        extrair_nativo=False, usar_cache=False, max_paginas=paginas,
+        ao_progresso=ao_progresso, persistir_dynamodb=False,
+        textract_assincrono=assincrono)
+    total = time.perf_counter() - inicio
+    if not resultado["success"]:
+        raise RuntimeError(resultado["error"])
+    return resultado, primeira[0], total
+
+
+def executar(paginas, latencia, latencia_job):
+    executor.iniciar()
+    s3 = StubS3Client(latencia=0.02)
+    textract = StubTextractClient(latencia=latencia, n_blocks=500, s3=s3,
+                                  latencia_job=latencia_job)
+    clientes_aws.registrar("s3", s3)
+    clientes_aws.registrar("textract", textract)
+
+    conteudo = gerar_pdf(paginas)
+    print(f"{paginas} páginas ({len(conteudo) / 1024 / 1024:.1f} MB), "
+          f"AnalyzeDocument {latencia}s/página, job assíncrono {latencia_job}s + "
+          f"{textract.latencia_job_pagina}s/página")
+    try:
+        for nome, assincrono in (("síncrono", False), ("assíncrono", True)):
+            chamadas = textract.chamadas + textract.chamadas_get
+            requisicoes_s3 = s3.requisicoes
+            resultado, primeira, total = executar_modo(conteudo, paginas, assincrono)
+            erros = sum(1 for r in resultado["renderizacao"] if r.get("blocos") == 0)
+            print(f"  {nome:<11} primeiro resultado {primeira:6.2f}s  total {total:6.2f}s  "
+                  f"chamadas Textract {textract.chamadas + textract.chamadas_get - chamadas:4d}  "
+                  f"requisições S3 {s3.requisicoes - requisicoes_s3:3d}  "
+                  f"itens {len(resultado['textract_result']['resultados'])}  "
+                  f"páginas sem blocos {erros}")
+    finally:
+        executor.encerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paginas", type=int, default=40)
+    parser.add_argument("--latencia", type=float, default=0.5)
+    parser.add_argument("--latencia-job", type=float, default=3.0)
+    args = parser.parse_args()
+    executar(args.paginas, args.latencia, args.latencia_job)
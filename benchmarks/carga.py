@@ -0,0 +1,323 @@
+# carga.py
+#
+# Teste de carga HTTP da aplicação: sobe o servidor de benchmark
+# (benchmarks/servidor.py, backends AWS locais) em outro processo e envia
+# cotações sintéticas (benchmarks/pdfs.py: nativas e digitalizadas, de 1 a
+# 5 páginas) ao POST /upload a partir de N clientes concorrentes com
+# conexões keep-alive, opcionalmente misturando consultas GET /query.
+# Reporta a latência (p50/p95/p99) e a vazão por rota, os erros por status
+# e o pico de memória (RSS) do servidor e dos processos filhos (pool de
+# renderização). Com --saida, grava o resultado em JSON; com --comparar,
+# compara com uma execução anterior (benchmarks/resultados.py).
+#
+# Uso: python -m benchmarks.carga [--clientes 4] [--duracao 30] [--aquecimento 5]
+#      [--consultas 0.2] [--saida data/bench/carga.json] [--comparar base.json]
+#      [--url http://host:porta (servidor já em execução, sem medir a memória)]
+
+import argparse
+import http.client
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from benchmarks import resultados
+from benchmarks.pdfs import gerar_corpus
+
+CONSULTAS = ["prêmio líquido total", "RCF-V danos materiais", "assistência 24 horas",
+             "vigência da apólice", "franquia colisão", "principal condutor"]
+# Intervalo (s) entre as amostras de memória do servidor
+INTERVALO_MEMORIA = 0.1
+_FRONTEIRA = "----bench-carga-fronteira"
+
+
+def corpo_upload(nome, conteudo, titulo="bench"):
+    """
+    Corpo multipart/form-data do POST /upload (arquivo + título).
+    """
+    partes = [
+        f"--{_FRONTEIRA}\r\n"
+        f'Content-Disposition: form-data; name="titulo"\r\n\r\n{titulo}\r\n'.encode(),
+        f"--{_FRONTEIRA}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{nome}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n".encode(),
+        conteudo,
+        f"\r\n--{_FRONTEIRA}--\r\n".encode(),
+    ]
+    return b"".join(partes)
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+class MonitorMemoria:
+    """
+    Amostra o RSS do processo do servidor somado ao dos filhos (lido de
+    /proc) e guarda o pico. O VmHWM do processo principal (pico registrado
+    pelo kernel) cobre os picos entre duas amostras.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.pico_rss = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    @staticmethod
+    def _status(pid, campo):
+        try:
+            with open(f"/proc/{pid}/status") as arquivo:
+                for linha in arquivo:
+                    if linha.startswith(campo + ":"):
+                        return int(linha.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def _descendentes(self):
+        pais = {}
+        for nome in os.listdir("/proc"):
+            if nome.isdigit():
+                try:
+                    with open(f"/proc/{nome}/stat") as arquivo:
+                        # O nome do processo (entre parênteses) pode ter espaços
+                        pais[int(nome)] = int(arquivo.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, ValueError, IndexError):
+                    continue
+        descendentes, pendentes = [], [self.pid]
+        while pendentes:
+            pai = pendentes.pop()
+            filhos = [pid for pid, ppid in pais.items() if ppid == pai]
+            descendentes.extend(filhos)
+            pendentes.extend(filhos)
+        return descendentes
+
+    def rss(self):
+        return sum(self._status(pid, "VmRSS") for pid in [self.pid] + self._descendentes())
+
+    def _loop(self):
+        while not self._parar.wait(INTERVALO_MEMORIA):
+            self.pico_rss = max(self.pico_rss, self.rss())
+
+    def iniciar(self):
+        self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        self._thread.join()
+        return {
+            "rss_pico_mb": round(self.pico_rss / 1024 / 1024, 1),
+            "hwm_servidor_mb": round(self._status(self.pid, "VmHWM") / 1024 / 1024, 1),
+        }
+
+
+class Cliente(threading.Thread):
+    """
+    Um cliente HTTP com conexão keep-alive, enviando requisições até o fim
+    do teste. Cada amostra: (rota, início, duração, status, páginas).
+    """
+
+    def __init__(self, endereco, requisicoes, parar, amostras, lock):
+        super().__init__(daemon=True)
+        self.endereco = endereco
+        self.requisicoes = requisicoes
+        self.parar = parar
+        self.amostras = amostras
+        self.lock = lock
+        self._conexao = None
+
+    def _enviar(self, metodo, caminho, corpo=None, cabecalhos=None):
+        for tentativa in range(2):
+            if self._conexao is None:
+                self._conexao = http.client.HTTPConnection(*self.endereco, timeout=300)
+            try:
+                self._conexao.request(metodo, caminho, body=corpo, headers=cabecalhos or {})
+                resposta = self._conexao.getresponse()
+                resposta.read()
+                return resposta.status
+            except (http.client.HTTPException, OSError):
+                # Conexão fechada pelo servidor: reabre uma vez
+                self._conexao.close()
+                self._conexao = None
+                if tentativa:
+                    return 0
+
+    def run(self):
+        while not self.parar.is_set():
+            rota, caminho, corpo, paginas = next(self.requisicoes)
+            cabecalhos = {"Content-Type": f"multipart/form-data; boundary={_FRONTEIRA}"} \
+                if corpo is not None else None
+            inicio = time.perf_counter()
+            status = self._enviar("POST" if corpo is not None else "GET", caminho, corpo,
+                                  cabecalhos)
+            duracao = time.perf_counter() - inicio
+            with self.lock:
+                self.amostras.append((rota, inicio, duracao, status, paginas))
+        if self._conexao is not None:
+            self._conexao.close()
+
+
+def gerar_requisicoes(corpus, fracao_consultas, lock):
+    """
+    Sequência determinística (compartilhada pelos clientes) de uploads e consultas.
+    """
+    uploads = itertools.cycle(corpus)
+    consultas = itertools.cycle(CONSULTAS)
+    contador = itertools.count()
+    intervalo = round(1 / fracao_consultas) if fracao_consultas else 0
+
+    def proxima():
+        with lock:
+            n = next(contador)
+            if intervalo and n % intervalo == intervalo - 1:
+                consulta = urllib.parse.quote(next(consultas))
+                return "GET /query", f"/query?q={consulta}&k=5", None, 0
+            item = next(uploads)
+            return "POST /upload", "/upload", item["corpo"], item["paginas"]
+
+    while True:
+        yield proxima()
+
+
+def aguardar_servidor(endereco, processo=None, timeout=60):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo is not None and processo.poll() is not None:
+            raise RuntimeError("o servidor de benchmark terminou durante o startup")
+        try:
+            conexao = http.client.HTTPConnection(*endereco, timeout=2)
+            conexao.request("GET", "/ok")
+            if conexao.getresponse().status == 200:
+                conexao.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError("o servidor de benchmark não respondeu")
+
+
+def resumir(amostras, inicio, fim):
+    """
+    Estatísticas por rota das amostras concluídas dentro da janela medida.
+    """
+    janela = fim - inicio
+    metricas = {}
+    por_rota = {}
+    for rota, t0, duracao, status, paginas in amostras:
+        if t0 >= inicio and t0 + duracao <= fim:
+            por_rota.setdefault(rota, []).append((duracao, status, paginas))
+    for rota, itens in sorted(por_rota.items()):
+        ok = [(d, p) for d, s, p in itens if s == 200]
+        tempos = [d for d, _ in ok]
+        prefixo = rota.split()[1].strip("/").replace("/", "_")
+        metricas.update({
+            f"{prefixo}.requisicoes": len(itens),
+            f"{prefixo}.erros": len(itens) - len(ok),
+            f"{prefixo}.p50_ms": round(percentil(tempos, 0.50) * 1000, 1),
+            f"{prefixo}.p95_ms": round(percentil(tempos, 0.95) * 1000, 1),
+            f"{prefixo}.p99_ms": round(percentil(tempos, 0.99) * 1000, 1),
+            f"{prefixo}.media_ms": round(sum(tempos) / len(tempos) * 1000, 1) if tempos else 0.0,
+            f"{prefixo}.req_por_s": round(len(ok) / janela, 2),
+        })
+        if rota == "POST /upload":
+            metricas["upload.paginas_por_s"] = round(sum(p for _, p in ok) / janela, 2)
+        status = {}
+        for _, s, _ in itens:
+            status[s] = status.get(s, 0) + 1
+        print(f"{rota:<13} {len(itens):>6} req  {len(ok) / janela:>7.2f} req/s  "
+              f"p50 {metricas[f'{prefixo}.p50_ms']:>8.1f}ms  "
+              f"p95 {metricas[f'{prefixo}.p95_ms']:>8.1f}ms  "
+              f"p99 {metricas[f'{prefixo}.p99_ms']:>8.1f}ms  status {status}")
+    return metricas
+
+
+def executar(args):
+    corpus = gerar_corpus(args.documentos, tuple(args.paginas), args.digitalizadas, args.seed)
+    for item in corpus:
+        item["corpo"] = corpo_upload(item["nome"], item["conteudo"])
+    print(f"corpus: {len(corpus)} cotações, {sum(i['paginas'] for i in corpus)} páginas, "
+          f"{sum(i['digitalizada'] for i in corpus)} digitalizadas")
+
+    processo = None
+    if args.url:
+        url = urllib.parse.urlsplit(args.url)
+        endereco = (url.hostname, url.port or 80)
+    else:
+        endereco = ("127.0.0.1", args.porta)
+        comando = [sys.executable, "-m", "benchmarks.servidor", "--porta", str(args.porta),
+                   "--latencia-textract", str(args.latencia_textract)]
+        if args.gravacoes:
+            comando += ["--gravacoes", args.gravacoes]
+        processo = subprocess.Popen(comando)
+    try:
+        aguardar_servidor(endereco, processo)
+        monitor = MonitorMemoria(processo.pid) if processo else None
+        rss_inicial = monitor.rss() if monitor else 0
+        if monitor:
+            monitor.iniciar()
+
+        lock = threading.Lock()
+        amostras = []
+        parar = threading.Event()
+        requisicoes = gerar_requisicoes(corpus, args.consultas, threading.Lock())
+        clientes = [Cliente(endereco, requisicoes, parar, amostras, lock)
+                    for _ in range(args.clientes)]
+        inicio_teste = time.perf_counter()
+        for cliente in clientes:
+            cliente.start()
+        # O aquecimento (pools, clientes, índices) fica fora da janela medida
+        inicio = inicio_teste + args.aquecimento
+        fim = inicio + args.duracao
+        time.sleep(max(0.0, fim - time.perf_counter()))
+        parar.set()
+        for cliente in clientes:
+            cliente.join()
+
+        print(f"{args.clientes} clientes, {args.duracao:.0f}s medidos "
+              f"(+{args.aquecimento:.0f}s de aquecimento)")
+        metricas = resumir(amostras, inicio, fim)
+        if monitor:
+            memoria = monitor.encerrar()
+            memoria["rss_inicial_mb"] = round(rss_inicial / 1024 / 1024, 1)
+            metricas.update(memoria)
+            print(f"memória do servidor: inicial {memoria['rss_inicial_mb']} MB, "
+                  f"pico {memoria['rss_pico_mb']} MB (servidor + filhos), "
+                  f"VmHWM {memoria['hwm_servidor_mb']} MB")
+    finally:
+        if processo is not None:
+            processo.terminate()
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    parametros = {k: v for k, v in vars(args).items() if k not in ("saida", "comparar")}
+    if args.saida:
+        resultados.salvar(args.saida, "carga", parametros, metricas)
+    if args.comparar:
+        resultados.comparar(metricas, resultados.carregar(args.comparar))
+    return metricas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=4)
+    parser.add_argument("--duracao", type=float, default=30)
+    parser.add_argument("--aquecimento", type=float, default=5)
+    parser.add_argument("--consultas", type=float, default=0.0,
+                        help="fração das requisições que são GET /query")
+    parser.add_argument("--documentos", type=int, default=20)
+    parser.add_argument("--paginas", type=int, nargs=2, default=[1, 5])
+    parser.add_argument("--digitalizadas", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latencia-textract", type=float, default=0.3)
+    parser.add_argument("--gravacoes", help="respostas gravadas do Textract (servidor local)")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--url", help="servidor já em execução (não mede a memória)")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    executar(parser.parse_args())
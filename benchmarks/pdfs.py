@@ -0,0 +1,194 @@
+# pdfs.py
+#
+# Gerador de PDFs sintéticos de cotações de seguro auto no layout do
+# template padrão (templates/cotacao_auto.json): cabeçalho da seguradora,
+# campos "Chave: valor", a tabela de coberturas (Descrição / Limite Máximo
+# Indenização / Prêmio Líquido, com bordas) e o rodapé com a numeração.
+# As páginas podem ser nativas (com camada de texto) ou digitalizadas
+# (apenas imagem, passando pela renderização e pelo Textract). O conteúdo
+# depende apenas dos parâmetros: a mesma chamada gera os mesmos bytes.
+#
+# Também grava respostas no formato do Textract a partir das páginas
+# nativas (services/pdf_nativo.py), usadas pelo StubTextractClient para
+# devolver respostas com o layout real da cotação.
+#
+# Uso: python -m benchmarks.pdfs --saida data/bench_pdfs [--documentos 20]
+#      [--gravacoes data/bench_gravacoes]
+
+import argparse
+import json
+import os
+import random
+
+import fitz  # PyMuPDF
+
+SEGURADORAS = ["Porto Seguro", "Bradesco Seguros", "Allianz", "Tokio Marine",
+               "HDI Seguros", "Mapfre", "Liberty Seguros", "Azul Seguros"]
+PRODUTOS = ["Auto Clássico", "Auto Essencial", "Auto Premium", "Auto Jovem"]
+VEICULOS = ["Onix 1.0 LT", "HB20 1.0 Comfort", "Corolla 2.0 XEi", "Compass 1.3 T270",
+            "Gol 1.6 MSI", "Kicks 1.6 SV", "T-Cross 200 TSI", "Renegade 1.8"]
+# Coberturas da tabela (os itens do template e alguns extras)
+COBERTURAS = [
+    "Colisão, Incêndio e Roubo/Furto", "Despesa extraordinária",
+    "RCF-V - Danos Materiais", "RCF-V - Danos Corporais", "RCF-V - Danos Morais",
+    "APP - Morte (por passageiro)", "APP - Invalidez permanente (por passageiro)",
+    "APP - DMHO (por passageiro)", "Assistência 24 horas", "Km adicional de reboque",
+    "Kit Gás", "Blindagem", "Extensão para Garantia de 0km", "Vidros e retrovisores",
+    "Carro reserva 15 dias", "Faróis e lanternas", "Martelinho de ouro",
+]
+COLUNAS = ["Descrição", "Limite Máximo Indenização", "Prêmio Líquido"]
+# Posição (pt) das colunas da tabela em uma página A4
+_X_COLUNAS = (40, 300, 450, 555)
+_ALTURA_LINHA = 18
+
+
+def _moeda(valor):
+    inteiro, centavos = divmod(int(round(valor * 100)), 100)
+    return f"R$ {inteiro:,}".replace(",", ".") + f",{centavos:02d}"
+
+
+def _desenhar_pagina(page, rnd, cotacao, numero, total, linhas_tabela):
+    page.insert_text((40, 50), f"{cotacao['seguradora']} - Cotação de Seguro Auto",
+                     fontsize=15)
+    campos = [
+        ("N° Cotação", cotacao["numero"]),
+        ("Vigência", cotacao["vigencia"]),
+        ("N° Proposta/Negócio", cotacao["proposta"]),
+        ("Tipo Seguro", cotacao["produto"]),
+        ("Empresa Parceira", "Corretora Exemplo Ltda"),
+        ("Processo SUSEP n°", cotacao["susep"]),
+        ("Veículo", cotacao["veiculo"]),
+        ("Principal Condutor", cotacao["condutor"]),
+    ]
+    y = 80
+    for chave, valor in campos:
+        page.insert_text((40, y), f"{chave}: {valor}", fontsize=9)
+        y += 14
+
+    # Tabela de coberturas com bordas (detectada pelo find_tables nas
+    # páginas nativas e pelo TABLES do Textract nas digitalizadas)
+    y += 10
+    linhas = [COLUNAS]
+    coberturas = rnd.sample(COBERTURAS, min(linhas_tabela, len(COBERTURAS)))
+    while len(coberturas) < linhas_tabela:
+        coberturas.append(f"Cobertura adicional {len(coberturas) + 1}")
+    for descricao in coberturas:
+        if rnd.random() < 0.15:
+            linhas.append([descricao, "Não contratada", "R$ 0,00"])
+        else:
+            linhas.append([descricao, _moeda(rnd.randint(5, 500) * 1000),
+                           _moeda(rnd.uniform(20, 2500))])
+    topo = y
+    for i, linha in enumerate(linhas):
+        for x, texto in zip(_X_COLUNAS, linha):
+            page.insert_text((x + 4, y + 13), texto, fontsize=8)
+        y += _ALTURA_LINHA
+        page.draw_line((_X_COLUNAS[0], y), (_X_COLUNAS[-1], y), width=0.5)
+    page.draw_line((_X_COLUNAS[0], topo), (_X_COLUNAS[-1], topo), width=0.5)
+    for x in _X_COLUNAS:
+        page.draw_line((x, topo), (x, y), width=0.5)
+
+    total_premio = sum(float(l[2][3:].replace(".", "").replace(",", ".")) for l in linhas[1:])
+    page.insert_text((40, y + 24), f"Prêmio Líquido Total: {_moeda(total_premio)}", fontsize=10)
+    page.insert_text((40, page.rect.height - 30), f"Página {numero} de {total}", fontsize=8)
+
+
+def gerar_cotacao(paginas=1, linhas_tabela=13, digitalizada=False, dpi=110, seed=0) -> bytes:
+    """
+    PDF de uma cotação com 'paginas' páginas, cada uma com a tabela de
+    'linhas_tabela' coberturas. Com 'digitalizada', as páginas vão para o
+    PDF apenas como imagem (renderizadas a 'dpi'), sem camada de texto.
+    """
+    rnd = random.Random(seed)
+    cotacao = {
+        "seguradora": rnd.choice(SEGURADORAS),
+        "produto": rnd.choice(PRODUTOS),
+        "veiculo": rnd.choice(VEICULOS),
+        "numero": str(rnd.randint(10 ** 8, 10 ** 9 - 1)),
+        "proposta": f"{rnd.randint(1000, 9999)}/{rnd.randint(100000, 999999)}",
+        "susep": f"15414.{rnd.randint(100000, 999999)}/2024-{rnd.randint(10, 99)}",
+        "vigencia": f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2026 a 12 meses",
+        "condutor": rnd.choice(["Ana Souza", "Carlos Lima", "Marina Costa", "João Pereira"]),
+    }
+
+    origem = fitz.open()
+    for numero in range(1, paginas + 1):
+        page = origem.new_page(width=595, height=842)
+        _desenhar_pagina(page, rnd, cotacao, numero, paginas, linhas_tabela)
+
+    if digitalizada:
+        doc = fitz.open()
+        for page in origem:
+            # A página vai para o PDF final apenas como imagem: sem texto extraível
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            imagem = doc.new_page(width=page.rect.width, height=page.rect.height)
+            imagem.insert_image(imagem.rect, stream=pix.tobytes("png"))
+        origem.close()
+    else:
+        doc = origem
+
+    # Metadados fixos e sem id novo: os bytes dependem só dos parâmetros
+    doc.set_metadata({"producer": "benchmarks.pdfs", "creator": "benchmarks.pdfs",
+                      "creationDate": "D:20260101000000", "modDate": "D:20260101000000"})
+    conteudo = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return conteudo
+
+
+def gerar_corpus(documentos, paginas=(1, 5), fracao_digitalizada=0.5, seed=0):
+    """
+    Lista de cotações variadas (número de páginas, tamanho da tabela,
+    nativas ou digitalizadas). Cada item: nome, paginas, digitalizada e
+    conteudo (bytes do PDF).
+    """
+    rnd = random.Random(seed)
+    corpus = []
+    for i in range(documentos):
+        n_paginas = rnd.randint(*paginas)
+        digitalizada = rnd.random() < fracao_digitalizada
+        corpus.append({
+            "nome": f"cotacao_{i:04d}_{n_paginas}p_{'scan' if digitalizada else 'nativa'}.pdf",
+            "paginas": n_paginas,
+            "digitalizada": digitalizada,
+            "conteudo": gerar_cotacao(n_paginas, linhas_tabela=rnd.randint(8, 17),
+                                      digitalizada=digitalizada, seed=seed * 100_000 + i),
+        })
+    return corpus
+
+
+def gravar_respostas(diretorio, respostas=20, seed=0):
+    """
+    Grava respostas no formato do Textract ('<n>.json') extraídas das
+    páginas nativas de cotações sintéticas: o StubTextractClient as devolve
+    para as páginas digitalizadas, com o mesmo layout das cotações.
+    """
+    from services.pdf_nativo import pagina_para_blocos
+
+    os.makedirs(diretorio, exist_ok=True)
+    for i in range(respostas):
+        doc = fitz.open(stream=gerar_cotacao(1, linhas_tabela=8 + i % 10, seed=seed + i),
+                        filetype="pdf")
+        resposta = pagina_para_blocos(doc[0])
+        doc.close()
+        with open(os.path.join(diretorio, f"{i:04d}.json"), "w", encoding="utf-8") as arquivo:
+            json.dump(resposta, arquivo, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--saida", default=os.path.join("data", "bench_pdfs"))
+    parser.add_argument("--documentos", type=int, default=20)
+    parser.add_argument("--paginas", type=int, nargs=2, default=[1, 5])
+    parser.add_argument("--digitalizadas", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gravacoes", help="diretório para as respostas do Textract")
+    args = parser.parse_args()
+
+    os.makedirs(args.saida, exist_ok=True)
+    for item in gerar_corpus(args.documentos, tuple(args.paginas), args.digitalizadas, args.seed):
+        with open(os.path.join(args.saida, item["nome"]), "wb") as arquivo:
+            arquivo.write(item["conteudo"])
+        print(f"{item['nome']}: {len(item['conteudo']) / 1024:.0f} KB")
+    if args.gravacoes:
+        gravar_respostas(args.gravacoes, seed=args.seed)
+        print(f"respostas gravadas em {args.gravacoes}")
@@ -0,0 +1,87 @@
+# resultados.py
+#
+# Resultados dos benchmarks em JSON, para comparar uma execução com outra
+# (ex.: antes e depois de uma mudança). Cada arquivo guarda os metadados da
+# execução (commit, Python, plataforma, CPUs), os parâmetros e as métricas
+# em um dicionário plano "nome": valor. Métricas terminadas em "_por_s"
+# são vazões (maior é melhor); as demais são tempos ou memória (menor é
+# melhor).
+#
+# Uso: python -m benchmarks.resultados atual.json base.json [--limiar 0.10]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Variação relativa a partir da qual uma métrica é marcada como regressão
+LIMIAR_PADRAO = 0.10
+
+
+def metadados() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def salvar(caminho, benchmark, parametros, metricas):
+    dados = {
+        "benchmark": benchmark,
+        "metadados": metadados(),
+        "parametros": parametros,
+        "metricas": metricas,
+    }
+    diretorio = os.path.dirname(caminho)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+    print(f"resultados gravados em {caminho}")
+
+
+def carregar(caminho) -> dict:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)["metricas"]
+
+
+def comparar(atual, base, limiar=LIMIAR_PADRAO):
+    """
+    Imprime a variação de cada métrica em relação à base e retorna os
+    nomes das métricas que pioraram mais que 'limiar'.
+    """
+    regressoes = []
+    print(f"{'métrica':<60} {'base':>12} {'atual':>12} {'variação':>9}")
+    for nome in sorted(set(atual) & set(base)):
+        anterior, valor = base[nome], atual[nome]
+        if not isinstance(valor, (int, float)) or not isinstance(anterior, (int, float)):
+            continue
+        variacao = (valor - anterior) / anterior if anterior else 0.0
+        piorou = -variacao if nome.endswith("_por_s") else variacao
+        marca = ""
+        if piorou > limiar:
+            regressoes.append(nome)
+            marca = "  REGRESSÃO"
+        print(f"{nome:<60} {anterior:>12.4g} {valor:>12.4g} {variacao:>+8.1%}{marca}")
+    print(f"{len(regressoes)} regressões acima de {limiar:.0%}")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("atual")
+    parser.add_argument("base")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_PADRAO)
+    args = parser.parse_args()
+    sys.exit(1 if comparar(carregar(args.atual), carregar(args.base), args.limiar) else 0)
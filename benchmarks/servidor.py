@@ -0,0 +1,67 @@
+# servidor.py
+#
+# Sobe a aplicação (main.app) com o uvicorn e os backends AWS locais:
+# Textract com latência configurável (respostas gravadas, se houver, ou
+# sintéticas), S3 e Bedrock em memória e o DynamoDB substituído no
+# PynamoDB (StubDynamoDB). Usado pelo driver de carga (benchmarks/carga.py),
+# que o executa em um processo separado para medir a memória do servidor.
+#
+# Uso: python -m benchmarks.servidor [--porta 8765] [--latencia-textract 0.3]
+#      [--gravacoes data/bench_gravacoes]
+
+import argparse
+import atexit
+import os
+import shutil
+import tempfile
+
+# Configuração do servidor de benchmark (antes de importar a aplicação):
+# sem cache de resultados (toda requisição processa o documento), logs só
+# de avisos, arquivamento das páginas desligado e os dados em um diretório
+# temporário; a persistência no DynamoDB vai para o StubDynamoDB. Os
+# processos de renderização reimportam este módulo e reaproveitam o diretório
+_DIRETORIO = os.environ.get("BENCH_SERVIDOR_DIRETORIO") or tempfile.mkdtemp(prefix="bench_servidor_")
+os.environ["BENCH_SERVIDOR_DIRETORIO"] = _DIRETORIO
+atexit.register(shutil.rmtree, _DIRETORIO, ignore_errors=True)
+os.environ.setdefault("CACHE_ATIVO", "false")
+os.environ.setdefault("CACHE_DIRETORIO", os.path.join(_DIRETORIO, "cache"))
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+os.environ.setdefault("PERSISTIR_PAGINAS", "false")
+os.environ.setdefault("DYNAMODB_PERSISTIR", "true")
+os.environ.setdefault("RECUPERACAO_DIRETORIO", os.path.join(_DIRETORIO, "indice_vetorial"))
+os.environ.setdefault("RESPOSTAS_DIRETORIO", os.path.join(_DIRETORIO, "respostas"))
+
+import uvicorn
+
+from benchmarks.stubs import (
+    RespostasGravadas, StubBedrockClient, StubDynamoDB, StubS3Client, StubTextractClient)
+from models import RAGPaginaModel, RAGRequestModel
+from services.aws import clientes_aws
+
+
+def instalar_stubs(latencia_textract=0.3, gravacoes=None, latencia_dynamodb=0.01,
+                   latencia_s3=0.0):
+    s3 = StubS3Client(latencia=latencia_s3)
+    respostas = RespostasGravadas(gravacoes) if gravacoes else None
+    clientes_aws.registrar("textract", StubTextractClient(
+        latencia=latencia_textract, s3=s3, respostas=respostas))
+    clientes_aws.registrar("s3", s3)
+    clientes_aws.registrar("bedrock-runtime", StubBedrockClient())
+    return StubDynamoDB(modelos=(RAGPaginaModel, RAGRequestModel),
+                        latencia=latencia_dynamodb).instalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-textract", type=float, default=0.3)
+    parser.add_argument("--latencia-dynamodb", type=float, default=0.01)
+    parser.add_argument("--latencia-s3", type=float, default=0.0)
+    parser.add_argument("--gravacoes", help="diretório com respostas gravadas do Textract")
+    args = parser.parse_args()
+
+    instalar_stubs(args.latencia_textract, args.gravacoes, args.latencia_dynamodb,
+                   args.latencia_s3)
+    import main
+
+    uvicorn.run(main.app, host="127.0.0.1", port=args.porta, log_level="warning")
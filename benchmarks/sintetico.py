@@ -0,0 +1,226 @@
+# sintetico.py
+#
+# Geradores de respostas sintéticas do Textract para benchmarks.
+
+import random
+
+
+def _geometry(left, top, width=0.1, height=0.01):
+    return {
+        'BoundingBox': {
+            'Left': left,
+            'Top': top,
+            'Width': width,
+            'Height': height
+        }
+    }
+
+
+def gerar_resposta(n_blocks, seed=0):
+    """
+    Gera uma resposta sintética do Textract com aproximadamente 'n_blocks' blocos,
+    misturando pares chave-valor (FORMS) e uma tabela de seguros (TABLES).
+    """
+    rnd = random.Random(seed)
+    blocks = []
+    contador = [0]
+
+    def novo_id(prefixo):
+        contador[0] += 1
+        return f"{prefixo}-{contador[0]}"
+
+    def word(texto, left, top):
+        block = {
+            'Id': novo_id('w'),
+            'BlockType': 'WORD',
+            'Text': texto,
+            'Confidence': 99.0,
+            'Page': 1,
+            'Geometry': _geometry(left, top)
+        }
+        blocks.append(block)
+        return block['Id']
+
+    def line(texto, left, top, word_ids):
+        blocks.append({
+            'Id': novo_id('l'),
+            'BlockType': 'LINE',
+            'Text': texto,
+            'Confidence': 99.0,
+            'Page': 1,
+            'Geometry': _geometry(left, top),
+            'Relationships': [{'Type': 'CHILD', 'Ids': word_ids}]
+        })
+
+    # Metade dos blocos em pares chave-valor (6 blocos por par)
+    n_pares = max(1, n_blocks // 12)
+    for i in range(n_pares):
+        top = rnd.random()
+        key_word = word(f"Campo{i}:", 0.05, top)
+        value_word = word(f"R$ {rnd.randint(1, 9999)},00", 0.5, top)
+        line(f"Campo{i}:", 0.05, top, [key_word])
+        line("valor", 0.5, top, [value_word])
+        value_id = novo_id('v')
+        blocks.append({
+            'Id': novo_id('k'),
+            'BlockType': 'KEY_VALUE_SET',
+            'EntityTypes': ['KEY'],
+            'Confidence': 95.0,
+            'Page': 1,
+            'Relationships': [
+                {'Type': 'VALUE', 'Ids': [value_id]},
+                {'Type': 'CHILD', 'Ids': [key_word]}
+            ]
+        })
+        blocks.append({
+            'Id': value_id,
+            'BlockType': 'KEY_VALUE_SET',
+            'EntityTypes': ['VALUE'],
+            'Confidence': 95.0,
+            'Page': 1,
+            'Relationships': [{'Type': 'CHILD', 'Ids': [value_word]}]
+        })
+
+    # O restante em uma tabela de 3 colunas (2 blocos por célula)
+    n_linhas = max(2, (n_blocks - len(blocks)) // 6)
+    cell_ids = []
+    for row in range(1, n_linhas + 1):
+        top = row / (n_linhas + 1)
+        textos = ["Descrição", "Limite", "Prêmio"] if row == 1 else [
+            f"Cobertura {row}", f"R$ {row}.000,00", f"R$ {row},00"]
+        for col, texto in enumerate(textos, start=1):
+            word_id = word(texto, col * 0.3, top)
+            cell_id = novo_id('c')
+            blocks.append({
+                'Id': cell_id,
+                'BlockType': 'CELL',
+                'RowIndex': row,
+                'ColumnIndex': col,
+                'Confidence': 90.0,
+                'Page': 1,
+                'Relationships': [{'Type': 'CHILD', 'Ids': [word_id]}]
+            })
+            cell_ids.append(cell_id)
+    blocks.append({
+        'Id': novo_id('t'),
+        'BlockType': 'TABLE',
+        'Confidence': 90.0,
+        'Page': 1,
+        'Relationships': [{'Type': 'CHILD', 'Ids': cell_ids}]
+    })
+
+    rnd.shuffle(blocks)
+    return {'Blocks': blocks}
+
+
+def gerar_tabelas(n_tabelas, n_linhas, n_colunas=3, paginas_por_tabela=1,
+                  mescladas=True, seed=0):
+    """
+    Gera uma resposta sintética com 'n_tabelas' tabelas de seguros de
+    'n_linhas' linhas cada, divididas em 'paginas_por_tabela' páginas
+    (um bloco TABLE por página, repetindo o cabeçalho, como o Textract
+    devolve tabelas que continuam na página seguinte). Com 'mescladas',
+    parte das linhas tem a descrição em uma célula mesclada com a linha
+    seguinte (MERGED_CELL) e algumas células ficam vazias.
+    """
+    rnd = random.Random(seed)
+    blocks = []
+    contador = [0]
+    cabecalho = ["Descrição", "Limite", "Prêmio"] + [
+        f"Coluna {c}" for c in range(4, n_colunas + 1)]
+
+    def novo_id(prefixo):
+        contador[0] += 1
+        return f"{prefixo}-{contador[0]}"
+
+    def celula(texto, linha, coluna, pagina, top, cabecalho=False):
+        word_ids = []
+        for posicao, palavra in enumerate(texto.split()):
+            word_id = novo_id('w')
+            blocks.append({
+                'Id': word_id,
+                'BlockType': 'WORD',
+                'Text': palavra,
+                'Confidence': 99.0,
+                'Page': pagina,
+                'Geometry': _geometry(coluna * 0.2 + posicao * 0.03, top)
+            })
+            word_ids.append(word_id)
+        cell = {
+            'Id': novo_id('c'),
+            'BlockType': 'CELL',
+            'RowIndex': linha,
+            'ColumnIndex': coluna,
+            'RowSpan': 1,
+            'ColumnSpan': 1,
+            'Confidence': round(rnd.uniform(80, 99), 2),
+            'Page': pagina,
+        }
+        if cabecalho:
+            cell['EntityTypes'] = ['COLUMN_HEADER']
+        if word_ids:
+            cell['Relationships'] = [{'Type': 'CHILD', 'Ids': word_ids}]
+        blocks.append(cell)
+        return cell['Id']
+
+    pagina = 0
+    item = 0
+    for _ in range(n_tabelas):
+        linhas_por_pagina = max(1, n_linhas // paginas_por_tabela)
+        for _ in range(paginas_por_tabela):
+            pagina += 1
+            cell_ids = []
+            merged_ids = []
+            total = linhas_por_pagina + 1
+            for coluna, texto in enumerate(cabecalho, start=1):
+                cell_ids.append(celula(texto, 1, coluna, pagina, 0.05, True))
+            linha = 2
+            while linha <= total:
+                top = linha / (total + 1)
+                item += 1
+                mesclar = mescladas and linha < total and rnd.random() < 0.1
+                valores = [f"Cobertura {item} adicional", f"R$ {item}.000,00",
+                           f"R$ {item},00"] + [
+                    f"Valor {item}.{c}" for c in range(4, n_colunas + 1)]
+                if mescladas and rnd.random() < 0.05:
+                    valores[rnd.randrange(n_colunas)] = ""
+                ids_linha = [celula(texto, linha, coluna, pagina, top)
+                             for coluna, texto in enumerate(valores, start=1)]
+                cell_ids.extend(ids_linha)
+                if mesclar:
+                    # Descrição ocupando duas linhas: a célula de baixo fica vazia
+                    abaixo = celula("", linha + 1, 1, pagina, top + 0.01)
+                    cell_ids.append(abaixo)
+                    item += 1
+                    cell_ids.extend(
+                        celula(f"R$ {item},00", linha + 1, coluna, pagina, top + 0.01)
+                        for coluna in range(2, n_colunas + 1))
+                    merged_id = novo_id('m')
+                    blocks.append({
+                        'Id': merged_id,
+                        'BlockType': 'MERGED_CELL',
+                        'RowIndex': linha,
+                        'ColumnIndex': 1,
+                        'RowSpan': 2,
+                        'ColumnSpan': 1,
+                        'Confidence': 90.0,
+                        'Page': pagina,
+                        'Relationships': [{'Type': 'CHILD', 'Ids': [ids_linha[0], abaixo]}]
+                    })
+                    merged_ids.append(merged_id)
+                    linha += 2
+                else:
+                    linha += 1
+
+            relationships = [{'Type': 'CHILD', 'Ids': cell_ids}]
+            if merged_ids:
+                relationships.append({'Type': 'MERGED_CELL', 'Ids': merged_ids})
+            blocks.append({
+                'Id': novo_id('t'),
+                'BlockType': 'TABLE',
+                'Confidence': 90.0,
+                'Page': pagina,
+                'Relationships': relationships
+            })
+
+    return {'DocumentMetadata': {'Pages': pagina}, 'Blocks': blocks}
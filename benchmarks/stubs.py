@@ -0,0 +1,529 @@
+# stubs.py
+#
+# Clientes AWS locais para testes e benchmarks, sem acesso à rede.
+# O Textract pode devolver respostas gravadas (RespostasGravadas, gravadas
+# com o GravadorTextract ou com benchmarks/pdfs.py) e o DynamoDB é
+# substituído no PynamoDB por uma tabela em memória (StubDynamoDB).
+
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import fitz  # PyMuPDF
+
+from benchmarks.sintetico import gerar_resposta
+
+
+class StubClientError(Exception):
+    """
+    Imita o botocore.exceptions.ClientError (atributo 'response' com o código do erro).
+    """
+
+    def __init__(self, code, operation_name="AnalyzeDocument"):
+        super().__init__(f"An error occurred ({code}) when calling the {operation_name} operation")
+        self.response = {"Error": {"Code": code, "Message": code}}
+        self.operation_name = operation_name
+
+
+class StubTextractClient:
+    """
+    Cliente Textract local que injeta latência e throttling.
+
+    - 'latencia': tempo (s) de cada chamada;
+    - 'taxa_throttling': probabilidade de responder ThrottlingException;
+    - 'tps_maximo': se definido, responde ThrottlingException acima dessa taxa;
+    - 'n_blocks': tamanho da resposta sintética devolvida;
+    - 'respostas': RespostasGravadas devolvidas no lugar das sintéticas.
+    """
+
+    def __init__(self, latencia=0.2, taxa_throttling=0.0, tps_maximo=None,
+                 n_blocks=500, seed=0, s3=None, latencia_job=2.0,
+                 latencia_job_pagina=0.05, respostas=None):
+        self.latencia = latencia
+        self.respostas = respostas
+        self.taxa_throttling = taxa_throttling
+        self.tps_maximo = tps_maximo
+        self.n_blocks = n_blocks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._janela = []
+        self.chamadas = 0
+        self.throttles = 0
+        self.em_voo = 0
+        self.pico_em_voo = 0
+
+        # Modo assíncrono: lê o documento do StubS3Client e conclui a
+        # análise após 'latencia_job' + 'latencia_job_pagina' por página
+        self.s3 = s3
+        self.latencia_job = latencia_job
+        self.latencia_job_pagina = latencia_job_pagina
+        self._jobs = {}
+        self._ids_jobs = itertools.count(1)
+        self.chamadas_get = 0
+
+    def _verificar_throttling(self):
+        with self._lock:
+            self.chamadas += 1
+            agora = time.monotonic()
+            self._janela = [t for t in self._janela if agora - t < 1.0]
+            excedeu = self.tps_maximo is not None and len(
+                self._janela) >= self.tps_maximo
+            sorteado = self._random.random() < self.taxa_throttling
+            if excedeu or sorteado:
+                self.throttles += 1
+                raise StubClientError("ThrottlingException")
+            self._janela.append(agora)
+
+    def analyze_document(self, Document, FeatureTypes=None, **kwargs):
+        self._verificar_throttling()
+        with self._lock:
+            self.em_voo += 1
+            self.pico_em_voo = max(self.pico_em_voo, self.em_voo)
+        try:
+            time.sleep(self.latencia)
+            if self.respostas is not None:
+                return self.respostas.resposta(Document.get('Bytes', b''))
+            # A semente depende do conteúdo para respostas determinísticas por página
+            seed = len(Document.get('Bytes', b''))
+            return gerar_resposta(self.n_blocks, seed=seed)
+        finally:
+            with self._lock:
+                self.em_voo -= 1
+
+    def start_document_analysis(self, DocumentLocation, FeatureTypes=None, **kwargs):
+        self._verificar_throttling()
+        objeto = DocumentLocation["S3Object"]
+        conteudo = self.s3.objetos[(objeto["Bucket"], objeto["Name"])]
+        doc = fitz.open(stream=conteudo, filetype="pdf")
+        paginas = doc.page_count
+        doc.close()
+
+        with self._lock:
+            job_id = f"job-{next(self._ids_jobs)}"
+            self._jobs[job_id] = {
+                "paginas": paginas,
+                "pronto_em": time.monotonic() + self.latencia_job + paginas * self.latencia_job_pagina,
+                "blocos": None,
+            }
+        return {"JobId": job_id}
+
+    def _blocos_job(self, job):
+        # Blocos de todas as páginas, agrupados por página como no Textract
+        if job["blocos"] is None:
+            blocos = []
+            for pagina in range(1, job["paginas"] + 1):
+                if self.respostas is not None:
+                    resposta = self.respostas.por_indice(pagina - 1)
+                else:
+                    resposta = gerar_resposta(self.n_blocks, seed=pagina)
+                # O bloco PAGE de cada página é montado abaixo
+                resposta["Blocks"] = [block for block in resposta["Blocks"]
+                                      if block["BlockType"] != "PAGE"]
+                ids_pagina = [block["Id"] for block in resposta["Blocks"]]
+                blocos.append({"Id": f"p{pagina}", "BlockType": "PAGE", "Page": pagina,
+                               "Relationships": [{"Type": "CHILD",
+                                                  "Ids": [f"p{pagina}-{i}" for i in ids_pagina]}]})
+                for block in resposta["Blocks"]:
+                    block["Id"] = f"p{pagina}-{block['Id']}"
+                    block["Page"] = pagina
+                    for relacao in block.get("Relationships", ()):
+                        relacao["Ids"] = [f"p{pagina}-{i}" for i in relacao["Ids"]]
+                    blocos.append(block)
+            job["blocos"] = blocos
+        return job["blocos"]
+
+    def get_document_analysis(self, JobId, MaxResults=1000, NextToken=None, **kwargs):
+        with self._lock:
+            self.chamadas_get += 1
+            job = self._jobs[JobId]
+        if time.monotonic() < job["pronto_em"]:
+            return {"JobStatus": "IN_PROGRESS"}
+
+        blocos = self._blocos_job(job)
+        inicio = int(NextToken or 0)
+        fim = inicio + MaxResults
+        resposta = {
+            "JobStatus": "SUCCEEDED",
+            "DocumentMetadata": {"Pages": job["paginas"]},
+            "Blocks": blocos[inicio:fim],
+        }
+        if fim < len(blocos):
+            resposta["NextToken"] = str(fim)
+        return resposta
+
+
+class RespostasGravadas:
+    """
+    Respostas do Textract gravadas em disco ('<chave>.json'), para o
+    StubTextractClient reproduzir. A chave é o sha256 do documento
+    enviado (GravadorTextract); um documento sem gravação recebe uma das
+    respostas escolhida pelo hash do conteúdo (sempre a mesma para o mesmo
+    documento). Cada chamada devolve uma cópia nova, decodificada do JSON
+    como no boto3.
+    """
+
+    def __init__(self, diretorio):
+        self._textos = {}
+        for nome in sorted(os.listdir(diretorio)):
+            if nome.endswith(".json"):
+                with open(os.path.join(diretorio, nome), encoding="utf-8") as arquivo:
+                    self._textos[nome[:-len(".json")]] = arquivo.read()
+        if not self._textos:
+            raise ValueError(f"Nenhuma resposta gravada em {diretorio}")
+        self._ordem = list(self._textos.values())
+        self._lock = threading.Lock()
+        self.exatas = 0
+        self.substitutas = 0
+
+    def __len__(self):
+        return len(self._ordem)
+
+    def resposta(self, conteudo: bytes) -> dict:
+        chave = hashlib.sha256(conteudo).hexdigest()
+        texto = self._textos.get(chave)
+        with self._lock:
+            if texto is None:
+                self.substitutas += 1
+            else:
+                self.exatas += 1
+        if texto is None:
+            texto = self._ordem[int(chave[:12], 16) % len(self._ordem)]
+        return json.loads(texto)
+
+    def por_indice(self, indice: int) -> dict:
+        return json.loads(self._ordem[indice % len(self._ordem)])
+
+
+class GravadorTextract:
+    """
+    Envolve um cliente Textract real e grava cada resposta do
+    analyze_document em '<sha256 do documento>.json', para reproduzir a
+    mesma carga depois sem acesso à AWS (RespostasGravadas).
+    """
+
+    def __init__(self, cliente, diretorio):
+        self.cliente = cliente
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def analyze_document(self, Document, **kwargs):
+        resposta = self.cliente.analyze_document(Document=Document, **kwargs)
+        chave = hashlib.sha256(Document.get("Bytes", b"")).hexdigest()
+        gravada = {k: v for k, v in resposta.items() if k != "ResponseMetadata"}
+        caminho = os.path.join(self.diretorio, f"{chave}.json")
+        with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+            json.dump(gravada, arquivo, ensure_ascii=False)
+        os.replace(caminho + ".tmp", caminho)
+        return resposta
+
+    def __getattr__(self, nome):
+        return getattr(self.cliente, nome)
+
+
+class StubS3Client:
+    """
+    Cliente S3 local em memória (put_object e multipart upload), com
+    latência opcional por requisição.
+    """
+
+    TAMANHO_MINIMO_PARTE = 5 * 1024 * 1024
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.objetos = {}
+        self._uploads = {}
+        self._ids_uploads = itertools.count(1)
+        self._lock = threading.Lock()
+        self.requisicoes = 0
+        self.bytes_recebidos = 0
+
+    def _requisicao(self, tamanho=0):
+        with self._lock:
+            self.requisicoes += 1
+            self.bytes_recebidos += tamanho
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        dados = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self._requisicao(len(dados))
+        self.objetos[(Bucket, Key)] = dados
+        return {"ETag": hashlib.md5(dados).hexdigest()}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._requisicao()
+        upload_id = f"upload-{next(self._ids_uploads)}"
+        self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        dados = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self._requisicao(len(dados))
+        self._uploads[UploadId][PartNumber] = dados
+        return {"ETag": hashlib.md5(dados).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._requisicao()
+        partes = self._uploads.pop(UploadId)
+        numeros = [parte["PartNumber"] for parte in MultipartUpload["Parts"]]
+        if any(len(partes[n]) < self.TAMANHO_MINIMO_PARTE for n in numeros[:-1]):
+            raise StubClientError("EntityTooSmall", "CompleteMultipartUpload")
+        self.objetos[(Bucket, Key)] = b"".join(partes[n] for n in numeros)
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._requisicao()
+        self._uploads.pop(UploadId, None)
+        return {}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._requisicao()
+        self.objetos.pop((Bucket, Key), None)
+        return {}
+
+
+class StubBedrockClient:
+    """
+    Cliente bedrock-runtime local e determinístico (apenas 'converse_stream').
+
+    Responde uma linha JSON por <pagina> do prompt, com dados tirados do
+    próprio texto da página, em trechos de 'tokens_por_trecho' tokens:
+    - 'latencia_primeiro_token': tempo (s) até o primeiro trecho;
+    - 'tokens_por_segundo': ritmo dos trechos seguintes.
+    """
+
+    CARACTERES_POR_TOKEN = 4
+    _PAGINA = re.compile(r'<pagina id="([^"]*)">\n(.*?)\n</pagina>', re.DOTALL)
+    _VALOR = re.compile(r"R\$\s*[\d.]+(?:,\d{2})?")
+
+    def __init__(self, latencia_primeiro_token=0.4, tokens_por_segundo=150,
+                 tokens_por_trecho=8):
+        self.latencia_primeiro_token = latencia_primeiro_token
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_por_trecho = tokens_por_trecho
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.paginas = 0
+        self.tokens_entrada = 0
+        self.tokens_saida = 0
+        self.em_voo = 0
+        self.pico_em_voo = 0
+
+    def _dados(self, id_, texto):
+        linhas = texto.splitlines()
+        coberturas = []
+        for linha in linhas:
+            valor = self._VALOR.search(linha)
+            if valor and linha[:valor.start()].strip():
+                coberturas.append({"nome": linha[:valor.start()].strip(),
+                                   "valor": valor.group()})
+        return {
+            "id": id_,
+            "seguradora": linhas[0] if linhas else None,
+            "produto": None,
+            "vigencia": None,
+            "premio_total": coberturas[-1]["valor"] if coberturas else None,
+            "coberturas": coberturas[:20],
+            "resumo": f"{len(linhas)} linhas, {len(coberturas)} valores",
+        }
+
+    def converse_stream(self, modelId, messages, system=None, inferenceConfig=None, **kwargs):
+        prompt = "".join(bloco.get("text", "") for mensagem in messages
+                         for bloco in mensagem["content"])
+        paginas = self._PAGINA.findall(prompt)
+        resposta = "".join(json.dumps(self._dados(id_, texto), ensure_ascii=False) + "\n"
+                           for id_, texto in paginas)
+        entrada = (len(prompt) + sum(len(bloco.get("text", "")) for bloco in system or ())) \
+            // self.CARACTERES_POR_TOKEN
+        with self._lock:
+            self.chamadas += 1
+            self.paginas += len(paginas)
+        return {"stream": self._eventos(resposta, entrada)}
+
+    def _eventos(self, resposta, entrada):
+        with self._lock:
+            self.em_voo += 1
+            self.pico_em_voo = max(self.pico_em_voo, self.em_voo)
+        try:
+            inicio = time.monotonic()
+            yield {"messageStart": {"role": "assistant"}}
+            time.sleep(self.latencia_primeiro_token)
+            tamanho = self.tokens_por_trecho * self.CARACTERES_POR_TOKEN
+            for posicao in range(0, len(resposta), tamanho):
+                if posicao:
+                    time.sleep(self.tokens_por_trecho / self.tokens_por_segundo)
+                yield {"contentBlockDelta": {"contentBlockIndex": 0,
+                                             "delta": {"text": resposta[posicao:posicao + tamanho]}}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+            saida = len(resposta) // self.CARACTERES_POR_TOKEN
+            with self._lock:
+                self.tokens_entrada += entrada
+                self.tokens_saida += saida
+            yield {"metadata": {
+                "usage": {"inputTokens": entrada, "outputTokens": saida,
+                          "totalTokens": entrada + saida},
+                "metrics": {"latencyMs": int((time.monotonic() - inicio) * 1000)}}}
+        finally:
+            with self._lock:
+                self.em_voo -= 1
+
+
+class StubDynamoDB:
+    """
+    DynamoDB em memória para o PynamoDB: substitui o
+    Connection._make_api_call (o ponto por onde passam todas as
+    operações) enquanto estiver instalado, sem DynamoDB Local nem rede.
+
+    Atende DescribeTable/CreateTable (esquema tirado dos modelos),
+    BatchWriteItem, PutItem, GetItem, DeleteItem e Query pela hash key
+    (condições na range key são ignoradas), com:
+    - 'latencia': tempo (s) de cada chamada;
+    - 'latencia_item': tempo (s) adicional por item gravado;
+    - 'taxa_nao_processados': proporção dos itens de cada BatchWriteItem
+      devolvida em UnprocessedItems (para exercitar as novas tentativas).
+
+    Uso: with StubDynamoDB(modelos=(RAGPaginaModel,)) as dynamodb: ...
+    """
+
+    def __init__(self, modelos=(), latencia=0.0, latencia_item=0.0,
+                 taxa_nao_processados=0.0, seed=0):
+        self.latencia = latencia
+        self.latencia_item = latencia_item
+        self.taxa_nao_processados = taxa_nao_processados
+        self._random = random.Random(seed)
+        self._esquemas = {}
+        for modelo in modelos:
+            esquema = modelo._get_schema()
+            self._esquemas[modelo.Meta.table_name] = {
+                "AttributeDefinitions": esquema["attribute_definitions"],
+                "KeySchema": esquema["key_schema"],
+            }
+        self.tabelas = {nome: {} for nome in self._esquemas}
+        self._lock = threading.Lock()
+        self._original = None
+        self.chamadas = {}
+        self.itens_gravados = 0
+
+    def instalar(self):
+        from pynamodb.connection.base import Connection
+
+        stub = self
+        self._original = Connection._make_api_call
+
+        def _make_api_call(connection, operation_name, operation_kwargs):
+            return stub.chamar(operation_name, operation_kwargs)
+
+        Connection._make_api_call = _make_api_call
+        return self
+
+    def remover(self):
+        from pynamodb.connection.base import Connection
+
+        if self._original is not None:
+            Connection._make_api_call = self._original
+            self._original = None
+
+    def __enter__(self):
+        return self.instalar()
+
+    def __exit__(self, *exc):
+        self.remover()
+
+    def _chave(self, tabela, item):
+        return tuple(json.dumps(item[atributo["AttributeName"]], sort_keys=True)
+                     for atributo in self._esquemas[tabela]["KeySchema"])
+
+    def _descricao(self, tabela):
+        return {"Table": dict(self._esquemas[tabela], TableName=tabela, TableStatus="ACTIVE",
+                              ItemCount=len(self.tabelas[tabela]))}
+
+    def chamar(self, operacao, kwargs):
+        with self._lock:
+            self.chamadas[operacao] = self.chamadas.get(operacao, 0) + 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        metodo = getattr(self, "_" + re.sub(r"(?<!^)([A-Z])", r"_\1", operacao).lower(), None)
+        if metodo is None:
+            raise StubClientError("UnknownOperationException", operacao)
+        return metodo(kwargs)
+
+    def _describe_table(self, kwargs):
+        tabela = kwargs["TableName"]
+        if tabela not in self._esquemas:
+            raise StubClientError("ResourceNotFoundException", "DescribeTable")
+        return self._descricao(tabela)
+
+    def _create_table(self, kwargs):
+        tabela = kwargs["TableName"]
+        with self._lock:
+            self._esquemas.setdefault(tabela, {
+                "AttributeDefinitions": kwargs["AttributeDefinitions"],
+                "KeySchema": kwargs["KeySchema"]})
+            self.tabelas.setdefault(tabela, {})
+        return {"TableDescription": self._descricao(tabela)["Table"]}
+
+    def _batch_write_item(self, kwargs):
+        nao_processados = {}
+        gravados = 0
+        with self._lock:
+            for tabela, requisicoes in kwargs["RequestItems"].items():
+                for requisicao in requisicoes:
+                    if self._random.random() < self.taxa_nao_processados:
+                        nao_processados.setdefault(tabela, []).append(requisicao)
+                        continue
+                    if "PutRequest" in requisicao:
+                        item = requisicao["PutRequest"]["Item"]
+                        self.tabelas[tabela][self._chave(tabela, item)] = item
+                    else:
+                        chave = requisicao["DeleteRequest"]["Key"]
+                        self.tabelas[tabela].pop(self._chave(tabela, chave), None)
+                    gravados += 1
+            self.itens_gravados += gravados
+        if self.latencia_item:
+            time.sleep(self.latencia_item * gravados)
+        return {"UnprocessedItems": nao_processados}
+
+    def _put_item(self, kwargs):
+        tabela = kwargs["TableName"]
+        with self._lock:
+            self.tabelas[tabela][self._chave(tabela, kwargs["Item"])] = kwargs["Item"]
+            self.itens_gravados += 1
+        if self.latencia_item:
+            time.sleep(self.latencia_item)
+        return {}
+
+    def _get_item(self, kwargs):
+        tabela = kwargs["TableName"]
+        item = self.tabelas[tabela].get(self._chave(tabela, kwargs["Key"]))
+        return {"Item": item} if item is not None else {}
+
+    def _delete_item(self, kwargs):
+        tabela = kwargs["TableName"]
+        with self._lock:
+            self.tabelas[tabela].pop(self._chave(tabela, kwargs["Key"]), None)
+        return {}
+
+    def _query(self, kwargs):
+        tabela = kwargs["TableName"]
+        esquema = self._esquemas[tabela]["KeySchema"]
+        hash_key = next(a["AttributeName"] for a in esquema if a["KeyType"] == "HASH")
+        range_key = next((a["AttributeName"] for a in esquema if a["KeyType"] == "RANGE"), None)
+        # "#0 = :0": o primeiro valor da expressão é o da hash key
+        nomes = kwargs.get("ExpressionAttributeNames", {})
+        valores = kwargs.get("ExpressionAttributeValues", {})
+        condicao = re.match(r"\s*\(?\s*(#\w+)\s*=\s*(:\w+)", kwargs["KeyConditionExpression"])
+        if condicao is None or nomes.get(condicao.group(1)) != hash_key:
+            raise StubClientError("ValidationException", "Query")
+        valor = valores[condicao.group(2)]
+        with self._lock:
+            itens = [item for item in self.tabelas[tabela].values() if item[hash_key] == valor]
+        if range_key:
+            itens.sort(key=lambda item: float(item[range_key]["N"]) if "N" in item[range_key]
+                       else item[range_key]["S"],
+                       reverse=not kwargs.get("ScanIndexForward", True))
+        return {"Items": itens, "Count": len(itens), "ScannedCount": len(itens)}
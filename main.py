@@ -1,10 +1,59 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes import routes
+from services.arquivamento import arquivador
+from services.arquivo_respostas import arquivo_respostas
+from services.aws import clientes_aws
+from services.bucket import encerrar_envios
+from services.enriquecimento import enriquecedor
+from services.executor import executor
+from services.indice_vetorial import RECUPERACAO_ATIVA, indice_vetorial
+from services.ingestao import LimiteTamanhoUploadMiddleware
+from services.jobs import job_runner
+from services.logs import iniciar_logging, encerrar_logging
+from services.persistencia import persistencia
+from services.templates import registro_templates
+from utils.respostas import RespostaJSON
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log estruturado, escrito no stdout por uma thread separada
+    iniciar_logging()
+    # Clientes AWS de longa duração, criados uma vez por worker
+    clientes_aws.iniciar()
+    # Templates de extração compilados uma vez
+    registro_templates.carregar()
+    # Índice de recuperação (/query) reaberto do disco
+    if RECUPERACAO_ATIVA:
+        indice_vetorial.abrir()
+    # Cria os pools de threads/processos do pipeline
+    executor.iniciar()
+    job_runner.iniciar()
+    persistencia.iniciar()
+    yield
+    job_runner.encerrar()
+    # Lote pendente do modelo (as threads são criadas na primeira página enriquecida)
+    enriquecedor.encerrar()
+    # Zips ainda sendo gravados (enviados ao S3 pelo pool de partes)
+    arquivador.encerrar()
+    encerrar_envios()
+    executor.encerrar()
+    # Grava no DynamoDB o que ainda estiver na fila de write-behind
+    persistencia.encerrar()
+    indice_vetorial.encerrar()
+    # Respostas ainda na fila do arquivo (write-behind)
+    arquivo_respostas.encerrar()
+    clientes_aws.encerrar()
+    # Por último: escreve os registros que ainda estão na fila
+    encerrar_logging()
 
-app = FastAPI()
+
+# Respostas serializadas com orjson quando disponível
+app = FastAPI(lifespan=lifespan, default_response_class=RespostaJSON)
 
 origins = [
     "*",
@@ -18,4 +67,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Recusa uploads acima do limite antes de ler o corpo da requisição
+app.add_middleware(LimiteTamanhoUploadMiddleware)
+
 app.include_router(routes.router)
@@ -1,3 +1,3 @@
-from .models import RAGRequestModel
+from .models import RAGRequestModel, RAGPaginaModel
 
-__all__ = ['RAGRequestModel']
+__all__ = ['RAGRequestModel', 'RAGPaginaModel']
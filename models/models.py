@@ -39,3 +39,33 @@ class RAGRequestModel(Model):
     # Atributos da sua tabela DynamoDB
     arquivo_id = UnicodeAttribute(hash_key=True)
     rags = ListAttribute()
+
+
+class RAGPaginaModel(Model):
+    """
+    Resultado da extração de uma página de um documento.
+    Todas as páginas de um documento compartilham o 'arquivo_id' (hash key),
+    então o documento inteiro é lido com uma única query.
+    """
+    class Meta:
+        # Nome da sua tabela no DynamoDB
+        table_name = 'RAGPaginas'
+        # Região da AWS onde a tabela está localizada
+        region = 'us-east-1'
+
+        # Endpoint URL para DynamoDB local (opcional)
+        # Remova ou comente esta linha se estiver usando DynamoDB na AWS.
+        host = 'http://localhost:8000'
+
+        # Leia e escreva capacidades de provisionamento (opcional)
+        read_capacity_units = 1
+        write_capacity_units = 1
+
+    # Atributos da sua tabela DynamoDB
+    arquivo_id = UnicodeAttribute(hash_key=True)
+    pagina = NumberAttribute(range_key=True)
+    filename = UnicodeAttribute(null=True)
+    titulo = UnicodeAttribute(null=True)
+    resultados = ListAttribute(null=True)
+    erro = UnicodeAttribute(null=True)
+    criado_em = NumberAttribute()
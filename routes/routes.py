@@ -1,18 +1,121 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+import asyncio
+import time
+from uuid import uuid4
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, Query, Body
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from services.arquivamento import arquivador
+from services.arquivo_respostas import arquivo_respostas
+from services.aws import clientes_aws
+from services.cache import cache
+from services.enriquecimento import enriquecedor
+from services.executor import executor, ExecutorSaturadoError
+from services.indice_busca import indice_busca, BUSCA_MAX_RESULTADOS
+from services.indice_vetorial import (
+    indice_vetorial,
+    RECUPERACAO_RESULTADOS,
+    RECUPERACAO_MAX_RESULTADOS,
+)
+from services.ingestao import (
+    ler_upload,
+    liberar_upload,
+    extrair_pdfs_zip,
+    ArquivoInvalidoError,
+    LOTE_MAX_ARQUIVOS,
+    LOTE_MAX_BYTES,
+)
+from services.jobs import job_runner, ESTADOS_FINAIS
+from services.logs import obter_logger, correlacao
+from services.lote import processador_lotes, LOTE_PRIORIZAR_PEQUENOS
+from services.metricas import INGESTAO, registro_metricas, span
+from services.persistencia import persistencia
 from services.processa_arquivos import processa_arquivos
+from services.templates import registro_templates
+from services.textract.scheduler import scheduler
+from utils.respostas import RespostaJSON, serializar
 
 router = APIRouter()
 
+logger = obter_logger("routes")
+
 
 @router.get("/ok")
 async def root():
     return {"status": 200, "message": "Server is running"}
 
 
-@router.post("/upload")
-async def upload(file: UploadFile = File(...), titulo: str = Form(...)):
+@router.get("/status/workers")
+async def status_workers():
+    return {"status": 200, "workers": executor.metricas()}
+
+
+@router.get("/status/cache")
+async def status_cache():
+    return {"status": 200, "cache": cache.estatisticas()}
+
+
+@router.get("/status/aws")
+async def status_aws():
+    return {"status": 200, "aws": clientes_aws.metricas()}
+
+
+@router.get("/status/busca")
+async def status_busca():
+    return {"status": 200, "busca": indice_busca.estatisticas()}
+
+
+@router.get("/status/recuperacao")
+async def status_recuperacao():
+    return {"status": 200, "recuperacao": indice_vetorial.estatisticas()}
+
+
+@router.get("/templates")
+async def listar_templates():
+    return {"status": 200, "templates": registro_templates.resumo()}
+
 
+@router.get("/metrics")
+async def metricas():
+    # Formato de texto do Prometheus
+    return Response(registro_metricas.exportar(),
+                    media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/status/arquivamento")
+async def status_arquivamento():
+    return {"status": 200, "arquivamento": arquivador.metricas()}
+
+
+@router.get("/status/respostas")
+async def status_respostas():
+    return {"status": 200, "respostas": arquivo_respostas.metricas()}
+
+
+@router.get("/status/enriquecimento")
+async def status_enriquecimento():
+    return {"status": 200, "enriquecimento": enriquecedor.metricas()}
+
+
+@router.get("/status/lotes")
+async def status_lotes():
+    return {"status": 200, "lotes": processador_lotes.metricas(),
+            "textract": scheduler.metricas()}
+
+
+@router.get("/status/jobs")
+async def status_jobs():
+    return {"status": 200, "jobs": job_runner.metricas()}
+
+
+@router.get("/status/persistencia")
+async def status_persistencia():
+    return {"status": 200, "persistencia": persistencia.metricas()}
+
+
+def validar_arquivo(file: UploadFile):
+    """
+    Valida o arquivo enviado. Retorna a resposta de erro ou None.
+    """
     # Verificar se o arquivo existe
     if not file or not file.filename:
         return JSONResponse(
@@ -28,21 +131,55 @@ async def upload(file: UploadFile = File(...), titulo: str = Form(...)):
                      "message": "Apenas arquivos PDF são permitidos"}
         )
 
-    # Ler o conteúdo do arquivo
-    file_content = await file.read()
+    return None
+
+
+@router.post("/upload")
+async def upload(file: UploadFile = File(...), titulo: str = Form(...)):
+
+    erro = validar_arquivo(file)
+    if erro is not None:
+        return erro
+
+    # O id do processamento é também o id de correlação dos logs
+    process_id = str(uuid4())
+
+    # Ler o conteúdo do arquivo em blocos (tamanho, assinatura e hash)
+    try:
+        with correlacao(process_id), span(INGESTAO):
+            file_content, hash_pdf = await ler_upload(file)
+    except ArquivoInvalidoError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"status": e.status_code, "message": e.message}
+        )
     file_size = len(file_content)
 
-    print(f"Tamanho do arquivo: {file_size} bytes")
+    with correlacao(process_id):
+        logger.info("Upload recebido", extra={"campos": {
+            "filename": file.filename, "bytes": file_size}})
 
-    # Fazer upload
-    result = processa_arquivos(file_content, file.filename, titulo)
+    # Fazer upload (fora do event loop, respeitando a fila de admissão)
+    try:
+        result = await executor.executar(
+            processa_arquivos, file_content, file.filename, titulo,
+            hash_pdf=hash_pdf, process_id=process_id)
+    except ExecutorSaturadoError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"status": e.status_code, "message": e.message},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    finally:
+        liberar_upload(file_content)
 
     if result["success"]:
-        return {
+        # Resultado serializado uma única vez, sem o jsonable_encoder
+        return RespostaJSON(content={
             "status": 200,
             "message": f"Arquivo {file.filename} processado com sucesso",
             "result": result
-        }
+        }, headers={"X-Correlation-Id": process_id})
     else:
         return JSONResponse(
             status_code=500,
@@ -52,3 +189,314 @@ async def upload(file: UploadFile = File(...), titulo: str = Form(...)):
                 "error": result.get("error", "Erro desconhecido")
             }
         )
+
+
+async def ler_lote(files: list[UploadFile]):
+    """
+    Lê os arquivos do lote: PDFs e zips com PDFs. Retorna (documentos,
+    recusados), com os arquivos inválidos em 'recusados' (um por linha
+    de erro), na ordem de envio.
+    """
+    documentos = []
+    recusados = []
+    for file in files:
+        filename = file.filename or ""
+        try:
+            if filename.lower().endswith(".zip"):
+                conteudo, _ = await ler_upload(file, LOTE_MAX_BYTES, formato="zip")
+                try:
+                    pdfs = await asyncio.to_thread(extrair_pdfs_zip, conteudo)
+                finally:
+                    # Os PDFs extraídos são cópias: o zip não é mais necessário
+                    liberar_upload(conteudo)
+            elif filename.endswith(".pdf"):
+                conteudo, hash_pdf = await ler_upload(file)
+                pdfs = [(filename, conteudo, hash_pdf)]
+            else:
+                raise ArquivoInvalidoError(400, "Apenas arquivos PDF ou zip são permitidos")
+        except ArquivoInvalidoError as e:
+            recusados.append({"tipo": "documento", "filename": filename,
+                              "status": e.status_code, "message": e.message})
+            continue
+
+        for nome, conteudo, hash_pdf in pdfs:
+            documentos.append({"filename": nome, "conteudo": conteudo, "hash": hash_pdf,
+                               "process_id": str(uuid4())})
+
+    # Índices na ordem de envio (os recusados depois dos válidos)
+    for indice, documento in enumerate(documentos + recusados):
+        documento["indice"] = indice
+    return documentos, recusados
+
+
+@router.post("/upload/batch")
+async def upload_batch(files: list[UploadFile] = File(...), titulo: str = Form(...),
+                       priorizar_pequenos: bool = Form(LOTE_PRIORIZAR_PEQUENOS)):
+
+    if len(files) > LOTE_MAX_ARQUIVOS:
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400,
+                     "message": f"O lote excede o limite de {LOTE_MAX_ARQUIVOS} arquivos"}
+        )
+
+    # O id do lote é o id de correlação da ingestão; cada documento tem o seu process_id
+    lote_id = str(uuid4())
+    with correlacao(lote_id), span(INGESTAO):
+        documentos, recusados = await ler_lote(files)
+
+    if len(documentos) > LOTE_MAX_ARQUIVOS:
+        for documento in documentos:
+            liberar_upload(documento["conteudo"])
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400,
+                     "message": f"O lote excede o limite de {LOTE_MAX_ARQUIVOS} arquivos"}
+        )
+    if not documentos:
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400, "message": "Nenhum arquivo PDF válido foi enviado",
+                     "recusados": recusados}
+        )
+
+    with correlacao(lote_id):
+        logger.info("Lote recebido", extra={"campos": {
+            "documentos": len(documentos), "recusados": len(recusados),
+            "bytes": sum(len(documento["conteudo"]) for documento in documentos)}})
+
+    async def gerar_linhas():
+        # Uma linha JSON por evento (NDJSON): o lote, os arquivos recusados,
+        # cada documento assim que termina e o resumo
+        inicio = time.perf_counter()
+        yield serializar({
+            "tipo": "lote",
+            "lote_id": lote_id,
+            "titulo": titulo,
+            "documentos": [{"indice": documento["indice"], "filename": documento["filename"],
+                            "process_id": documento["process_id"]}
+                           for documento in documentos],
+        }) + b"\n"
+        for recusado in recusados:
+            yield serializar(recusado) + b"\n"
+
+        sucessos = 0
+        try:
+            async for linha in processador_lotes.processar(documentos, titulo, priorizar_pequenos):
+                sucessos += linha["status"] == 200
+                yield serializar(linha) + b"\n"
+        finally:
+            for documento in documentos:
+                liberar_upload(documento["conteudo"])
+
+        yield serializar({
+            "tipo": "resumo",
+            "lote_id": lote_id,
+            "documentos": len(documentos) + len(recusados),
+            "sucessos": sucessos,
+            "falhas": len(documentos) - sucessos + len(recusados),
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }) + b"\n"
+
+    return StreamingResponse(
+        gerar_linhas(),
+        media_type="application/x-ndjson",
+        headers={"X-Correlation-Id": lote_id, "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs", status_code=202)
+async def criar_job(file: UploadFile = File(...), titulo: str = Form(...)):
+
+    erro = validar_arquivo(file)
+    if erro is not None:
+        return erro
+
+    # Fila de jobs cheia: recusa antes de ler o arquivo
+    try:
+        job_runner.verificar_capacidade()
+        file_content, hash_pdf = await ler_upload(file)
+        # Registra o job e devolve o id imediatamente; o processamento segue
+        # em segundo plano (o job libera o upload ao terminar)
+        try:
+            job = await asyncio.to_thread(
+                job_runner.submeter, file_content, file.filename, titulo, hash_pdf)
+        except BaseException:
+            liberar_upload(file_content)
+            raise
+    except ArquivoInvalidoError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"status": e.status_code, "message": e.message}
+        )
+    except ExecutorSaturadoError as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"status": e.status_code, "message": e.message},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": 202,
+            "message": f"Arquivo {file.filename} recebido para processamento",
+            "job_id": job["id"],
+            "links": {
+                "status": f"/jobs/{job['id']}",
+                "events": f"/jobs/{job['id']}/events"
+            }
+        },
+        headers={"Location": f"/jobs/{job['id']}"}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def obter_job(job_id: str):
+
+    store = job_runner.store
+    job = await asyncio.to_thread(store.obter, job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": 404, "message": "Job não encontrado"}
+        )
+
+    # Resultados das páginas já concluídas
+    paginas = await asyncio.to_thread(store.eventos, job_id, 0, "pagina")
+    job["paginas"] = [evento["dados"] for evento in paginas]
+
+    return RespostaJSON(content={"status": 200, "job": job})
+
+
+@router.get("/jobs/{job_id}/events")
+async def eventos_job(job_id: str, last_event_id: int = Header(0)):
+
+    store = job_runner.store
+    if await asyncio.to_thread(store.obter, job_id) is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": 404, "message": "Job não encontrado"}
+        )
+
+    async def gerar_eventos():
+        # Retoma a partir do último evento recebido (cabeçalho Last-Event-ID)
+        ultimo = last_event_id
+        ultimo_envio = time.monotonic()
+        finalizado = False
+        while True:
+            eventos = await asyncio.to_thread(store.eventos, job_id, ultimo)
+            for evento in eventos:
+                ultimo = evento["seq"]
+                ultimo_envio = time.monotonic()
+                dados = serializar(evento["dados"]).decode("utf-8")
+                yield f"id: {evento['seq']}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+                if evento["tipo"] == "status" and evento["dados"]["status"] in ESTADOS_FINAIS:
+                    return
+            if not eventos:
+                # Reconexão depois do evento final (Last-Event-ID) ou job
+                # removido pela expiração: nada mais será enviado
+                job = await asyncio.to_thread(store.obter, job_id)
+                if job is None:
+                    return
+                if job["status"] in ESTADOS_FINAIS:
+                    # O status é gravado antes do evento final: encerra só
+                    # se a leitura seguinte também não trouxer eventos
+                    if finalizado:
+                        return
+                    finalizado = True
+            if time.monotonic() - ultimo_envio > 15:
+                # Mantém a conexão viva enquanto aguarda novos eventos
+                ultimo_envio = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        gerar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def buscar_documentos(keywords: list[str], process_id: str, max_resultados: int):
+    """
+    Busca as palavras-chave nos documentos já processados (fora do event loop).
+    """
+    keywords = [k for k in keywords if k and k.strip()]
+    if not keywords:
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400, "message": "Informe ao menos uma palavra-chave"}
+        )
+    situacao = indice_busca.situacao(process_id) if process_id is not None else None
+    if process_id is not None and situacao == "removido":
+        return JSONResponse(
+            status_code=410,
+            content={"status": 410,
+                     "message": f"Documento {process_id} saiu do índice de busca "
+                                "(limite de documentos em memória); envie o PDF de novo"}
+        )
+    if process_id is not None and situacao is None:
+        return JSONResponse(
+            status_code=404,
+            content={"status": 404,
+                     "message": f"Documento {process_id} não encontrado no índice de busca "
+                                "(o índice é em memória e não sobrevive a reinícios)"}
+        )
+
+    documentos = await asyncio.to_thread(
+        indice_busca.buscar, keywords, process_id, max_resultados)
+    return RespostaJSON(content={"status": 200, "keywords": keywords, "documentos": documentos})
+
+
+@router.get("/search")
+async def search(q: list[str] = Query(...), process_id: str = None,
+                 max_resultados: int = BUSCA_MAX_RESULTADOS):
+    return await buscar_documentos(q, process_id, max_resultados)
+
+
+@router.post("/search")
+async def search_lote(keywords: list[str] = Body(..., embed=True),
+                      process_id: str = Body(None, embed=True),
+                      max_resultados: int = Body(BUSCA_MAX_RESULTADOS, embed=True)):
+    # Para listas grandes de palavras-chave, que não cabem na URL
+    return await buscar_documentos(keywords, process_id, max_resultados)
+
+
+async def consultar_indice(consulta: str, k: int, process_id: str):
+    """
+    Trechos dos documentos processados mais similares à consulta (fora do event loop).
+    """
+    if not consulta or not consulta.strip():
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400, "message": "Informe o texto da consulta"}
+        )
+    if not 1 <= k <= RECUPERACAO_MAX_RESULTADOS:
+        return JSONResponse(
+            status_code=400,
+            content={"status": 400,
+                     "message": f"k deve estar entre 1 e {RECUPERACAO_MAX_RESULTADOS}"}
+        )
+    if process_id is not None and not await asyncio.to_thread(indice_vetorial.contem, process_id):
+        return JSONResponse(
+            status_code=404,
+            content={"status": 404,
+                     "message": f"Documento {process_id} não encontrado no índice de recuperação"}
+        )
+
+    resultados = await asyncio.to_thread(indice_vetorial.consultar, consulta, k, process_id)
+    return RespostaJSON(content={"status": 200, "consulta": consulta, "resultados": resultados})
+
+
+@router.get("/query")
+async def query(q: str = Query(...), k: int = RECUPERACAO_RESULTADOS, process_id: str = None):
+    return await consultar_indice(q, k, process_id)
+
+
+@router.post("/query")
+async def query_corpo(consulta: str = Body(..., embed=True),
+                      k: int = Body(RECUPERACAO_RESULTADOS, embed=True),
+                      process_id: str = Body(None, embed=True)):
+    # Para consultas longas (ex.: um trecho inteiro), que não cabem na URL
+    return await consultar_indice(consulta, k, process_id)
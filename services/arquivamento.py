@@ -0,0 +1,263 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+import zipfile
+
+from services.bucket import S3_BUCKET, UploadS3
+from services.logs import obter_logger
+from services.metricas import COMPACTACAO, observar_etapa
+
+
+logger = obter_logger("arquivamento")
+
+# Configurações do arquivamento (ajustáveis por variável de ambiente)
+# Destino dos zips das páginas: "disco" ou "s3" (multipart upload, sem arquivo local)
+ARQUIVAMENTO_DESTINO = os.environ.get("ARQUIVAMENTO_DESTINO", "disco")
+# Prefixo das chaves dos zips no S3
+ARQUIVAMENTO_PREFIXO_S3 = os.environ.get("ARQUIVAMENTO_PREFIXO_S3", "processados/")
+# Nível de compressão das imagens: 0 = armazenadas (PNG/JPEG já são
+# comprimidos, deflate quase não reduz e custa CPU); 1 a 9 = deflate
+ARQUIVAMENTO_NIVEL = int(os.environ.get("ARQUIVAMENTO_NIVEL", "0"))
+# Imagens aguardando a escrita no zip (por documento); cheia, quem
+# adiciona espera: a memória não cresce com o número de páginas
+ARQUIVAMENTO_MAX_FILA = int(os.environ.get("ARQUIVAMENTO_MAX_FILA", "16"))
+
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+CANCELADO = "cancelado"
+
+_FIM = object()
+_CANCELAR = object()
+
+
+def metodo_compressao(nivel: int):
+    """
+    (compress_type, compresslevel) do zipfile para o nível configurado.
+    """
+    if nivel <= 0:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, min(nivel, 9)
+
+
+class Arquivo:
+    """
+    Zip de um documento, gravado por uma thread própria a partir das
+    imagens em memória: o pipeline só coloca as imagens na fila, e a
+    escrita (disco ou S3) termina depois que a resposta já foi enviada.
+    """
+
+    def __init__(self, nome: str, destino: str, pasta: str, nivel: int,
+                 bucket: str, s3=None, ao_terminar=None):
+        self.nome = nome
+        self.destino = destino
+        self.nivel = nivel
+        self.status = EM_ANDAMENTO
+        self.erro = None
+        self.entradas = []
+        self.bytes_entradas = 0
+        self.bytes_escritos = 0
+        self.tempo_ms = None
+
+        if destino == "s3":
+            self.bucket = bucket
+            self.chave = f"{ARQUIVAMENTO_PREFIXO_S3}{nome}"
+            self.localizacao = f"s3://{bucket}/{self.chave}"
+            self._s3 = s3
+        else:
+            self.caminho = os.path.join(pasta, nome)
+            self.localizacao = self.caminho
+
+        self._fila = queue.Queue(maxsize=ARQUIVAMENTO_MAX_FILA)
+        self._ao_terminar = ao_terminar
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._executar,),
+            name=f"arquivamento-{nome}")
+
+    def iniciar(self):
+        self._thread.start()
+
+    def adicionar(self, nome: str, dados: bytes):
+        """
+        Coloca a imagem na fila do zip (espera se a fila estiver cheia).
+        """
+        self.entradas.append(nome)
+        self._fila.put((nome, dados))
+
+    def concluir(self):
+        """
+        Sinaliza que não há mais imagens; o zip é finalizado em segundo plano.
+        """
+        self._fila.put(_FIM)
+
+    def cancelar(self):
+        """
+        Descarta o zip (o processamento do documento falhou).
+        """
+        self._fila.put(_CANCELAR)
+
+    def aguardar(self, timeout: float = None) -> bool:
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _abrir_destino(self):
+        if self.destino == "s3":
+            return UploadS3(self.chave, self.bucket, "application/zip", self._s3)
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        return open(self.caminho, "wb")
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        compress_type, compresslevel = metodo_compressao(self.nivel)
+        destino = None
+        try:
+            destino = self._abrir_destino()
+            # Destino sem seek (S3): o zipfile grava os descritores de dados
+            # depois de cada entrada, em uma única passada
+            with zipfile.ZipFile(destino, "w", compression=compress_type,
+                                 compresslevel=compresslevel) as zipf:
+                while True:
+                    item = self._fila.get()
+                    if item is _FIM:
+                        break
+                    if item is _CANCELAR:
+                        raise InterruptedError("Arquivamento cancelado")
+                    nome, dados = item
+                    zipf.writestr(nome, dados)
+                    self.bytes_entradas += len(dados)
+
+            if self.destino == "s3":
+                destino.concluir()
+                self.bytes_escritos = destino.bytes_enviados
+            else:
+                destino.close()
+                self.bytes_escritos = os.path.getsize(self.caminho)
+            self.status = CONCLUIDO
+            logger.info("Arquivo zip criado", extra={"campos": {
+                "zip": self.localizacao, "entradas": len(self.entradas),
+                "bytes": self.bytes_escritos}})
+        except Exception as e:
+            self.status = CANCELADO if isinstance(e, InterruptedError) else ERRO
+            self.erro = str(e)
+            self._descartar(destino)
+            if self.status == ERRO:
+                logger.exception("Erro ao criar arquivo zip",
+                                 extra={"campos": {"zip": self.localizacao}})
+                self._drenar()
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.tempo_ms = round(duracao * 1000, 2)
+            observar_etapa(COMPACTACAO, duracao, zip=self.nome, status=self.status)
+            if self._ao_terminar is not None:
+                self._ao_terminar(self)
+
+    def _drenar(self):
+        # Consome o restante da fila para não bloquear quem ainda adiciona
+        while self._fila.get() not in (_FIM, _CANCELAR):
+            pass
+
+    def _descartar(self, destino):
+        if destino is None:
+            return
+        try:
+            if self.destino == "s3":
+                destino.abortar()
+            else:
+                destino.close()
+                if os.path.exists(self.caminho):
+                    os.remove(self.caminho)
+        except Exception:
+            logger.exception("Erro ao descartar o arquivo zip",
+                             extra={"campos": {"zip": self.localizacao}})
+
+    def resumo(self) -> dict:
+        return {
+            "zip": self.localizacao,
+            "destino": self.destino,
+            "status": self.status,
+            "entradas": len(self.entradas),
+            "erro": self.erro,
+        }
+
+
+class Arquivador:
+    """
+    Cria os zips dos documentos e acompanha os que ainda estão sendo
+    gravados em segundo plano.
+    """
+
+    def __init__(self, destino: str = ARQUIVAMENTO_DESTINO, nivel: int = ARQUIVAMENTO_NIVEL,
+                 bucket: str = S3_BUCKET):
+        self.destino = destino
+        self.nivel = nivel
+        self.bucket = bucket
+        self._ativos = set()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.concluidos = 0
+        self.falhas = 0
+        self.cancelados = 0
+        self.bytes_entradas = 0
+        self.bytes_escritos = 0
+        self.tempo_total_ms = 0.0
+
+    def abrir(self, nome: str, pasta: str, destino: str = None, nivel: int = None,
+              s3=None) -> Arquivo:
+        """
+        Inicia o zip 'nome' ('pasta' é usada no destino em disco).
+        """
+        arquivo = Arquivo(nome, destino or self.destino, pasta,
+                          self.nivel if nivel is None else nivel, self.bucket,
+                          s3=s3, ao_terminar=self._terminado)
+        with self._lock:
+            self._ativos.add(arquivo)
+        arquivo.iniciar()
+        return arquivo
+
+    def _terminado(self, arquivo: Arquivo):
+        with self._lock:
+            self._ativos.discard(arquivo)
+            if arquivo.status == CONCLUIDO:
+                self.concluidos += 1
+                self.bytes_entradas += arquivo.bytes_entradas
+                self.bytes_escritos += arquivo.bytes_escritos
+                self.tempo_total_ms += arquivo.tempo_ms
+            elif arquivo.status == CANCELADO:
+                self.cancelados += 1
+            else:
+                self.falhas += 1
+
+    def encerrar(self, timeout: float = 30.0):
+        """
+        Aguarda os zips em andamento (chamado no shutdown da aplicação).
+        """
+        with self._lock:
+            ativos = list(self._ativos)
+        limite = time.monotonic() + timeout
+        for arquivo in ativos:
+            if not arquivo.aguardar(max(0.0, limite - time.monotonic())):
+                logger.warning("Arquivo zip não concluído no encerramento",
+                               extra={"campos": {"zip": arquivo.localizacao}})
+
+    def metricas(self) -> dict:
+        with self._lock:
+            em_andamento = len(self._ativos)
+        return {
+            "destino": self.destino,
+            "nivel": self.nivel,
+            "em_andamento": em_andamento,
+            "concluidos": self.concluidos,
+            "falhas": self.falhas,
+            "cancelados": self.cancelados,
+            "bytes_entradas": self.bytes_entradas,
+            "bytes_escritos": self.bytes_escritos,
+            "tempo_medio_ms": round(self.tempo_total_ms / self.concluidos, 2)
+            if self.concluidos else None,
+        }
+
+
+# Instância única por processo
+arquivador = Arquivador()
@@ -0,0 +1,219 @@
+# arquivo_respostas.py
+#
+# Arquivo das respostas brutas de cada página (Textract síncrono ou
+# assíncrono e extração nativa), no formato colunar de
+# services/textract/colunar.py, para reexecutar a extração sobre documentos
+# antigos sem pagar o Textract de novo (services/reprocessamento.py).
+#
+# As respostas são endereçadas pelo conteúdo: cada uma é gravada uma única
+# vez em 'objetos/<2 primeiros>/<sha256>.tcol', mesmo que apareça em vários
+# documentos (páginas repetidas ou reenviadas). 'paginas.jsonl' registra,
+# por página processada, o objeto com a sua resposta; só recebe acréscimos,
+# então vários workers podem gravar no mesmo diretório.
+#
+# A gravação é feita por uma thread de write-behind, fora do caminho da
+# requisição. O arquivo é opcional (RESPOSTAS_ARQUIVAR) e não tem
+# retenção: objetos e registro só crescem, e a limpeza de documentos
+# antigos fica a cargo de quem opera o diretório.
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+from services.logs import obter_logger
+from services.textract.colunar import carregar, codificar
+from services.textract.document import TextractDocument
+
+
+logger = obter_logger("arquivo_respostas")
+
+# Configurações do arquivo (ajustáveis por variável de ambiente)
+RESPOSTAS_ARQUIVAR = os.environ.get("RESPOSTAS_ARQUIVAR", "false").lower() == "true"
+# Diretório dos objetos e do registro das páginas
+RESPOSTAS_DIRETORIO = os.environ.get(
+    "RESPOSTAS_DIRETORIO", os.path.join("data", "respostas"))
+# Páginas aguardando gravação; com a fila cheia 'enfileirar' bloqueia
+RESPOSTAS_MAX_FILA = int(os.environ.get("RESPOSTAS_MAX_FILA", "256"))
+
+EXTENSAO = ".tcol"
+
+
+class ArquivoRespostas:
+    """
+    Respostas por página no formato colunar, endereçadas pelo sha256 do
+    conteúdo codificado.
+
+    - 'guardar' codifica a resposta, grava o objeto (se ainda não existir)
+      e acrescenta a página ao registro;
+    - 'enfileirar' faz o mesmo em segundo plano (write-behind), com fila
+      limitada; 'encerrar()' grava o que restar na fila;
+    - 'carregar' abre um objeto por mmap como DocumentoColunar, pronto
+      para as funções do parser;
+    - 'documentos' lê o registro e agrupa as páginas por documento (a
+      última gravação de cada página vale).
+    """
+
+    def __init__(self, diretorio: str = RESPOSTAS_DIRETORIO, max_fila=RESPOSTAS_MAX_FILA):
+        self.diretorio = diretorio
+        self._registro = None
+        self._lock = threading.Lock()
+
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._thread = None
+        self._parar = threading.Event()
+
+        # Métricas do arquivo neste processo
+        self.paginas = 0
+        self.objetos_novos = 0
+        self.bytes_gravados = 0
+        self.falhas = 0
+        self.tempo_total = 0.0
+
+    def caminho_objeto(self, chave: str) -> str:
+        return os.path.join(self.diretorio, "objetos", chave[:2], chave + EXTENSAO)
+
+    def guardar(self, process_id: str, pagina: int, response, arquivo: str = None,
+                origem: str = None) -> str:
+        """
+        Arquiva a resposta da página 'pagina' (a partir de 1) do documento.
+        Retorna a chave do objeto, ou None se não foi possível gravar (a
+        falha não interrompe o processamento do documento).
+        """
+        inicio = time.perf_counter()
+        try:
+            dados = codificar(response)
+            chave = hashlib.sha256(dados).hexdigest()
+            caminho = self.caminho_objeto(chave)
+            novo = not os.path.exists(caminho)
+            if novo:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                # Nome temporário único por thread: a troca é atômica
+                temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temporario, "wb") as f:
+                    f.write(dados)
+                os.replace(temporario, caminho)
+
+            blocos = len(response) if isinstance(response, TextractDocument) \
+                else len(response.get('Blocks', []))
+            linha = json.dumps({
+                "process_id": process_id,
+                "pagina": pagina,
+                "objeto": chave,
+                "arquivo": arquivo,
+                "origem": origem,
+                "blocos": blocos,
+                "criado_em": int(time.time()),
+            }, ensure_ascii=False).encode("utf-8") + b"\n"
+            with self._lock:
+                if self._registro is None:
+                    os.makedirs(self.diretorio, exist_ok=True)
+                    self._registro = open(os.path.join(self.diretorio, "paginas.jsonl"), "ab")
+                # Uma única escrita por linha (modo append)
+                self._registro.write(linha)
+                self._registro.flush()
+                self.paginas += 1
+                self.objetos_novos += novo
+                self.bytes_gravados += len(dados) if novo else 0
+                self.tempo_total += time.perf_counter() - inicio
+            return chave
+        except Exception:
+            # Último recurso: uma falha aqui (disco, resposta que o formato
+            # não representa) não interrompe o documento; fica nas métricas
+            with self._lock:
+                self.falhas += 1
+            logger.exception("Erro ao arquivar a resposta da página", extra={"campos": {
+                "process_id": process_id, "pagina": pagina}})
+            return None
+
+    def iniciar(self):
+        """
+        Inicia a thread de write-behind.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(
+                    target=self._loop, name="respostas-write-behind", daemon=True)
+                self._thread.start()
+
+    def enfileirar(self, process_id: str, pagina: int, response, arquivo: str = None,
+                   origem: str = None, timeout: float = None):
+        """
+        Coloca a página na fila de gravação. Bloqueia (até 'timeout') quando
+        a fila está cheia. A resposta não pode ser alterada depois disso.
+        """
+        self.iniciar()
+        self._fila.put((process_id, pagina, response, arquivo, origem), timeout=timeout)
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                item = self._fila.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.guardar(*item)
+
+    def carregar(self, chave: str):
+        return carregar(self.caminho_objeto(chave))
+
+    def documentos(self) -> dict:
+        """
+        process_id -> {"arquivo": ..., "paginas": {pagina: chave do objeto}}.
+        """
+        caminho = os.path.join(self.diretorio, "paginas.jsonl")
+        documentos = {}
+        if not os.path.exists(caminho):
+            return documentos
+        with open(caminho, "rb") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # Linha incompleta (gravação interrompida)
+                    continue
+                documento = documentos.setdefault(
+                    registro["process_id"], {"arquivo": registro.get("arquivo"), "paginas": {}})
+                documento["paginas"][registro["pagina"]] = registro["objeto"]
+        return documentos
+
+    def encerrar(self, timeout: float = 30):
+        """
+        Para a thread de write-behind, grava as páginas restantes da fila e
+        fecha o registro.
+        """
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            self.guardar(*item)
+        with self._lock:
+            if self._registro is not None:
+                self._registro.close()
+                self._registro = None
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "ativo": RESPOSTAS_ARQUIVAR,
+                "diretorio": self.diretorio,
+                "na_fila": self._fila.qsize(),
+                "paginas": self.paginas,
+                "objetos_novos": self.objetos_novos,
+                "paginas_repetidas": self.paginas - self.objetos_novos,
+                "bytes_gravados": self.bytes_gravados,
+                "falhas": self.falhas,
+                "tempo_medio_ms": round(self.tempo_total / self.paginas * 1000, 2)
+                if self.paginas else None,
+            }
+
+
+# Instância única por processo
+arquivo_respostas = ArquivoRespostas()
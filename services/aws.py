@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+from services.executor import IO_WORKERS
+from services.logs import obter_logger
+from services.textract.scheduler import TEXTRACT_MAX_EM_VOO
+
+
+logger = obter_logger("aws")
+
+# Configurações dos clientes AWS (ajustáveis por variável de ambiente)
+AWS_REGIAO = os.environ.get("AWS_REGIAO", "us-east-1")
+# Conexões HTTP mantidas por cliente: acompanha a concorrência dos workers
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get(
+    "AWS_MAX_POOL_CONNECTIONS", str(max(TEXTRACT_MAX_EM_VOO, IO_WORKERS) + 2)))
+# Modo de retry do botocore: "adaptive" também limita a taxa no cliente
+# (não vale para o perfil 'agendado', ver abaixo)
+AWS_RETRY_MODO = os.environ.get("AWS_RETRY_MODO", "adaptive")
+AWS_RETRY_MAX_TENTATIVAS = int(os.environ.get("AWS_RETRY_MAX_TENTATIVAS", "3"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "60"))
+# Serviços criados já no startup da aplicação
+SERVICOS_STARTUP = ("textract", "s3")
+
+# Perfil dos clientes usados pelo TextractScheduler: ele já cadencia as
+# chamadas (token bucket) e repete throttles e falhas transitórias; os
+# retries do botocore multiplicariam as tentativas por página, o modo
+# adaptive competiria com o token bucket e os throttles absorvidos no
+# cliente não apareceriam nas métricas do agendador
+PERFIL_AGENDADO = "agendado"
+RETRIES_AGENDADO = {"mode": "standard", "total_max_attempts": 1}
+
+
+def config_padrao(max_pool_connections: int = AWS_MAX_POOL_CONNECTIONS,
+                  retries: dict = None) -> Config:
+    """
+    Configuração do botocore para clientes de longa duração.
+    """
+    return Config(
+        max_pool_connections=max_pool_connections,
+        retries=retries or {"mode": AWS_RETRY_MODO, "max_attempts": AWS_RETRY_MAX_TENTATIVAS},
+        tcp_keepalive=True,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+    )
+
+
+def _nome(chave) -> str:
+    return ":".join(parte for parte in chave if parte)
+
+
+class ClientesAWS:
+    """
+    Registro de clientes boto3 com escopo de aplicação.
+
+    Os clientes são criados uma vez (por serviço e região) e reutilizados
+    por todas as requisições: clientes boto3 são thread-safe e mantêm o
+    pool de conexões HTTP (keep-alive), evitando resolver credenciais,
+    carregar endpoints e refazer o handshake TLS a cada requisição.
+    """
+
+    def __init__(self, regiao: str = AWS_REGIAO, config: Config = None):
+        self.regiao = regiao
+        self.config = config or config_padrao()
+        # Configuração por perfil de cliente (None é o padrão)
+        self.configs = {
+            None: self.config,
+            PERFIL_AGENDADO: self.config.merge(Config(retries=RETRIES_AGENDADO)),
+        }
+        self._session = None
+        self._clientes = {}
+        self._lock = threading.Lock()
+        self.tempos_criacao_ms = {}
+        self.tempo_inicializacao_ms = None
+
+    def _obter_session(self):
+        if self._session is None:
+            self._session = boto3.session.Session()
+        return self._session
+
+    def cliente(self, servico: str, regiao: str = None, perfil: str = None):
+        """
+        Retorna o cliente do serviço, criando-o na primeira chamada.
+        'perfil' escolhe a configuração (ex.: PERFIL_AGENDADO).
+        """
+        chave = (servico, regiao or self.regiao, perfil)
+        cliente = self._clientes.get(chave)
+        if cliente is not None:
+            return cliente
+
+        with self._lock:
+            cliente = self._clientes.get(chave)
+            if cliente is None:
+                inicio = time.perf_counter()
+                # A criação de clientes a partir da mesma session não é thread-safe
+                cliente = self._obter_session().client(
+                    servico, region_name=chave[1], config=self.configs[perfil])
+                self.tempos_criacao_ms[_nome(chave)] = round(
+                    (time.perf_counter() - inicio) * 1000, 2)
+                self._clientes[chave] = cliente
+            return cliente
+
+    def registrar(self, servico: str, cliente, regiao: str = None):
+        """
+        Registra um cliente já criado para o serviço, em todos os perfis
+        (ex.: os clientes locais dos benchmarks, que não acessam a rede).
+        """
+        with self._lock:
+            for perfil in self.configs:
+                self._clientes[(servico, regiao or self.regiao, perfil)] = cliente
+
+    def textract(self, regiao: str = None, perfil: str = None):
+        return self.cliente("textract", regiao, perfil)
+
+    def s3(self, regiao: str = None):
+        return self.cliente("s3", regiao)
+
+    def iniciar(self, servicos=SERVICOS_STARTUP):
+        """
+        Cria os clientes e resolve as credenciais no startup da aplicação,
+        para que a primeira requisição não pague esse custo.
+        """
+        inicio = time.perf_counter()
+        try:
+            self._obter_session().get_credentials()
+        except Exception as e:
+            logger.warning("Não foi possível resolver as credenciais AWS",
+                           extra={"campos": {"erro": str(e)}})
+        for servico in servicos:
+            self.cliente(servico)
+        if "textract" in servicos:
+            self.cliente("textract", perfil=PERFIL_AGENDADO)
+        self.tempo_inicializacao_ms = round(
+            (time.perf_counter() - inicio) * 1000, 2)
+        logger.info("Clientes AWS inicializados", extra={"campos": {
+            "tempo_ms": self.tempo_inicializacao_ms, "servicos": list(servicos)}})
+
+    def encerrar(self):
+        """
+        Fecha os pools de conexões dos clientes.
+        """
+        with self._lock:
+            clientes = list(self._clientes.values())
+            self._clientes.clear()
+        for cliente in clientes:
+            try:
+                cliente.close()
+            except Exception:
+                pass
+
+    def metricas(self) -> dict:
+        return {
+            "regiao": self.regiao,
+            "max_pool_connections": self.config.max_pool_connections,
+            "retry": {perfil or "padrao": config.retries
+                      for perfil, config in self.configs.items()},
+            "clientes": sorted(_nome(chave) for chave in self._clientes),
+            "tempos_criacao_ms": dict(self.tempos_criacao_ms),
+            "tempo_inicializacao_ms": self.tempo_inicializacao_ms,
+        }
+
+
+# Instância única por worker do uvicorn
+clientes_aws = ClientesAWS()
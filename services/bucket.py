@@ -0,0 +1,214 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.aws import clientes_aws
+from services.logs import obter_logger
+
+
+logger = obter_logger("bucket")
+
+# Configurações do S3 (ajustáveis por variável de ambiente)
+# Bucket dos documentos enviados; vazio desliga os recursos que dependem do S3
+S3_BUCKET = os.environ.get("S3_BUCKET", "")
+# Prefixo das chaves dos PDFs enviados para a análise assíncrona
+S3_PREFIXO_UPLOADS = os.environ.get("S3_PREFIXO_UPLOADS", "uploads/")
+# Acima deste tamanho o envio é feito em partes (multipart upload)
+S3_LIMITE_MULTIPART = int(os.environ.get(
+    "S3_LIMITE_MULTIPART", str(16 * 1024 * 1024)))
+# Tamanho de cada parte (mínimo de 5 MB exigido pelo S3, exceto a última)
+S3_TAMANHO_PARTE = max(5 * 1024 * 1024, int(os.environ.get(
+    "S3_TAMANHO_PARTE", str(16 * 1024 * 1024))))
+# Partes enviadas ao mesmo tempo por upload (memória: uma parte cada)
+S3_PARTES_EM_VOO = int(os.environ.get("S3_PARTES_EM_VOO", "2"))
+# Threads que enviam as partes, compartilhadas pelos uploads do processo
+S3_WORKERS_PARTES = int(os.environ.get("S3_WORKERS_PARTES", "4"))
+
+# Pool próprio das partes: os uploads rodam dentro do pool de I/O do
+# executor e esperar, de lá, por tarefas do mesmo pool pode travá-lo
+_pool_partes = None
+_lock_pool_partes = threading.Lock()
+
+
+def _submeter_parte(func, *args):
+    global _pool_partes
+    with _lock_pool_partes:
+        if _pool_partes is None:
+            _pool_partes = ThreadPoolExecutor(
+                max_workers=max(1, S3_WORKERS_PARTES), thread_name_prefix="s3-partes")
+        return _pool_partes.submit(func, *args)
+
+
+def encerrar_envios(wait: bool = True):
+    """
+    Encerra o pool de envio das partes (criado no primeiro multipart upload).
+    """
+    global _pool_partes
+    with _lock_pool_partes:
+        pool, _pool_partes = _pool_partes, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def chave_upload(process_id: str, filename: str) -> str:
+    """
+    Chave do PDF enviado: um objeto por processamento.
+    """
+    return f"{S3_PREFIXO_UPLOADS}{process_id}/{os.path.basename(filename)}"
+
+
+def enviar_objeto(conteudo, chave: str, bucket: str = S3_BUCKET,
+                  content_type: str = "application/pdf", s3=None) -> dict:
+    """
+    Envia o conteúdo (bytes, bytearray ou memoryview) para o S3 direto da
+    memória. Conteúdos grandes vão em partes, sem copiar o buffer.
+    Retorna a localização do objeto no formato do Textract
+    ({'Bucket': ..., 'Name': ...}).
+    """
+    if not bucket:
+        raise ValueError("Bucket S3 não configurado (S3_BUCKET)")
+    if s3 is None:
+        s3 = clientes_aws.s3()
+
+    dados = memoryview(conteudo)
+    if dados.nbytes <= S3_LIMITE_MULTIPART:
+        corpo = conteudo if isinstance(conteudo, (bytes, bytearray)) else bytes(dados)
+        s3.put_object(Bucket=bucket, Key=chave, Body=corpo, ContentType=content_type)
+    else:
+        with UploadS3(chave, bucket, content_type, s3) as destino:
+            destino.write(dados)
+
+    logger.info("Objeto enviado ao S3", extra={"campos": {
+        "bucket": bucket, "chave": chave, "bytes": dados.nbytes}})
+    return {"Bucket": bucket, "Name": chave}
+
+
+def enviar_em_partes(partes, chave: str, bucket: str = S3_BUCKET,
+                     content_type: str = "application/octet-stream", s3=None):
+    """
+    Multipart upload a partir de um iterável de partes (bytes ou
+    memoryview), sem arquivo local. Em caso de erro o upload é abortado.
+    """
+    with UploadS3(chave, bucket, content_type, s3) as destino:
+        for parte in partes:
+            destino.write(parte)
+
+
+class UploadS3:
+    """
+    Destino de escrita (file-like, só 'write') que envia o conteúdo ao S3
+    em partes à medida que é escrito, sem arquivo local: cada parte de
+    'tamanho_parte' bytes sobe em segundo plano enquanto a próxima é
+    preenchida. Conteúdos menores que uma parte vão em um único put_object.
+
+    Usado como context manager: sem exceção o upload é concluído; com
+    exceção, abortado.
+    """
+
+    def __init__(self, chave: str, bucket: str = S3_BUCKET,
+                 content_type: str = "application/octet-stream", s3=None,
+                 tamanho_parte: int = S3_TAMANHO_PARTE,
+                 partes_em_voo: int = S3_PARTES_EM_VOO):
+        if not bucket:
+            raise ValueError("Bucket S3 não configurado (S3_BUCKET)")
+        self.chave = chave
+        self.bucket = bucket
+        self.content_type = content_type
+        self.s3 = s3 if s3 is not None else clientes_aws.s3()
+        self.tamanho_parte = tamanho_parte
+        self.partes_em_voo = max(1, partes_em_voo)
+
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._enviando = []
+        self._partes = []
+        self.bytes_enviados = 0
+
+    def write(self, dados) -> int:
+        dados = memoryview(dados)
+        tamanho = dados.nbytes
+
+        # Completa a parte iniciada em escritas anteriores
+        if self._buffer:
+            falta = self.tamanho_parte - len(self._buffer)
+            self._buffer += dados[:falta]
+            dados = dados[falta:]
+            if len(self._buffer) < self.tamanho_parte:
+                return tamanho
+            self._enviar_parte(bytes(self._buffer))
+            self._buffer = bytearray()
+
+        # Partes inteiras saem direto do conteúdo escrito
+        while dados.nbytes >= self.tamanho_parte:
+            self._enviar_parte(bytes(dados[:self.tamanho_parte]))
+            dados = dados[self.tamanho_parte:]
+        self._buffer += dados
+        return tamanho
+
+    def flush(self):
+        pass
+
+    def _enviar_parte(self, parte: bytes):
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.chave,
+                ContentType=self.content_type)["UploadId"]
+
+        # Limita as partes em memória aguardando o envio
+        while len(self._enviando) >= self.partes_em_voo:
+            self._partes.append(self._enviando.pop(0).result())
+
+        numero = len(self._partes) + len(self._enviando) + 1
+        self._enviando.append(_submeter_parte(self._upload_part, numero, parte))
+        self.bytes_enviados += len(parte)
+
+    def _upload_part(self, numero: int, parte: bytes) -> dict:
+        resposta = self.s3.upload_part(Bucket=self.bucket, Key=self.chave,
+                                       UploadId=self._upload_id,
+                                       PartNumber=numero, Body=parte)
+        return {"PartNumber": numero, "ETag": resposta["ETag"]}
+
+    def concluir(self) -> dict:
+        """
+        Envia o restante e conclui o upload. Retorna a localização do objeto.
+        """
+        if self._upload_id is None:
+            self.bytes_enviados += len(self._buffer)
+            self.s3.put_object(Bucket=self.bucket, Key=self.chave,
+                               Body=bytes(self._buffer), ContentType=self.content_type)
+        else:
+            if self._buffer:
+                self._enviar_parte(bytes(self._buffer))
+            for future in self._enviando:
+                self._partes.append(future.result())
+            self._enviando = []
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._partes})
+        self._buffer = bytearray()
+        return {"Bucket": self.bucket, "Name": self.chave}
+
+    def abortar(self):
+        for future in self._enviando:
+            future.cancel()
+        self._enviando = []
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.chave, UploadId=self._upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.concluir()
+        else:
+            self.abortar()
+        return False
+
+
+def remover_objeto(chave: str, bucket: str = S3_BUCKET, s3=None):
+    if s3 is None:
+        s3 = clientes_aws.s3()
+    s3.delete_object(Bucket=bucket, Key=chave)
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.logs import obter_logger
+
+
+logger = obter_logger("cache")
+
+# Configurações do cache (ajustáveis por variável de ambiente)
+CACHE_ATIVO = os.environ.get("CACHE_ATIVO", "true").lower() == "true"
+# Tamanho máximo (bytes, pelo JSON serializado) da camada em memória (LRU)
+CACHE_MAX_BYTES_MEMORIA = int(
+    os.environ.get("CACHE_MAX_BYTES_MEMORIA", str(64 * 1024 * 1024)))
+# Diretório e tamanho máximo (bytes) da camada em disco
+CACHE_DIRETORIO = os.environ.get("CACHE_DIRETORIO", os.path.join("data", "cache"))
+CACHE_MAX_BYTES_DISCO = int(
+    os.environ.get("CACHE_MAX_BYTES_DISCO", str(512 * 1024 * 1024)))
+# Validade das entradas (s)
+CACHE_TTL = float(os.environ.get("CACHE_TTL", str(7 * 24 * 3600)))
+# Versão do formato/extração; alterar invalida as entradas antigas
+CACHE_VERSAO = "2"
+
+
+def hash_conteudo(conteudo: bytes) -> str:
+    """
+    SHA-256 do conteúdo (chave do cache).
+    """
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class ResultadoCache:
+    """
+    Cache endereçado por conteúdo com duas camadas:
+    - memória: LRU limitada pelo tamanho total (JSON serializado);
+    - disco: arquivos JSON limitados por tamanho total, com TTL.
+
+    As entradas são separadas por namespace (ex.: 'documento', 'pagina').
+    """
+
+    def __init__(self, diretorio=CACHE_DIRETORIO,
+                 max_bytes_memoria=CACHE_MAX_BYTES_MEMORIA,
+                 max_bytes_disco=CACHE_MAX_BYTES_DISCO, ttl=CACHE_TTL,
+                 versao=CACHE_VERSAO):
+        self.diretorio = diretorio
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.ttl = ttl
+        self.versao = versao
+
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self._bytes_disco = None
+
+        # Estatísticas
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self.expirados = 0
+        self.evictions_memoria = 0
+        self.evictions_disco = 0
+
+    def _chave(self, namespace, hash_):
+        return f"{namespace}:{self.versao}:{hash_}"
+
+    def _caminho(self, namespace, hash_):
+        return os.path.join(self.diretorio, f"{namespace}-v{self.versao}", hash_[:2], f"{hash_}.json")
+
+    def _arquivos_disco(self):
+        for raiz, _, arquivos in os.walk(self.diretorio):
+            for arquivo in arquivos:
+                if arquivo.endswith(".json"):
+                    yield os.path.join(raiz, arquivo)
+
+    def _calcular_bytes_disco(self):
+        if self._bytes_disco is None:
+            total = 0
+            for caminho in self._arquivos_disco():
+                try:
+                    total += os.path.getsize(caminho)
+                except OSError:
+                    pass
+            self._bytes_disco = total
+        return self._bytes_disco
+
+    def _guardar_memoria(self, chave, valor, tamanho):
+        self._remover_memoria(chave)
+        # Entradas maiores que a camada inteira ficam só no disco
+        if tamanho > self.max_bytes_memoria:
+            return
+        self._memoria[chave] = (time.time(), valor, tamanho)
+        self._bytes_memoria += tamanho
+        while self._bytes_memoria > self.max_bytes_memoria:
+            _, (_, _, removido) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= removido
+            self.evictions_memoria += 1
+
+    def _remover_memoria(self, chave):
+        entrada = self._memoria.pop(chave, None)
+        if entrada is not None:
+            self._bytes_memoria -= entrada[2]
+
+    def obter(self, namespace: str, hash_: str):
+        """
+        Retorna o valor armazenado para o hash (ou None).
+        """
+        chave = self._chave(namespace, hash_)
+        agora = time.time()
+
+        with self._lock:
+            if chave in self._memoria:
+                criado_em, valor, _ = self._memoria[chave]
+                if agora - criado_em <= self.ttl:
+                    self._memoria.move_to_end(chave)
+                    self.hits_memoria += 1
+                    return valor
+                self._remover_memoria(chave)
+                self.expirados += 1
+
+        caminho = self._caminho(namespace, hash_)
+        try:
+            criado_em = os.path.getmtime(caminho)
+            if agora - criado_em > self.ttl:
+                self._remover_arquivo(caminho)
+                with self._lock:
+                    self.expirados += 1
+                    self.misses += 1
+                return None
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            valor = json.loads(conteudo)
+            # Marca o acesso para a eviction por LRU no disco
+            os.utime(caminho, (agora, criado_em))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits_disco += 1
+            self._guardar_memoria(chave, valor, len(conteudo))
+        return valor
+
+    def guardar(self, namespace: str, hash_: str, valor):
+        """
+        Armazena o valor (serializável em JSON) nas duas camadas.
+        """
+        chave = self._chave(namespace, hash_)
+        try:
+            conteudo = json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.warning("Erro ao serializar entrada do cache",
+                           extra={"campos": {"chave": chave, "erro": str(e)}})
+            return
+        with self._lock:
+            self._guardar_memoria(chave, valor, len(conteudo))
+            # Inicializa o total em disco antes de gravar a nova entrada
+            self._calcular_bytes_disco()
+
+        caminho = self._caminho(namespace, hash_)
+        try:
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.{threading.get_ident()}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            anterior = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning("Erro ao gravar cache",
+                           extra={"campos": {"chave": chave, "erro": str(e)}})
+            return
+
+        with self._lock:
+            self._bytes_disco += len(conteudo) - anterior
+            excedeu = self._bytes_disco > self.max_bytes_disco
+        if excedeu:
+            self._aplicar_limite_disco()
+
+    def _remover_arquivo(self, caminho):
+        try:
+            tamanho = os.path.getsize(caminho)
+            os.remove(caminho)
+        except OSError:
+            return
+        with self._lock:
+            if self._bytes_disco is not None:
+                self._bytes_disco -= tamanho
+
+    def _aplicar_limite_disco(self):
+        """
+        Remove as entradas menos acessadas (atime) até voltar ao limite.
+        """
+        entradas = []
+        for caminho in self._arquivos_disco():
+            try:
+                stat = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((stat.st_atime, stat.st_size, caminho))
+        entradas.sort()
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in entradas:
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            self.evictions_disco += 1
+
+        with self._lock:
+            self._bytes_disco = total
+
+    def limpar(self):
+        """
+        Remove todas as entradas (memória e disco).
+        """
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+        for caminho in list(self._arquivos_disco()):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes_disco = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_disco + self.misses
+            return {
+                "entradas_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+                "max_bytes_memoria": self.max_bytes_memoria,
+                "bytes_disco": self._calcular_bytes_disco(),
+                "max_bytes_disco": self.max_bytes_disco,
+                "ttl_s": self.ttl,
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "expirados": self.expirados,
+                "evictions_memoria": self.evictions_memoria,
+                "evictions_disco": self.evictions_disco,
+                "taxa_acerto": ((self.hits_memoria + self.hits_disco) / consultas) if consultas else 0.0,
+            }
+
+
+# Instância única por processo
+cache = ResultadoCache()
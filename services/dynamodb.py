@@ -1,16 +1,34 @@
 from schemas import schemas
 from models import RAGRequestModel
+from services.logs import obter_logger
+from services.persistencia import persistencia
 
 
-def salvar_rag(rag_request: schemas.RAGRequest):
+logger = obter_logger("dynamodb")
 
+
+def salvar_rag(rag_request: schemas.RAGRequest, write_behind: bool = True):
+    """
+    Salva o RAG do arquivo no DynamoDB.
+    Por padrão o item entra na fila de write-behind e é gravado em lote
+    fora do caminho da requisição; com write_behind=False grava na hora.
+    """
     try:
         rag = RAGRequestModel(
-            arquivo_id=rag_request.id_arquivo,
+            arquivo_id=str(rag_request.id_arquivo),
             rags=rag_request.rags
         )
-        rag.save()  # Salva o objeto no DynamoDB
-        print(f"rag salvo com sucesso para o arquivo {rag_request.id_arquivo}")
-    except Exception as e:
-        print(f"Erro ao criar/atualizar usuário: {e}")
+        if write_behind:
+            persistencia.enfileirar(rag)
+            logger.info("rag enfileirado", extra={"campos": {
+                "id_arquivo": str(rag_request.id_arquivo)}})
+            return rag
+
+        if persistencia.salvar([rag]):
+            logger.info("rag salvo com sucesso", extra={"campos": {
+                "id_arquivo": str(rag_request.id_arquivo)}})
+            return rag
+        return None
+    except Exception:
+        logger.exception("Erro ao salvar o rag")
         return None
@@ -0,0 +1,438 @@
+# enriquecimento.py
+#
+# Enriquecimento dos documentos por um modelo do Amazon Bedrock. O texto de
+# cada página (extract_text) é compactado e entra em um lote compartilhado
+# pelos documentos em processamento; cada lote, limitado por um orçamento de
+# tokens, vira uma única invocação do modelo. A resposta é lida em streaming:
+# o modelo responde uma linha JSON por página e cada página é entregue assim
+# que a sua linha chega. As respostas ficam em cache pelo hash do texto
+# normalizado, então páginas idênticas (ou que só diferem em espaços e
+# maiúsculas) não voltam ao modelo.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from services.aws import clientes_aws
+from services.cache import CACHE_ATIVO, cache
+from services.logs import obter_logger
+from services.metricas import ENRIQUECIMENTO, observar_etapa, registro_metricas
+
+
+logger = obter_logger("enriquecimento")
+
+# Configurações do enriquecimento (ajustáveis por variável de ambiente)
+# Enriquecer os documentos processados (requer acesso ao Bedrock)
+ENRIQUECIMENTO_ATIVO = os.environ.get("ENRIQUECIMENTO_ATIVO", "false").lower() == "true"
+# Modelo invocado (ConverseStream do bedrock-runtime)
+BEDROCK_MODELO_ID = os.environ.get(
+    "BEDROCK_MODELO_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+# Orçamento de tokens de entrada (estimados) por invocação
+ENRIQUECIMENTO_MAX_TOKENS_LOTE = int(os.environ.get("ENRIQUECIMENTO_MAX_TOKENS_LOTE", "6000"))
+# Páginas por invocação (a resposta cresce com o número de páginas)
+ENRIQUECIMENTO_MAX_PAGINAS_LOTE = int(os.environ.get("ENRIQUECIMENTO_MAX_PAGINAS_LOTE", "8"))
+# Tokens de saída por página do lote
+ENRIQUECIMENTO_TOKENS_RESPOSTA_PAGINA = int(
+    os.environ.get("ENRIQUECIMENTO_TOKENS_RESPOSTA_PAGINA", "300"))
+# Tempo máximo (ms) que um lote incompleto espera por mais páginas
+ENRIQUECIMENTO_ESPERA_MS = float(os.environ.get("ENRIQUECIMENTO_ESPERA_MS", "50"))
+# Invocações do modelo em andamento ao mesmo tempo (por processo)
+ENRIQUECIMENTO_CONCORRENCIA = int(os.environ.get("ENRIQUECIMENTO_CONCORRENCIA", "2"))
+# Tempo máximo (s) aguardando o enriquecimento de um documento
+ENRIQUECIMENTO_TIMEOUT = float(os.environ.get("ENRIQUECIMENTO_TIMEOUT", "120"))
+
+# Versão das instruções; alterar invalida as respostas em cache
+VERSAO_PROMPT = "1"
+# Estimativa de caracteres por token (sem depender do tokenizer do modelo)
+CARACTERES_POR_TOKEN = 4
+
+INSTRUCOES = (
+    "Você extrai dados de cotações de seguro. O usuário envia páginas entre "
+    "<pagina id=\"N\"> e </pagina>. Para cada página, responda uma única linha "
+    "JSON, sem texto antes ou depois, no formato "
+    "{\"id\": \"N\", \"seguradora\": str, \"produto\": str, \"vigencia\": str, "
+    "\"premio_total\": str, \"coberturas\": [{\"nome\": str, \"valor\": str}], "
+    "\"resumo\": str}. Use null para os dados ausentes na página."
+)
+
+# Linhas sem conteúdo útil para o modelo: numeração de página e separadores
+_NUMERO_PAGINA = re.compile(r"^(p[áa]g(ina)?\.?\s*)?\d+(\s*(de|/)\s*\d+)?$", re.IGNORECASE)
+_ESPACOS = re.compile(r"\s+")
+_ALFANUMERICO = re.compile(r"\w")
+
+PRIMEIRO_TOKEN = registro_metricas.histograma(
+    "mvp_enriquecimento_primeiro_token_segundos",
+    "Tempo até o primeiro trecho da resposta do modelo, por invocação")
+
+
+def compactar_texto(texto: str) -> str:
+    """
+    Reduz o texto da página ao que interessa ao modelo: espaços repetidos,
+    linhas vazias, separadores, números de página e linhas repetidas em
+    sequência são removidos.
+    """
+    linhas = []
+    anterior = None
+    for linha in texto.splitlines():
+        linha = _ESPACOS.sub(" ", linha).strip()
+        if not linha or not _ALFANUMERICO.search(linha) or _NUMERO_PAGINA.match(linha):
+            continue
+        if linha != anterior:
+            linhas.append(linha)
+        anterior = linha
+    return "\n".join(linhas)
+
+
+def normalizar(texto: str) -> str:
+    """
+    Forma normalizada do texto para a chave do cache.
+    """
+    return _ESPACOS.sub(" ", unicodedata.normalize("NFKC", texto).casefold()).strip()
+
+
+def hash_normalizado(texto: str, modelo: str = BEDROCK_MODELO_ID) -> str:
+    """
+    SHA-256 do texto normalizado, do modelo e da versão das instruções.
+    """
+    conteudo = f"{modelo}\0{VERSAO_PROMPT}\0{normalizar(texto)}"
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def estimar_tokens(texto: str) -> int:
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def formatar_pagina(id_, texto: str) -> str:
+    return f"<pagina id=\"{id_}\">\n{texto}\n</pagina>"
+
+
+def ler_linhas(stream):
+    """
+    Gera, a partir dos eventos do ConverseStream, cada linha completa do
+    texto da resposta assim que chega, e por último o evento 'metadata'
+    (uso de tokens), se houver.
+    """
+    pendente = ""
+    for evento in stream:
+        if "contentBlockDelta" in evento:
+            pendente += evento["contentBlockDelta"]["delta"].get("text", "")
+            *linhas, pendente = pendente.split("\n")
+            yield from linhas
+        elif "metadata" in evento:
+            if pendente:
+                yield pendente
+                pendente = ""
+            yield evento["metadata"]
+    if pendente:
+        yield pendente
+
+
+class Enriquecedor:
+    """
+    Agrupa as páginas de todos os documentos em lotes e invoca o modelo.
+
+    'submeter' devolve um Future por página, resolvido com os dados da
+    página assim que a sua linha da resposta chega (ou do cache). Um lote
+    é enviado quando o próximo texto estouraria o orçamento de tokens,
+    quando atinge 'max_paginas_lote' ou depois de 'espera_ms' sem encher.
+
+    'cliente' é qualquer objeto com o 'converse_stream' do bedrock-runtime
+    (ex.: o cliente local dos benchmarks); sem ele, usa o cliente do
+    registro de clientes AWS.
+    """
+
+    def __init__(self, cliente=None, modelo=BEDROCK_MODELO_ID,
+                 max_tokens_lote=ENRIQUECIMENTO_MAX_TOKENS_LOTE,
+                 max_paginas_lote=ENRIQUECIMENTO_MAX_PAGINAS_LOTE,
+                 espera_ms=ENRIQUECIMENTO_ESPERA_MS,
+                 concorrencia=ENRIQUECIMENTO_CONCORRENCIA, usar_cache: bool = None):
+        self._cliente = cliente
+        self.modelo = modelo
+        self.max_tokens_lote = max_tokens_lote
+        self.max_paginas_lote = max_paginas_lote
+        self.espera = espera_ms / 1000
+        self.concorrencia = concorrencia
+        self.usar_cache = CACHE_ATIVO if usar_cache is None else usar_cache
+        # Orçamento das páginas: o total menos as instruções
+        self.orcamento_paginas = max(1, max_tokens_lote - estimar_tokens(INSTRUCOES))
+
+        self._lote = []
+        self._tokens_lote = 0
+        self._inicio_lote = None
+        # Páginas idênticas em andamento compartilham o Future
+        self._em_andamento = {}
+        self._pool = None
+        self._despachante = None
+        self._encerrando = False
+        self._condicao = threading.Condition()
+
+        # Métricas
+        self.paginas = 0
+        self.hits_cache = 0
+        self.coalescidas = 0
+        self.truncadas = 0
+        self.invocacoes = 0
+        self.falhas = 0
+        self.tokens_entrada = 0
+        self.tokens_saida = 0
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            return clientes_aws.cliente("bedrock-runtime")
+        return self._cliente
+
+    def iniciar(self):
+        with self._condicao:
+            self._encerrando = False
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.concorrencia, thread_name_prefix="enriquecimento")
+            if self._despachante is None:
+                self._despachante = threading.Thread(
+                    target=self._despachar_por_tempo, daemon=True,
+                    name="enriquecimento-lotes")
+                self._despachante.start()
+
+    def encerrar(self, wait: bool = True):
+        """
+        Envia o lote pendente e encerra as threads.
+        """
+        with self._condicao:
+            self._encerrando = True
+            self._enviar_lote()
+            self._condicao.notify_all()
+            despachante, self._despachante = self._despachante, None
+            pool, self._pool = self._pool, None
+        if despachante is not None and wait:
+            despachante.join()
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def submeter(self, texto: str) -> Future:
+        """
+        Enfileira o texto de uma página. O Future resolve com
+        {"dados", "cache", "truncado"}.
+        """
+        if self._pool is None:
+            self.iniciar()
+        texto = compactar_texto(texto)
+        chave = hash_normalizado(texto, self.modelo)
+        future = Future()
+
+        with self._condicao:
+            self.paginas += 1
+            existente = self._em_andamento.get(chave)
+            if existente is not None:
+                self.coalescidas += 1
+                return existente
+
+        if self.usar_cache:
+            em_cache = cache.obter("enriquecimento", chave)
+            if em_cache is not None:
+                with self._condicao:
+                    self.hits_cache += 1
+                future.set_result({"dados": em_cache, "cache": True, "truncado": False})
+                return future
+
+        truncado = estimar_tokens(formatar_pagina(0, texto)) > self.orcamento_paginas
+        if truncado:
+            # Uma página maior que o orçamento vai sozinha, com o início do texto
+            texto = texto[:max(1, self.orcamento_paginas - 16) * CARACTERES_POR_TOKEN]
+        tokens = estimar_tokens(formatar_pagina(0, texto))
+
+        with self._condicao:
+            existente = self._em_andamento.get(chave)
+            if existente is not None:
+                self.coalescidas += 1
+                return existente
+            self._em_andamento[chave] = future
+            self.truncadas += truncado
+            if self._lote and (self._tokens_lote + tokens > self.orcamento_paginas):
+                self._enviar_lote()
+            if not self._lote:
+                self._inicio_lote = time.monotonic()
+                self._condicao.notify_all()
+            self._lote.append((chave, texto, truncado, future))
+            self._tokens_lote += tokens
+            if len(self._lote) >= self.max_paginas_lote:
+                self._enviar_lote()
+        return future
+
+    def despachar(self):
+        """
+        Envia o lote pendente sem esperar que encha (ex.: a última página
+        de um documento).
+        """
+        with self._condicao:
+            self._enviar_lote()
+
+    def _enviar_lote(self):
+        # Chamado com a condição adquirida
+        if not self._lote:
+            return
+        lote, self._lote, self._tokens_lote = self._lote, [], 0
+        self._inicio_lote = None
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.concorrencia, thread_name_prefix="enriquecimento")
+        self._pool.submit(self._invocar, lote)
+
+    def _despachar_por_tempo(self):
+        with self._condicao:
+            while not self._encerrando:
+                if self._inicio_lote is None:
+                    self._condicao.wait()
+                    continue
+                restante = self._inicio_lote + self.espera - time.monotonic()
+                if restante <= 0:
+                    self._enviar_lote()
+                else:
+                    self._condicao.wait(restante)
+
+    def montar_prompt(self, lote) -> str:
+        return "\n".join(formatar_pagina(indice, texto)
+                         for indice, (_, texto, _, _) in enumerate(lote))
+
+    def _invocar(self, lote):
+        pendentes = {str(indice): item for indice, item in enumerate(lote)}
+        inicio = time.perf_counter()
+        primeiro = None
+        uso = {}
+        try:
+            resposta = self.cliente.converse_stream(
+                modelId=self.modelo,
+                system=[{"text": INSTRUCOES}],
+                messages=[{"role": "user", "content": [{"text": self.montar_prompt(lote)}]}],
+                inferenceConfig={"maxTokens": ENRIQUECIMENTO_TOKENS_RESPOSTA_PAGINA * len(lote),
+                                 "temperature": 0},
+            )
+            for linha in ler_linhas(resposta["stream"]):
+                if primeiro is None:
+                    primeiro = time.perf_counter() - inicio
+                    PRIMEIRO_TOKEN.observar(primeiro)
+                if isinstance(linha, dict):
+                    uso = linha.get("usage", {})
+                    continue
+                dados = self._ler_linha(linha)
+                item = pendentes.pop(str(dados.pop("id")), None) if dados else None
+                if item is not None:
+                    self._concluir(item, dados)
+            erro = "O modelo não respondeu a página"
+        except Exception as e:
+            erro = str(e)
+            logger.warning("Erro ao invocar o modelo", extra={"campos": {
+                "modelo": self.modelo, "paginas": len(lote), "erro": erro}})
+
+        for chave, _, _, future in pendentes.values():
+            with self._condicao:
+                self._em_andamento.pop(chave, None)
+                self.falhas += 1
+            future.set_exception(RuntimeError(erro))
+
+        duracao = time.perf_counter() - inicio
+        with self._condicao:
+            self.invocacoes += 1
+            self.tokens_entrada += uso.get("inputTokens", 0)
+            self.tokens_saida += uso.get("outputTokens", 0)
+        observar_etapa(ENRIQUECIMENTO, duracao, paginas=len(lote),
+                       primeiro_token_ms=round((primeiro or duracao) * 1000, 2),
+                       tokens_entrada=uso.get("inputTokens"),
+                       tokens_saida=uso.get("outputTokens"))
+
+    @staticmethod
+    def _ler_linha(linha: str):
+        # Linhas fora do formato (ex.: cercas de código) são ignoradas
+        linha = linha.strip()
+        if not linha.startswith("{"):
+            return None
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            return None
+        return dados if isinstance(dados, dict) and "id" in dados else None
+
+    def _concluir(self, item, dados):
+        chave, _, truncado, future = item
+        if self.usar_cache:
+            cache.guardar("enriquecimento", chave, dados)
+        with self._condicao:
+            self._em_andamento.pop(chave, None)
+        future.set_result({"dados": dados, "cache": False, "truncado": truncado})
+
+    def metricas(self) -> dict:
+        with self._condicao:
+            return {
+                "ativo": ENRIQUECIMENTO_ATIVO,
+                "modelo": self.modelo,
+                "max_tokens_lote": self.max_tokens_lote,
+                "max_paginas_lote": self.max_paginas_lote,
+                "concorrencia": self.concorrencia,
+                "paginas": self.paginas,
+                "hits_cache": self.hits_cache,
+                "coalescidas": self.coalescidas,
+                "truncadas": self.truncadas,
+                "invocacoes": self.invocacoes,
+                "paginas_por_invocacao": round(
+                    (self.paginas - self.hits_cache - self.coalescidas)
+                    / self.invocacoes, 2) if self.invocacoes else None,
+                "falhas": self.falhas,
+                "tokens_entrada": self.tokens_entrada,
+                "tokens_saida": self.tokens_saida,
+                "na_fila": len(self._lote),
+            }
+
+
+class SessaoEnriquecimento:
+    """
+    Enriquecimento das páginas de um documento: as páginas entram à medida
+    que são extraídas e 'ao_resultado(resultado)' é chamado assim que cada
+    uma fica pronta (na thread que recebeu a resposta).
+    """
+
+    def __init__(self, enriquecedor: Enriquecedor, ao_resultado=None):
+        self.enriquecedor = enriquecedor
+        self.ao_resultado = ao_resultado
+        self._paginas = []
+
+    def adicionar(self, pagina: int, texto: str):
+        if not texto.strip():
+            return
+        future = self.enriquecedor.submeter(texto)
+        self._paginas.append((pagina, future))
+        if self.ao_resultado is not None:
+            future.add_done_callback(lambda f: self.ao_resultado(self._resultado(pagina, f)))
+
+    def concluir(self, timeout: float = ENRIQUECIMENTO_TIMEOUT) -> list:
+        """
+        Envia as páginas pendentes e aguarda todas. Retorna os resultados
+        na ordem das páginas.
+        """
+        self.enriquecedor.despachar()
+        limite = time.monotonic() + timeout
+        resultados = []
+        for pagina, future in self._paginas:
+            try:
+                future.exception(timeout=max(0.0, limite - time.monotonic()))
+            except TimeoutError:
+                pass
+            resultados.append(self._resultado(pagina, future))
+        return resultados
+
+    @staticmethod
+    def _resultado(pagina, future) -> dict:
+        if not future.done():
+            return {"pagina": pagina, "dados": None, "erro": "Tempo de espera excedido"}
+        erro = future.exception()
+        if erro is not None:
+            return {"pagina": pagina, "dados": None, "erro": str(erro)}
+        return dict(future.result(), pagina=pagina, erro=None)
+
+
+# Instância única por processo
+enriquecedor = Enriquecedor()
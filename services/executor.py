@@ -0,0 +1,199 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+# Configurações da camada de execução (ajustáveis por variável de ambiente)
+# Threads para as etapas de I/O (Textract, disco, zip)
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+# Processos para a rasterização com PyMuPDF (0 = renderizar na própria thread)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(os.cpu_count() or 2)))
+# Uploads processados ao mesmo tempo por worker do uvicorn
+MAX_CONCORRENTES = int(os.environ.get("UPLOAD_MAX_CONCORRENTES", str(IO_WORKERS)))
+# Uploads aguardando na fila de admissão antes de recusar com 429
+MAX_FILA = int(os.environ.get("UPLOAD_MAX_FILA", "16"))
+# Tempo máximo (s) aguardando na fila antes de recusar com 503
+TIMEOUT_FILA = float(os.environ.get("UPLOAD_TIMEOUT_FILA", "30"))
+# Valor do cabeçalho Retry-After (s) devolvido quando saturado
+RETRY_AFTER = int(os.environ.get("UPLOAD_RETRY_AFTER", "5"))
+
+
+class ExecutorSaturadoError(Exception):
+    """
+    Lançada quando o executor não pode admitir mais trabalho.
+    'status_code' é 429 (fila cheia) ou 503 (timeout na fila / encerrando).
+    """
+
+    def __init__(self, status_code: int, message: str, retry_after: int = RETRY_AFTER):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+class PipelineExecutor:
+    """
+    Executa o pipeline síncrono de processamento fora do event loop.
+
+    - Um pool de threads para as etapas de I/O;
+    - Um pool de processos para a rasterização (CPU);
+    - Uma fila de admissão limitada que recusa trabalho quando saturada.
+    """
+
+    def __init__(self, io_workers=IO_WORKERS, render_workers=RENDER_WORKERS,
+                 max_concorrentes=MAX_CONCORRENTES, max_fila=MAX_FILA,
+                 timeout_fila=TIMEOUT_FILA):
+        self.io_workers = io_workers
+        self.render_workers = render_workers
+        self.max_concorrentes = max_concorrentes
+        self.max_fila = max_fila
+        self.timeout_fila = timeout_fila
+
+        self._io_pool = None
+        self._render_pool = None
+        self._semaforo = None
+        self._encerrando = False
+        self._lock = threading.Lock()
+
+        # Métricas de concorrência deste worker
+        self._ativos = 0
+        self._na_fila = 0
+        self._pico_ativos = 0
+        self._concluidos = 0
+        self._falhas = 0
+        self._rejeitados_429 = 0
+        self._rejeitados_503 = 0
+        self._tempo_total = 0.0
+        self._renderizacoes = 0
+
+    def iniciar(self):
+        """
+        Cria os pools. Chamado no startup da aplicação (ou sob demanda).
+        """
+        with self._lock:
+            self._encerrando = False
+            if self._io_pool is None:
+                self._io_pool = ThreadPoolExecutor(
+                    max_workers=self.io_workers, thread_name_prefix="pipeline-io")
+            if self._render_pool is None and self.render_workers > 0:
+                # forkserver: os processos não herdam as threads deste worker
+                # (logs, scheduler, pool de I/O) nem os locks que elas seguram
+                self._render_pool = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context("forkserver"))
+            if self._semaforo is None:
+                self._semaforo = asyncio.Semaphore(self.max_concorrentes)
+
+    def encerrar(self, wait: bool = True):
+        """
+        Recusa novos trabalhos e encerra os pools.
+        """
+        with self._lock:
+            self._encerrando = True
+            io_pool, render_pool = self._io_pool, self._render_pool
+            self._io_pool = None
+            self._render_pool = None
+            self._semaforo = None
+        if io_pool:
+            io_pool.shutdown(wait=wait)
+        if render_pool:
+            render_pool.shutdown(wait=wait)
+
+    async def executar(self, func, *args, **kwargs):
+        """
+        Executa 'func' no pool de I/O respeitando a fila de admissão.
+        Lança ExecutorSaturadoError quando não há capacidade.
+        """
+        if self._encerrando:
+            self._rejeitados_503 += 1
+            raise ExecutorSaturadoError(503, "Servidor em encerramento")
+
+        if self._io_pool is None:
+            self.iniciar()
+
+        # Fila de admissão limitada: recusa imediatamente quando cheia
+        if self._ativos + self._na_fila >= self.max_concorrentes + self.max_fila:
+            self._rejeitados_429 += 1
+            raise ExecutorSaturadoError(
+                429, "Muitas requisições em processamento, tente novamente mais tarde")
+
+        semaforo = self._semaforo
+        self._na_fila += 1
+        try:
+            await asyncio.wait_for(semaforo.acquire(), timeout=self.timeout_fila)
+        except asyncio.TimeoutError:
+            self._na_fila -= 1
+            self._rejeitados_503 += 1
+            raise ExecutorSaturadoError(
+                503, "Tempo de espera na fila de processamento excedido")
+        except BaseException:
+            # Requisição cancelada (ex.: cliente desconectou) enquanto aguardava
+            self._na_fila -= 1
+            raise
+
+        # Passa da fila para ativo sem ponto de suspensão entre as duas contagens
+        self._na_fila -= 1
+        self._ativos += 1
+        self._pico_ativos = max(self._pico_ativos, self._ativos)
+        inicio = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            resultado = await loop.run_in_executor(
+                self._io_pool, lambda: func(*args, **kwargs))
+            self._concluidos += 1
+            return resultado
+        except Exception:
+            self._falhas += 1
+            raise
+        finally:
+            self._tempo_total += time.perf_counter() - inicio
+            self._ativos -= 1
+            semaforo.release()
+
+    def renderizar(self, func, *args):
+        """
+        Submete uma tarefa de rasterização ao pool de processos e retorna o Future.
+        'func' precisa ser uma função de módulo (serializável).
+        Sem pool de processos, executa na thread atual.
+        """
+        if self._io_pool is None:
+            self.iniciar()
+        with self._lock:
+            self._renderizacoes += 1
+        if self._render_pool is None:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._render_pool.submit(func, *args)
+
+    def metricas(self) -> dict:
+        """
+        Retorna as métricas de concorrência deste worker.
+        """
+        concluidos = self._concluidos + self._falhas
+        return {
+            "pid": os.getpid(),
+            "io_workers": self.io_workers,
+            "render_workers": self.render_workers,
+            "max_concorrentes": self.max_concorrentes,
+            "max_fila": self.max_fila,
+            "ativos": self._ativos,
+            "na_fila": self._na_fila,
+            "pico_ativos": self._pico_ativos,
+            "concluidos": self._concluidos,
+            "falhas": self._falhas,
+            "rejeitados_429": self._rejeitados_429,
+            "rejeitados_503": self._rejeitados_503,
+            "renderizacoes": self._renderizacoes,
+            "tempo_medio_s": (self._tempo_total / concluidos) if concluidos else 0.0,
+        }
+
+
+# Instância única por worker do uvicorn
+executor = PipelineExecutor()
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.textract.busca import IndicePalavras
+
+
+# Configurações da busca (ajustáveis por variável de ambiente)
+BUSCA_ATIVA = os.environ.get("BUSCA_ATIVA", "true").lower() == "true"
+# Documentos mantidos no índice em memória (os mais antigos saem primeiro)
+BUSCA_MAX_DOCUMENTOS = int(os.environ.get("BUSCA_MAX_DOCUMENTOS", "100"))
+# Ids de documentos que saíram do LRU lembrados para responder 410 na busca
+BUSCA_MAX_REMOVIDOS = int(os.environ.get("BUSCA_MAX_REMOVIDOS", "1000"))
+# Resultados retornados por palavra-chave e documento
+BUSCA_MAX_RESULTADOS = int(os.environ.get("BUSCA_MAX_RESULTADOS", "50"))
+
+
+class IndiceDocumentos:
+    """
+    Índice de busca dos documentos já processados, em memória (por processo).
+
+    Cada documento (process_id) tem um IndicePalavras com as palavras de
+    todas as páginas; os documentos são mantidos em LRU, limitados por
+    'max_documentos'. Um PDF já indexado (mesmo hash) enviado de novo com
+    outro process_id vira um alias do documento existente, sem indexar as
+    páginas outra vez nem duplicar os resultados da busca.
+
+    O índice não sobrevive a reinícios, e documentos que saem do LRU não
+    são reconstruídos: 'situacao' diferencia um id removido do índice (os
+    últimos 'max_removidos') de um id desconhecido. O processamento trata
+    um documento em cache que não está no índice como novo (ver
+    processa_arquivos), então o id devolvido ao cliente está sempre indexado.
+    """
+
+    def __init__(self, max_documentos=BUSCA_MAX_DOCUMENTOS, max_removidos=BUSCA_MAX_REMOVIDOS):
+        self.max_documentos = max_documentos
+        self.max_removidos = max_removidos
+        self._documentos = OrderedDict()
+        # alias -> process_id do documento indexado; hash do PDF -> process_id
+        self._aliases = {}
+        self._por_hash = {}
+        # Ids (documentos e aliases) que saíram do LRU, do mais antigo ao mais recente
+        self._removidos = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def registrar_documento(self, process_id: str, filename: str, titulo: str = None,
+                            hash_pdf: str = None) -> bool:
+        """
+        Registra o documento antes das suas páginas. Retorna False se o
+        process_id virou um alias de um documento com o mesmo 'hash_pdf'.
+        """
+        with self._lock:
+            self._removidos.pop(process_id, None)
+            existente = self._por_hash.get(hash_pdf) if hash_pdf else None
+            if existente is not None and existente != process_id:
+                self._esquecer(process_id)
+                self._aliases[process_id] = existente
+                self._documentos[existente]["aliases"].add(process_id)
+                self._documentos.move_to_end(existente)
+                return False
+
+            self._esquecer(process_id)
+            self._documentos[process_id] = {
+                "process_id": process_id,
+                "filename": filename,
+                "titulo": titulo,
+                "hash_pdf": hash_pdf,
+                "aliases": set(),
+                "criado_em": time.time(),
+                "paginas": 0,
+                "indice": IndicePalavras(),
+            }
+            if hash_pdf:
+                self._por_hash[hash_pdf] = process_id
+            while len(self._documentos) > self.max_documentos:
+                removido = next(iter(self._documentos))
+                for id_removido in (removido, *self._documentos[removido]["aliases"]):
+                    self._removidos[id_removido] = True
+                self._esquecer(removido)
+                self.evictions += 1
+            while len(self._removidos) > self.max_removidos:
+                self._removidos.popitem(last=False)
+            return True
+
+    def _esquecer(self, process_id):
+        # Remove o alias, ou o documento com os seus aliases e o seu hash
+        if self._aliases.pop(process_id, None) is not None:
+            for documento in self._documentos.values():
+                documento["aliases"].discard(process_id)
+            return
+        documento = self._documentos.pop(process_id, None)
+        if documento is None:
+            return
+        for alias in documento["aliases"]:
+            del self._aliases[alias]
+        if self._por_hash.get(documento["hash_pdf"]) == process_id:
+            del self._por_hash[documento["hash_pdf"]]
+
+    def adicionar_pagina(self, process_id: str, pagina: int, response):
+        """
+        Indexa as palavras de uma página (resposta do Textract ou nativa).
+        'pagina' é o número da página no PDF, começando em 1.
+        """
+        word_blocks = [block for block in response.get('Blocks', [])
+                       if block['BlockType'] == 'WORD']
+        with self._lock:
+            documento = self._documentos.get(process_id)
+            if documento is None:
+                return
+            documento["indice"].adicionar(word_blocks, pagina)
+            documento["paginas"] += 1
+
+    def buscar(self, keywords, process_id: str = None,
+               max_resultados: int = BUSCA_MAX_RESULTADOS) -> list:
+        """
+        Busca as palavras-chave em um documento (ou em todos, do mais recente
+        para o mais antigo). Retorna apenas os documentos com algum resultado.
+        """
+        with self._lock:
+            if process_id is not None:
+                process_id = self._aliases.get(process_id, process_id)
+                documentos = [self._documentos[process_id]] \
+                    if process_id in self._documentos else []
+            else:
+                documentos = list(reversed(self._documentos.values()))
+
+            encontrados = []
+            for documento in documentos:
+                resultados = documento["indice"].buscar_varias(keywords)
+                resultados = {keyword: blocos[:max_resultados]
+                              for keyword, blocos in resultados.items() if blocos}
+                if resultados:
+                    encontrados.append({
+                        "process_id": documento["process_id"],
+                        "filename": documento["filename"],
+                        "titulo": documento["titulo"],
+                        "resultados": resultados,
+                    })
+            return encontrados
+
+    def contem(self, process_id: str) -> bool:
+        with self._lock:
+            return process_id in self._documentos or process_id in self._aliases
+
+    def situacao(self, process_id: str):
+        """
+        "indexado", "removido" (saiu do LRU) ou None (desconhecido neste
+        processo: nunca indexado aqui ou anterior a um reinício).
+        """
+        with self._lock:
+            if process_id in self._documentos or process_id in self._aliases:
+                return "indexado"
+            return "removido" if process_id in self._removidos else None
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "documentos": len(self._documentos),
+                "max_documentos": self.max_documentos,
+                "aliases": len(self._aliases),
+                "removidos": len(self._removidos),
+                "palavras": sum(len(d["indice"]) for d in self._documentos.values()),
+                "evictions": self.evictions,
+            }
+
+
+# Instância única por worker do uvicorn
+indice_busca = IndiceDocumentos()
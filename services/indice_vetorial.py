@@ -0,0 +1,603 @@
+# indice_vetorial.py
+#
+# Índice de recuperação (RAG) sobre os documentos já processados. O texto de
+# cada página e os seus pares chave-valor são divididos em trechos, e cada
+# trecho vira um embedding float32 gravado em uma matriz mapeada em memória
+# (um arquivo que só cresce, compactado na abertura quando há muitos trechos
+# de documentos removidos): documentos novos entram sem reconstruir o
+# índice, e a consulta é um produto matriz-vetor do NumPy seguido de top-k.
+#
+# Os embeddings vêm de um codificador plugável; o padrão ("hashing") é local
+# e determinístico, sem rede nem modelo.
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+from services.aws import clientes_aws
+from services.logs import obter_logger
+from services.textract.busca import normalizar_token
+from services.textract.parser import as_document, extract_text, get_kv_map
+
+
+logger = obter_logger("indice_vetorial")
+
+# Configurações do índice (ajustáveis por variável de ambiente)
+RECUPERACAO_ATIVA = os.environ.get("RECUPERACAO_ATIVA", "true").lower() == "true"
+# Diretório dos arquivos do índice (matriz, trechos e documentos)
+RECUPERACAO_DIRETORIO = os.environ.get(
+    "RECUPERACAO_DIRETORIO", os.path.join("data", "indice_vetorial"))
+# Codificador dos embeddings: "hashing" (local) ou "bedrock"
+RECUPERACAO_CODIFICADOR = os.environ.get("RECUPERACAO_CODIFICADOR", "hashing")
+# Dimensão dos embeddings
+RECUPERACAO_DIMENSAO = int(os.environ.get("RECUPERACAO_DIMENSAO", "256"))
+# Tamanho máximo (caracteres) de um trecho
+RECUPERACAO_TAMANHO_TRECHO = int(os.environ.get("RECUPERACAO_TAMANHO_TRECHO", "600"))
+# Trechos retornados por consulta (padrão e máximo)
+RECUPERACAO_RESULTADOS = int(os.environ.get("RECUPERACAO_RESULTADOS", "5"))
+RECUPERACAO_MAX_RESULTADOS = int(os.environ.get("RECUPERACAO_MAX_RESULTADOS", "50"))
+# Fração dos trechos pertencentes a documentos removidos a partir da qual o
+# índice é compactado ao abrir (0 desliga a compactação)
+RECUPERACAO_COMPACTAR_FRACAO = float(os.environ.get("RECUPERACAO_COMPACTAR_FRACAO", "0.25"))
+# Modelo de embeddings do codificador "bedrock"
+BEDROCK_EMBEDDINGS_MODELO_ID = os.environ.get(
+    "BEDROCK_EMBEDDINGS_MODELO_ID", "amazon.titan-embed-text-v2:0")
+
+# Linhas da matriz reservadas na criação (a capacidade dobra quando enche)
+CAPACIDADE_INICIAL = 1024
+# Tipos de trecho
+TEXTO = "texto"
+CAMPOS = "campos"
+
+_PALAVRAS = re.compile(r"\w+")
+
+
+def fragmentar(linhas, tamanho: int = RECUPERACAO_TAMANHO_TRECHO) -> list:
+    """
+    Agrupa as linhas em trechos de até 'tamanho' caracteres, sem quebrar
+    linhas (a não ser as maiores que o trecho). A última linha de cada
+    trecho se repete no início do seguinte, para não separar um rótulo do
+    seu valor.
+    """
+    trechos = []
+    atual = []
+    tamanho_atual = 0
+    for linha in linhas:
+        linha = linha.strip()
+        if not linha:
+            continue
+        while len(linha) > tamanho:
+            # Linha maior que o trecho: corta no último espaço
+            corte = linha.rfind(" ", 0, tamanho)
+            corte = corte if corte > 0 else tamanho
+            trechos.append(linha[:corte])
+            linha = linha[corte:].strip()
+        if atual and tamanho_atual + len(linha) + 1 > tamanho:
+            trechos.append("\n".join(atual))
+            atual = atual[-1:] if len(atual) > 1 else []
+            tamanho_atual = sum(len(anterior) + 1 for anterior in atual)
+        atual.append(linha)
+        tamanho_atual += len(linha) + 1
+    if atual:
+        trechos.append("\n".join(atual))
+    return trechos
+
+
+def trechos_pagina(response, tamanho: int = RECUPERACAO_TAMANHO_TRECHO) -> list:
+    """
+    Trechos de uma página (resposta do Textract ou documento indexado):
+    [(tipo, texto)] com o texto das linhas e os pares chave-valor.
+    """
+    document = as_document(response)
+    trechos = [(TEXTO, trecho)
+               for trecho in fragmentar(extract_text(document).split("\n"), tamanho)]
+    pares = get_kv_map(document, document.word_map)
+    trechos.extend((CAMPOS, trecho) for trecho in fragmentar(
+        (f"{chave}: {valor}" for chave, valor in pares.items() if valor), tamanho))
+    return trechos
+
+
+class CodificadorHashing:
+    """
+    Embeddings locais por feature hashing: as palavras normalizadas e os
+    pares de palavras vizinhas caem em 'dimensao' posições (CRC32, com
+    sinal), com peso log(1 + frequência), e o vetor é normalizado.
+    Determinístico e sem estado: o mesmo texto gera sempre o mesmo vetor.
+    """
+
+    nome = "hashing"
+
+    def __init__(self, dimensao: int = RECUPERACAO_DIMENSAO):
+        self.dimensao = dimensao
+
+    def _hashes(self, texto: str) -> list:
+        tokens = [normalizar_token(palavra) for palavra in _PALAVRAS.findall(texto)]
+        termos = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(termo.encode("utf-8")) for termo in termos]
+
+    def codificar(self, textos) -> np.ndarray:
+        vetores = np.zeros((len(textos), self.dimensao), dtype=np.float32)
+        for linha, texto in enumerate(textos):
+            hashes = np.array(self._hashes(texto), dtype=np.uint32)
+            if not len(hashes):
+                continue
+            posicoes, contagens = np.unique(hashes, return_counts=True)
+            sinais = np.where(posicoes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vetores[linha], posicoes % self.dimensao,
+                      sinais * np.log1p(contagens).astype(np.float32))
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        np.divide(vetores, normas, out=vetores, where=normas > 0)
+        return vetores
+
+
+class CodificadorBedrock:
+    """
+    Embeddings do Amazon Titan Text Embeddings (uma chamada por texto).
+    """
+
+    def __init__(self, dimensao: int = RECUPERACAO_DIMENSAO,
+                 modelo: str = BEDROCK_EMBEDDINGS_MODELO_ID, cliente=None):
+        self.dimensao = dimensao
+        self.modelo = modelo
+        self.nome = f"bedrock:{modelo}"
+        self._cliente = cliente
+
+    def codificar(self, textos) -> np.ndarray:
+        cliente = self._cliente or clientes_aws.cliente("bedrock-runtime")
+        vetores = np.zeros((len(textos), self.dimensao), dtype=np.float32)
+        for linha, texto in enumerate(textos):
+            resposta = cliente.invoke_model(
+                modelId=self.modelo,
+                body=json.dumps({"inputText": texto, "dimensions": self.dimensao,
+                                 "normalize": True}))
+            vetores[linha] = json.loads(resposta["body"].read())["embedding"]
+        return vetores
+
+
+CODIFICADORES = {
+    "hashing": CodificadorHashing,
+    "bedrock": CodificadorBedrock,
+}
+
+
+def criar_codificador(nome: str = RECUPERACAO_CODIFICADOR,
+                      dimensao: int = RECUPERACAO_DIMENSAO):
+    """
+    Cria o codificador configurado.
+    """
+    if nome not in CODIFICADORES:
+        raise ValueError(f"Codificador de embeddings desconhecido: {nome}")
+    return CODIFICADORES[nome](dimensao)
+
+
+class IndiceVetorial:
+    """
+    Índice de trechos com embeddings, persistido em 'diretorio':
+
+    - vetores.f32: matriz (capacidade x dimensão) float32 mapeada em
+      memória; a linha i é o embedding do trecho i;
+    - trechos.jsonl: uma linha por trecho (documento, página, tipo, texto),
+      lida só para os resultados (o índice guarda apenas a posição);
+    - documentos.jsonl: os documentos, os aliases e as remoções;
+    - estado.json: o codificador e a dimensão com que o índice foi criado.
+
+    Os trechos só são acrescentados: o vetor é gravado antes da linha do
+    trecho, então um índice interrompido é reaberto com os trechos
+    completos. Remover um documento só o marca como removido; ao abrir,
+    se os trechos removidos passam de 'fracao_compactar' do total, os
+    três arquivos são reescritos sem eles (em um diretório à parte,
+    aplicado por renomeação, inclusive se a abertura for interrompida).
+
+    Os documentos são identificados também pelo hash do PDF: um PDF já
+    indexado, enviado de novo com outro process_id, vira um alias do
+    documento existente (as páginas não são indexadas de novo, e as
+    consultas não retornam cópias do mesmo documento).
+
+    Os arquivos pertencem a um único processo: com vários workers do
+    uvicorn, cada um precisa do seu RECUPERACAO_DIRETORIO.
+    """
+
+    def __init__(self, diretorio: str = RECUPERACAO_DIRETORIO, codificador=None,
+                 tamanho_trecho: int = RECUPERACAO_TAMANHO_TRECHO,
+                 fracao_compactar: float = RECUPERACAO_COMPACTAR_FRACAO):
+        self.diretorio = diretorio
+        self.codificador = codificador or criar_codificador()
+        self.tamanho_trecho = tamanho_trecho
+        self.fracao_compactar = fracao_compactar
+        self._lock = threading.Lock()
+        self._aberto = False
+
+        self._vetores = None
+        self._capacidade = 0
+        self._n = 0
+        # Por trecho: documento (código), página e posição da linha em trechos.jsonl
+        self._documento_trecho = array("i")
+        self._pagina_trecho = array("i")
+        self._offset_trecho = array("q")
+        # Documentos: código -> dados; process_id (ou alias) -> código atual;
+        # hash do PDF -> código
+        self._documentos = {}
+        self._codigos = {}
+        self._por_hash = {}
+        self._removidos = set()
+        self._trechos_removidos = 0
+        self._arquivo_trechos = None
+        self._arquivo_documentos = None
+
+        # Métricas
+        self.consultas = 0
+        self.tempo_consultas = 0.0
+        self.tempo_abertura_ms = None
+        self.compactacoes = 0
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def abrir(self):
+        """
+        Abre (ou cria) o índice em disco. Chamado no startup da aplicação
+        (ou sob demanda).
+        """
+        with self._lock:
+            if self._aberto:
+                return
+            inicio = time.perf_counter()
+            os.makedirs(self.diretorio, exist_ok=True)
+            estado = {"codificador": self.codificador.nome,
+                      "dimensao": self.codificador.dimensao}
+            caminho_estado = self._caminho("estado.json")
+            if os.path.exists(caminho_estado):
+                with open(caminho_estado, "r", encoding="utf-8") as f:
+                    gravado = json.load(f)
+                if gravado != estado:
+                    raise ValueError(
+                        f"Índice criado com {gravado}, incompatível com {estado}; "
+                        f"use outro diretório")
+            else:
+                with open(caminho_estado, "w", encoding="utf-8") as f:
+                    json.dump(estado, f)
+
+            # Compactação interrompida: descartada se incompleta, senão aplicada
+            shutil.rmtree(self._caminho("compactacao.tmp"), ignore_errors=True)
+            self._aplicar_compactacao()
+            self._ler_documentos()
+            self._ler_trechos()
+            if self._n and self.fracao_compactar > 0 and \
+                    self._trechos_removidos >= self.fracao_compactar * self._n:
+                self._compactar()
+            caminho_vetores = self._caminho("vetores.f32")
+            linhas_arquivo = 0
+            if os.path.exists(caminho_vetores):
+                linhas_arquivo = os.path.getsize(caminho_vetores) // (4 * self.codificador.dimensao)
+            self._mapear(max(linhas_arquivo, self._n, CAPACIDADE_INICIAL))
+
+            self._arquivo_trechos = open(self._caminho("trechos.jsonl"), "ab")
+            self._arquivo_documentos = open(self._caminho("documentos.jsonl"), "ab")
+            self._aberto = True
+            self.tempo_abertura_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            logger.info("Índice vetorial aberto", extra={"campos": {
+                "trechos": self._n, "documentos": len(self._codigos),
+                "tempo_ms": self.tempo_abertura_ms}})
+
+    def _compactar(self):
+        """
+        Reescreve os arquivos sem os trechos e os registros dos documentos
+        removidos (chamado na abertura, antes de mapear a matriz). Os
+        códigos dos documentos são mantidos.
+        """
+        dimensao = self.codificador.dimensao
+        mantidos = [i for i in range(self._n) if self._documento_trecho[i] not in self._removidos]
+        temporario = self._caminho("compactacao.tmp")
+        os.makedirs(temporario)
+
+        vetores = np.memmap(self._caminho("vetores.f32"), dtype=np.float32, mode="r",
+                            shape=(self._n, dimensao))
+        with open(os.path.join(temporario, "vetores.f32"), "wb") as f:
+            f.write(np.ascontiguousarray(vetores[mantidos]).tobytes())
+        del vetores
+
+        with open(self._caminho("trechos.jsonl"), "rb") as origem, \
+                open(os.path.join(temporario, "trechos.jsonl"), "wb") as destino:
+            for i in mantidos:
+                origem.seek(self._offset_trecho[i])
+                destino.write(origem.readline())
+
+        with open(os.path.join(temporario, "documentos.jsonl"), "wb") as f:
+            for codigo, registro in self._documentos.items():
+                if codigo not in self._removidos:
+                    f.write(json.dumps(registro, ensure_ascii=False).encode("utf-8") + b"\n")
+            for process_id, codigo in self._codigos.items():
+                if self._documentos[codigo]["process_id"] != process_id:
+                    f.write(json.dumps({"alias": process_id, "codigo": codigo},
+                                       ensure_ascii=False).encode("utf-8") + b"\n")
+
+        # A renomeação do diretório confirma a compactação
+        os.replace(temporario, self._caminho("compactacao"))
+        self._aplicar_compactacao()
+
+        removidos = self._n - len(mantidos)
+        self._documentos = {}
+        self._codigos = {}
+        self._por_hash = {}
+        self._removidos = set()
+        self._documento_trecho = array("i")
+        self._pagina_trecho = array("i")
+        self._offset_trecho = array("q")
+        self._ler_documentos()
+        self._ler_trechos()
+        self.compactacoes += 1
+        logger.info("Índice vetorial compactado", extra={"campos": {
+            "trechos": self._n, "trechos_removidos": removidos}})
+
+    def _aplicar_compactacao(self):
+        # Move os arquivos de uma compactação confirmada para o índice
+        # (pode ser repetido se for interrompido no meio)
+        compactacao = self._caminho("compactacao")
+        if not os.path.isdir(compactacao):
+            return
+        for nome in ("vetores.f32", "trechos.jsonl", "documentos.jsonl"):
+            if os.path.exists(os.path.join(compactacao, nome)):
+                os.replace(os.path.join(compactacao, nome), self._caminho(nome))
+        os.rmdir(compactacao)
+
+    def _ler_documentos(self):
+        caminho = self._caminho("documentos.jsonl")
+        if not os.path.exists(caminho):
+            return
+        with open(caminho, "rb") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # Linha incompleta (gravação interrompida)
+                    continue
+                if "removido" in registro:
+                    self._esquecer(registro["removido"])
+                    continue
+                if "alias" in registro:
+                    # Código None: alias removido
+                    if registro["codigo"] is None or registro["codigo"] in self._removidos:
+                        self._codigos.pop(registro["alias"], None)
+                    else:
+                        self._codigos[registro["alias"]] = registro["codigo"]
+                    continue
+                self._documentos[registro["codigo"]] = registro
+                self._codigos[registro["process_id"]] = registro["codigo"]
+                if registro.get("hash_pdf"):
+                    self._por_hash[registro["hash_pdf"]] = registro["codigo"]
+
+    def _ler_trechos(self):
+        caminho = self._caminho("trechos.jsonl")
+        if not os.path.exists(caminho):
+            return
+        offset = 0
+        with open(caminho, "rb") as f:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    # Linha incompleta: descartada e sobrescrita pelo próximo trecho
+                    break
+                registro = json.loads(linha)
+                self._documento_trecho.append(registro["d"])
+                self._pagina_trecho.append(registro["p"])
+                self._offset_trecho.append(offset)
+                offset += len(linha)
+        if offset != os.path.getsize(caminho):
+            os.truncate(caminho, offset)
+        self._n = len(self._offset_trecho)
+        self._trechos_removidos = sum(
+            1 for codigo in self._documento_trecho if codigo in self._removidos)
+
+    def _mapear(self, capacidade: int):
+        # Chamado com o lock adquirido; a matriz antiga continua válida para
+        # quem já a estiver lendo (o arquivo só cresce)
+        caminho = self._caminho("vetores.f32")
+        if self._vetores is not None:
+            self._vetores.flush()
+        with open(caminho, "ab") as f:
+            f.truncate(capacidade * 4 * self.codificador.dimensao)
+        self._vetores = np.memmap(caminho, dtype=np.float32, mode="r+",
+                                  shape=(capacidade, self.codificador.dimensao))
+        self._capacidade = capacidade
+
+    def registrar_documento(self, process_id: str, filename: str, titulo: str = None,
+                            hash_pdf: str = None) -> bool:
+        """
+        Registra o documento antes das suas páginas. Um process_id já
+        indexado é substituído (os trechos antigos são removidos). Se um
+        documento com o mesmo 'hash_pdf' já está indexado, o process_id
+        vira um alias dele e retorna False (as páginas não são indexadas).
+        """
+        if not self._aberto:
+            self.abrir()
+        with self._lock:
+            existente = self._por_hash.get(hash_pdf) if hash_pdf else None
+            if existente is not None and self._documentos[existente]["process_id"] != process_id:
+                if self._codigos.get(process_id) not in (None, existente):
+                    self._remover(process_id)
+                self._codigos[process_id] = existente
+                self._escrever_documento({"alias": process_id, "codigo": existente})
+                return False
+            if process_id in self._codigos:
+                self._remover(process_id)
+            codigo = max(self._documentos, default=-1) + 1
+            registro = {"codigo": codigo, "process_id": process_id, "filename": filename,
+                        "titulo": titulo, "hash_pdf": hash_pdf, "criado_em": time.time()}
+            self._escrever_documento(registro)
+            self._documentos[codigo] = registro
+            self._codigos[process_id] = codigo
+            if hash_pdf:
+                self._por_hash[hash_pdf] = codigo
+            return True
+
+    def _escrever_documento(self, registro: dict):
+        self._arquivo_documentos.write(
+            json.dumps(registro, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._arquivo_documentos.flush()
+
+    def adicionar_pagina(self, process_id: str, pagina: int, response) -> int:
+        """
+        Indexa os trechos de uma página (resposta do Textract, nativa ou já
+        indexada). 'pagina' começa em 1. Retorna o número de trechos.
+        Páginas de um alias (PDF já indexado) são ignoradas.
+        """
+        with self._lock:
+            codigo = self._codigos.get(process_id)
+            if codigo is None or self._documentos[codigo]["process_id"] != process_id:
+                return 0
+        trechos = trechos_pagina(response, self.tamanho_trecho)
+        if not trechos:
+            return 0
+        # A codificação acontece fora do lock
+        vetores = self.codificador.codificar([texto for _, texto in trechos])
+
+        with self._lock:
+            if self._codigos.get(process_id) != codigo:
+                return 0
+            if self._n + len(trechos) > self._capacidade:
+                capacidade = self._capacidade
+                while self._n + len(trechos) > capacidade:
+                    capacidade *= 2
+                self._mapear(capacidade)
+            self._vetores[self._n:self._n + len(trechos)] = vetores
+            self._vetores.flush()
+
+            offset = self._arquivo_trechos.tell()
+            linhas = []
+            for tipo, texto in trechos:
+                linha = json.dumps({"d": codigo, "p": pagina, "t": tipo, "x": texto},
+                                   ensure_ascii=False).encode("utf-8") + b"\n"
+                linhas.append(linha)
+                self._documento_trecho.append(codigo)
+                self._pagina_trecho.append(pagina)
+                self._offset_trecho.append(offset)
+                offset += len(linha)
+            self._arquivo_trechos.write(b"".join(linhas))
+            self._arquivo_trechos.flush()
+            self._n += len(trechos)
+        return len(trechos)
+
+    def remover_documento(self, process_id: str) -> bool:
+        with self._lock:
+            if process_id not in self._codigos:
+                return False
+            self._remover(process_id)
+            return True
+
+    def _remover(self, process_id):
+        """
+        Remove o documento de 'process_id'; de um alias, remove só o alias.
+        """
+        codigo = self._codigos[process_id]
+        if self._documentos[codigo]["process_id"] != process_id:
+            del self._codigos[process_id]
+            self._escrever_documento({"alias": process_id, "codigo": None})
+            return
+        self._esquecer(codigo)
+        self._trechos_removidos += self._documento_trecho.count(codigo)
+        self._escrever_documento({"removido": codigo})
+
+    def _esquecer(self, codigo):
+        # O documento, os seus aliases e o seu hash saem dos mapas
+        self._removidos.add(codigo)
+        for process_id in [p for p, c in self._codigos.items() if c == codigo]:
+            del self._codigos[process_id]
+        hash_pdf = self._documentos[codigo].get("hash_pdf")
+        if hash_pdf and self._por_hash.get(hash_pdf) == codigo:
+            del self._por_hash[hash_pdf]
+
+    def contem(self, process_id: str) -> bool:
+        with self._lock:
+            return process_id in self._codigos
+
+    def consultar(self, consulta: str, k: int = RECUPERACAO_RESULTADOS,
+                  process_id: str = None) -> list:
+        """
+        Os 'k' trechos mais similares à consulta (similaridade do cosseno),
+        em todos os documentos ou apenas em 'process_id'.
+        """
+        if not self._aberto:
+            self.abrir()
+        inicio = time.perf_counter()
+        vetor = self.codificador.codificar([consulta])[0]
+
+        with self._lock:
+            n = self._n
+            vetores = self._vetores
+            codigo = self._codigos.get(process_id) if process_id is not None else None
+            if n == 0 or (process_id is not None and codigo is None):
+                return []
+            documentos = np.array(self._documento_trecho[:n], dtype=np.int32)
+            removidos = np.fromiter(self._removidos, dtype=np.int32, count=len(self._removidos))
+
+        # A matriz é lida direto do arquivo mapeado, sem cópia
+        scores = np.asarray(vetores[:n] @ vetor)
+        if process_id is not None:
+            scores[documentos != codigo] = -np.inf
+        elif len(removidos):
+            scores[np.isin(documentos, removidos)] = -np.inf
+
+        k = min(k, n)
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.argsort(-scores[melhores], kind="stable")]
+        melhores = [int(i) for i in melhores if np.isfinite(scores[i])]
+
+        resultados = []
+        with open(self._caminho("trechos.jsonl"), "rb") as f:
+            for i in melhores:
+                f.seek(self._offset_trecho[i])
+                trecho = json.loads(f.readline())
+                documento = self._documentos[trecho["d"]]
+                resultados.append({
+                    "score": round(float(scores[i]), 4),
+                    "process_id": documento["process_id"],
+                    "filename": documento["filename"],
+                    "titulo": documento["titulo"],
+                    "pagina": trecho["p"],
+                    "tipo": trecho["t"],
+                    "texto": trecho["x"],
+                })
+
+        with self._lock:
+            self.consultas += 1
+            self.tempo_consultas += time.perf_counter() - inicio
+        return resultados
+
+    def encerrar(self):
+        with self._lock:
+            if not self._aberto:
+                return
+            self._vetores.flush()
+            self._arquivo_trechos.close()
+            self._arquivo_documentos.close()
+            self._vetores = None
+            self._aberto = False
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "ativo": RECUPERACAO_ATIVA,
+                "codificador": self.codificador.nome,
+                "dimensao": self.codificador.dimensao,
+                "documentos": len(self._documentos) - len(self._removidos),
+                "aliases": len(self._codigos) - (len(self._documentos) - len(self._removidos)),
+                "trechos": self._n,
+                "trechos_removidos": self._trechos_removidos,
+                "compactacoes": self.compactacoes,
+                "capacidade": self._capacidade,
+                "bytes_vetores": self._capacidade * 4 * self.codificador.dimensao,
+                "consultas": self.consultas,
+                "tempo_medio_consulta_ms": round(
+                    self.tempo_consultas / self.consultas * 1000, 2) if self.consultas else None,
+                "tempo_abertura_ms": self.tempo_abertura_ms,
+            }
+
+
+# Instância única por worker do uvicorn
+indice_vetorial = IndiceVetorial()
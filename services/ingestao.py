@@ -0,0 +1,303 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import zipfile
+
+from fastapi import UploadFile
+
+
+# Tamanho máximo aceito para um upload (bytes)
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# Tamanho dos blocos lidos do upload
+TAMANHO_CHUNK = int(os.environ.get("UPLOAD_TAMANHO_CHUNK", str(1024 * 1024)))
+# Arquivos (PDFs enviados ou dentro do zip) aceitos por lote em /upload/batch
+LOTE_MAX_ARQUIVOS = int(os.environ.get("LOTE_MAX_ARQUIVOS", "100"))
+# Tamanho máximo do corpo de um lote (bytes)
+LOTE_MAX_BYTES = int(os.environ.get("LOTE_MAX_BYTES", str(500 * 1024 * 1024)))
+# Rotas que recebem arquivos e passam pelo limite de tamanho do corpo
+ROTAS_UPLOAD = ("/upload", "/jobs")
+# Rotas com limite próprio (as demais usam MAX_UPLOAD_BYTES)
+LIMITES_ROTAS = {"/upload/batch": LOTE_MAX_BYTES}
+
+# O cabeçalho "%PDF-" pode aparecer em qualquer posição do primeiro 1 KB
+ASSINATURA_PDF = b"%PDF-"
+JANELA_ASSINATURA = 1024
+# Assinatura de um arquivo zip (cabeçalho local da primeira entrada)
+ASSINATURA_ZIP = b"PK\x03\x04"
+
+
+class ArquivoInvalidoError(Exception):
+    """
+    Lançada quando o upload é recusado (tamanho ou conteúdo inválido).
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _descritor(file):
+    """
+    Descritor do arquivo temporário do upload, se o Starlette já o passou
+    para o disco (o corpo fica em um SpooledTemporaryFile), ou None.
+    Enquanto o upload está em memória, 'fileno' forçaria a escrita em
+    disco; nesse caso o conteúdo é lido do próprio buffer.
+    """
+    arquivo = getattr(file, "file", None)
+    if arquivo is None or not getattr(arquivo, "_rolled", False):
+        return None
+    try:
+        return arquivo.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+async def ler_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES,
+                     formato: str = "pdf"):
+    """
+    Lê o upload em blocos, validando a assinatura do 'formato' ("pdf" ou
+    "zip") no primeiro bloco, aplicando o limite de tamanho durante a
+    leitura e calculando o SHA-256 ao mesmo tempo.
+
+    Retorna (conteúdo, sha256). Se o Starlette já passou o upload para o
+    disco, o conteúdo é uma memoryview do arquivo temporário mapeado com
+    mmap (sem copiar o arquivo para a memória do processo), que deve ser
+    fechada com liberar_upload ao fim da requisição; senão, um único
+    buffer (bytearray) pré-alocado quando o tamanho é conhecido.
+    """
+    tamanho_declarado = getattr(file, "size", None)
+    if tamanho_declarado is not None and tamanho_declarado > max_bytes:
+        raise ArquivoInvalidoError(
+            413, f"Arquivo excede o tamanho máximo de {max_bytes} bytes")
+
+    descritor = _descritor(file)
+    sha256 = hashlib.sha256()
+    buffer = None
+    view = None
+    if descritor is None:
+        buffer = bytearray(tamanho_declarado) if tamanho_declarado else bytearray()
+        view = memoryview(buffer) if tamanho_declarado else None
+    lidos = 0
+
+    while True:
+        chunk = await file.read(TAMANHO_CHUNK)
+        if not chunk:
+            break
+
+        # Valida a assinatura antes de continuar lendo o restante do arquivo
+        if lidos == 0:
+            if formato == "zip" and not chunk.startswith(ASSINATURA_ZIP):
+                raise ArquivoInvalidoError(
+                    400, "O conteúdo enviado não é um arquivo zip válido")
+            if formato == "pdf" and ASSINATURA_PDF not in chunk[:JANELA_ASSINATURA]:
+                raise ArquivoInvalidoError(
+                    400, "O conteúdo enviado não é um arquivo PDF válido")
+
+        if lidos + len(chunk) > max_bytes:
+            raise ArquivoInvalidoError(
+                413, f"Arquivo excede o tamanho máximo de {max_bytes} bytes")
+
+        sha256.update(chunk)
+        # Com o arquivo temporário, o conteúdo não é copiado para o buffer
+        if buffer is not None:
+            if view is not None and lidos + len(chunk) <= len(buffer):
+                view[lidos:lidos + len(chunk)] = chunk
+            else:
+                # Tamanho desconhecido (ou maior que o declarado): cresce o buffer
+                if view is not None:
+                    view.release()
+                    view = None
+                    del buffer[lidos:]
+                buffer.extend(chunk)
+        lidos += len(chunk)
+
+    if lidos == 0:
+        raise ArquivoInvalidoError(400, "O arquivo enviado está vazio")
+
+    if buffer is None:
+        # O mapeamento continua válido depois que o Starlette fecha o arquivo
+        mapa = mmap.mmap(descritor, lidos, access=mmap.ACCESS_READ)
+        return memoryview(mapa), sha256.hexdigest()
+
+    if view is not None:
+        view.release()
+    if len(buffer) != lidos:
+        # Menor que o declarado
+        del buffer[lidos:]
+
+    return buffer, sha256.hexdigest()
+
+
+def liberar_upload(conteudo):
+    """
+    Fecha o mmap do upload retornado por ler_upload (um bytearray não
+    precisa ser liberado). Se ainda há views do mapeamento em uso, ele
+    é fechado quando a última for coletada.
+    """
+    if not isinstance(conteudo, memoryview) or not isinstance(conteudo.obj, mmap.mmap):
+        return
+    mapa = conteudo.obj
+    try:
+        conteudo.release()
+        mapa.close()
+    except BufferError:
+        pass
+
+
+class _LeitorMemoria:
+    """
+    Arquivo de leitura (com seek) sobre uma memoryview, para o zipfile
+    ler o upload mapeado sem copiá-lo inteiro (io.BytesIO copiaria, e o
+    mmap só é 'seekable' a partir do Python 3.13).
+    """
+
+    def __init__(self, dados: memoryview):
+        self._dados = dados
+        self._posicao = 0
+
+    def read(self, tamanho: int = -1) -> bytes:
+        fim = len(self._dados)
+        if tamanho is not None and tamanho >= 0:
+            fim = min(fim, self._posicao + tamanho)
+        parte = bytes(self._dados[self._posicao:fim])
+        self._posicao = max(self._posicao, fim)
+        return parte
+
+    def seek(self, posicao: int, origem: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicao, io.SEEK_END: len(self._dados)}[origem]
+        self._posicao = max(0, base + posicao)
+        return self._posicao
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def seekable(self) -> bool:
+        return True
+
+
+def extrair_pdfs_zip(conteudo, max_arquivos: int = LOTE_MAX_ARQUIVOS,
+                     max_bytes: int = MAX_UPLOAD_BYTES) -> list:
+    """
+    Extrai os PDFs de um zip (os demais arquivos são ignorados).
+    Retorna [(nome, conteúdo, sha256)] na ordem do zip.
+
+    Os limites são conferidos pelo tamanho declarado de cada entrada antes
+    da leitura e novamente durante a descompressão (zip bomb).
+    """
+    try:
+        origem = _LeitorMemoria(conteudo) if isinstance(conteudo, memoryview) \
+            else io.BytesIO(conteudo)
+        arquivo_zip = zipfile.ZipFile(origem)
+    except zipfile.BadZipFile:
+        raise ArquivoInvalidoError(400, "O conteúdo enviado não é um arquivo zip válido")
+
+    with arquivo_zip:
+        entradas = [info for info in arquivo_zip.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith(".pdf")
+                    and not os.path.basename(info.filename).startswith(".")
+                    and not info.filename.startswith("__MACOSX/")]
+        if not entradas:
+            raise ArquivoInvalidoError(400, "O zip não contém arquivos PDF")
+        if len(entradas) > max_arquivos:
+            raise ArquivoInvalidoError(
+                400, f"O zip excede o limite de {max_arquivos} arquivos")
+
+        pdfs = []
+        for info in entradas:
+            nome = os.path.basename(info.filename)
+            if info.file_size > max_bytes:
+                raise ArquivoInvalidoError(
+                    413, f"{nome} excede o tamanho máximo de {max_bytes} bytes")
+            sha256 = hashlib.sha256()
+            buffer = bytearray()
+            with arquivo_zip.open(info) as entrada:
+                while True:
+                    chunk = entrada.read(TAMANHO_CHUNK)
+                    if not chunk:
+                        break
+                    if len(buffer) + len(chunk) > max_bytes:
+                        raise ArquivoInvalidoError(
+                            413, f"{nome} excede o tamanho máximo de {max_bytes} bytes")
+                    sha256.update(chunk)
+                    buffer.extend(chunk)
+            if ASSINATURA_PDF not in buffer[:JANELA_ASSINATURA]:
+                raise ArquivoInvalidoError(
+                    400, f"{nome} não é um arquivo PDF válido")
+            pdfs.append((nome, buffer, sha256.hexdigest()))
+        return pdfs
+
+
+class LimiteTamanhoUploadMiddleware:
+    """
+    Middleware ASGI que recusa com 413 corpos maiores que o limite nas rotas
+    de upload, antes de o multipart ser lido: pelo Content-Length declarado
+    ou, em uploads chunked, interrompendo a leitura ao exceder o limite.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES, rotas=ROTAS_UPLOAD,
+                 limites_rotas: dict = None):
+        self.app = app
+        self.limite = max_bytes
+        self.rotas = rotas
+        self.limites_rotas = LIMITES_ROTAS if limites_rotas is None else limites_rotas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or \
+                not scope["path"].startswith(self.rotas):
+            return await self.app(scope, receive, send)
+
+        limite = self.limites_rotas.get(scope["path"], self.limite)
+        # Margem para os cabeçalhos do multipart e os demais campos do formulário
+        max_bytes = limite + 64 * 1024
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and \
+                int(content_length) > max_bytes:
+            return await self._recusar(send, limite)
+
+        recebidos = 0
+        excedeu = False
+        recusado = False
+
+        async def receive_limitado():
+            nonlocal recebidos, excedeu
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > max_bytes:
+                    # Interrompe a leitura do corpo; a resposta vira 413 em send_limitado
+                    excedeu = True
+                    raise ArquivoInvalidoError(
+                        413, "Corpo da requisição excede o limite")
+            return mensagem
+
+        async def send_limitado(mensagem):
+            nonlocal recusado
+            if not excedeu:
+                return await send(mensagem)
+            if mensagem["type"] == "http.response.start" and not recusado:
+                recusado = True
+                await self._recusar(send, limite)
+
+        try:
+            await self.app(scope, receive_limitado, send_limitado)
+        except ArquivoInvalidoError:
+            if not recusado:
+                await self._recusar(send, limite)
+
+    async def _recusar(self, send, limite):
+        mensagem = f"Arquivo excede o tamanho máximo de {limite} bytes"
+        corpo = json.dumps({"status": 413, "message": mensagem},
+                           ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(corpo)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": corpo})
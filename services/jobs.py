@@ -0,0 +1,426 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from services.executor import RETRY_AFTER, ExecutorSaturadoError
+from services.ingestao import liberar_upload
+from services.logs import obter_logger
+from services.processa_arquivos import processa_arquivos
+
+
+logger = obter_logger("jobs")
+
+
+# Configurações dos jobs assíncronos (ajustáveis por variável de ambiente)
+# Backend do estado dos jobs: "memoria" ou "sqlite"
+JOBS_STORE = os.environ.get("JOBS_STORE", "memoria")
+JOBS_SQLITE_PATH = os.environ.get(
+    "JOBS_SQLITE_PATH", os.path.join("data", "jobs.db"))
+# Jobs processados ao mesmo tempo por worker do uvicorn
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", "2"))
+# Limite de páginas por documento nos jobs (o upload síncrono continua com MAX_PAGES)
+JOBS_MAX_PAGINAS = int(os.environ.get("JOBS_MAX_PAGINAS", "500"))
+# Jobs aguardando na fila (com o PDF em memória) antes de recusar com 429
+JOBS_MAX_FILA = int(os.environ.get("JOBS_MAX_FILA", "16"))
+# Tempo (s) que um job concluído (e seus eventos) fica disponível
+JOBS_TTL = float(os.environ.get("JOBS_TTL", str(24 * 3600)))
+# Intervalo mínimo (s) entre duas remoções dos jobs expirados
+JOBS_INTERVALO_LIMPEZA = 60
+
+# Estados de um job
+NA_FILA = "na_fila"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+ESTADOS_FINAIS = (CONCLUIDO, ERRO)
+ESTADOS_PENDENTES = (NA_FILA, PROCESSANDO)
+
+
+class JobStore(ABC):
+    """
+    Interface do armazenamento do estado dos jobs e dos seus eventos.
+    Os eventos têm sequência crescente por job (usada como id no SSE).
+    """
+
+    @abstractmethod
+    def criar(self, job: dict):
+        ...
+
+    @abstractmethod
+    def obter(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def atualizar(self, job_id: str, **campos):
+        ...
+
+    @abstractmethod
+    def adicionar_evento(self, job_id: str, tipo: str, dados: dict) -> int:
+        ...
+
+    @abstractmethod
+    def eventos(self, job_id: str, desde: int = 0, tipo: str = None) -> list:
+        ...
+
+    @abstractmethod
+    def pendentes(self) -> list:
+        """
+        Jobs ainda na fila ou em processamento.
+        """
+
+    @abstractmethod
+    def remover_finalizados(self, antes: float) -> int:
+        """
+        Remove os jobs finalizados (e seus eventos) sem atualização desde
+        'antes'. Retorna o número de jobs removidos.
+        """
+
+
+class MemoriaJobStore(JobStore):
+    """
+    Estado dos jobs em memória (por processo).
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._eventos = {}
+        self._lock = threading.Lock()
+
+    def criar(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self._eventos[job["id"]] = []
+
+    def obter(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def atualizar(self, job_id, **campos):
+        with self._lock:
+            self._jobs[job_id].update(campos, atualizado_em=time.time())
+
+    def adicionar_evento(self, job_id, tipo, dados):
+        with self._lock:
+            eventos = self._eventos[job_id]
+            seq = len(eventos) + 1
+            eventos.append({"seq": seq, "tipo": tipo,
+                           "dados": dados, "criado_em": time.time()})
+            return seq
+
+    def eventos(self, job_id, desde=0, tipo=None):
+        with self._lock:
+            return [e for e in self._eventos.get(job_id, [])[desde:]
+                    if tipo is None or e["tipo"] == tipo]
+
+    def pendentes(self):
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()
+                    if job["status"] in ESTADOS_PENDENTES]
+
+    def remover_finalizados(self, antes):
+        with self._lock:
+            expirados = [job_id for job_id, job in self._jobs.items()
+                         if job["status"] in ESTADOS_FINAIS and job["atualizado_em"] < antes]
+            for job_id in expirados:
+                del self._jobs[job_id]
+                del self._eventos[job_id]
+            return len(expirados)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Estado dos jobs em um arquivo SQLite local (funciona offline e
+    sobrevive a reinícios do processo).
+    """
+
+    def __init__(self, caminho=JOBS_SQLITE_PATH):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, dados TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS eventos (job_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "tipo TEXT NOT NULL, dados TEXT NOT NULL, criado_em REAL NOT NULL, "
+                "PRIMARY KEY (job_id, seq))")
+
+    def criar(self, job):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO jobs (id, dados) VALUES (?, ?)",
+                               (job["id"], json.dumps(job, ensure_ascii=False, default=str)))
+
+    def obter(self, job_id):
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT dados FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def atualizar(self, job_id, **campos):
+        with self._lock, self._conn:
+            linha = self._conn.execute(
+                "SELECT dados FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            job = json.loads(linha[0])
+            job.update(campos, atualizado_em=time.time())
+            self._conn.execute("UPDATE jobs SET dados = ? WHERE id = ?",
+                               (json.dumps(job, ensure_ascii=False, default=str), job_id))
+
+    def adicionar_evento(self, job_id, tipo, dados):
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM eventos WHERE job_id = ?",
+                (job_id,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO eventos (job_id, seq, tipo, dados, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, tipo, json.dumps(dados, ensure_ascii=False, default=str), time.time()))
+            return seq
+
+    def eventos(self, job_id, desde=0, tipo=None):
+        consulta = "SELECT seq, tipo, dados, criado_em FROM eventos WHERE job_id = ? AND seq > ?"
+        parametros = [job_id, desde]
+        if tipo is not None:
+            consulta += " AND tipo = ?"
+            parametros.append(tipo)
+        with self._lock:
+            linhas = self._conn.execute(
+                consulta + " ORDER BY seq", parametros).fetchall()
+        return [{"seq": seq, "tipo": tipo_, "dados": json.loads(dados), "criado_em": criado_em}
+                for seq, tipo_, dados, criado_em in linhas]
+
+    def pendentes(self):
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT dados FROM jobs WHERE json_extract(dados, '$.status') IN (?, ?)",
+                ESTADOS_PENDENTES).fetchall()
+        return [json.loads(linha[0]) for linha in linhas]
+
+    def remover_finalizados(self, antes):
+        with self._lock, self._conn:
+            ids = [linha[0] for linha in self._conn.execute(
+                "SELECT id FROM jobs WHERE json_extract(dados, '$.status') IN (?, ?) "
+                "AND json_extract(dados, '$.atualizado_em') < ?",
+                (*ESTADOS_FINAIS, antes)).fetchall()]
+            self._conn.executemany("DELETE FROM eventos WHERE job_id = ?", [(i,) for i in ids])
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        return len(ids)
+
+
+def criar_job_store(backend: str = JOBS_STORE) -> JobStore:
+    """
+    Cria o store de jobs configurado.
+    """
+    if backend == "memoria":
+        return MemoriaJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Backend de jobs desconhecido: {backend}")
+
+
+def _processo_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """
+    Executa os jobs em segundo plano, registrando o progresso no store.
+
+    A fila é limitada: com 'workers' jobs em processamento e 'max_fila'
+    aguardando, novos jobs são recusados (ExecutorSaturadoError 429). Os
+    jobs finalizados saem do store depois de 'ttl' segundos.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOBS_WORKERS,
+                 max_paginas: int = JOBS_MAX_PAGINAS, max_fila: int = JOBS_MAX_FILA,
+                 ttl: float = JOBS_TTL):
+        self.store = store
+        self.workers = workers
+        self.max_paginas = max_paginas
+        self.max_fila = max_fila
+        self.ttl = ttl
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._ultima_limpeza = 0.0
+
+        # Métricas
+        self.submetidos = 0
+        self.rejeitados_429 = 0
+        self.orfaos = 0
+        self.expirados = 0
+
+    def iniciar(self):
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="jobs")
+        self._marcar_orfaos()
+        self.remover_expirados()
+
+    def encerrar(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _marcar_orfaos(self):
+        """
+        Jobs pendentes cujo worker não existe mais (reinício do servidor)
+        nunca terminariam: passam para 'erro'. Jobs de outros workers
+        ainda vivos (store SQLite compartilhado) não são alterados.
+        """
+        for job in self.store.pendentes():
+            pid = job.get("pid")
+            if pid is not None and pid != os.getpid() and _processo_vivo(pid):
+                continue
+            erro = "Processamento interrompido pelo reinício do servidor"
+            self.store.atualizar(job["id"], status=ERRO, etapa=None, erro=erro)
+            self.store.adicionar_evento(job["id"], "status", {"status": ERRO, "erro": erro})
+            self.orfaos += 1
+        if self.orfaos:
+            logger.warning("Jobs interrompidos marcados como erro",
+                           extra={"campos": {"jobs": self.orfaos}})
+
+    def remover_expirados(self):
+        """
+        Remove do store os jobs finalizados há mais de 'ttl' segundos
+        (no máximo uma vez a cada JOBS_INTERVALO_LIMPEZA segundos).
+        """
+        agora = time.time()
+        with self._lock:
+            if agora - self._ultima_limpeza < JOBS_INTERVALO_LIMPEZA:
+                return
+            self._ultima_limpeza = agora
+        removidos = self.store.remover_finalizados(agora - self.ttl)
+        with self._lock:
+            self.expirados += removidos
+
+    def verificar_capacidade(self):
+        """
+        Lança ExecutorSaturadoError (429) se a fila de jobs está cheia.
+        Usada antes de ler o upload, para recusar sem guardar o PDF.
+        """
+        with self._lock:
+            if self._pendentes >= self.workers + self.max_fila:
+                raise self._recusar()
+
+    def _recusar(self) -> ExecutorSaturadoError:
+        self.rejeitados_429 += 1
+        return ExecutorSaturadoError(
+            429, "Muitos jobs na fila, tente novamente mais tarde", RETRY_AFTER)
+
+    def submeter(self, file_content: bytes, filename: str, titulo: str = None,
+                 hash_pdf: str = None) -> dict:
+        """
+        Registra o job e o coloca na fila. Retorna o job criado.
+        Lança ExecutorSaturadoError (429) se a fila está cheia.
+        """
+        self.iniciar()
+        self.remover_expirados()
+        with self._lock:
+            if self._pendentes >= self.workers + self.max_fila:
+                raise self._recusar()
+            self._pendentes += 1
+            self.submetidos += 1
+        agora = time.time()
+        job = {
+            "id": str(uuid4()),
+            "status": NA_FILA,
+            "etapa": None,
+            "filename": filename,
+            "titulo": titulo,
+            "pages_processed": None,
+            "paginas_concluidas": 0,
+            "criado_em": agora,
+            "atualizado_em": agora,
+            "resultado": None,
+            "erro": None,
+            # Worker que processa o job (para identificar jobs órfãos)
+            "pid": os.getpid(),
+        }
+        try:
+            self.store.criar(job)
+            self.store.adicionar_evento(job["id"], "status", {"status": NA_FILA})
+            self._pool.submit(self._executar, job["id"],
+                              file_content, filename, titulo, hash_pdf)
+        except BaseException:
+            with self._lock:
+                self._pendentes -= 1
+            raise
+        return job
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_fila": self.max_fila,
+                "pendentes": self._pendentes,
+                "submetidos": self.submetidos,
+                "rejeitados_429": self.rejeitados_429,
+                "orfaos": self.orfaos,
+                "expirados": self.expirados,
+                "ttl_s": self.ttl,
+            }
+
+    def _executar(self, job_id, file_content, filename, titulo, hash_pdf):
+        try:
+            self._processar(job_id, file_content, filename, titulo, hash_pdf)
+        finally:
+            liberar_upload(file_content)
+            with self._lock:
+                self._pendentes -= 1
+
+    def _processar(self, job_id, file_content, filename, titulo, hash_pdf):
+        store = self.store
+        store.atualizar(job_id, status=PROCESSANDO)
+        store.adicionar_evento(job_id, "status", {"status": PROCESSANDO})
+        paginas_concluidas = [0]
+
+        def ao_progresso(tipo, dados):
+            if tipo == "etapa":
+                campos = {"etapa": dados["etapa"]}
+                if "pages_processed" in dados:
+                    campos["pages_processed"] = dados["pages_processed"]
+                store.atualizar(job_id, **campos)
+            elif tipo == "pagina":
+                paginas_concluidas[0] += 1
+                store.atualizar(
+                    job_id, paginas_concluidas=paginas_concluidas[0])
+            store.adicionar_evento(job_id, tipo, dados)
+
+        try:
+            resultado = processa_arquivos(
+                file_content, filename, titulo,
+                max_paginas=self.max_paginas, ao_progresso=ao_progresso,
+                hash_pdf=hash_pdf, process_id=job_id)
+        except Exception as e:
+            resultado = {"success": False, "error": str(e)}
+
+        if resultado["success"]:
+            store.atualizar(job_id, status=CONCLUIDO,
+                            etapa=None, resultado=resultado)
+            store.adicionar_evento(job_id, "status", {"status": CONCLUIDO})
+        else:
+            erro = resultado.get("error", "Erro desconhecido")
+            store.atualizar(job_id, status=ERRO, etapa=None, erro=erro)
+            store.adicionar_evento(
+                job_id, "status", {"status": ERRO, "erro": erro})
+
+
+# Instância única por worker do uvicorn
+job_runner = JobRunner(criar_job_store())
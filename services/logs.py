@@ -0,0 +1,193 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Configurações do log (ajustáveis por variável de ambiente)
+LOG_NIVEL = os.environ.get("LOG_NIVEL", "INFO").upper()
+# "json" (uma linha JSON por evento) ou "texto"
+LOG_FORMATO = os.environ.get("LOG_FORMATO", "json")
+# Registros aguardando escrita; com a fila cheia os novos são descartados
+LOG_MAX_FILA = int(os.environ.get("LOG_MAX_FILA", "10000"))
+
+# Logger raiz da aplicação
+NOME_LOGGER = "mvp"
+
+# Id de correlação do processamento atual (o process_id do documento)
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def definir_correlacao(correlation_id: str):
+    """
+    Define o id de correlação do contexto atual. Retorna o token para
+    'restaurar_correlacao'.
+    """
+    return _correlation_id.set(correlation_id)
+
+
+def restaurar_correlacao(token):
+    _correlation_id.reset(token)
+
+
+def correlacao_atual():
+    return _correlation_id.get()
+
+
+@contextmanager
+def correlacao(correlation_id: str):
+    """
+    Associa o id de correlação a todos os logs emitidos dentro do bloco.
+    """
+    token = definir_correlacao(correlation_id)
+    try:
+        yield
+    finally:
+        restaurar_correlacao(token)
+
+
+class FiltroCorrelacao(logging.Filter):
+    """
+    Copia o id de correlação para o registro na thread que emitiu o log
+    (antes de o registro ir para a fila).
+    """
+
+    def filter(self, record):
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Uma linha JSON por evento, com os campos estruturados de
+    'extra={"campos": {...}}'.
+    """
+
+    def format(self, record):
+        evento = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        evento.update(getattr(record, "campos", None) or {})
+        if record.exc_text:
+            evento["excecao"] = record.exc_text
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    def format(self, record):
+        campos = getattr(record, "campos", None) or {}
+        extras = " ".join(f"{k}={v}" for k, v in campos.items())
+        correlacao_id = getattr(record, "correlation_id", None)
+        texto = (f"{time.strftime('%H:%M:%S', time.localtime(record.created))} "
+                 f"{record.levelname:<7} [{correlacao_id or '-'}] "
+                 f"{record.getMessage()}{' ' + extras if extras else ''}")
+        if record.exc_text:
+            texto += "\n" + record.exc_text
+        return texto
+
+
+class QueueHandlerNaoBloqueante(QueueHandler):
+    """
+    Coloca os registros na fila sem bloquear: a escrita no stdout fica com
+    a thread do QueueListener. Com a fila cheia, o registro é descartado.
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # Formata a mensagem e a exceção na thread de origem; os campos
+        # estruturados seguem no registro
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+_listener = None
+_handler = None
+
+
+def iniciar_logging(nivel: str = LOG_NIVEL, formato: str = LOG_FORMATO):
+    """
+    Configura o logger da aplicação (uma vez por processo): os registros vão
+    para uma fila e são escritos no stdout por uma thread separada.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    fila = queue.Queue(maxsize=LOG_MAX_FILA)
+    saida = logging.StreamHandler(sys.stdout)
+    saida.setFormatter(FormatadorJSON() if formato == "json" else FormatadorTexto())
+
+    _handler = QueueHandlerNaoBloqueante(fila)
+    _handler.addFilter(FiltroCorrelacao())
+
+    logger = logging.getLogger(NOME_LOGGER)
+    logger.setLevel(nivel)
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+    _listener = QueueListener(fila, saida, respect_handler_level=True)
+    _listener.start()
+
+
+def encerrar_logging():
+    """
+    Escreve os registros pendentes e para a thread de escrita.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger(NOME_LOGGER).removeHandler(_handler)
+
+
+def logs_descartados() -> int:
+    return _handler.descartados if _handler is not None else 0
+
+
+def obter_logger(nome: str) -> logging.Logger:
+    """
+    Logger de um módulo da aplicação (filho do logger 'mvp').
+    """
+    iniciar_logging()
+    return logging.getLogger(f"{NOME_LOGGER}.{nome}")
+
+
+def _reiniciar_no_processo_filho():
+    # Processos criados por fork (pool de renderização) herdam a fila, mas
+    # não a thread que a consome: cada filho configura o próprio log
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger(NOME_LOGGER).removeHandler(_handler)
+    _listener = None
+    _handler = None
+    iniciar_logging()
+
+
+atexit.register(encerrar_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_no_processo_filho)
@@ -0,0 +1,168 @@
+# lote.py
+#
+# Processamento de lotes de documentos (/upload/batch). Os documentos de um
+# lote são processados ao mesmo tempo (até LOTE_DOCUMENTOS_CONCORRENTES) e
+# as páginas de todos dividem a fila justa do agendador do Textract, com os
+# documentos menores na frente. Cada documento é entregue assim que termina.
+
+import asyncio
+import os
+import time
+
+import fitz  # PyMuPDF
+
+from services.executor import executor, ExecutorSaturadoError
+from services.logs import obter_logger
+from services.processa_arquivos import processa_arquivos
+from services.textract.scheduler import agendamento
+
+
+logger = obter_logger("lote")
+
+# Configurações dos lotes (ajustáveis por variável de ambiente)
+# Documentos de um lote processados ao mesmo tempo
+LOTE_DOCUMENTOS_CONCORRENTES = int(os.environ.get("LOTE_DOCUMENTOS_CONCORRENTES", "4"))
+# Ordena o lote pelo número de páginas: os documentos menores começam e
+# têm prioridade no Textract, e chegam primeiro ao cliente
+LOTE_PRIORIZAR_PEQUENOS = os.environ.get("LOTE_PRIORIZAR_PEQUENOS", "true").lower() == "true"
+
+# Limite de páginas por documento nos lotes (o upload síncrono continua com MAX_PAGES)
+LOTE_MAX_PAGINAS = int(os.environ.get("LOTE_MAX_PAGINAS", "500"))
+
+# Prioridade dos documentos cujo número de páginas não pôde ser lido
+PRIORIDADE_DESCONHECIDA = 1_000_000
+
+
+def contar_paginas(conteudo) -> int:
+    """
+    Número de páginas do PDF (None se não puder ser aberto).
+    """
+    try:
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            return doc.page_count
+    except Exception:
+        return None
+
+
+def _processar_documento(documento: dict, titulo: str, prioridade: int):
+    # As páginas do documento entram na fila do Textract como um fluxo próprio
+    with agendamento(documento["process_id"], prioridade):
+        return processa_arquivos(
+            documento["conteudo"], documento["filename"], titulo,
+            max_paginas=LOTE_MAX_PAGINAS, hash_pdf=documento["hash"],
+            process_id=documento["process_id"])
+
+
+class ProcessadorLotes:
+    """
+    Processa os documentos de um lote e os entrega na ordem em que terminam.
+    """
+
+    def __init__(self, concorrentes: int = LOTE_DOCUMENTOS_CONCORRENTES):
+        self.concorrentes = concorrentes
+
+        # Métricas
+        self.lotes = 0
+        self.lotes_ativos = 0
+        self.documentos = 0
+        self.sucessos = 0
+        self.falhas = 0
+
+    async def processar(self, documentos: list, titulo: str,
+                        priorizar_pequenos: bool = LOTE_PRIORIZAR_PEQUENOS):
+        """
+        Gera, à medida que cada documento termina, a linha de resultado do
+        documento. 'documentos' são dicts com indice, filename, conteudo,
+        hash e process_id.
+        """
+        self.lotes += 1
+        self.lotes_ativos += 1
+
+        # Número de páginas (fora do event loop), para a prioridade
+        paginas = await asyncio.to_thread(
+            lambda: [contar_paginas(documento["conteudo"]) for documento in documentos])
+        for documento, total in zip(documentos, paginas):
+            documento["paginas"] = total
+
+        if priorizar_pequenos:
+            documentos = sorted(documentos, key=lambda documento: (
+                documento["paginas"] is None, documento["paginas"] or 0, documento["indice"]))
+
+        # Os documentos começam na ordem da lista (o semáforo atende na
+        # ordem de chegada)
+        semaforo = asyncio.Semaphore(self.concorrentes)
+        tarefas = [asyncio.create_task(self._executar(documento, titulo, priorizar_pequenos,
+                                                      semaforo))
+                   for documento in documentos]
+        inicio = time.perf_counter()
+        try:
+            for tarefa in asyncio.as_completed(tarefas):
+                yield await tarefa
+            logger.info("Lote concluído", extra={"campos": {
+                "documentos": len(documentos),
+                "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2)}})
+        finally:
+            # Cliente desconectou: os documentos que ainda não começaram são descartados
+            for tarefa in tarefas:
+                tarefa.cancel()
+            self.lotes_ativos -= 1
+
+    async def _executar(self, documento: dict, titulo: str, priorizar_pequenos: bool,
+                        semaforo: asyncio.Semaphore) -> dict:
+        prioridade = 0
+        if priorizar_pequenos:
+            prioridade = documento["paginas"] if documento["paginas"] is not None \
+                else PRIORIDADE_DESCONHECIDA
+
+        linha = {
+            "tipo": "documento",
+            "indice": documento["indice"],
+            "filename": documento["filename"],
+            "process_id": documento["process_id"],
+            "paginas": documento["paginas"],
+        }
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        resultado = await executor.executar(
+                            _processar_documento, documento, titulo, prioridade)
+                        break
+                    except ExecutorSaturadoError as e:
+                        # Fila de admissão cheia: o documento espera, o lote continua
+                        if e.status_code != 429:
+                            raise
+                        await asyncio.sleep(e.retry_after)
+            except ExecutorSaturadoError as e:
+                resultado = {"success": False, "error": e.message, "status_code": e.status_code}
+            finally:
+                # O conteúdo não é mais necessário
+                documento["conteudo"] = None
+            linha["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+
+        self.documentos += 1
+        if resultado["success"]:
+            self.sucessos += 1
+            # Um PDF já processado (cache) devolve o process_id original
+            linha.update(status=200, process_id=resultado["process_id"], result=resultado)
+        else:
+            self.falhas += 1
+            linha.update(status=resultado.get("status_code", 500),
+                         message="Erro ao processar o arquivo",
+                         error=resultado.get("error", "Erro desconhecido"))
+        return linha
+
+    def metricas(self) -> dict:
+        return {
+            "concorrentes": self.concorrentes,
+            "lotes": self.lotes,
+            "lotes_ativos": self.lotes_ativos,
+            "documentos": self.documentos,
+            "sucessos": self.sucessos,
+            "falhas": self.falhas,
+        }
+
+
+# Instância única por worker do uvicorn
+processador_lotes = ProcessadorLotes()
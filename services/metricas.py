@@ -0,0 +1,147 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from services.logs import obter_logger
+
+
+logger = obter_logger("metricas")
+
+# Limites (s) dos buckets das etapas: de poucos milissegundos (extração de
+# uma página) a minutos (OCR de documentos grandes)
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BUCKETS_PAGINAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Etapas instrumentadas do pipeline
+INGESTAO = "ingestao"
+RENDERIZACAO = "renderizacao"
+CODIFICACAO = "codificacao"
+NATIVO = "nativo"
+OCR = "ocr"
+EXTRACAO = "extracao"
+COMPACTACAO = "compactacao"
+PERSISTENCIA = "persistencia"
+ENRIQUECIMENTO = "enriquecimento"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_labels(pares) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def _formatar_numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    """
+    Histograma cumulativo no formato do Prometheus, com séries por labels.
+    """
+
+    def __init__(self, nome: str, descricao: str, labels=(), buckets=BUCKETS_DURACAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # valores dos labels -> [contagens por bucket, soma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **labels):
+        chave = tuple(str(labels.get(nome, "")) for nome in self.labels)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.descricao}",
+                  f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = sorted((chave, (list(c), s, t))
+                            for chave, (c, s, t) in self._series.items())
+        for chave, (contagens, soma, total) in series:
+            pares = list(zip(self.labels, chave))
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f"{self.nome}_bucket"
+                              f"{_formatar_labels(pares + [('le', _formatar_numero(limite))])} {contagem}")
+            linhas.append(f"{self.nome}_bucket{_formatar_labels(pares + [('le', '+Inf')])} {total}")
+            linhas.append(f"{self.nome}_sum{_formatar_labels(pares)} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{_formatar_labels(pares)} {total}")
+        return linhas
+
+
+class RegistroMetricas:
+    """
+    Registro das métricas do processo, exportadas em texto para o /metrics.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nome: str, descricao: str, labels=(), buckets=BUCKETS_DURACAO) -> Histograma:
+        with self._lock:
+            if nome not in self._metricas:
+                self._metricas[nome] = Histograma(nome, descricao, labels, buckets)
+            return self._metricas[nome]
+
+    def exportar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+# Instância única por processo
+registro_metricas = RegistroMetricas()
+
+DURACAO_ETAPA = registro_metricas.histograma(
+    "mvp_etapa_duracao_segundos",
+    "Duração de cada etapa do pipeline (por página ou por documento)",
+    labels=("etapa",))
+DURACAO_DOCUMENTO = registro_metricas.histograma(
+    "mvp_documento_duracao_segundos",
+    "Duração total do processamento de um documento",
+    labels=("resultado",))
+PAGINAS_DOCUMENTO = registro_metricas.histograma(
+    "mvp_documento_paginas",
+    "Páginas processadas por documento",
+    buckets=BUCKETS_PAGINAS)
+
+
+def observar_etapa(etapa: str, segundos: float, **campos):
+    """
+    Registra a duração de uma etapa medida fora de um span (ex.: no pool
+    de processos) e o evento correspondente no log (nível DEBUG).
+    """
+    DURACAO_ETAPA.observar(segundos, etapa=etapa)
+    logger.debug("etapa concluída", extra={"campos": dict(
+        campos, etapa=etapa, duracao_ms=round(segundos * 1000, 2))})
+
+
+@contextmanager
+def span(etapa: str, **campos):
+    """
+    Mede a duração do bloco como uma etapa do pipeline.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar_etapa(etapa, time.perf_counter() - inicio, **campos)
@@ -0,0 +1,203 @@
+import os
+from bisect import bisect_left, bisect_right
+from uuid import uuid4
+
+from services.logs import obter_logger
+from services.textract.indice_linhas import IndiceLinhas
+
+
+logger = obter_logger("pdf_nativo")
+
+# Extração nativa (sem OCR) para PDFs com camada de texto
+PDF_NATIVO = os.environ.get("PDF_NATIVO", "true").lower() == "true"
+# Mínimo de caracteres na camada de texto para considerar a página nativa
+PDF_NATIVO_MIN_CARACTERES = int(
+    os.environ.get("PDF_NATIVO_MIN_CARACTERES", "50"))
+# Proporção máxima de caracteres ilegíveis (fontes sem mapeamento Unicode)
+PDF_NATIVO_MAX_ILEGIVEIS = float(
+    os.environ.get("PDF_NATIVO_MAX_ILEGIVEIS", "0.05"))
+
+# Confiança atribuída aos blocos extraídos da camada de texto
+CONFIANCA_NATIVA = 99.9
+# Tolerância vertical (normalizada) para considerar duas linhas na mesma altura
+TOLERANCIA_MESMA_LINHA = 0.01
+
+
+def tem_camada_texto(page) -> bool:
+    """
+    Verifica se a página tem uma camada de texto extraível e confiável.
+    Páginas digitalizadas (ou com texto ilegível) devem ir para o Textract.
+    """
+    texto = page.get_text("text")
+    caracteres = [c for c in texto if not c.isspace()]
+    if len(caracteres) < PDF_NATIVO_MIN_CARACTERES:
+        return False
+
+    ilegiveis = sum(1 for c in caracteres if c == "�" or not c.isprintable())
+    return ilegiveis / len(caracteres) <= PDF_NATIVO_MAX_ILEGIVEIS
+
+
+def _geometry(rect, largura, altura):
+    x0, y0, x1, y1 = rect
+    return {
+        'BoundingBox': {
+            'Left': x0 / largura,
+            'Top': y0 / altura,
+            'Width': (x1 - x0) / largura,
+            'Height': (y1 - y0) / altura
+        }
+    }
+
+
+def _novo_bloco(block_type, **campos):
+    bloco = {
+        'Id': str(uuid4()),
+        'BlockType': block_type,
+        'Confidence': CONFIANCA_NATIVA,
+    }
+    bloco.update(campos)
+    return bloco
+
+
+def pagina_para_blocos(page) -> dict:
+    """
+    Converte a camada de texto de uma página do PyMuPDF em uma resposta
+    no formato do Textract (blocos WORD, LINE, TABLE/CELL e KEY_VALUE_SET),
+    para que as funções de services/textract/parser.py funcionem sem alterações.
+    """
+    largura, altura = page.rect.width, page.rect.height
+    numero_pagina = page.number + 1
+    blocks = []
+
+    # Palavras: (x0, y0, x1, y1, texto, bloco, linha, palavra)
+    palavras = []
+    linhas = {}
+    for x0, y0, x1, y1, texto, bloco_no, linha_no, _ in page.get_text("words", sort=True):
+        word = _novo_bloco('WORD', Text=texto, TextType='PRINTED', Page=numero_pagina,
+                           Geometry=_geometry((x0, y0, x1, y1), largura, altura))
+        blocks.append(word)
+        palavras.append((word, (x0, y0, x1, y1)))
+        linhas.setdefault((bloco_no, linha_no), []).append(
+            (word, (x0, y0, x1, y1)))
+
+    # Linhas: agrupadas pelo (bloco, linha) do PyMuPDF
+    line_blocks = []
+    for palavras_linha in linhas.values():
+        x0 = min(r[0] for _, r in palavras_linha)
+        y0 = min(r[1] for _, r in palavras_linha)
+        x1 = max(r[2] for _, r in palavras_linha)
+        y1 = max(r[3] for _, r in palavras_linha)
+        line = _novo_bloco('LINE', Page=numero_pagina,
+                           Text=" ".join(w['Text'] for w, _ in palavras_linha),
+                           Geometry=_geometry((x0, y0, x1, y1), largura, altura),
+                           Relationships=[{'Type': 'CHILD',
+                                           'Ids': [w['Id'] for w, _ in palavras_linha]}])
+        blocks.append(line)
+        line_blocks.append((line, palavras_linha))
+
+    blocks.extend(_extrair_tabelas(page, palavras, largura, altura, numero_pagina))
+    blocks.extend(_extrair_chave_valor(line_blocks, numero_pagina))
+
+    page_block = _novo_bloco('PAGE', Page=numero_pagina,
+                             Geometry=_geometry((0, 0, largura, altura), largura, altura),
+                             Relationships=[{'Type': 'CHILD',
+                                             'Ids': [line['Id'] for line, _ in line_blocks]}])
+    return {
+        'DocumentMetadata': {'Pages': 1},
+        'Blocks': [page_block] + blocks
+    }
+
+
+def _extrair_tabelas(page, palavras, largura, altura, numero_pagina):
+    """
+    Converte as tabelas detectadas pelo PyMuPDF em blocos TABLE/CELL.
+    Células mescladas (None no PyMuPDF) são omitidas, como no Textract.
+    """
+    blocks = []
+    try:
+        tabelas = page.find_tables().tables
+    except Exception:
+        logger.exception("Erro ao detectar tabelas",
+                         extra={"campos": {"pagina": numero_pagina}})
+        return blocks
+
+    # Palavras ordenadas pelo centro vertical: as de cada célula são
+    # localizadas por busca binária na faixa da célula
+    centros = sorted(((r[1] + r[3]) / 2, (r[0] + r[2]) / 2, posicao)
+                     for posicao, (_, r) in enumerate(palavras))
+    alturas = [centro[0] for centro in centros]
+
+    for tabela in tabelas:
+        cell_ids = []
+        for row_index, row in enumerate(tabela.rows, start=1):
+            for col_index, bbox in enumerate(row.cells, start=1):
+                if bbox is None:
+                    continue
+                x0, y0, x1, y1 = bbox
+                # Palavras cujo centro está dentro da célula (na ordem de leitura)
+                faixa = centros[bisect_left(alturas, y0):bisect_right(alturas, y1)]
+                filhos = [palavras[posicao][0]['Id']
+                          for posicao in sorted(p for _, x, p in faixa if x0 <= x <= x1)]
+                cell = _novo_bloco('CELL', Page=numero_pagina,
+                                   RowIndex=row_index, ColumnIndex=col_index,
+                                   RowSpan=1, ColumnSpan=1,
+                                   Geometry=_geometry(bbox, largura, altura))
+                if filhos:
+                    cell['Relationships'] = [{'Type': 'CHILD', 'Ids': filhos}]
+                blocks.append(cell)
+                cell_ids.append(cell['Id'])
+
+        blocks.append(_novo_bloco('TABLE', Page=numero_pagina,
+                                  Geometry=_geometry(tabela.bbox, largura, altura),
+                                  Relationships=[{'Type': 'CHILD', 'Ids': cell_ids}]))
+    return blocks
+
+
+def _chave(palavras_linha):
+    """
+    Posição da palavra que fecha a chave: a primeira terminada em ':' com
+    um rótulo não numérico antes (horários como "10:30", URLs e números
+    não são chaves). None se a linha não tem chave.
+    """
+    for posicao, (word, _) in enumerate(palavras_linha):
+        if word['Text'].endswith(':'):
+            rotulo = " ".join(w['Text'] for w, _ in palavras_linha[:posicao + 1])
+            if any(c.isalpha() for c in rotulo):
+                return posicao
+    return None
+
+
+def _extrair_chave_valor(line_blocks, numero_pagina):
+    """
+    Deriva pares chave-valor (KEY_VALUE_SET) das linhas no formato "Chave: valor".
+    Se a linha termina em ':', o valor é a próxima linha na mesma altura, à direita.
+    """
+    blocks = []
+    indice = None
+    for line, palavras_linha in line_blocks:
+        posicao = _chave(palavras_linha)
+        if posicao is None:
+            continue
+
+        key_ids = [w['Id'] for w, _ in palavras_linha[:posicao + 1]]
+        value_ids = [w['Id'] for w, _ in palavras_linha[posicao + 1:]]
+
+        if not value_ids:
+            # Índice das linhas por altura, montado só quando necessário
+            if indice is None:
+                indice = IndiceLinhas([outra for outra, _ in line_blocks])
+                entradas = {entrada['id']: entrada for entrada in indice.linhas}
+                palavras_por_linha = {outra['Id']: palavras_outra
+                                      for outra, palavras_outra in line_blocks}
+            vizinhas = indice.mesma_altura(entradas[line['Id']], TOLERANCIA_MESMA_LINHA)
+            if vizinhas:
+                value_ids = [w['Id'] for w, _ in palavras_por_linha[vizinhas[0]['id']]]
+
+        value = _novo_bloco('KEY_VALUE_SET', EntityTypes=['VALUE'], Page=numero_pagina)
+        if value_ids:
+            value['Relationships'] = [{'Type': 'CHILD', 'Ids': value_ids}]
+        key = _novo_bloco('KEY_VALUE_SET', EntityTypes=['KEY'], Page=numero_pagina,
+                          Relationships=[{'Type': 'VALUE', 'Ids': [value['Id']]},
+                                         {'Type': 'CHILD', 'Ids': key_ids}])
+        blocks.extend([key, value])
+    return blocks
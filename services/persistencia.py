@@ -0,0 +1,214 @@
+import os
+import queue
+import random
+import threading
+import time
+
+from models import RAGPaginaModel
+from services.logs import obter_logger
+from services.metricas import PERSISTENCIA, span
+
+
+# Configurações da persistência (ajustáveis por variável de ambiente)
+# Persistir os resultados das páginas no DynamoDB ao fim do processamento
+DYNAMODB_PERSISTIR = os.environ.get(
+    "DYNAMODB_PERSISTIR", "false").lower() == "true"
+# Capacidade da fila do modo write-behind
+DYNAMODB_MAX_FILA = int(os.environ.get("DYNAMODB_MAX_FILA", "1000"))
+# Intervalo máximo (s) entre flushes no modo write-behind
+DYNAMODB_INTERVALO_FLUSH = float(
+    os.environ.get("DYNAMODB_INTERVALO_FLUSH", "1.0"))
+# Tentativas para itens não processados (UnprocessedItems)
+DYNAMODB_MAX_TENTATIVAS = int(os.environ.get("DYNAMODB_MAX_TENTATIVAS", "5"))
+DYNAMODB_BACKOFF_BASE = float(os.environ.get("DYNAMODB_BACKOFF_BASE", "0.1"))
+
+logger = obter_logger("persistencia")
+
+# Limite de itens por chamada BatchWriteItem
+TAMANHO_LOTE_DYNAMODB = 25
+
+
+class PersistenciaService:
+    """
+    Persiste itens do PynamoDB em lotes com BatchWriteItem.
+
+    - 'salvar(itens)': grava imediatamente (em lotes de 25), repetindo os
+      itens não processados com backoff exponencial;
+    - 'enfileirar(item)': modo write-behind, com fila limitada e uma thread
+      que faz o flush periódico; 'encerrar()' grava o que restar na fila.
+    """
+
+    def __init__(self, max_fila=DYNAMODB_MAX_FILA, intervalo_flush=DYNAMODB_INTERVALO_FLUSH,
+                 max_tentativas=DYNAMODB_MAX_TENTATIVAS, backoff_base=DYNAMODB_BACKOFF_BASE):
+        self.intervalo_flush = intervalo_flush
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.gravados = 0
+        self.falhas = 0
+        self.retentativas = 0
+        self.lotes = 0
+
+    def salvar(self, itens) -> int:
+        """
+        Grava os itens agrupados por modelo. Retorna o número de itens gravados.
+        """
+        por_modelo = {}
+        for item in itens:
+            por_modelo.setdefault(type(item), []).append(item)
+
+        gravados = 0
+        for model_class, itens_modelo in por_modelo.items():
+            for inicio in range(0, len(itens_modelo), TAMANHO_LOTE_DYNAMODB):
+                gravados += self._gravar_lote(
+                    model_class, itens_modelo[inicio:inicio + TAMANHO_LOTE_DYNAMODB])
+        return gravados
+
+    def _gravar_lote(self, model_class, itens) -> int:
+        """
+        Uma chamada BatchWriteItem por tentativa, direto na conexão do
+        modelo: o BatchWrite do PynamoDB repete os itens não processados
+        sem backoff e, esgotadas as tentativas, só avisa com PutError.
+        Aqui os UnprocessedItems voltam com backoff exponencial e apenas
+        um erro na chamada repete o lote inteiro.
+        """
+        tabela = model_class.Meta.table_name
+        pendentes = [item.serialize() for item in itens]
+        tentativa = 0
+        while True:
+            try:
+                with span(PERSISTENCIA, itens=len(pendentes)):
+                    resposta = model_class._get_connection().batch_write_item(
+                        put_items=pendentes)
+                restantes = [operacao["PutRequest"]["Item"] for operacao in
+                             (resposta or {}).get("UnprocessedItems", {}).get(tabela, [])]
+            except Exception:
+                logger.exception("Erro ao gravar lote no DynamoDB", extra={"campos": {
+                    "tabela": tabela}})
+                # Erro na chamada: repete o lote inteiro
+                restantes = pendentes
+
+            with self._lock:
+                self.lotes += 1
+                self.gravados += len(pendentes) - len(restantes)
+
+            if not restantes:
+                return len(itens)
+
+            tentativa += 1
+            if tentativa >= self.max_tentativas:
+                with self._lock:
+                    self.falhas += len(restantes)
+                logger.error("Itens não gravados no DynamoDB após as tentativas",
+                             extra={"campos": {"itens": len(restantes), "tentativas": tentativa}})
+                return len(itens) - len(restantes)
+
+            with self._lock:
+                self.retentativas += 1
+            time.sleep(random.uniform(0, self.backoff_base * (2 ** tentativa)))
+            pendentes = restantes
+
+    def iniciar(self):
+        """
+        Inicia a thread de write-behind.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(
+                target=self._loop, name="dynamodb-write-behind", daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, item, timeout: float = None):
+        """
+        Coloca o item na fila de write-behind. Bloqueia (até 'timeout')
+        quando a fila está cheia.
+        """
+        self.iniciar()
+        self._fila.put(item, timeout=timeout)
+
+    def _drenar(self, limite=TAMANHO_LOTE_DYNAMODB):
+        itens = []
+        while len(itens) < limite:
+            try:
+                itens.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return itens
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                primeiro = self._fila.get(timeout=self.intervalo_flush)
+            except queue.Empty:
+                continue
+            itens = [primeiro] + self._drenar(TAMANHO_LOTE_DYNAMODB - 1)
+            self.salvar(itens)
+
+    def encerrar(self, timeout: float = 30):
+        """
+        Para a thread de write-behind e grava os itens restantes da fila.
+        """
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        while True:
+            itens = self._drenar()
+            if not itens:
+                break
+            self.salvar(itens)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "na_fila": self._fila.qsize(),
+                "gravados": self.gravados,
+                "falhas": self.falhas,
+                "retentativas": self.retentativas,
+                "lotes": self.lotes,
+            }
+
+
+def montar_itens_paginas(arquivo_id, filename, titulo, paginas):
+    """
+    Monta um item RAGPaginaModel por página.
+    'paginas' é uma lista de dicts com 'pagina', 'resultados' e 'erro'.
+    """
+    agora = time.time()
+    return [
+        RAGPaginaModel(
+            arquivo_id=arquivo_id,
+            pagina=pagina["pagina"],
+            filename=filename,
+            titulo=titulo,
+            resultados=pagina.get("resultados") or [],
+            erro=pagina.get("erro"),
+            criado_em=agora,
+        )
+        for pagina in paginas
+    ]
+
+
+def ler_paginas(arquivo_id):
+    """
+    Lê todas as páginas de um documento com uma única query, em ordem.
+    """
+    return list(RAGPaginaModel.query(arquivo_id, scan_index_forward=True))
+
+
+def criar_tabelas():
+    """
+    Cria as tabelas se não existirem (útil com o DynamoDB Local).
+    """
+    for model_class in (RAGPaginaModel,):
+        if not model_class.exists():
+            model_class.create_table(wait=True)
+
+
+# Instância única por processo
+persistencia = PersistenciaService()
@@ -1,86 +1,450 @@
 import os
-import fitz  # PyMuPDF
 import tempfile
+import threading
+import time
+import fitz  # PyMuPDF
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable
 from uuid import uuid4
 
-from services.textract.textract import processar_arquivos_png
-
+from services.arquivamento import arquivador
+from services.arquivo_respostas import RESPOSTAS_ARQUIVAR, arquivo_respostas
+from services.cache import CACHE_ATIVO, cache, hash_conteudo
+from services.enriquecimento import ENRIQUECIMENTO_ATIVO, SessaoEnriquecimento, enriquecedor
+from services.executor import RENDER_WORKERS, executor
+from services.indice_busca import BUSCA_ATIVA, indice_busca
+from services.indice_vetorial import RECUPERACAO_ATIVA, indice_vetorial
+from services.logs import obter_logger, definir_correlacao, restaurar_correlacao
+from services.metricas import (
+    DURACAO_DOCUMENTO, PAGINAS_DOCUMENTO, CODIFICACAO, NATIVO, RENDERIZACAO,
+    observar_etapa)
+from services.persistencia import DYNAMODB_PERSISTIR, persistencia, montar_itens_paginas
+from services.pdf_nativo import PDF_NATIVO, tem_camada_texto, pagina_para_blocos
+from services.bucket import S3_BUCKET, chave_upload
+from services.templates import registro_templates
+from services.textract.parser import as_document, extract_text
+from services.textract.assincrono import (
+    TEXTRACT_ASYNC_MAX_PAGINAS, analisar_pdf, usar_modo_assincrono)
+from services.textract.scheduler import TEXTRACT_MAX_EM_VOO
+from services.textract.textract import extrair_pagina, submeter_imagem
+
+
+logger = obter_logger("processa_arquivos")
 
 # Diretório de saída para arquivos processados
 path_output = "data"
 
+# Arquivar as imagens das páginas em um zip (em disco ou no S3, ver
+# services/arquivamento.py) além de enviá-las ao Textract. O zip é gravado
+# em segundo plano, a partir da memória, fora do caminho da resposta.
+PERSISTIR_PAGINAS = os.environ.get(
+    "PERSISTIR_PAGINAS", "true").lower() == "true"
+
+# Número máximo de páginas processadas no upload síncrono (com um bucket
+# S3 configurado, documentos grandes usam o Textract assíncrono e o limite
+# passa a ser o do StartDocumentAnalysis)
+MAX_PAGES = 5
+# Páginas em andamento no pipeline (renderizando ou no Textract) por
+# documento: limita a memória independentemente do número de páginas
+PIPELINE_JANELA = int(os.environ.get(
+    "PIPELINE_JANELA", str(2 * max(RENDER_WORKERS, TEXTRACT_MAX_EM_VOO))))
+
+# Diretório do arquivo do PDF compartilhado com os processos de renderização
+# (o /dev/shm, quando existe, fica em memória)
+RENDER_DIRETORIO = os.environ.get(
+    "RENDER_DIRETORIO", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+# Documentos mantidos abertos por processo de renderização
+RENDER_DOCUMENTOS_ABERTOS = 4
+
+# Limites da API síncrona do Textract para imagens
+TEXTRACT_MAX_BYTES = 10 * 1024 * 1024
+TEXTRACT_MAX_PIXELS_LADO = 10000
+
+# Política de renderização padrão (ajustável por variável de ambiente)
+RENDER_DPI_MIN = int(os.environ.get("RENDER_DPI_MIN", "100"))
+# 144 dpi equivale ao zoom 2x usado originalmente
+RENDER_DPI_BASE = int(os.environ.get("RENDER_DPI_BASE", "144"))
+RENDER_DPI_MAX = int(os.environ.get("RENDER_DPI_MAX", "220"))
+# "png" (sem perdas) ou "jpeg"
+RENDER_FORMATO = os.environ.get("RENDER_FORMATO", "png")
+RENDER_QUALIDADE_JPEG = int(os.environ.get("RENDER_QUALIDADE_JPEG", "80"))
+RENDER_QUALIDADE_JPEG_MIN = int(
+    os.environ.get("RENDER_QUALIDADE_JPEG_MIN", "50"))
+RENDER_TONS_DE_CINZA = os.environ.get(
+    "RENDER_TONS_DE_CINZA", "false").lower() == "true"
+# Teto do payload por página (nunca acima do limite do Textract)
+RENDER_MAX_BYTES = int(os.environ.get("RENDER_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class PoliticaRenderizacao:
+    """
+    Decide, por página, a resolução e a codificação da imagem enviada ao Textract.
 
-def processa_arquivos(file_content: bytes, filename: str, titulo: str = None):
-
-    # Criar pasta de saída se não existir
-    output_folder = os.path.join(path_output, "bucket-processados")
-    os.makedirs(output_folder, exist_ok=True)
-
-    # Definir número máximo de páginas a serem processadas
-    MAX_PAGES = 5
-
-    # Lista para armazenar os caminhos dos arquivos PNG gerados
-    arquivos_png_gerados = []
-
-    # ID único para este processamento
-    process_id = str(uuid4())
-
-    print(f"Iniciando processamento do PDF: {filename}")
-    print(f"Título: {titulo}")
-    print(f"ID do processo: {process_id}")
-
-    try:
-        # Criar arquivo temporário com o conteúdo do PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(file_content)
-            temp_pdf_path = temp_file.name
+    - DPI escolhido pelo tamanho da página e pela densidade de texto
+      (texto pequeno e denso precisa de mais resolução);
+    - Saída em PNG ou JPEG (com qualidade alvo), colorida ou em tons de cinza;
+    - Garante que o payload fique abaixo de 'max_bytes', reduzindo a
+      qualidade e depois a resolução quando necessário.
+    """
 
-        # Abrir o PDF usando PyMuPDF
-        doc = fitz.open(temp_pdf_path)
-        print(f"PDF carregado: {doc.page_count} páginas encontradas")
+    def __init__(self, dpi_min=RENDER_DPI_MIN, dpi_base=RENDER_DPI_BASE,
+                 dpi_max=RENDER_DPI_MAX, formato=RENDER_FORMATO,
+                 qualidade_jpeg=RENDER_QUALIDADE_JPEG,
+                 qualidade_jpeg_min=RENDER_QUALIDADE_JPEG_MIN,
+                 tons_de_cinza=RENDER_TONS_DE_CINZA, max_bytes=RENDER_MAX_BYTES):
+        if formato not in ("png", "jpeg"):
+            raise ValueError(f"Formato de imagem inválido: {formato}")
+        self.dpi_min = dpi_min
+        self.dpi_base = dpi_base
+        self.dpi_max = dpi_max
+        self.formato = formato
+        self.qualidade_jpeg = qualidade_jpeg
+        self.qualidade_jpeg_min = qualidade_jpeg_min
+        self.tons_de_cinza = tons_de_cinza
+        self.max_bytes = min(max_bytes, TEXTRACT_MAX_BYTES)
+
+    def escolher_dpi(self, page) -> int:
+        """
+        Escolhe o DPI da página a partir do tamanho e da densidade de texto.
+        """
+        largura_pol = page.rect.width / 72
+        altura_pol = page.rect.height / 72
+        area_pol2 = max(largura_pol * altura_pol, 1e-6)
+
+        # Caracteres por polegada quadrada na camada de texto (0 em páginas digitalizadas)
+        densidade = len(page.get_text("text").strip()) / area_pol2
+
+        if densidade >= 40:
+            dpi = self.dpi_max
+        elif densidade >= 10 or densidade == 0:
+            # Páginas digitalizadas não têm texto para medir: usa a resolução base
+            dpi = self.dpi_base
+        else:
+            dpi = max(self.dpi_min, int(self.dpi_base * 0.85))
+
+        # Respeita o limite de pixels por lado do Textract
+        maior_lado_pol = max(largura_pol, altura_pol)
+        dpi = min(dpi, int(TEXTRACT_MAX_PIXELS_LADO / maior_lado_pol))
+        return max(1, min(max(dpi, self.dpi_min), self.dpi_max))
+
+    def _codificar(self, page, dpi, qualidade):
+        zoom = dpi / 72
+        colorspace = fitz.csGRAY if self.tons_de_cinza else fitz.csRGB
+        inicio = time.perf_counter()
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom),
+                              colorspace=colorspace, alpha=False)
+        rasterizado = time.perf_counter()
+        if self.formato == "jpeg":
+            imagem = pix.tobytes("jpeg", jpg_quality=qualidade)
+        else:
+            imagem = pix.tobytes("png")
+        # Tempos (s) da rasterização e da compressão
+        tempos = (rasterizado - inicio, time.perf_counter() - rasterizado)
+        return imagem, len(pix.samples), tempos
+
+    def renderizar(self, page):
+        """
+        Renderiza a página conforme a política.
+        Retorna (bytes da imagem, relatório da página).
+        """
+        inicio = time.perf_counter()
+        dpi = self.escolher_dpi(page)
+        qualidade = self.qualidade_jpeg
+        tentativas = 0
+        tempo_rasterizacao = tempo_compressao = 0.0
+
+        while True:
+            tentativas += 1
+            imagem, bytes_brutos, tempos = self._codificar(page, dpi, qualidade)
+            tempo_rasterizacao += tempos[0]
+            tempo_compressao += tempos[1]
+            if len(imagem) <= self.max_bytes:
+                break
+
+            # Primeiro reduz a qualidade do JPEG, depois a resolução
+            if self.formato == "jpeg" and qualidade - 10 >= self.qualidade_jpeg_min:
+                qualidade -= 10
+            elif dpi > self.dpi_min:
+                dpi = max(self.dpi_min, int(dpi * 0.8))
+            else:
+                raise ValueError(
+                    f"Página {page.number + 1} excede {self.max_bytes} bytes mesmo na menor resolução")
+
+        relatorio = {
+            "pagina": page.number,
+            "dpi": dpi,
+            "formato": self.formato,
+            "tons_de_cinza": self.tons_de_cinza,
+            "qualidade": qualidade if self.formato == "jpeg" else None,
+            "bytes": len(imagem),
+            "bytes_brutos": bytes_brutos,
+            "bytes_economizados": bytes_brutos - len(imagem),
+            "origem": "textract",
+            "tentativas": tentativas,
+            "tempo_codificacao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+            "tempo_rasterizacao_ms": round(tempo_rasterizacao * 1000, 2),
+            "tempo_compressao_ms": round(tempo_compressao * 1000, 2),
+        }
+        return imagem, relatorio
+
+    @property
+    def extensao(self):
+        return "jpg" if self.formato == "jpeg" else "png"
+
+
+def processa_arquivos(file_content: bytes, filename: str, titulo: str = None,
+                      persistir_paginas: bool = None,
+                      politica: PoliticaRenderizacao = None,
+                      extrair_nativo: bool = None,
+                      usar_cache: bool = None,
+                      max_paginas: int = None,
+                      ao_progresso: Callable = None,
+                      hash_pdf: str = None,
+                      persistir_dynamodb: bool = None,
+                      process_id: str = None,
+                      textract_assincrono: bool = None,
+                      enriquecer: bool = None):
+    """
+    Processa o PDF em pipeline: a renderização (ou extração nativa), o
+    Textract e a extração dos dados de páginas diferentes acontecem ao
+    mesmo tempo.
 
-        # Verificar se excede o limite de páginas
-        if doc.page_count > MAX_PAGES:
-            print(
-                f"Aviso: PDF tem {doc.page_count} páginas. Processando apenas as primeiras {MAX_PAGES}")
+    'ao_progresso(tipo, dados)' recebe os eventos do processamento:
+    'etapa' (início de cada etapa) e 'pagina' (resultado de cada página,
+    assim que extraída).
 
-        # Processar cada página até o limite
-        pages_processed = min(doc.page_count, MAX_PAGES)
+    'file_content' pode ser bytes ou bytearray; 'hash_pdf' (SHA-256 já
+    calculado na ingestão) evita ler o conteúdo novamente.
 
-        for page_num in range(pages_processed):
-            page = doc.load_page(page_num)
+    'process_id' (gerado aqui se não informado) é também o id de correlação
+    dos logs deste processamento. Um PDF idêntico já processado (cache)
+    devolve o process_id do processamento original.
 
-            # Matriz de zoom para alta resolução (2x)
-            matriz = fitz.Matrix(2, 2)
-            pix = page.get_pixmap(matrix=matriz)
+    Documentos com muitas páginas (ver 'usar_modo_assincrono') são enviados
+    inteiros ao S3 e analisados pelo Textract assíncrono, em vez de uma
+    imagem por página; 'textract_assincrono' força um dos modos.
 
-            # Gerar nome do arquivo de saída
-            base_name = os.path.splitext(filename)[0]
-            output_image_name = f"{base_name}_{process_id}_pagina_{page_num}.png"
-            full_output_path = os.path.join(output_folder, output_image_name)
+    Com 'enriquecer', o texto de cada página segue para o modelo do
+    Bedrock assim que a página é extraída (ver services/enriquecimento.py)
+    e cada resultado é emitido como um evento 'enriquecimento'.
+    """
 
-            # Salvar a imagem
-            pix.save(full_output_path)
-            arquivos_png_gerados.append(full_output_path)
+    if persistir_paginas is None:
+        persistir_paginas = PERSISTIR_PAGINAS
+    if extrair_nativo is None:
+        extrair_nativo = PDF_NATIVO
+    if usar_cache is None:
+        usar_cache = CACHE_ATIVO
+    if persistir_dynamodb is None:
+        persistir_dynamodb = DYNAMODB_PERSISTIR
+    if enriquecer is None:
+        enriquecer = ENRIQUECIMENTO_ATIVO
+    if politica is None:
+        politica = PoliticaRenderizacao()
+    if max_paginas is None:
+        max_paginas = TEXTRACT_ASYNC_MAX_PAGINAS if S3_BUCKET else MAX_PAGES
+
+    # Resultados de cada página, para a persistência no DynamoDB
+    paginas_concluidas = []
+
+    def emitir(tipo, **dados):
+        if tipo == "pagina":
+            paginas_concluidas.append(dados)
+        if ao_progresso is not None:
+            ao_progresso(tipo, dados)
+
+    # Pasta de saída (usada apenas pelo zip em disco)
+    output_folder = os.path.join(path_output, "bucket-processados")
 
-            print(f"Página {page_num + 1} processada: {output_image_name}")
+    # Zip das imagens das páginas, criado com a primeira imagem
+    arquivo = None
 
-        # Fechar o documento
-        doc.close()
+    # ID único para este processamento
+    if process_id is None:
+        process_id = str(uuid4())
 
-        # Remover arquivo temporário
-        os.unlink(temp_pdf_path)
+    # Todos os logs deste processamento levam o process_id
+    token_correlacao = definir_correlacao(process_id)
+    inicio_documento = time.perf_counter()
+    resultado_metrica = "erro"
 
-        print(
-            f"Processamento concluído: {len(arquivos_png_gerados)} imagens geradas")
+    logger.info("Iniciando processamento do PDF", extra={"campos": {
+        "filename": filename, "titulo": titulo, "process_id": process_id}})
 
-        # Processar com Textract
-        print("Iniciando análise com AWS Textract...")
-        textract_resultado = processar_arquivos_png(arquivos_png_gerados)
+    try:
+        # Resultado em cache para um PDF idêntico já processado
+        if hash_pdf is None:
+            hash_pdf = hash_conteudo(file_content)
+        # A extração depende dos templates: editá-los muda o namespace
+        namespace_documento = (f"documento-{'nativo' if extrair_nativo else 'ocr'}-{max_paginas}"
+                               f"-t{registro_templates.versao()}")
+        if enriquecer:
+            namespace_documento += "-enriquecido"
+        if usar_cache:
+            em_cache = cache.obter(namespace_documento, hash_pdf)
+            if (em_cache is not None and BUSCA_ATIVA
+                    and not indice_busca.contem(em_cache["process_id"])):
+                # O índice de busca é em memória: depois de um reinício (o
+                # cache em disco continua) ou da saída do documento do LRU, o
+                # id original não seria encontrado na busca. Processa de novo
+                # com o id novo, que é indexado; as páginas enviadas como
+                # imagem continuam com a resposta do cache de páginas
+                logger.info("Documento em cache fora do índice de busca; reprocessando",
+                            extra={"campos": {"hash_pdf": hash_pdf,
+                                              "process_id_original": em_cache["process_id"]}})
+                em_cache = None
+            if em_cache is not None:
+                # O documento já está nos índices, no DynamoDB e no arquivo
+                # das respostas com o process_id do processamento original:
+                # é esse o id devolvido
+                logger.info("Resultado encontrado em cache", extra={"campos": {
+                    "hash_pdf": hash_pdf, "process_id_original": em_cache["process_id"]}})
+                resultado_metrica = "cache"
+                return {
+                    "success": True,
+                    "process_id": em_cache["process_id"],
+                    "filename": filename,
+                    "titulo": titulo,
+                    "pages_processed": em_cache["pages_processed"],
+                    "total_pages": em_cache["total_pages"],
+                    "arquivos_png": [],
+                    "zip_path": None,
+                    "renderizacao": em_cache["renderizacao"],
+                    "textract_result": em_cache["textract_result"],
+                    "enriquecimento": em_cache.get("enriquecimento"),
+                    "cache": "documento"
+                }
+
+        # Abrir o PDF diretamente da memória usando PyMuPDF
+        emitir("etapa", etapa="carregamento")
+        doc = fitz.open(stream=file_content, filetype="pdf")
+        try:
+            total_pages = doc.page_count
+            logger.info("PDF carregado", extra={"campos": {"total_pages": total_pages}})
+
+            # Verificar se excede o limite de páginas
+            if total_pages > max_paginas:
+                logger.warning("PDF excede o limite de páginas; processando apenas as primeiras",
+                               extra={"campos": {"total_pages": total_pages, "max_paginas": max_paginas}})
+
+            # Processar cada página até o limite
+            pages_processed = min(total_pages, max_paginas)
+
+            # Documentos grandes vão inteiros para o Textract assíncrono; os
+            # que têm camada de texto continuam com a extração nativa
+            if textract_assincrono is None:
+                assincrono = (usar_modo_assincrono(pages_processed)
+                              and not (extrair_nativo and tem_camada_texto(doc.load_page(0))))
+            else:
+                assincrono = textract_assincrono
+            conteudo_assincrono = file_content
+            if assincrono and pages_processed < total_pages:
+                # O Textract analisa o arquivo inteiro: envia só as páginas usadas
+                doc.select(range(pages_processed))
+                conteudo_assincrono = doc.tobytes(garbage=3, deflate=True)
+        finally:
+            doc.close()
+
+        emitir("etapa", etapa="paginas", total_pages=total_pages,
+               pages_processed=pages_processed,
+               modo="assincrono" if assincrono else "sincrono")
+
+        # As palavras das páginas entram no índice de busca (/search) e os
+        # trechos, no índice de recuperação (/query); um PDF já indexado
+        # (mesmo hash) vira um alias do documento existente
+        if BUSCA_ATIVA:
+            indice_busca.registrar_documento(process_id, filename, titulo, hash_pdf)
+        if RECUPERACAO_ATIVA:
+            indice_vetorial.registrar_documento(process_id, filename, titulo, hash_pdf)
+
+        # Enquanto a página N está no Textract, as seguintes são renderizadas
+        # e os dados das anteriores são extraídos aqui, na ordem das páginas
+        base_name = os.path.splitext(filename)[0]
+        relatorios_renderizacao = []
+        resultados = []
+        paginas_em_cache = 0
+        documento_completo = True
+        # As páginas entram no lote do modelo enquanto as seguintes são processadas
+        sessao = None
+        if enriquecer:
+            sessao = SessaoEnriquecimento(
+                enriquecedor, ao_resultado=lambda resultado: emitir("enriquecimento", **resultado))
+        if assincrono:
+            emitir("etapa", etapa="textract_assincrono")
+            paginas = paginas_assincronas(conteudo_assincrono, pages_processed,
+                                          chave_upload(process_id, filename))
+        else:
+            paginas = pipeline_paginas(file_content, range(pages_processed), politica,
+                                       extrair_nativo, usar_cache)
+        for pagina in paginas:
+            concluida = _concluir_pagina(pagina, base_name, process_id, politica, usar_cache,
+                                         sessao is not None)
+            if sessao is not None and concluida["texto"]:
+                sessao.adicionar(pagina["page_num"], concluida["texto"])
+
+            # A imagem vai da memória para o zip, gravado em segundo plano
+            if persistir_paginas and pagina["imagem"] is not None:
+                if arquivo is None:
+                    arquivo = arquivador.abrir(
+                        f"imagens_processadas_{process_id}.zip", output_folder)
+                arquivo.adicionar(concluida["nome"], pagina["imagem"])
+
+            relatorios_renderizacao.append(pagina["relatorio"])
+            resultados.extend(concluida["resultados"])
+            paginas_em_cache += pagina["em_cache"]
+            documento_completo = (documento_completo
+                                  and not isinstance(pagina["response"], Exception))
+
+            if len(relatorios_renderizacao) == 1:
+                logger.info("Primeira página concluída", extra={"campos": {
+                    "tempo_ms": round((time.perf_counter() - inicio_documento) * 1000, 2)}})
+            emitir("pagina", pagina=pagina["page_num"],
+                   resultados=concluida["resultados"], erro=concluida["erro"])
+
+        enriquecimento = None
+        if sessao is not None:
+            emitir("etapa", etapa="enriquecimento")
+            enriquecimento = sessao.concluir()
+
+        textract_resultado = {
+            "success": True,
+            "total_arquivos": pages_processed,
+            "resultados": resultados
+        }
 
-        # Compactar imagens (opcional)
-        zip_path = compactar_imagens_geradas(
-            arquivos_png_gerados, output_folder)
+        # Só guarda o documento se todas as páginas foram analisadas
+        documento_completo = documento_completo and not any(
+            resultado["erro"] for resultado in enriquecimento or ())
+        if usar_cache and documento_completo:
+            cache.guardar(namespace_documento, hash_pdf, {
+                "process_id": process_id,
+                "pages_processed": pages_processed,
+                "total_pages": total_pages,
+                "renderizacao": relatorios_renderizacao,
+                "textract_result": textract_resultado,
+                "enriquecimento": enriquecimento
+            })
+
+        # Persistência no DynamoDB em write-behind (fora do caminho da requisição)
+        if persistir_dynamodb:
+            emitir("etapa", etapa="persistencia")
+            try:
+                for item in montar_itens_paginas(process_id, filename, titulo, paginas_concluidas):
+                    persistencia.enfileirar(item, timeout=5)
+            except Exception:
+                logger.exception("Erro ao enfileirar resultados no DynamoDB")
+
+        # O zip é finalizado depois da resposta; 'zip_path' é o destino final
+        zip_path = None
+        arquivos_png = []
+        if arquivo is not None:
+            arquivo.concluir()
+            zip_path = arquivo.localizacao
+            arquivos_png = arquivo.entradas
+
+        PAGINAS_DOCUMENTO.observar(pages_processed)
+        resultado_metrica = "sucesso"
 
         return {
             "success": True,
@@ -88,18 +452,19 @@ def processa_arquivos(file_content: bytes, filename: str, titulo: str = None):
             "filename": filename,
             "titulo": titulo,
             "pages_processed": pages_processed,
-            "total_pages": doc.page_count,
-            "arquivos_png": arquivos_png_gerados,
+            "total_pages": total_pages,
+            "arquivos_png": arquivos_png,
             "zip_path": zip_path,
-            "textract_result": textract_resultado
+            "renderizacao": relatorios_renderizacao,
+            "textract_result": textract_resultado,
+            "enriquecimento": enriquecimento,
+            "cache": "paginas" if paginas_em_cache else None
         }
 
     except Exception as e:
-        print(f"Erro ao processar o PDF '{filename}': {e}")
-
-        # Cleanup em caso de erro
-        if 'temp_pdf_path' in locals() and os.path.exists(temp_pdf_path):
-            os.unlink(temp_pdf_path)
+        logger.exception("Erro ao processar o PDF", extra={"campos": {"filename": filename}})
+        if arquivo is not None:
+            arquivo.cancelar()
 
         return {
             "success": False,
@@ -108,36 +473,264 @@ def processa_arquivos(file_content: bytes, filename: str, titulo: str = None):
             "titulo": titulo
         }
 
+    finally:
+        duracao = time.perf_counter() - inicio_documento
+        DURACAO_DOCUMENTO.observar(duracao, resultado=resultado_metrica)
+        logger.info("Processamento concluído", extra={"campos": {
+            "resultado": resultado_metrica, "duracao_ms": round(duracao * 1000, 2)}})
+        restaurar_correlacao(token_correlacao)
+
+
+def pipeline_paginas(file_content, numeros_paginas, politica: PoliticaRenderizacao,
+                     extrair_nativo: bool, usar_cache: bool, janela: int = PIPELINE_JANELA):
+    """
+    Gera as páginas na ordem, cada uma com a resposta do Textract (ou da
+    camada de texto, ou do cache) em 'response', ou a exceção da página.
+
+    As páginas seguintes são renderizadas no pool de processos e enviadas
+    ao Textract assim que ficam prontas, enquanto quem consome o gerador
+    extrai os dados das anteriores. No máximo 'janela' páginas ficam em
+    andamento, então a memória não cresce com o número de páginas.
 
-def compactar_imagens_geradas(arquivos_png_gerados, output_folder):
+    Com o pool de processos, o PDF é gravado uma única vez em um arquivo
+    temporário (RENDER_DIRETORIO) e os processos o abrem pelo caminho, em
+    vez de receberem uma cópia do conteúdo por página.
+    """
+    if executor.render_workers <= 0:
+        yield from _pipeline_paginas(file_content, numeros_paginas, politica,
+                                     extrair_nativo, usar_cache, janela)
+        return
+    with tempfile.NamedTemporaryFile(dir=RENDER_DIRETORIO, prefix="pdf_", suffix=".pdf") as arquivo:
+        arquivo.write(file_content)
+        arquivo.flush()
+        yield from _pipeline_paginas(arquivo.name, numeros_paginas, politica,
+                                     extrair_nativo, usar_cache, janela)
+
+
+def _pipeline_paginas(pdf, numeros_paginas, politica, extrair_nativo, usar_cache, janela):
+    proximas = iter(numeros_paginas)
+    em_andamento = deque()
+
+    while True:
+        # Completa a janela com as próximas páginas
+        while len(em_andamento) < janela:
+            page_num = next(proximas, None)
+            if page_num is None:
+                break
+            em_andamento.append({
+                "page_num": page_num,
+                "render": executor.renderizar(renderizar_pagina, pdf, page_num,
+                                              politica, extrair_nativo),
+                "ocr": None,
+                "imagem": None,
+                "relatorio": None,
+                "hash": None,
+                "response": None,
+                "em_cache": False,
+            })
+        if not em_andamento:
+            return
+
+        # Páginas renderizadas seguem para o Textract (ou o cache)
+        for pagina in em_andamento:
+            if pagina["relatorio"] is None and pagina["render"].done():
+                _encaminhar_pagina(pagina, usar_cache)
+
+        # A próxima página na ordem está pronta para a extração
+        cabeca = em_andamento[0]
+        if cabeca["relatorio"] is not None and (cabeca["ocr"] is None or cabeca["ocr"].done()):
+            em_andamento.popleft()
+            if cabeca["ocr"] is not None:
+                try:
+                    cabeca["response"] = cabeca["ocr"].result()
+                except Exception as e:
+                    cabeca["response"] = e
+            del cabeca["render"], cabeca["ocr"]
+            yield cabeca
+            continue
+
+        # Aguarda a próxima renderização ou resposta do Textract
+        wait([pagina["render"] if pagina["relatorio"] is None else pagina["ocr"]
+              for pagina in em_andamento
+              if pagina["relatorio"] is None or pagina["ocr"] is not None],
+             return_when=FIRST_COMPLETED)
+
+
+def paginas_assincronas(file_content, pages_processed: int, chave: str):
     """
-    Função auxiliar para compactar as imagens geradas (opcional)
+    Páginas analisadas pelo Textract assíncrono, no mesmo formato do
+    'pipeline_paginas' (cada página chega ao parser assim que seus blocos
+    são lidos).
     """
-    if not arquivos_png_gerados:
-        return None
+    for page_num, response in analisar_pdf(file_content, chave, pages_processed):
+        yield {
+            "page_num": page_num,
+            "imagem": None,
+            "relatorio": {
+                "pagina": page_num,
+                "origem": "textract_assincrono",
+                "bytes": 0,
+                "blocos": 0 if isinstance(response, Exception) else len(response["Blocks"]),
+            },
+            "hash": None,
+            "response": response,
+            "em_cache": False,
+        }
 
-    try:
-        import zipfile
 
-        # Nome do arquivo ZIP
-        zip_filename = f"imagens_processadas_{uuid4()}.zip"
-        zip_path = os.path.join(output_folder, zip_filename)
+def _encaminhar_pagina(pagina, usar_cache):
+    """
+    Recebe a página renderizada e a envia ao Textract, a menos que seja
+    nativa ou que a resposta de uma imagem idêntica esteja em cache.
+    """
+    renderizada = pagina["render"].result()
+    pagina["relatorio"] = renderizada["relatorio"]
+
+    if renderizada["imagem"] is None:
+        pagina["response"] = renderizada["response"]
+        return
 
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for png_path in arquivos_png_gerados:
-                if os.path.exists(png_path):
-                    # Adicionar apenas o nome do arquivo, não o caminho completo
-                    zipf.write(png_path, os.path.basename(png_path))
+    imagem = pagina["imagem"] = renderizada["imagem"]
+    pagina["hash"] = hash_conteudo(imagem)
+    if usar_cache:
+        em_cache = cache.obter("pagina", pagina["hash"])
+        if em_cache is not None:
+            pagina["response"] = em_cache
+            pagina["em_cache"] = True
+            return
 
-        print(f"Arquivo ZIP criado: {zip_filename}")
+    pagina["ocr"] = submeter_imagem(imagem)
 
-        # Opcional: remover arquivos PNG originais
-        for png_path in arquivos_png_gerados:
-            if os.path.exists(png_path):
-                os.remove(png_path)
 
-        return zip_path
+def _concluir_pagina(pagina, base_name, process_id, politica, usar_cache,
+                     extrair_texto: bool = False):
+    """
+    Etapas finais de uma página, na ordem das páginas: métricas, cache,
+    índice de busca, arquivo da resposta bruta, extração dos dados (e do
+    texto, com 'extrair_texto') e índice de recuperação.
+    """
+    page_num = pagina["page_num"]
+    relatorio = pagina["relatorio"]
+    response = pagina["response"]
+
+    if relatorio["origem"] == "nativo":
+        nome = f"{base_name}_{process_id}_pagina_{page_num} (texto nativo)"
+        observar_etapa(NATIVO, relatorio["tempo_codificacao_ms"] / 1000, pagina=page_num)
+        logger.info("Página extraída da camada de texto", extra={"campos": {
+            "pagina": page_num + 1, "tempo_ms": relatorio["tempo_codificacao_ms"]}})
+    elif pagina["imagem"] is None:
+        nome = f"{base_name}_{process_id}_pagina_{page_num} (textract assíncrono)"
+    else:
+        nome = f"{base_name}_{process_id}_pagina_{page_num}.{politica.extensao}"
+
+        # Tempos medidos no pool de processos
+        observar_etapa(RENDERIZACAO, relatorio["tempo_rasterizacao_ms"] / 1000, pagina=page_num)
+        observar_etapa(CODIFICACAO, relatorio["tempo_compressao_ms"] / 1000, pagina=page_num)
+        logger.info("Página renderizada", extra={"campos": {
+            "pagina": page_num + 1, "arquivo": nome, "dpi": relatorio['dpi'],
+            "bytes": relatorio['bytes'], "tempo_ms": relatorio['tempo_codificacao_ms'],
+            "cache": pagina["em_cache"]}})
+
+        # Respostas novas do Textract ficam em cache para imagens idênticas
+        if usar_cache and not pagina["em_cache"] and not isinstance(response, Exception):
+            cache.guardar("pagina", pagina["hash"], response)
+
+    if BUSCA_ATIVA and not isinstance(response, Exception):
+        indice_busca.adicionar_pagina(process_id, page_num + 1, response)
+
+    # A extração, o texto e os trechos usam o mesmo documento indexado
+    texto = None
+    valida = not isinstance(response, Exception) and bool(response)
+
+    # Resposta bruta arquivada no formato colunar (em segundo plano), para
+    # reprocessar a página no futuro sem chamar o Textract de novo
+    if valida and RESPOSTAS_ARQUIVAR:
+        arquivo_respostas.enfileirar(process_id, page_num + 1, response, base_name,
+                                     relatorio["origem"])
+
+    if valida and (extrair_texto or RECUPERACAO_ATIVA):
+        response = as_document(response)
+    if valida and extrair_texto:
+        texto = extract_text(response)
+
+    resultados_pagina, erro = extrair_pagina(response, nome)
+
+    if valida and RECUPERACAO_ATIVA:
+        try:
+            indice_vetorial.adicionar_pagina(process_id, page_num + 1, response)
+        except Exception:
+            logger.exception("Erro ao indexar a página para recuperação",
+                             extra={"campos": {"pagina": page_num + 1}})
+
+    return {
+        "resultados": resultados_pagina,
+        "erro": erro,
+        "nome": nome,
+        "texto": texto,
+    }
+
+
+# Documentos abertos neste processo, por caminho (ver 'renderizar_pagina')
+_documentos_abertos = OrderedDict()
+_lock_documentos = threading.Lock()
+
+
+def _abrir_documento(caminho: str):
+    """
+    Documento aberto uma única vez por processo e reaproveitado nas páginas
+    seguintes. Os documentos cujo arquivo já foi removido (processamento
+    concluído) são fechados.
+    """
+    with _lock_documentos:
+        for outro in [c for c in _documentos_abertos if c != caminho and not os.path.exists(c)]:
+            _documentos_abertos.pop(outro).close()
+        doc = _documentos_abertos.get(caminho)
+        if doc is None:
+            doc = _documentos_abertos[caminho] = fitz.open(caminho, filetype="pdf")
+            while len(_documentos_abertos) > RENDER_DOCUMENTOS_ABERTOS:
+                _documentos_abertos.popitem(last=False)[1].close()
+        else:
+            _documentos_abertos.move_to_end(caminho)
+        return doc
+
+
+def renderizar_pagina(pdf, page_num: int,
+                      politica: PoliticaRenderizacao = None,
+                      extrair_nativo: bool = False) -> dict:
+    """
+    Prepara uma página do PDF para extração. Retorna um dicionário com:
+    - 'imagem': bytes da imagem para o Textract (None se a página é nativa);
+    - 'response': resposta no formato do Textract montada da camada de texto
+      (apenas para páginas nativas);
+    - 'relatorio': relatório da página.
+    'pdf' é o conteúdo do PDF ou o caminho do arquivo compartilhado pelo
+    pipeline; pelo caminho, cada processo do pool abre o documento uma
+    única vez.
+    """
+    if politica is None:
+        politica = PoliticaRenderizacao()
 
-    except Exception as e:
-        print(f"Erro ao criar arquivo ZIP: {e}")
-        return None
+    compartilhado = isinstance(pdf, str)
+    doc = _abrir_documento(pdf) if compartilhado else fitz.open(stream=pdf, filetype="pdf")
+    try:
+        page = doc.load_page(page_num)
+
+        # Fast path: página com camada de texto dispensa rasterização e OCR
+        if extrair_nativo and tem_camada_texto(page):
+            inicio = time.perf_counter()
+            response = pagina_para_blocos(page)
+            relatorio = {
+                "pagina": page_num,
+                "origem": "nativo",
+                "bytes": 0,
+                "blocos": len(response['Blocks']),
+                "tempo_codificacao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+            }
+            return {"imagem": None, "response": response, "relatorio": relatorio}
+
+        # Codificar a imagem direto em memória
+        imagem, relatorio = politica.renderizar(page)
+        return {"imagem": imagem, "response": None, "relatorio": relatorio}
+    finally:
+        if not compartilhado:
+            doc.close()
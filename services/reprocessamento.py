@@ -0,0 +1,131 @@
+# reprocessamento.py
+#
+# Reexecuta a extração atual (templates e parser) sobre as respostas
+# arquivadas (services/arquivo_respostas.py), sem chamar o Textract de
+# novo: útil depois de melhorar o parser ou um template. Os documentos são
+# distribuídos entre processos (por padrão um por núcleo); cada processo
+# abre as respostas por mmap e passa o DocumentoColunar direto ao parser.
+# O resultado de cada documento vai para um arquivo JSONL, na ordem do
+# registro das páginas.
+#
+# Uso: python -m services.reprocessamento [--diretorio data/respostas]
+#      [--processos 4] [--process-id ID ...] [--saida reprocessamento.jsonl]
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Só avisos no log: o resumo da execução vai para o stdout
+os.environ.setdefault("LOG_NIVEL", "WARNING")
+
+from services.arquivo_respostas import RESPOSTAS_DIRETORIO, ArquivoRespostas
+from services.templates import registro_templates
+from services.textract.textract import extrair_pagina
+
+# Documentos enviados de uma vez a cada processo
+DOCUMENTOS_POR_TAREFA = 4
+
+
+def _iniciar_processo():
+    registro_templates.carregar()
+
+
+def reprocessar_documento(diretorio: str, process_id: str, documento: dict) -> dict:
+    """
+    Extração de todas as páginas arquivadas de um documento, em ordem.
+    """
+    arquivo = ArquivoRespostas(diretorio)
+    inicio = time.perf_counter()
+    resultados = []
+    erros = []
+    blocos = 0
+    for pagina, chave in sorted(documento["paginas"].items(), key=lambda item: int(item[0])):
+        nome = f"{documento['arquivo']}_{process_id}_pagina_{pagina} (reprocessamento)"
+        try:
+            response = arquivo.carregar(chave)
+        except (OSError, ValueError) as e:
+            erros.append({"pagina": pagina, "erro": f"resposta arquivada ilegível: {e}"})
+            continue
+        blocos += len(response)
+        resultados_pagina, erro = extrair_pagina(response, nome)
+        resultados.extend(resultados_pagina)
+        if erro:
+            erros.append({"pagina": pagina, "erro": erro})
+    return {
+        "process_id": process_id,
+        "arquivo": documento["arquivo"],
+        "paginas": len(documento["paginas"]),
+        "blocos": blocos,
+        "resultados": resultados,
+        "erros": erros,
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+    }
+
+
+def _reprocessar(argumentos):
+    return reprocessar_documento(*argumentos)
+
+
+def reprocessar(diretorio: str = RESPOSTAS_DIRETORIO, saida: str = None, processos: int = None,
+                process_ids=None) -> dict:
+    """
+    Reprocessa os documentos arquivados (ou apenas 'process_ids') em
+    'processos' processos. Grava um JSON por linha em 'saida' e retorna o
+    resumo da execução.
+    """
+    documentos = ArquivoRespostas(diretorio).documentos()
+    if process_ids:
+        documentos = {process_id: documentos[process_id]
+                      for process_id in process_ids if process_id in documentos}
+    processos = processos or os.cpu_count() or 1
+    saida = saida or os.path.join(diretorio, "reprocessamento.jsonl")
+
+    inicio = time.perf_counter()
+    resumo = {"documentos": 0, "paginas": 0, "blocos": 0, "itens": 0, "paginas_com_erro": 0}
+    tarefas = [(diretorio, process_id, documento) for process_id, documento in documentos.items()]
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        if processos > 1 and len(tarefas) > 1:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo) as pool:
+                resultados = pool.map(_reprocessar, tarefas, chunksize=DOCUMENTOS_POR_TAREFA)
+                _gravar(f, resultados, resumo)
+        else:
+            _iniciar_processo()
+            _gravar(f, map(_reprocessar, tarefas), resumo)
+
+    duracao = time.perf_counter() - inicio
+    resumo.update({
+        "saida": saida,
+        "processos": processos,
+        "tempo_s": round(duracao, 3),
+        "paginas_por_s": round(resumo["paginas"] / duracao, 1) if duracao else None,
+    })
+    return resumo
+
+
+def _gravar(arquivo, resultados, resumo):
+    for resultado in resultados:
+        arquivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        resumo["documentos"] += 1
+        resumo["paginas"] += resultado["paginas"]
+        resumo["blocos"] += resultado["blocos"]
+        resumo["itens"] += len(resultado["resultados"])
+        resumo["paginas_com_erro"] += len(resultado["erros"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reexecuta a extração sobre as respostas arquivadas do Textract")
+    parser.add_argument("--diretorio", default=RESPOSTAS_DIRETORIO)
+    parser.add_argument("--processos", type=int, default=None,
+                        help="processos em paralelo (padrão: um por núcleo)")
+    parser.add_argument("--process-id", nargs="+", dest="process_ids",
+                        help="apenas estes documentos")
+    parser.add_argument("--saida", help="arquivo JSONL com os resultados")
+    args = parser.parse_args()
+    resumo = reprocessar(args.diretorio, args.saida, args.processos, args.process_ids)
+    json.dump(resumo, sys.stdout, ensure_ascii=False, indent=2)
+    print()
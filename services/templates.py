@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+from services.logs import obter_logger
+from services.textract.busca import normalizar_token
+from services.textract.indice_linhas import MultiPadroes
+
+
+logger = obter_logger("templates")
+
+# Diretório com os templates de extração (um arquivo JSON por tipo de documento);
+# o padrão é o 'templates' do projeto, independente do diretório de trabalho
+TEMPLATES_DIRETORIO = os.environ.get("TEMPLATES_DIRETORIO", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"))
+# Template usado quando nenhum outro é reconhecido na página
+TEMPLATE_PADRAO = os.environ.get("TEMPLATE_PADRAO", "cotacao_auto")
+# Similaridade mínima padrão para associar chaves por aproximação (0 a 1)
+SIMILARIDADE_MINIMA = 0.9
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_chave(texto: str) -> str:
+    """
+    Normaliza uma chave para comparação: minúsculas, sem acentos, espaços
+    colapsados e sem ':' no final.
+    """
+    return _ESPACOS.sub(" ", normalizar_token(texto)).strip().rstrip(":").strip()
+
+
+class Template:
+    """
+    Template de extração compilado a partir da definição declarativa:
+    campos (com sinônimos), regras de aproximação, colunas e itens da tabela
+    e termos de classificação, já normalizados em estruturas de consulta.
+    """
+
+    def __init__(self, definicao: dict):
+        self.nome = definicao["nome"]
+        self.descricao = definicao.get("descricao", "")
+
+        # Campos chave-valor, na ordem de saída
+        self.chaves = []
+        self._por_chave_normalizada = {}
+        for campo in definicao.get("campos", []):
+            chave = campo["chave"]
+            self.chaves.append(chave)
+            for variante in [chave] + campo.get("sinonimos", []):
+                self._por_chave_normalizada.setdefault(
+                    normalizar_chave(variante), chave)
+        self.chaves = tuple(self.chaves)
+
+        fuzzy = definicao.get("fuzzy") or {}
+        self.similaridade_minima = fuzzy.get(
+            "similaridade_minima", SIMILARIDADE_MINIMA)
+        self.fuzzy_ativo = fuzzy.get("ativo", True)
+
+        # Tabela
+        tabela = definicao.get("tabela") or {}
+        self.colunas = tuple(tabela.get("colunas", []))
+        self.itens = tuple(tabela.get("itens", []))
+        self.cabecalhos = frozenset(normalizar_chave(c)
+                                    for c in tabela.get("cabecalhos", []))
+        self.valores_padrao = dict(tabela.get("valores_padrao", {}))
+        filtro = tabela.get("filtro") or {}
+        self.filtro_coluna = filtro.get("coluna")
+        self.filtro_contem = filtro.get("contem")
+
+        # Classificação
+        classificacao = definicao.get("classificacao") or {}
+        self.termos = tuple(normalizar_chave(t)
+                            for t in classificacao.get("termos", []))
+        self.minimo_termos = classificacao.get("minimo_termos", 1)
+
+    def __repr__(self):
+        return f"Template({self.nome!r})"
+
+    def _chave_aproximada(self, normalizada: str):
+        """
+        Campo do template mais parecido com a chave, acima da similaridade mínima.
+        """
+        melhor, melhor_razao = None, self.similaridade_minima
+        for variante, chave in self._por_chave_normalizada.items():
+            matcher = SequenceMatcher(None, normalizada, variante)
+            # Filtros baratos antes da razão exata
+            if matcher.real_quick_ratio() < melhor_razao or matcher.quick_ratio() < melhor_razao:
+                continue
+            razao = matcher.ratio()
+            if razao >= melhor_razao:
+                melhor, melhor_razao = chave, razao
+        return melhor
+
+    def mapear_campos(self, kv_map: dict) -> dict:
+        """
+        Associa as chaves extraídas aos campos do template: primeiro pela
+        chave exata, depois pela chave normalizada (ou sinônimo) e, por fim,
+        por aproximação. Retorna um dicionário campo -> valor.
+        """
+        mapeado = {}
+        exatas = set()
+        for chave, valor in kv_map.items():
+            if chave in self.chaves:
+                # A chave exata tem prioridade sobre as variantes
+                mapeado[chave] = valor
+                exatas.add(chave)
+                continue
+            normalizada = normalizar_chave(chave)
+            campo = self._por_chave_normalizada.get(normalizada)
+            if campo is None and self.fuzzy_ativo:
+                campo = self._chave_aproximada(normalizada)
+            if campo is not None and campo not in exatas and campo not in mapeado:
+                mapeado[campo] = valor
+        return mapeado
+
+    def eh_cabecalho(self, texto: str) -> bool:
+        return normalizar_chave(texto) in self.cabecalhos
+
+    def filtrar_linhas(self, linhas: list) -> list:
+        """
+        Mantém as linhas da tabela cuja coluna de filtro contém o texto
+        esperado (ex.: 'R$' no prêmio).
+        """
+        if not self.filtro_coluna:
+            return [linha for linha in linhas if isinstance(linha, dict)]
+        return [linha for linha in linhas
+                if isinstance(linha, dict) and self.filtro_coluna in linha and
+                self.filtro_contem in str(linha[self.filtro_coluna])]
+
+
+class RegistroTemplates:
+    """
+    Registro dos templates de extração, compilados uma vez (no startup).
+
+    A classificação de uma página percorre o seu texto uma única vez,
+    buscando ao mesmo tempo os termos de todos os templates.
+    """
+
+    def __init__(self, diretorio=TEMPLATES_DIRETORIO, padrao=TEMPLATE_PADRAO):
+        self.diretorio = diretorio
+        self.nome_padrao = padrao
+        self.templates = {}
+        # Hash das definições carregadas (ver 'versao')
+        self._versao = None
+        self._automato = None
+        # Índice do termo -> templates que o usam
+        self._templates_por_termo = []
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        """
+        Lê e compila todos os templates do diretório.
+        """
+        templates = {}
+        versao = hashlib.sha256(self.nome_padrao.encode("utf-8"))
+        for arquivo in sorted(os.listdir(self.diretorio)):
+            if not arquivo.endswith(".json"):
+                continue
+            caminho = os.path.join(self.diretorio, arquivo)
+            with open(caminho, "r", encoding="utf-8") as f:
+                definicao = json.load(f)
+            try:
+                template = Template(definicao)
+            except KeyError as e:
+                raise ValueError(f"Template inválido em {caminho}: campo {e} ausente")
+            templates[template.nome] = template
+            # Forma canônica: só mudanças na definição alteram a versão
+            versao.update(json.dumps(definicao, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+        if self.nome_padrao not in templates:
+            raise ValueError(
+                f"Template padrão '{self.nome_padrao}' não encontrado em {self.diretorio}")
+
+        termos = {}
+        for template in templates.values():
+            for termo in set(template.termos):
+                termos.setdefault(termo, []).append(template)
+
+        automato = MultiPadroes(list(termos.keys()))
+        with self._lock:
+            # 'templates' por último: quem lê sem o lock só o vê preenchido
+            # depois que o autômato está pronto
+            self._templates_por_termo = list(termos.values())
+            self._automato = automato
+            self._versao = versao.hexdigest()[:16]
+            self.templates = templates
+        logger.info("Templates de extração carregados",
+                    extra={"campos": {"templates": list(templates), "versao": self._versao}})
+
+    def _garantir_carregado(self):
+        # Fora da aplicação (jobs, scripts), carrega no primeiro uso
+        if not self.templates:
+            self.carregar()
+
+    def versao(self) -> str:
+        """
+        Hash das definições dos templates carregados. Entra na chave do
+        cache de documentos: editar um template invalida os resultados
+        extraídos com a versão anterior.
+        """
+        self._garantir_carregado()
+        return self._versao
+
+    def obter(self, nome: str) -> Template:
+        self._garantir_carregado()
+        return self.templates[nome]
+
+    def padrao(self) -> Template:
+        return self.obter(self.nome_padrao)
+
+    def classificar(self, textos) -> Template:
+        """
+        Escolhe o template da página pelos termos encontrados no seu texto
+        (linhas). Sem nenhum template reconhecido, retorna o padrão.
+        """
+        self._garantir_carregado()
+        texto = normalizar_token("\n".join(textos))
+
+        pontuacao = {}
+        for indice in self._automato.buscar(texto):
+            for template in self._templates_por_termo[indice]:
+                pontuacao[template.nome] = pontuacao.get(template.nome, 0) + 1
+
+        melhor = None
+        for nome, pontos in pontuacao.items():
+            template = self.templates[nome]
+            if pontos >= template.minimo_termos and \
+                    (melhor is None or pontos > pontuacao[melhor.nome]):
+                melhor = template
+        return melhor or self.padrao()
+
+    def resumo(self) -> list:
+        self._garantir_carregado()
+        return [{"nome": t.nome, "descricao": t.descricao, "campos": list(t.chaves),
+                 "colunas": list(t.colunas), "itens": len(t.itens)}
+                for t in self.templates.values()]
+
+
+# Instância única por processo
+registro_templates = RegistroTemplates()
@@ -0,0 +1,172 @@
+# assincrono.py
+#
+# Backend assíncrono do Textract para PDFs grandes: o PDF original vai uma
+# única vez para o S3, é analisado por StartDocumentAnalysis e os blocos
+# são lidos com GetDocumentAnalysis (paginado por NextToken). Cada página
+# é entregue ao parser assim que todos os seus blocos chegaram, sem
+# esperar o documento inteiro.
+
+import os
+import time
+
+from services.aws import clientes_aws
+from services.bucket import S3_BUCKET, enviar_objeto, remover_objeto
+from services.logs import obter_logger
+from services.metricas import OCR, observar_etapa
+
+from .textract import FEATURE_TYPES
+
+
+logger = obter_logger("textract.assincrono")
+
+# Configurações do modo assíncrono (ajustáveis por variável de ambiente)
+# A partir de quantas páginas o documento usa o modo assíncrono
+TEXTRACT_ASYNC_MIN_PAGINAS = int(os.environ.get("TEXTRACT_ASYNC_MIN_PAGINAS", "10"))
+# Limite de páginas por documento do StartDocumentAnalysis
+TEXTRACT_ASYNC_MAX_PAGINAS = int(os.environ.get("TEXTRACT_ASYNC_MAX_PAGINAS", "3000"))
+# Intervalo (s) entre as consultas do status, dobrando até o máximo
+TEXTRACT_ASYNC_INTERVALO = float(os.environ.get("TEXTRACT_ASYNC_INTERVALO", "1.0"))
+TEXTRACT_ASYNC_INTERVALO_MAX = float(os.environ.get("TEXTRACT_ASYNC_INTERVALO_MAX", "5.0"))
+# Tempo máximo (s) de espera pela conclusão da análise
+TEXTRACT_ASYNC_TIMEOUT = float(os.environ.get("TEXTRACT_ASYNC_TIMEOUT", "900"))
+# Blocos por chamada GetDocumentAnalysis (máximo da API: 1000)
+TEXTRACT_ASYNC_MAX_RESULTADOS = int(os.environ.get("TEXTRACT_ASYNC_MAX_RESULTADOS", "1000"))
+# Mantém o PDF no bucket depois da análise
+S3_MANTER_PDF = os.environ.get("S3_MANTER_PDF", "true").lower() == "true"
+
+EM_ANDAMENTO = "IN_PROGRESS"
+CONCLUIDO = "SUCCEEDED"
+CONCLUIDO_PARCIAL = "PARTIAL_SUCCESS"
+
+
+class TextractAssincronoError(Exception):
+    """
+    Falha da análise assíncrona (job com erro, tempo esgotado ou página
+    ausente no resultado).
+    """
+
+
+def usar_modo_assincrono(paginas: int, bucket: str = S3_BUCKET) -> bool:
+    """
+    Decide o modo pelo número de páginas: documentos grandes vão inteiros
+    para o StartDocumentAnalysis (exige um bucket S3 configurado).
+    """
+    return bool(bucket) and TEXTRACT_ASYNC_MIN_PAGINAS <= paginas <= TEXTRACT_ASYNC_MAX_PAGINAS
+
+
+def iniciar_analise(localizacao: dict, textract=None) -> str:
+    """
+    Inicia a análise do documento no S3. Retorna o JobId.
+    """
+    if textract is None:
+        textract = clientes_aws.textract()
+    resposta = textract.start_document_analysis(
+        DocumentLocation={"S3Object": localizacao}, FeatureTypes=FEATURE_TYPES)
+    return resposta["JobId"]
+
+
+def aguardar_conclusao(job_id: str, textract=None, timeout: float = TEXTRACT_ASYNC_TIMEOUT,
+                       intervalo: float = TEXTRACT_ASYNC_INTERVALO) -> dict:
+    """
+    Consulta o job até a conclusão. Retorna a primeira página de resultados
+    (com os primeiros blocos e o NextToken).
+    """
+    if textract is None:
+        textract = clientes_aws.textract()
+    limite = time.monotonic() + timeout
+    while True:
+        resposta = textract.get_document_analysis(
+            JobId=job_id, MaxResults=TEXTRACT_ASYNC_MAX_RESULTADOS)
+        status = resposta.get("JobStatus")
+        if status in (CONCLUIDO, CONCLUIDO_PARCIAL):
+            if status == CONCLUIDO_PARCIAL:
+                logger.warning("Análise assíncrona concluída parcialmente", extra={"campos": {
+                    "job_id": job_id, "avisos": resposta.get("Warnings")}})
+            return resposta
+        if status != EM_ANDAMENTO:
+            raise TextractAssincronoError(
+                f"Análise {job_id} terminou com status {status}: {resposta.get('StatusMessage')}")
+        if time.monotonic() + intervalo > limite:
+            raise TextractAssincronoError(f"Análise {job_id} não concluída em {timeout}s")
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, TEXTRACT_ASYNC_INTERVALO_MAX)
+
+
+def respostas_por_pagina(job_id: str, primeira: dict, textract=None):
+    """
+    Lê os resultados paginados (NextToken) e gera (número da página, resposta
+    no formato do AnalyzeDocument com os blocos daquela página).
+
+    Os blocos chegam ordenados por página: uma página está completa quando
+    aparece um bloco da seguinte ou quando os resultados terminam.
+    """
+    if textract is None:
+        textract = clientes_aws.textract()
+
+    resposta = primeira
+    pagina_atual = None
+    blocos = []
+    while True:
+        for block in resposta.get("Blocks", ()):
+            pagina = block.get("Page", 1)
+            if pagina != pagina_atual:
+                if pagina_atual is not None:
+                    yield pagina_atual, _resposta_pagina(blocos)
+                pagina_atual = pagina
+                blocos = []
+            blocos.append(block)
+
+        token = resposta.get("NextToken")
+        if not token:
+            break
+        resposta = textract.get_document_analysis(
+            JobId=job_id, MaxResults=TEXTRACT_ASYNC_MAX_RESULTADOS, NextToken=token)
+
+    if pagina_atual is not None:
+        yield pagina_atual, _resposta_pagina(blocos)
+
+
+def _resposta_pagina(blocos: list) -> dict:
+    return {"DocumentMetadata": {"Pages": 1}, "Blocks": blocos}
+
+
+def analisar_pdf(conteudo, chave: str, paginas: int, bucket: str = S3_BUCKET,
+                 manter_pdf: bool = S3_MANTER_PDF, aws_config: dict = None):
+    """
+    Analisa o PDF inteiro no modo assíncrono. Gera, na ordem, (índice da
+    página a partir de 0, resposta da página), com a exceção no lugar da
+    resposta para as páginas ausentes do resultado.
+    """
+    regiao = (aws_config or {}).get("region")
+    textract = clientes_aws.textract(regiao)
+    s3 = clientes_aws.s3(regiao)
+
+    localizacao = enviar_objeto(conteudo, chave, bucket, s3=s3)
+    try:
+        inicio = time.perf_counter()
+        job_id = iniciar_analise(localizacao, textract)
+        logger.info("Análise assíncrona iniciada", extra={"campos": {
+            "job_id": job_id, "chave": chave, "paginas": paginas}})
+        primeira = aguardar_conclusao(job_id, textract)
+        observar_etapa(OCR, time.perf_counter() - inicio, modo="assincrono", paginas=paginas)
+
+        esperada = 1
+        for numero, response in respostas_por_pagina(job_id, primeira, textract):
+            if numero < esperada or numero > paginas:
+                continue
+            # Páginas sem blocos no resultado (ex.: falha parcial)
+            for ausente in range(esperada, numero):
+                yield ausente - 1, TextractAssincronoError(
+                    f"Página {ausente} ausente no resultado da análise {job_id}")
+            yield numero - 1, response
+            esperada = numero + 1
+
+        for ausente in range(esperada, paginas + 1):
+            yield ausente - 1, TextractAssincronoError(
+                f"Página {ausente} ausente no resultado da análise {job_id}")
+    finally:
+        if not manter_pdf:
+            try:
+                remover_objeto(chave, bucket, s3=s3)
+            except Exception:
+                logger.exception("Erro ao remover o PDF do S3", extra={"campos": {"chave": chave}})
@@ -0,0 +1,130 @@
+# busca.py
+#
+# Índice invertido das palavras (WORD) de um documento do Textract, para
+# buscar muitas palavras-chave sem varrer todos os blocos a cada uma.
+
+import unicodedata
+from collections import defaultdict
+
+# Tamanho dos n-gramas usados nas buscas parciais
+TAMANHO_NGRAMA = 3
+
+
+def normalizar_token(texto):
+    """
+    Normaliza o texto para a busca: minúsculas e sem acentos
+    ('Prêmio' e 'premio' são equivalentes).
+    """
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _ngramas(token, tamanho=TAMANHO_NGRAMA):
+    return {token[i:i + tamanho] for i in range(len(token) - tamanho + 1)}
+
+
+class IndicePalavras:
+    """
+    Índice invertido sobre tokens normalizados (minúsculas, sem acentos):
+
+    - token -> posições das palavras com esse texto (busca exata em O(1));
+    - n-grama -> tokens que o contêm, para a busca parcial: só os tokens
+      que têm todos os n-gramas da palavra-chave são verificados.
+
+    As palavras podem vir de várias respostas (uma por página).
+    """
+
+    def __init__(self, tamanho_ngrama=TAMANHO_NGRAMA):
+        self.tamanho_ngrama = tamanho_ngrama
+        # (bloco, página) na ordem em que foram adicionados
+        self.palavras = []
+        self._por_token = {}
+        self._ngramas = defaultdict(set)
+
+    def __len__(self):
+        return len(self.palavras)
+
+    def adicionar(self, word_blocks, pagina=None):
+        """
+        Indexa blocos WORD. 'pagina' substitui o 'Page' dos blocos (útil
+        quando cada página do PDF foi analisada como uma imagem separada).
+        """
+        palavras = self.palavras
+        por_token = self._por_token
+        ngramas = self._ngramas
+        tamanho = self.tamanho_ngrama
+        for block in word_blocks:
+            posicao = len(palavras)
+            palavras.append((block, block['Page'] if pagina is None else pagina))
+
+            token = normalizar_token(block['Text'])
+            posicoes = por_token.get(token)
+            if posicoes is None:
+                posicoes = por_token[token] = []
+                for i in range(len(token) - tamanho + 1):
+                    ngramas[token[i:i + tamanho]].add(token)
+            posicoes.append(posicao)
+
+    def _tokens_contendo(self, keyword):
+        """
+        Tokens do vocabulário que contêm a palavra-chave (já normalizada).
+        """
+        if len(keyword) < self.tamanho_ngrama:
+            # Palavra-chave curta: verifica o vocabulário (tokens únicos)
+            return [token for token in self._por_token if keyword in token]
+
+        candidatos = None
+        # Interseção começando pelos n-gramas mais raros
+        for conjunto in sorted((self._ngramas.get(ngrama, frozenset())
+                                for ngrama in _ngramas(keyword, self.tamanho_ngrama)), key=len):
+            candidatos = set(conjunto) if candidatos is None else candidatos & conjunto
+            if not candidatos:
+                return []
+        return [token for token in candidatos if keyword in token]
+
+    def buscar(self, keyword):
+        """
+        Palavras que contêm a palavra-chave, na ordem do documento, no mesmo
+        formato de 'find_keyword_blocks' (com 'match_type': 'partial' quando
+        a palavra apenas contém a palavra-chave).
+        """
+        keyword = normalizar_token(keyword)
+        exatas = set()
+        posicoes = []
+        for token in self._tokens_contendo(keyword):
+            if token == keyword:
+                exatas.update(self._por_token[token])
+            posicoes.extend(self._por_token[token])
+        posicoes.sort()
+
+        resultado = []
+        for posicao in posicoes:
+            block, pagina = self.palavras[posicao]
+            encontrado = {
+                'id': block['Id'],
+                'text': block['Text'],
+                'confidence': block['Confidence'],
+                'page': pagina,
+                'geometry': block['Geometry']
+            }
+            if posicao not in exatas:
+                encontrado['match_type'] = 'partial'
+            resultado.append(encontrado)
+        return resultado
+
+    def buscar_varias(self, keywords):
+        """
+        Busca várias palavras-chave. Retorna um dicionário keyword -> blocos.
+        Palavras-chave equivalentes após a normalização são resolvidas uma vez.
+        """
+        resolvidas = {}
+        resultado = {}
+        for keyword in keywords:
+            normalizada = normalizar_token(keyword)
+            if normalizada not in resolvidas:
+                resolvidas[normalizada] = self.buscar(keyword)
+            resultado[keyword] = resolvidas[normalizada]
+        return resultado
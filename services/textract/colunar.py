@@ -0,0 +1,673 @@
+# colunar.py
+#
+# Formato binário colunar das respostas do Textract, usado para arquivar as
+# respostas brutas (services/arquivo_respostas.py) e reprocessá-las sem
+# chamar o Textract de novo. Cada campo dos blocos é um array tipado (uma
+# posição por bloco), os textos ficam internados em uma tabela de strings
+# (cada texto distinto aparece uma vez) e os relacionamentos em tabelas de
+# offsets (CSR). O arquivo é lido por mmap, sem cópia, e o DocumentoColunar
+# oferece ao parser a mesma interface do TextractDocument: os blocos são
+# visões sobre as colunas, criadas apenas quando acessadas, sem um
+# dicionário por bloco.
+#
+# Layout (little-endian na prática: a ordem dos bytes da máquina que gravou
+# fica no cabeçalho e é convertida na leitura, se diferente):
+#   MAGICA (8 bytes) | versão (u16) | reservado (u16) | tamanho do cabeçalho (u32)
+#   cabeçalho JSON (contagens, categorias, posição de cada seção)
+#   seções alinhadas em 8 bytes (arrays tipados e tabelas de strings)
+#
+# O formato é sem perdas: coordenadas e confianças ficam em float64, o
+# Polygon em uma tabela de offsets (CSR) de pares X, Y, e o que não cabe
+# nas colunas (campos desconhecidos dos blocos, geometrias fora do padrão,
+# listas vazias, chaves da resposta além de Blocks e DocumentMetadata) vai
+# para uma seção JSON de extras. A resposta é reconstruída inteira.
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import repeat
+from operator import itemgetter
+
+from .document import TextractDocument
+
+
+MAGICA = b"TXTRCOL\x00"
+VERSAO = 2
+# Versões que o leitor abre (a 1 guardava só a BoundingBox, em float32)
+VERSOES_SUPORTADAS = (1, 2)
+_PREFIXO = struct.Struct("<8sHHI")
+_ALINHAMENTO = 8
+# Separador das tabelas de strings (o Textract não devolve NUL nos textos)
+_SEPARADOR = "\x00"
+_NAN = float("nan")
+
+# Campos numéricos das células: (campo, seção, tipo do array)
+_CAMPOS_CELULA = (('RowIndex', 'linha', 'I'), ('ColumnIndex', 'coluna', 'I'),
+                  ('RowSpan', 'span_linhas', 'I'), ('ColumnSpan', 'span_colunas', 'I'))
+# Campos guardados nas colunas; os demais vão para os extras do bloco
+_CAMPOS_COLUNAS = frozenset(('Id', 'BlockType', 'Text', 'TextType', 'SelectionStatus',
+                             'Confidence', 'Page', 'Geometry', 'EntityTypes', 'Relationships',
+                             *(campo for campo, _, _ in _CAMPOS_CELULA)))
+# Campos cujo valor vazio (0 ou []) as colunas leem como ausente
+_CAMPOS_NAO_VAZIOS = ('Page', 'EntityTypes', 'Relationships',
+                      *(campo for campo, _, _ in _CAMPOS_CELULA))
+_CAIXA = frozenset(('Left', 'Top', 'Width', 'Height'))
+_PONTO = frozenset(('X', 'Y'))
+
+
+def _categoria(categorias, valor):
+    """
+    Código (a partir de 1) do valor na lista de categorias; 0 = ausente.
+    """
+    if valor is None:
+        return 0
+    try:
+        return categorias.index(valor) + 1
+    except ValueError:
+        categorias.append(valor)
+        return len(categorias)
+
+
+def _geometria_colunar(geometria) -> bool:
+    """
+    Geometria no formato das colunas: BoundingBox completa e, se houver,
+    Polygon não vazio de pontos X, Y.
+    """
+    if not isinstance(geometria, dict) or not geometria.keys() <= {'BoundingBox', 'Polygon'}:
+        return False
+    bbox = geometria.get('BoundingBox')
+    if not isinstance(bbox, dict) or bbox.keys() != _CAIXA:
+        return False
+    poligono = geometria.get('Polygon', [{'X': 0, 'Y': 0}])
+    return isinstance(poligono, list) and bool(poligono) and all(
+        isinstance(ponto, dict) and ponto.keys() == _PONTO for ponto in poligono)
+
+
+def _tabela_strings(textos) -> bytes:
+    return _SEPARADOR.join(texto.replace(_SEPARADOR, "�") for texto in textos).encode("utf-8")
+
+
+def codificar(response) -> bytes:
+    """
+    Converte uma resposta do Textract (dict ou TextractDocument) para o
+    formato colunar.
+    """
+    if isinstance(response, DocumentoColunar):
+        return bytes(response.buffer)
+    if isinstance(response, TextractDocument):
+        response = response.response
+    blocks = response.get('Blocks', [])
+    n = len(blocks)
+
+    ids = [block['Id'] for block in blocks]
+    indice = dict(zip(ids, range(n)))
+    if len(indice) != n:
+        raise ValueError("Resposta com Ids de blocos repetidos")
+
+    tipos, text_types, selecoes, entidades, relacoes = [], [], [], [], []
+    textos = {}
+
+    tipo = array('B')
+    pagina = array('I')
+    confianca = array('d')
+    caixa = array('d')
+    poligono_inicio = array('I', [0])
+    poligono = array('d')
+    texto = array('i')
+    text_type = array('B')
+    selecao = array('B')
+    mascara = array('I')
+    celulas = {secao: array(formato) for _, secao, formato in _CAMPOS_CELULA}
+    rel_inicio = array('I', [0])
+    rel_tipo = array('B')
+    rel_alvos_inicio = array('I', [0])
+    alvos = array('I')
+    # Posição do bloco -> campos fora das colunas
+    extras = {}
+
+    for posicao_bloco, block in enumerate(blocks):
+        extras_bloco = {campo: valor for campo, valor in block.items()
+                        if campo not in _CAMPOS_COLUNAS}
+        for campo in _CAMPOS_NAO_VAZIOS:
+            if campo in block and not block[campo]:
+                extras_bloco[campo] = block[campo]
+        # Valores de tipo inesperado também ficam fora das colunas
+        if 'Text' in block and not isinstance(block['Text'], str):
+            extras_bloco['Text'] = block['Text']
+        if 'Confidence' in block and not isinstance(block['Confidence'], (int, float)):
+            extras_bloco['Confidence'] = block['Confidence']
+        codigo = _categoria(tipos, block['BlockType']) - 1
+        if codigo > 255:
+            raise ValueError("Tipos de bloco demais para o formato colunar")
+        tipo.append(codigo)
+        pagina.append(block.get('Page') or 0)
+        confianca.append(_NAN if 'Confidence' in extras_bloco
+                         else block.get('Confidence', _NAN))
+        geometria = block.get('Geometry')
+        if geometria is not None and not _geometria_colunar(geometria):
+            extras_bloco['Geometry'] = geometria
+            geometria = None
+        if geometria is None:
+            caixa.extend((_NAN, _NAN, _NAN, _NAN))
+        else:
+            bbox = geometria['BoundingBox']
+            caixa.extend((bbox['Left'], bbox['Top'], bbox['Width'], bbox['Height']))
+            for ponto in geometria.get('Polygon', ()):
+                poligono.extend((ponto['X'], ponto['Y']))
+        poligono_inicio.append(len(poligono) // 2)
+        if extras_bloco:
+            extras[posicao_bloco] = extras_bloco
+
+        valor = None if 'Text' in extras_bloco else block.get('Text')
+        if valor is None:
+            texto.append(-1)
+        else:
+            posicao = textos.get(valor)
+            if posicao is None:
+                posicao = textos[valor] = len(textos)
+            texto.append(posicao)
+        text_type.append(_categoria(text_types, block.get('TextType')))
+        selecao.append(_categoria(selecoes, block.get('SelectionStatus')))
+
+        bits = 0
+        for entidade in block.get('EntityTypes', ()):
+            bits |= 1 << (_categoria(entidades, entidade) - 1)
+        if len(entidades) > 32:
+            raise ValueError("EntityTypes demais para o formato colunar")
+        mascara.append(bits)
+
+        for campo, secao, _ in _CAMPOS_CELULA:
+            celulas[secao].append(block.get(campo) or 0)
+
+        for relationship in block.get('Relationships', ()):
+            codigo = _categoria(relacoes, relationship['Type']) - 1
+            if codigo > 255:
+                raise ValueError("Tipos de relacionamento demais para o formato colunar")
+            rel_tipo.append(codigo)
+            for alvo in relationship['Ids']:
+                posicao = indice.get(alvo)
+                if posicao is None:
+                    # Id sem bloco na resposta: entra na tabela depois dos blocos
+                    posicao = indice[alvo] = len(ids)
+                    ids.append(alvo)
+                alvos.append(posicao)
+            rel_alvos_inicio.append(len(alvos))
+        rel_inicio.append(len(rel_tipo))
+
+    # Blocos agrupados por tipo (na ordem original dentro de cada tipo)
+    por_tipo = array('I')
+    faixas = {}
+    grupos = [[] for _ in tipos]
+    for posicao, codigo in enumerate(tipo):
+        grupos[codigo].append(posicao)
+    for nome, grupo in zip(tipos, grupos):
+        faixas[nome] = [len(por_tipo), len(por_tipo) + len(grupo)]
+        por_tipo.extend(grupo)
+
+    secoes = [
+        ('tipo', tipo), ('por_tipo', por_tipo), ('pagina', pagina),
+        ('confianca', confianca), ('caixa', caixa),
+        ('poligono_inicio', poligono_inicio), ('poligono', poligono), ('texto', texto),
+        ('text_type', text_type), ('selecao', selecao), ('entidades', mascara),
+        *((secao, celulas[secao]) for _, secao, _ in _CAMPOS_CELULA),
+        ('rel_inicio', rel_inicio), ('rel_tipo', rel_tipo),
+        ('rel_alvos_inicio', rel_alvos_inicio), ('alvos', alvos),
+        ('ids', _tabela_strings(ids)), ('textos', _tabela_strings(textos)),
+        ('extras', json.dumps(extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+    ]
+    cabecalho = {
+        "ordem": sys.byteorder,
+        "blocos": n,
+        "ids": len(ids),
+        "textos": len(textos),
+        "categorias": {"tipo": tipos, "text_type": text_types, "selecao": selecoes,
+                       "entidades": entidades, "relacao": relacoes},
+        "faixas_tipo": faixas,
+        "metadados": response.get('DocumentMetadata'),
+        "resposta": {chave: valor for chave, valor in response.items()
+                     if chave not in ('Blocks', 'DocumentMetadata')},
+        "secoes": {},
+    }
+
+    # As posições das seções dependem do tamanho do cabeçalho: calcula com
+    # espaço reservado e ajusta até estabilizar
+    tamanho_cabecalho = 0
+    while True:
+        posicao = _alinhar(_PREFIXO.size + tamanho_cabecalho)
+        for nome, dados in secoes:
+            formato = dados.typecode if isinstance(dados, array) else 'B'
+            cabecalho["secoes"][nome] = [posicao, formato, len(dados)]
+            posicao = _alinhar(posicao + len(dados) * (dados.itemsize if isinstance(dados, array) else 1))
+        json_cabecalho = json.dumps(cabecalho, ensure_ascii=False, separators=(",", ":")).encode()
+        if len(json_cabecalho) <= tamanho_cabecalho:
+            break
+        tamanho_cabecalho = len(json_cabecalho) + 64
+
+    saida = bytearray(_PREFIXO.pack(MAGICA, VERSAO, 0, tamanho_cabecalho))
+    saida += json_cabecalho.ljust(tamanho_cabecalho)
+    for nome, dados in secoes:
+        saida += bytes(cabecalho["secoes"][nome][0] - len(saida))
+        saida += dados.tobytes() if isinstance(dados, array) else dados
+    return bytes(saida)
+
+
+def _alinhar(posicao):
+    return (posicao + _ALINHAMENTO - 1) // _ALINHAMENTO * _ALINHAMENTO
+
+
+def decodificar(dados) -> "DocumentoColunar":
+    """
+    DocumentoColunar sobre bytes já em memória (sem cópia).
+    """
+    return DocumentoColunar(dados)
+
+
+def carregar(caminho: str) -> "DocumentoColunar":
+    """
+    Abre um arquivo no formato colunar por mmap (somente leitura): as
+    colunas são lidas direto das páginas do arquivo, sem cópia.
+    """
+    with open(caminho, "rb") as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+    return DocumentoColunar(mapa)
+
+
+class Bloco(Mapping):
+    """
+    Visão de um bloco do DocumentoColunar com a interface de leitura do
+    dict do Textract (bloco['Text'], bloco.get('EntityTypes'), 'Geometry'
+    in bloco...). Os campos são lidos das colunas a cada acesso.
+    """
+
+    __slots__ = ('_documento', '_indice')
+
+    def __init__(self, documento, indice):
+        self._documento = documento
+        self._indice = indice
+
+    def __getitem__(self, campo):
+        extras = self._documento.extras
+        if extras:
+            extras = extras.get(self._indice)
+            if extras is not None and campo in extras:
+                return extras[campo]
+        leitor = _LEITORES.get(campo)
+        if leitor is None:
+            raise KeyError(campo)
+        return leitor(self._documento, self._indice)
+
+    def __iter__(self):
+        for campo in _LEITORES:
+            if campo in self:
+                yield campo
+        for campo in self._documento.extras.get(self._indice, ()):
+            if campo not in _LEITORES:
+                yield campo
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Bloco({dict(self)!r})"
+
+
+class _Blocos(Sequence):
+    """
+    Sequência de blocos (visões) nas posições informadas.
+    """
+
+    __slots__ = ('_documento', '_posicoes')
+
+    def __init__(self, documento, posicoes):
+        self._documento = documento
+        self._posicoes = posicoes
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [Bloco(self._documento, posicao) for posicao in self._posicoes[indice]]
+        return Bloco(self._documento, self._posicoes[indice])
+
+    def __iter__(self):
+        return map(Bloco, repeat(self._documento), self._posicoes)
+
+
+class _PorId(Mapping):
+    """
+    Mapa Id -> bloco (visão), sobre o índice de Ids do documento.
+    """
+
+    __slots__ = ('_documento',)
+
+    def __init__(self, documento):
+        self._documento = documento
+
+    def __getitem__(self, block_id):
+        return Bloco(self._documento, self._documento.indice[block_id])
+
+    def get(self, block_id, padrao=None):
+        posicao = self._documento.indice.get(block_id)
+        return padrao if posicao is None else Bloco(self._documento, posicao)
+
+    def __contains__(self, block_id):
+        return block_id in self._documento.indice
+
+    def __iter__(self):
+        return iter(self._documento.indice)
+
+    def __len__(self):
+        return len(self._documento.indice)
+
+
+class _Relacoes(Mapping):
+    """
+    Mapa Id -> Ids relacionados (de um tipo de relacionamento), lido da
+    tabela de offsets; só tem entrada quem tem o relacionamento, como os
+    mapas do TextractDocument.
+    """
+
+    __slots__ = ('_documento', '_codigo')
+
+    def __init__(self, documento, tipo):
+        self._documento = documento
+        relacoes = documento.categorias["relacao"]
+        self._codigo = relacoes.index(tipo) if tipo in relacoes else -1
+
+    def get(self, block_id, padrao=None):
+        documento = self._documento
+        posicao = documento.indice.get(block_id)
+        if posicao is None or self._codigo < 0:
+            return padrao
+        alvos = documento.relacionados(posicao, self._codigo)
+        return alvos if alvos else padrao
+
+    def __getitem__(self, block_id):
+        alvos = self.get(block_id)
+        if alvos is None:
+            raise KeyError(block_id)
+        return alvos
+
+    def __iter__(self):
+        documento = self._documento
+        for posicao in range(documento.n_blocos):
+            if documento.relacionados(posicao, self._codigo):
+                yield documento.ids[posicao]
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class DocumentoColunar(TextractDocument):
+    """
+    Resposta do Textract no formato colunar, com a interface do
+    TextractDocument (blocks_of, child_ids, value_ids, word_map,
+    line_index, tabelas...): pode ser passada diretamente às funções de
+    services/textract/parser.py.
+
+    As colunas são memoryviews sobre o buffer (bytes ou mmap); apenas as
+    tabelas de strings (Ids e textos) são decodificadas, uma vez e em uma
+    única operação cada. Os mapas word_map/line_map são montados das
+    colunas, sem passar por blocos.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        visao = memoryview(buffer)
+        magica, versao, _, tamanho = _PREFIXO.unpack_from(visao, 0)
+        if magica != MAGICA:
+            raise ValueError("Arquivo não está no formato colunar do Textract")
+        if versao not in VERSOES_SUPORTADAS:
+            raise ValueError(f"Versão {versao} do formato colunar não suportada")
+        cabecalho = json.loads(bytes(visao[_PREFIXO.size:_PREFIXO.size + tamanho]))
+        self.cabecalho = cabecalho
+        self.categorias = cabecalho["categorias"]
+        self.n_blocos = cabecalho["blocos"]
+        self.metadados = cabecalho["metadados"]
+        self.resposta_extras = cabecalho.get("resposta") or {}
+        troca = cabecalho["ordem"] != sys.byteorder
+
+        colunas = {}
+        for nome, (posicao, formato, comprimento) in cabecalho["secoes"].items():
+            tamanho_item = array(formato).itemsize
+            secao = visao[posicao:posicao + comprimento * tamanho_item]
+            if formato == 'B':
+                colunas[nome] = secao
+            elif troca:
+                convertida = array(formato, bytes(secao))
+                convertida.byteswap()
+                colunas[nome] = convertida
+            else:
+                colunas[nome] = secao.cast(formato)
+        self._colunas = colunas
+        # Arquivos da versão 1 (com perdas) não têm Polygon nem extras
+        self._poligono_inicio = colunas.get('poligono_inicio')
+        self._poligono = colunas.get('poligono')
+        self.extras = {int(posicao): campos for posicao, campos
+                       in json.loads(bytes(colunas['extras'])).items()} \
+            if 'extras' in colunas else {}
+        for nome in ('tipo', 'por_tipo', 'pagina', 'confianca', 'caixa', 'texto', 'text_type',
+                     'selecao', 'entidades', 'rel_inicio', 'rel_tipo', 'rel_alvos_inicio',
+                     'alvos'):
+            setattr(self, '_' + nome, colunas[nome])
+
+        self.ids = self._strings(colunas['ids'], cabecalho["ids"])
+        self.textos = self._strings(colunas['textos'], cabecalho["textos"])
+        self._indice = None
+        self._por_tipo_cache = {}
+
+        self.blocks = _Blocos(self, range(self.n_blocos))
+        self.by_id = _PorId(self)
+        self.children = _Relacoes(self, 'CHILD')
+        self.values = _Relacoes(self, 'VALUE')
+        self._parents = None
+
+        self._response = None
+        self._word_map = None
+        self._line_map = None
+        self._line_index = None
+        self._word_index = None
+        self._tabelas = None
+
+    @staticmethod
+    def _strings(secao, quantidade):
+        if not quantidade:
+            return []
+        return bytes(secao).decode("utf-8").split(_SEPARADOR)
+
+    def __len__(self):
+        return self.n_blocos
+
+    @property
+    def indice(self):
+        """
+        Mapa Id -> posição do bloco (montado na primeira consulta por Id).
+        """
+        if self._indice is None:
+            self._indice = dict(zip(self.ids, range(self.n_blocos)))
+        return self._indice
+
+    def relacionados(self, posicao, codigo):
+        """
+        Ids relacionados ao bloco na posição, pelo relacionamento de código informado.
+        """
+        ids = self.ids
+        alvos = self._alvos
+        inicio_alvos = self._rel_alvos_inicio
+        rel_tipo = self._rel_tipo
+        resultado = []
+        for grupo in range(self._rel_inicio[posicao], self._rel_inicio[posicao + 1]):
+            if rel_tipo[grupo] == codigo:
+                resultado.extend(map(ids.__getitem__,
+                                     alvos[inicio_alvos[grupo]:inicio_alvos[grupo + 1]]))
+        return resultado
+
+    @property
+    def parents(self):
+        if self._parents is None:
+            parents = {}
+            codigo = self.categorias["relacao"].index('CHILD') \
+                if 'CHILD' in self.categorias["relacao"] else -1
+            for posicao in range(self.n_blocos):
+                block_id = self.ids[posicao]
+                for child_id in self.relacionados(posicao, codigo):
+                    parents.setdefault(child_id, []).append(block_id)
+            self._parents = parents
+        return self._parents
+
+    def _posicoes(self, block_type):
+        faixa = self.cabecalho["faixas_tipo"].get(block_type)
+        if faixa is None:
+            return ()
+        return self._por_tipo[faixa[0]:faixa[1]]
+
+    def blocks_of(self, block_type):
+        blocos = self._por_tipo_cache.get(block_type)
+        if blocos is None:
+            blocos = self._por_tipo_cache[block_type] = list(
+                _Blocos(self, self._posicoes(block_type)))
+        return blocos
+
+    def _mapa_textos(self, block_type):
+        posicoes = self._posicoes(block_type)
+        if not posicoes:
+            return {}
+        indices_texto = itemgetter(*posicoes)(self._texto) if len(posicoes) > 1 \
+            else (self._texto[posicoes[0]],)
+        if min(indices_texto) < 0:
+            pares = [(self.ids[p], self.textos[t]) for p, t in zip(posicoes, indices_texto)
+                     if t >= 0]
+            return dict(pares)
+        return dict(zip(map(self.ids.__getitem__, posicoes),
+                        map(self.textos.__getitem__, indices_texto)))
+
+    @property
+    def word_map(self):
+        if self._word_map is None:
+            self._word_map = self._mapa_textos('WORD')
+        return self._word_map
+
+    @property
+    def line_map(self):
+        if self._line_map is None:
+            self._line_map = self._mapa_textos('LINE')
+        return self._line_map
+
+    @property
+    def response(self):
+        """
+        Resposta no formato do Textract (dicts), montada sob demanda para
+        quem precisa da resposta bruta.
+        """
+        if self._response is None:
+            self._response = self.para_resposta()
+        return self._response
+
+    def para_resposta(self) -> dict:
+        resposta = {'Blocks': [dict(bloco) for bloco in self.blocks]}
+        if self.metadados is not None:
+            resposta['DocumentMetadata'] = self.metadados
+        resposta.update(self.resposta_extras)
+        return resposta
+
+
+def _ler_id(documento, i):
+    return documento.ids[i]
+
+
+def _ler_tipo(documento, i):
+    return documento.categorias["tipo"][documento._tipo[i]]
+
+
+def _ler_texto(documento, i):
+    posicao = documento._texto[i]
+    if posicao < 0:
+        raise KeyError('Text')
+    return documento.textos[posicao]
+
+
+def _ler_pagina(documento, i):
+    pagina = documento._pagina[i]
+    if not pagina:
+        raise KeyError('Page')
+    return pagina
+
+
+def _ler_confianca(documento, i):
+    confianca = documento._confianca[i]
+    if confianca != confianca:
+        raise KeyError('Confidence')
+    return confianca
+
+
+def _ler_geometria(documento, i):
+    left, top, width, height = documento._caixa[4 * i:4 * i + 4]
+    if left != left:
+        raise KeyError('Geometry')
+    geometria = {'BoundingBox': {'Left': left, 'Top': top, 'Width': width, 'Height': height}}
+    if documento._poligono_inicio is not None:
+        inicio, fim = documento._poligono_inicio[i], documento._poligono_inicio[i + 1]
+        if inicio != fim:
+            coordenadas = documento._poligono[2 * inicio:2 * fim]
+            geometria['Polygon'] = [{'X': x, 'Y': y}
+                                    for x, y in zip(coordenadas[::2], coordenadas[1::2])]
+    return geometria
+
+
+def _leitor_categoria(campo, secao, categoria):
+    def ler(documento, i):
+        codigo = documento._colunas[secao][i]
+        if not codigo:
+            raise KeyError(campo)
+        return documento.categorias[categoria][codigo - 1]
+    return ler
+
+
+def _ler_entidades(documento, i):
+    bits = documento._entidades[i]
+    if not bits:
+        raise KeyError('EntityTypes')
+    return [nome for posicao, nome in enumerate(documento.categorias["entidades"])
+            if bits >> posicao & 1]
+
+
+def _leitor_celula(campo, secao):
+    def ler(documento, i):
+        valor = documento._colunas[secao][i]
+        if not valor:
+            raise KeyError(campo)
+        return valor
+    return ler
+
+
+def _ler_relacoes(documento, i):
+    inicio, fim = documento._rel_inicio[i], documento._rel_inicio[i + 1]
+    if inicio == fim:
+        raise KeyError('Relationships')
+    ids = documento.ids
+    alvos = documento._alvos
+    inicio_alvos = documento._rel_alvos_inicio
+    return [{'Type': documento.categorias["relacao"][documento._rel_tipo[grupo]],
+             'Ids': list(map(ids.__getitem__,
+                             alvos[inicio_alvos[grupo]:inicio_alvos[grupo + 1]]))}
+            for grupo in range(inicio, fim)]
+
+
+# Campo do bloco -> leitor a partir das colunas (na ordem dos blocos do Textract)
+_LEITORES = {
+    'Id': _ler_id,
+    'BlockType': _ler_tipo,
+    'Text': _ler_texto,
+    'TextType': _leitor_categoria('TextType', 'text_type', 'text_type'),
+    'SelectionStatus': _leitor_categoria('SelectionStatus', 'selecao', 'selecao'),
+    'Confidence': _ler_confianca,
+    'Page': _ler_pagina,
+    'Geometry': _ler_geometria,
+    'EntityTypes': _ler_entidades,
+    **{campo: _leitor_celula(campo, secao) for campo, secao, _ in _CAMPOS_CELULA},
+    'Relationships': _ler_relacoes,
+}
@@ -0,0 +1,151 @@
+# document.py
+
+from .busca import IndicePalavras
+from .indice_linhas import IndiceLinhas
+from .tabela import montar_tabelas
+
+
+class TextractDocument:
+    """
+    Representação indexada de uma resposta do Textract.
+
+    Construída uma única vez por resposta: mantém um índice Id -> bloco,
+    listas de blocos por BlockType e as tabelas de adjacência (filhos,
+    valores e pais) derivadas de 'Relationships'. Assim as funções do
+    parser resolvem relacionamentos em O(1) em vez de varrer todos os blocos.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.blocks = response.get('Blocks', [])
+
+        self.by_id = {}
+        self.by_type = {}
+        self.children = {}
+        self.values = {}
+        self.parents = {}
+
+        self._word_map = None
+        self._line_map = None
+        self._line_index = None
+        self._word_index = None
+        self._tabelas = None
+
+        # Passada única sobre os blocos
+        for block in self.blocks:
+            block_id = block['Id']
+            self.by_id[block_id] = block
+            self.by_type.setdefault(block['BlockType'], []).append(block)
+
+            for relationship in block.get('Relationships', []):
+                if relationship['Type'] == 'CHILD':
+                    self.children.setdefault(
+                        block_id, []).extend(relationship['Ids'])
+                    for child_id in relationship['Ids']:
+                        self.parents.setdefault(child_id, []).append(block_id)
+                elif relationship['Type'] == 'VALUE':
+                    self.values.setdefault(
+                        block_id, []).extend(relationship['Ids'])
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Retorna um TextractDocument para a resposta informada.
+        Se já for um TextractDocument, devolve a própria instância.
+        """
+        if isinstance(response, cls):
+            return response
+        return cls(response)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def get(self, block_id):
+        """
+        Retorna o bloco com o Id informado (ou None).
+        """
+        return self.by_id.get(block_id)
+
+    def blocks_of(self, block_type):
+        """
+        Retorna os blocos de um determinado BlockType, na ordem original.
+        """
+        return self.by_type.get(block_type, [])
+
+    def child_ids(self, block_id):
+        """
+        Retorna os Ids dos filhos (relacionamento CHILD) de um bloco.
+        """
+        return self.children.get(block_id, [])
+
+    def value_ids(self, block_id):
+        """
+        Retorna os Ids dos blocos de valor (relacionamento VALUE) de uma chave.
+        """
+        return self.values.get(block_id, [])
+
+    def relationship_groups(self, block_id, relationship_type):
+        """
+        Retorna, na ordem original, a lista de Ids de cada relacionamento
+        do tipo informado (sem juntar os relacionamentos repetidos).
+        """
+        block = self.by_id.get(block_id)
+        if block is None:
+            return []
+        return [relationship['Ids'] for relationship in block.get('Relationships', [])
+                if relationship['Type'] == relationship_type]
+
+    def parent_ids(self, block_id):
+        """
+        Retorna os Ids dos blocos que têm este bloco como filho.
+        """
+        return self.parents.get(block_id, [])
+
+    @property
+    def word_map(self):
+        """
+        Mapa Id -> texto dos blocos WORD (calculado uma vez).
+        """
+        if self._word_map is None:
+            self._word_map = {
+                block['Id']: block['Text'] for block in self.blocks_of('WORD')}
+        return self._word_map
+
+    @property
+    def line_map(self):
+        """
+        Mapa Id -> texto dos blocos LINE (calculado uma vez).
+        """
+        if self._line_map is None:
+            self._line_map = {
+                block['Id']: block['Text'] for block in self.blocks_of('LINE')}
+        return self._line_map
+
+    @property
+    def line_index(self):
+        """
+        Índice espacial dos blocos LINE (calculado uma vez).
+        """
+        if self._line_index is None:
+            self._line_index = IndiceLinhas(self.blocks_of('LINE'))
+        return self._line_index
+
+    @property
+    def word_index(self):
+        """
+        Índice invertido dos blocos WORD (calculado uma vez).
+        """
+        if self._word_index is None:
+            self._word_index = IndicePalavras()
+            self._word_index.adicionar(self.blocks_of('WORD'))
+        return self._word_index
+
+    @property
+    def tabelas(self):
+        """
+        Tabelas (TABLE) em representação colunar, com as continuações entre
+        páginas unidas (calculadas uma vez).
+        """
+        if self._tabelas is None:
+            self._tabelas = montar_tabelas(self)
+        return self._tabelas
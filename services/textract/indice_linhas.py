@@ -0,0 +1,206 @@
+# indice_linhas.py
+#
+# Índice espacial das linhas (LINE) de um documento e busca de vários
+# padrões de uma só vez, usados pelo extrator alternativo baseado em linhas.
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from functools import lru_cache
+
+# Tolerância (em fração da altura da página) para considerar duas linhas na mesma altura
+TOLERANCIA_MESMA_ALTURA = 0.01
+# Folga para erros de arredondamento nos limites da busca binária; o teste
+# exato de tolerância é refeito em cada candidata
+_FOLGA = 1e-9
+# Até este número de padrões, a busca direta por substring (em C) é mais
+# rápida que percorrer o autômato caractere a caractere em Python
+LIMITE_BUSCA_DIRETA = 32
+
+
+def normalizar(texto):
+    """
+    Normalização do texto para a comparação dos padrões
+    (a mesma do método original: sem diferenciar maiúsculas).
+    """
+    return texto.lower()
+
+
+class MultiPadroes:
+    """
+    Autômato de Aho-Corasick: encontra, em uma única passada pelo texto,
+    todos os padrões contidos nele, independentemente da quantidade de padrões.
+    Com até LIMITE_BUSCA_DIRETA padrões, a busca direta por substring é usada.
+    """
+
+    def __init__(self, padroes):
+        self.padroes = list(padroes)
+        # Poucos padrões: busca direta por substring, sem montar o autômato
+        self._diretos = None
+        if len(self.padroes) <= LIMITE_BUSCA_DIRETA:
+            self._diretos = [normalizar(padrao) for padrao in self.padroes]
+            return
+
+        # Cada estado: transições, estado de falha e índices dos padrões que terminam nele
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saidas = [[]]
+
+        for indice, padrao in enumerate(self.padroes):
+            estado = 0
+            for caractere in normalizar(padrao):
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saidas.append([])
+                    self._transicoes[estado][caractere] = proximo
+                estado = proximo
+            self._saidas[estado].append(indice)
+
+        # Estados de falha em largura (BFS); as saídas herdam as do estado de falha
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] = self._saidas[proximo] + \
+                    self._saidas[self._falha[proximo]]
+
+    def buscar(self, texto):
+        """
+        Retorna o conjunto dos índices dos padrões contidos no texto.
+        """
+        if self._diretos is not None:
+            texto = normalizar(texto)
+            return {indice for indice, padrao in enumerate(self._diretos)
+                    if padrao in texto}
+
+        encontrados = set(self._saidas[0])  # padrões vazios
+        transicoes = self._transicoes
+        falha = self._falha
+        saidas = self._saidas
+        estado = 0
+        for caractere in normalizar(texto):
+            while estado and caractere not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            if saidas[estado]:
+                encontrados.update(saidas[estado])
+        return encontrados
+
+
+    def primeiras_ocorrencias(self, textos):
+        """
+        Para cada padrão, a posição do primeiro texto que o contém, ou None.
+        Uma única passada pelos textos resolve todos os padrões; a passada
+        termina quando todos forem encontrados.
+        """
+        posicoes = [None] * len(self.padroes)
+        if not self.padroes:
+            return posicoes
+
+        if self._diretos is not None:
+            # Só os padrões ainda não encontrados são procurados em cada texto
+            pendentes = list(enumerate(self._diretos))
+            for posicao, texto in enumerate(textos):
+                texto = normalizar(texto)
+                restantes = []
+                for indice, padrao in pendentes:
+                    if padrao in texto:
+                        posicoes[indice] = posicao
+                    else:
+                        restantes.append((indice, padrao))
+                pendentes = restantes
+                if not pendentes:
+                    break
+            return posicoes
+
+        pendentes = len(self.padroes)
+        for posicao, texto in enumerate(textos):
+            for indice in self.buscar(texto):
+                if posicoes[indice] is None:
+                    posicoes[indice] = posicao
+                    pendentes -= 1
+            if not pendentes:
+                break
+        return posicoes
+
+
+@lru_cache(maxsize=32)
+def compilar_padroes(padroes):
+    """
+    Compila (uma vez por catálogo) o autômato de uma tupla de padrões.
+    """
+    return MultiPadroes(padroes)
+
+
+class IndiceLinhas:
+    """
+    Linhas de um documento ordenadas por (página, top, left), com as
+    linhas de cada página em buckets ordenados por 'top' para localizar,
+    por busca binária, as linhas na mesma altura de uma linha dada.
+    """
+
+    def __init__(self, line_blocks):
+        self.linhas = []
+        for block in line_blocks:
+            geometry = block.get('Geometry', {}).get('BoundingBox', {})
+            self.linhas.append({
+                'id': block['Id'],
+                'text': block['Text'],
+                'page': block['Page'],
+                'left': geometry.get('Left', 0),
+                'top': geometry.get('Top', 0),
+                'width': geometry.get('Width', 0),
+                'confidence': block['Confidence']
+            })
+
+        # Ordena por página e posição
+        self.linhas.sort(key=lambda x: (x['page'], x['top'], x['left']))
+
+        self._por_pagina = {}
+        for linha in self.linhas:
+            self._por_pagina.setdefault(linha['page'], []).append(linha)
+        self._tops = {pagina: [linha['top'] for linha in linhas]
+                      for pagina, linhas in self._por_pagina.items()}
+
+    def mesma_altura(self, linha, tolerancia=TOLERANCIA_MESMA_ALTURA):
+        """
+        Linhas da mesma página na mesma altura (dentro da tolerância) e à
+        direita da linha dada, ordenadas da esquerda para a direita.
+        """
+        linhas = self._por_pagina.get(linha['page'], [])
+        tops = self._tops.get(linha['page'], [])
+        inicio = bisect_right(tops, linha['top'] - tolerancia - _FOLGA)
+        fim = bisect_left(tops, linha['top'] + tolerancia + _FOLGA)
+
+        vizinhas = [
+            candidata for candidata in linhas[inicio:fim]
+            if abs(candidata['top'] - linha['top']) < tolerancia and
+            candidata['left'] > linha['left']
+        ]
+        vizinhas.sort(key=lambda x: x['left'])
+        return vizinhas
+
+    def localizar(self, padroes):
+        """
+        Para cada padrão, a primeira linha (na ordem de leitura) cujo texto
+        o contém, ou None. Uma única passada pelas linhas resolve todos os
+        padrões; a passada termina quando todos forem encontrados.
+        A busca é a de MultiPadroes (direta por substring em catálogos
+        pequenos; o autômato de Aho-Corasick nos grandes).
+        """
+        padroes = tuple(padroes)
+        if not padroes:
+            return []
+
+        posicoes = compilar_padroes(padroes).primeiras_ocorrencias(
+            linha['text'] for linha in self.linhas)
+        return [None if posicao is None else self.linhas[posicao]
+                for posicao in posicoes]
@@ -0,0 +1,332 @@
+# scheduler.py
+
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from botocore.exceptions import ConnectionError as ErroConexao, HTTPClientError
+
+from services.logs import correlacao_atual, obter_logger
+from services.metricas import OCR, observar_etapa
+
+
+logger = obter_logger("textract.scheduler")
+
+
+# Configurações do agendador (ajustáveis por variável de ambiente)
+# Máximo de chamadas ao Textract em andamento ao mesmo tempo (por processo)
+TEXTRACT_MAX_EM_VOO = int(os.environ.get("TEXTRACT_MAX_EM_VOO", "4"))
+# Cota de transações por segundo da conta para AnalyzeDocument
+TEXTRACT_TPS = float(os.environ.get("TEXTRACT_TPS", "5"))
+# Tentativas por página quando o Textract limita a taxa ou falha de forma transitória
+TEXTRACT_MAX_TENTATIVAS = int(os.environ.get("TEXTRACT_MAX_TENTATIVAS", "5"))
+# Backoff base (s) entre tentativas, com jitter
+TEXTRACT_BACKOFF_BASE = float(os.environ.get("TEXTRACT_BACKOFF_BASE", "0.5"))
+
+# Códigos de erro do Textract que indicam limitação de taxa
+CODIGOS_THROTTLING = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "LimitExceededException",
+    "TooManyRequestsException",
+}
+# Erros transitórios do serviço: o cliente usado pelo agendador não tem
+# retries do botocore (services/aws.py), então são repetidos aqui
+CODIGOS_TRANSITORIOS = {
+    "InternalServerError",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+
+
+# Fluxo (documento) e prioridade das chamadas submetidas no contexto atual
+_agendamento = contextvars.ContextVar("agendamento", default=None)
+
+
+@contextmanager
+def agendamento(fluxo: str, prioridade: int = 0):
+    """
+    As chamadas ao Textract submetidas dentro do bloco pertencem ao fluxo
+    'fluxo' (um documento) com a prioridade informada (menor = antes).
+    Sem agendamento, o fluxo é o id de correlação e a prioridade é 0.
+    """
+    token = _agendamento.set((fluxo, prioridade))
+    try:
+        yield
+    finally:
+        _agendamento.reset(token)
+
+
+def is_throttling(erro: Exception) -> bool:
+    """
+    Verifica se a exceção (ClientError do botocore ou equivalente) é de limitação de taxa.
+    """
+    response = getattr(erro, "response", None) or {}
+    codigo = response.get("Error", {}).get("Code")
+    return codigo in CODIGOS_THROTTLING
+
+
+def is_transitorio(erro: Exception) -> bool:
+    """
+    Verifica se a exceção é uma falha transitória (erro interno do serviço
+    ou de conexão) que vale repetir.
+    """
+    if isinstance(erro, (ErroConexao, HTTPClientError)):
+        return True
+    response = getattr(erro, "response", None) or {}
+    return response.get("Error", {}).get("Code") in CODIGOS_TRANSITORIOS
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe para cadenciar as chamadas contra a cota de TPS.
+    """
+
+    def __init__(self, taxa: float, capacidade: float = None):
+        self.taxa = taxa
+        self.capacidade = capacidade if capacidade is not None else max(1.0, taxa)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        """
+        Bloqueia até haver um token disponível.
+        """
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(
+                    self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+class FilaJusta:
+    """
+    Fila compartilhada pelas chamadas de todos os documentos, com uma fila
+    FIFO por fluxo (documento). A próxima chamada vem do fluxo de menor
+    prioridade e, entre fluxos de mesma prioridade, do que foi menos
+    atendido (revezamento): um documento grande não bloqueia os demais.
+
+    Um fluxo novo começa com o número de atendimentos do último fluxo
+    atendido (tempo virtual), para não passar à frente de todos por ter
+    chegado depois.
+    """
+
+    def __init__(self):
+        self._fluxos = {}
+        self._heap = []
+        self._ordem = itertools.count()
+        self._virtual = 0
+        self._tamanho = 0
+        self._fechada = False
+        self._condicao = threading.Condition()
+
+    def colocar(self, item, fluxo, prioridade: int = 0):
+        with self._condicao:
+            if self._fechada:
+                raise RuntimeError("Fila do agendador encerrada")
+            estado = self._fluxos.get(fluxo)
+            if estado is None:
+                estado = self._fluxos[fluxo] = {
+                    "itens": deque(), "prioridade": prioridade, "atendidos": self._virtual}
+            if not estado["itens"]:
+                heapq.heappush(self._heap, (estado["prioridade"], estado["atendidos"],
+                                            next(self._ordem), fluxo))
+            estado["itens"].append(item)
+            self._tamanho += 1
+            self._condicao.notify()
+
+    def retirar(self):
+        """
+        Bloqueia até haver um item. Retorna None quando a fila foi
+        encerrada e está vazia.
+        """
+        with self._condicao:
+            while not self._heap:
+                if self._fechada:
+                    return None
+                self._condicao.wait()
+            _, atendidos, _, fluxo = heapq.heappop(self._heap)
+            estado = self._fluxos[fluxo]
+            item = estado["itens"].popleft()
+            self._tamanho -= 1
+            estado["atendidos"] = self._virtual = atendidos + 1
+            if estado["itens"]:
+                heapq.heappush(self._heap, (estado["prioridade"], estado["atendidos"],
+                                            next(self._ordem), fluxo))
+            else:
+                # Fluxo sem chamadas pendentes: sai da fila
+                del self._fluxos[fluxo]
+            return item
+
+    def fechar(self):
+        with self._condicao:
+            self._fechada = True
+            self._condicao.notify_all()
+
+    def __len__(self):
+        return self._tamanho
+
+    def fluxos(self) -> int:
+        with self._condicao:
+            return len(self._fluxos)
+
+
+class TextractScheduler:
+    """
+    Agenda chamadas concorrentes ao Textract com limite de chamadas em voo,
+    cadência por token bucket e novas tentativas com jitter em caso de
+    throttling ou de falha transitória. É o único ponto de retry dessas
+    chamadas: o cliente do Textract usado aqui não repete nem limita a taxa
+    no botocore (perfil 'agendado' em services/aws.py).
+
+    As chamadas esperam em uma FilaJusta, atendida por 'max_em_voo'
+    threads: documentos processados ao mesmo tempo dividem a cota, com
+    prioridade para os de menor 'prioridade' (ver 'agendamento').
+    """
+
+    def __init__(self, max_em_voo=TEXTRACT_MAX_EM_VOO, tps=TEXTRACT_TPS,
+                 max_tentativas=TEXTRACT_MAX_TENTATIVAS,
+                 backoff_base=TEXTRACT_BACKOFF_BASE):
+        self.max_em_voo = max_em_voo
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.bucket = TokenBucket(tps)
+        self._fila = FilaJusta()
+        self._threads = []
+
+        # Métricas
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.throttles = 0
+        self.erros_transitorios = 0
+
+    def _chamar_com_retentativas(self, func, kwargs):
+        tentativa = 0
+        while True:
+            self.bucket.adquirir()
+            with self._lock:
+                self.chamadas += 1
+            inicio = time.perf_counter()
+            try:
+                resposta = func(**kwargs)
+                # Duração de cada chamada bem-sucedida (sem a espera por token)
+                observar_etapa(OCR, time.perf_counter() - inicio, tentativa=tentativa + 1)
+                return resposta
+            except Exception as e:
+                tentativa += 1
+                throttling = is_throttling(e)
+                if not (throttling or is_transitorio(e)) or tentativa >= self.max_tentativas:
+                    raise
+                with self._lock:
+                    if throttling:
+                        self.throttles += 1
+                    else:
+                        self.erros_transitorios += 1
+                # Backoff exponencial com "full jitter"
+                espera = random.uniform(
+                    0, self.backoff_base * (2 ** (tentativa - 1)))
+                logger.warning("Textract limitou a taxa" if throttling
+                               else "Falha transitória no Textract", extra={"campos": {
+                                   "tentativa": tentativa, "espera_s": round(espera, 2),
+                                   "erro": type(e).__name__}})
+                time.sleep(espera)
+
+    def _iniciar_threads(self):
+        with self._lock:
+            while len(self._threads) < self.max_em_voo:
+                thread = threading.Thread(target=self._atender, daemon=True,
+                                          name=f"textract_{len(self._threads)}")
+                thread.start()
+                self._threads.append(thread)
+
+    def _atender(self):
+        while True:
+            item = self._fila.retirar()
+            if item is None:
+                return
+            future, contexto, func, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                resposta = contexto.run(self._chamar_com_retentativas, func, kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(resposta)
+
+    def submeter(self, func, **kwargs):
+        """
+        Submete uma chamada e retorna o Future. A chamada entra no fluxo
+        do 'agendamento' atual (ou do id de correlação).
+        """
+        if len(self._threads) < self.max_em_voo:
+            self._iniciar_threads()
+        fluxo, prioridade = _agendamento.get() or (correlacao_atual(), 0)
+        future = Future()
+        # A chamada herda o contexto (id de correlação dos logs) de quem submete
+        self._fila.colocar((future, contextvars.copy_context(), func, kwargs),
+                           fluxo, prioridade)
+        return future
+
+    def analisar_documentos(self, textract, payloads, feature_types):
+        """
+        Executa 'analyze_document' para cada payload (bytes) concorrentemente.
+        Retorna uma lista na mesma ordem das páginas, contendo a resposta
+        ou a exceção da página que falhou.
+        """
+        futures = [
+            self.submeter(textract.analyze_document,
+                          Document={'Bytes': payload},
+                          FeatureTypes=feature_types)
+            for payload in payloads
+        ]
+
+        respostas = []
+        for future in futures:
+            try:
+                respostas.append(future.result())
+            except Exception as e:
+                respostas.append(e)
+        return respostas
+
+    def metricas(self) -> dict:
+        return {
+            "max_em_voo": self.max_em_voo,
+            "tps": self.bucket.taxa,
+            "na_fila": len(self._fila),
+            "fluxos": self._fila.fluxos(),
+            "chamadas": self.chamadas,
+            "throttles": self.throttles,
+            "erros_transitorios": self.erros_transitorios,
+        }
+
+    def encerrar(self, wait: bool = True):
+        """
+        Atende as chamadas já na fila e encerra as threads.
+        """
+        self._fila.fechar()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+# Agendador compartilhado pelo processo: a cota de TPS é da conta, não da requisição
+scheduler = TextractScheduler()
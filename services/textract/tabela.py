@@ -0,0 +1,352 @@
+# tabela.py
+#
+# Representação colunar das tabelas (TABLE) de um documento. As células de
+# cada tabela ficam em arrays compactos (linha, coluna, spans, confiança e
+# posição do texto em um único buffer), montados em uma passada pelos
+# filhos do bloco TABLE. Linhas e colunas são fatiadas por uma grade de
+# índices, sem dicionários por célula.
+
+from array import array
+from itertools import accumulate, chain, compress, repeat
+from operator import add, itemgetter, methodcaller, mul
+
+
+# Tipo de relacionamento do TABLE com as células mescladas (MERGED_CELL)
+MESCLADAS = 'MERGED_CELL'
+# Marcação do Textract para as células de cabeçalho
+COLUMN_HEADER = 'COLUMN_HEADER'
+
+
+# Campos numéricos das células (com o valor usado quando faltam no bloco)
+_PADROES = (('RowIndex', 0), ('ColumnIndex', 0), ('RowSpan', 1),
+            ('ColumnSpan', 1), ('Confidence', 0))
+_CAMPOS = itemgetter(*(campo for campo, _ in _PADROES))
+_TIPO = itemgetter('BlockType')
+_ENTIDADES = methodcaller('get', 'EntityTypes')
+
+
+def _deslocar(valores, deslocamento):
+    return map(add, valores, repeat(deslocamento))
+
+
+class Tabela:
+    """
+    Células de uma tabela em arrays paralelos (uma posição por célula, na
+    ordem do Textract). O texto de todas as células fica em 'texto', e
+    'inicio'/'fim' delimitam o de cada uma.
+
+    Células mescladas (MERGED_CELL) ficam em arrays próprios: 'mesclada'
+    aponta, para cada célula, a região que a contém (-1 se nenhuma).
+
+    Uma tabela que continua nas páginas seguintes é unida às continuações
+    (ver juntar_continuacoes): 'segmentos' guarda a primeira linha de cada
+    trecho, e as linhas dos trechos seguintes são numeradas em sequência.
+    """
+
+    __slots__ = (
+        'id', 'paginas', 'n_linhas', 'n_colunas', 'segmentos',
+        'linha', 'coluna', 'span_linhas', 'span_colunas', 'confianca',
+        'cabecalho', 'mesclada', 'inicio', 'fim', 'texto',
+        'm_linha', 'm_coluna', 'm_span_linhas', 'm_span_colunas',
+        'm_inicio', 'm_fim', '_grade',
+    )
+
+    def __init__(self, table_id=None, pagina=1):
+        self.id = table_id
+        self.paginas = [pagina]
+        self.n_linhas = 0
+        self.n_colunas = 0
+        self.segmentos = array('I', [1])
+
+        self.linha = array('I')
+        self.coluna = array('I')
+        self.span_linhas = array('H')
+        self.span_colunas = array('H')
+        self.confianca = array('f')
+        self.cabecalho = array('b')
+        self.mesclada = array('i')
+        self.inicio = array('I')
+        self.fim = array('I')
+        self.texto = ""
+
+        self.m_linha = array('I')
+        self.m_coluna = array('I')
+        self.m_span_linhas = array('H')
+        self.m_span_colunas = array('H')
+        self.m_inicio = array('I')
+        self.m_fim = array('I')
+
+        self._grade = None
+
+    @classmethod
+    def do_bloco(cls, document, table_block):
+        """
+        Monta a tabela a partir dos filhos CELL do bloco TABLE: cada campo
+        das células vira um array em uma única conversão. O texto de cada
+        célula vem das palavras (ou linhas) filhas.
+        """
+        tabela = cls(table_block['Id'], table_block.get('Page', 1))
+        children = document.children
+
+        ids = children.get(table_block['Id'], ())
+        cells = list(map(document.by_id.get, ids))
+        # Filtro só quando há filhos que não são células (raro)
+        if None in cells or set(map(_TIPO, cells)) != {'CELL'}:
+            cells = [cell for cell in cells
+                     if cell is not None and cell['BlockType'] == 'CELL']
+            ids = [cell['Id'] for cell in cells]
+
+        # Textos dos filhos de todas as células em uma passada, agrupados
+        # por célula pelos limites acumulados
+        filhos = list(map(children.get, ids, repeat((), len(ids))))
+        partes = list(map(document.word_map.get, chain.from_iterable(filhos)))
+        if None in partes:
+            # Filhos que não são palavras: texto da linha, se houver
+            ids_filhos = list(chain.from_iterable(filhos))
+            line_map = document.line_map
+            for posicao in [posicao for posicao, parte in enumerate(partes) if parte is None]:
+                partes[posicao] = line_map.get(ids_filhos[posicao])
+        limites = list(accumulate(map(len, filhos), initial=0))
+        if None in partes:
+            textos = [" ".join([parte for parte in partes[a:b] if parte is not None])
+                      for a, b in zip(limites, limites[1:])]
+        else:
+            textos = [" ".join(partes[a:b]) for a, b in zip(limites, limites[1:])]
+        textos = list(map(str.strip, textos))
+        del filhos, partes
+
+        # Campos numéricos de todas as células em uma passada (em C),
+        # transpostos para um array por campo
+        if cells:
+            try:
+                valores = list(map(_CAMPOS, cells))
+            except KeyError:
+                valores = [tuple(cell.get(campo, padrao) for campo, padrao in _PADROES)
+                           for cell in cells]
+            linhas, colunas, spans_linhas, spans_colunas, confiancas = zip(*valores)
+            tabela.linha = array('I', linhas)
+            tabela.coluna = array('I', colunas)
+            tabela.span_linhas = array('H', spans_linhas)
+            tabela.span_colunas = array('H', spans_colunas)
+            tabela.confianca = array('f', confiancas)
+        # Células de cabeçalho: só as poucas com EntityTypes são inspecionadas
+        tabela.cabecalho = array('b', bytes(len(cells)))
+        for indice in compress(range(len(cells)), map(_ENTIDADES, cells)):
+            if COLUMN_HEADER in cells[indice]['EntityTypes']:
+                tabela.cabecalho[indice] = 1
+        tabela.mesclada = array('i', [-1]) * len(cells)
+
+        tabela.fim = array('I', accumulate(map(len, textos)))
+        tabela.inicio = array('I', [0]) + tabela.fim[:-1] if cells else array('I')
+        tabela.texto = "".join(textos)
+
+        if cells:
+            tabela.n_linhas = max(map(add, tabela.linha, tabela.span_linhas)) - 1
+            tabela.n_colunas = max(map(add, tabela.coluna, tabela.span_colunas)) - 1
+            tabela._ler_mescladas(document, table_block, ids, textos)
+        return tabela
+
+    def _ler_mescladas(self, document, table_block, ids_celulas, textos):
+        ids = []
+        for relationship in table_block.get('Relationships', ()):
+            if relationship['Type'] == MESCLADAS:
+                ids.extend(relationship['Ids'])
+        if not ids:
+            return
+
+        indice_celula = dict(zip(ids_celulas, range(len(ids_celulas))))
+
+        partes_texto = [self.texto]
+        posicao = len(self.texto)
+        for merged_id in ids:
+            merged = document.get(merged_id)
+            if merged is None:
+                continue
+            regiao = len(self.m_linha)
+            partes = []
+            for cell_id in document.child_ids(merged_id):
+                indice = indice_celula.get(cell_id)
+                if indice is not None:
+                    self.mesclada[indice] = regiao
+                    if textos[indice]:
+                        partes.append(textos[indice])
+            texto = " ".join(partes)
+
+            self.m_linha.append(merged.get('RowIndex', 0))
+            self.m_coluna.append(merged.get('ColumnIndex', 0))
+            self.m_span_linhas.append(merged.get('RowSpan', 1))
+            self.m_span_colunas.append(merged.get('ColumnSpan', 1))
+            self.m_inicio.append(posicao)
+            posicao += len(texto)
+            self.m_fim.append(posicao)
+            partes_texto.append(texto)
+        self.texto = "".join(partes_texto)
+
+    def __len__(self):
+        return len(self.linha)
+
+    def texto_celula(self, indice: int) -> str:
+        return self.texto[self.inicio[indice]:self.fim[indice]]
+
+    def texto_mesclada(self, regiao: int) -> str:
+        return self.texto[self.m_inicio[regiao]:self.m_fim[regiao]]
+
+    @property
+    def grade(self):
+        """
+        Índice da célula em cada posição (linha, coluna), em um array de
+        (n_linhas + 1) x (n_colunas + 1) posições (-1 = sem célula).
+        Calculada uma vez; com duas células na mesma posição vale a última.
+        """
+        if self._grade is None:
+            largura = self.n_colunas + 1
+            grade = array('i', [-1]) * ((self.n_linhas + 1) * largura)
+            posicoes = map(add, map(mul, self.linha, repeat(largura)), self.coluna)
+            for indice, posicao in enumerate(posicoes):
+                grade[posicao] = indice
+            self._grade = grade
+        return self._grade
+
+    def celula(self, linha: int, coluna: int) -> int:
+        """
+        Índice da célula na posição (linha e coluna a partir de 1), ou -1.
+        """
+        if not (0 < linha <= self.n_linhas and 0 < coluna <= self.n_colunas):
+            return -1
+        return self.grade[linha * (self.n_colunas + 1) + coluna]
+
+    def valor(self, linha: int, coluna: int, mescladas: bool = False):
+        """
+        Texto da célula na posição (None se não houver célula). Com
+        'mescladas', as posições de uma célula mesclada devolvem o texto
+        da região inteira.
+        """
+        indice = self.celula(linha, coluna)
+        if indice < 0:
+            return None
+        if mescladas and self.mesclada[indice] >= 0:
+            return self.texto_mesclada(self.mesclada[indice])
+        return self.texto_celula(indice)
+
+    def valores_linha(self, linha: int, colunas=None, mescladas: bool = False) -> list:
+        """
+        Textos de uma linha, nas colunas informadas (por padrão todas),
+        com None nas posições sem célula.
+        """
+        if colunas is None:
+            colunas = range(1, self.n_colunas + 1)
+        if not 0 < linha <= self.n_linhas:
+            return [None] * len(colunas)
+        largura = self.n_colunas + 1
+        grade = self.grade
+        base = linha * largura
+        valores = []
+        for coluna in colunas:
+            indice = grade[base + coluna] if 0 < coluna < largura else -1
+            if indice < 0:
+                valores.append(None)
+            elif mescladas and self.mesclada[indice] >= 0:
+                valores.append(self.texto_mesclada(self.mesclada[indice]))
+            else:
+                valores.append(self.texto[self.inicio[indice]:self.fim[indice]])
+        return valores
+
+    def valores_coluna(self, coluna: int, linhas=None, mescladas: bool = False) -> list:
+        """
+        Textos de uma coluna, nas linhas informadas (por padrão todas).
+        """
+        if linhas is None:
+            linhas = range(1, self.n_linhas + 1)
+        return [self.valor(linha, coluna, mescladas) for linha in linhas]
+
+    def linhas_com_colunas(self, n_colunas: int):
+        """
+        Gera (linha, textos) das linhas com células em todas as colunas de
+        1 a 'n_colunas', na ordem das linhas.
+        """
+        if n_colunas > self.n_colunas:
+            return
+        largura = self.n_colunas + 1
+        grade = self.grade
+        texto = self.texto
+        inicio = self.inicio
+        fim = self.fim
+        for linha in range(1, self.n_linhas + 1):
+            base = linha * largura
+            indices = grade[base + 1:base + n_colunas + 1]
+            if min(indices, default=0) < 0:
+                continue
+            yield linha, [texto[inicio[i]:fim[i]] for i in indices]
+
+    def linhas_cabecalho(self, marcadas: bool = False) -> set:
+        """
+        Linhas de cabeçalho: a primeira de cada trecho da tabela e, com
+        'marcadas', as linhas com células marcadas como COLUMN_HEADER.
+        """
+        linhas = set(self.segmentos)
+        if marcadas:
+            linhas.update(linha for linha, cabecalho in zip(self.linha, self.cabecalho)
+                          if cabecalho)
+        return linhas
+
+    def estender(self, continuacao: "Tabela"):
+        """
+        Acrescenta as linhas de uma continuação (tabela da página seguinte).
+        """
+        deslocamento = self.n_linhas
+        tamanho_texto = len(self.texto)
+        regioes = len(self.m_linha)
+
+        self.linha.extend(_deslocar(continuacao.linha, deslocamento))
+        self.coluna.extend(continuacao.coluna)
+        self.span_linhas.extend(continuacao.span_linhas)
+        self.span_colunas.extend(continuacao.span_colunas)
+        self.confianca.extend(continuacao.confianca)
+        self.cabecalho.extend(continuacao.cabecalho)
+        if regioes:
+            self.mesclada.extend(regiao + regioes if regiao >= 0 else -1
+                                 for regiao in continuacao.mesclada)
+        else:
+            self.mesclada.extend(continuacao.mesclada)
+        self.inicio.extend(_deslocar(continuacao.inicio, tamanho_texto))
+        self.fim.extend(_deslocar(continuacao.fim, tamanho_texto))
+
+        self.m_linha.extend(_deslocar(continuacao.m_linha, deslocamento))
+        self.m_coluna.extend(continuacao.m_coluna)
+        self.m_span_linhas.extend(continuacao.m_span_linhas)
+        self.m_span_colunas.extend(continuacao.m_span_colunas)
+        self.m_inicio.extend(_deslocar(continuacao.m_inicio, tamanho_texto))
+        self.m_fim.extend(_deslocar(continuacao.m_fim, tamanho_texto))
+
+        self.texto += continuacao.texto
+        self.segmentos.extend(_deslocar(continuacao.segmentos, deslocamento))
+        self.paginas.extend(continuacao.paginas)
+        self.n_linhas += continuacao.n_linhas
+        self.n_colunas = max(self.n_colunas, continuacao.n_colunas)
+        self._grade = None
+
+
+def juntar_continuacoes(tabelas: list) -> list:
+    """
+    Une cada tabela às suas continuações: a tabela seguinte (na ordem do
+    Textract) começa na página logo após a última página da anterior e tem
+    o mesmo número de colunas.
+    """
+    unidas = []
+    for tabela in tabelas:
+        anterior = unidas[-1] if unidas else None
+        if (anterior is not None and tabela.n_colunas == anterior.n_colunas
+                and tabela.paginas[0] == anterior.paginas[-1] + 1):
+            anterior.estender(tabela)
+        else:
+            unidas.append(tabela)
+    return unidas
+
+
+def montar_tabelas(document) -> list:
+    """
+    Tabelas do documento na ordem dos blocos TABLE, com as continuações
+    entre páginas já unidas.
+    """
+    return juntar_continuacoes([Tabela.do_bloco(document, block)
+                                for block in document.blocks_of('TABLE')])
@@ -1,135 +1,131 @@
-import boto3
 import json
 import os
-from typing import List, Dict, Any
+from typing import Any, Dict, List
 from .parser import (
-    map_word_id,
+    as_document,
     get_kv_map,
     extract_insurance_table_data,  # Nova função para tabela de seguros
     # find_keyword_blocks,  # Nova função para buscar keywords
     # find_multiple_keywords,  # Nova função para buscar múltiplas keywords
     # get_block_coordinates  # Nova função para coordenadas
 )
+from .scheduler import scheduler
+from services.aws import PERFIL_AGENDADO, clientes_aws
+from services.logs import obter_logger
+from services.metricas import EXTRACAO, span
+from services.templates import registro_templates
 from utils.montar_json import montar_json
 
 
-def processar_arquivos_png(arquivos_png: List[str], aws_config: Dict[str, str] = None) -> Dict[str, Any]:
+logger = obter_logger("textract")
+
+FEATURE_TYPES = ["FORMS", "TABLES", "LAYOUT"]
+
+# Imprime o JSON formatado dos resultados de cada página (apenas para
+# depuração: serializar e escrever no stdout custa caro em documentos grandes)
+IMPRIMIR_RESULTADOS = os.environ.get(
+    "IMPRIMIR_RESULTADOS", "false").lower() == "true"
+
+
+def submeter_imagem(imagem: bytes, aws_config: Dict[str, str] = None):
+    """
+    Envia uma imagem ao Textract sem bloquear.
+    Retorna o Future com a resposta da página.
+    """
+    regiao = (aws_config or {}).get("region")
+    textract = clientes_aws.textract(regiao, perfil=PERFIL_AGENDADO)
+    return scheduler.submeter(textract.analyze_document,
+                              Document={'Bytes': imagem},
+                              FeatureTypes=FEATURE_TYPES)
+
+
+def extrair_pagina(response: Any, nome: str):
+    """
+    Extrai os dados de uma página (resposta do Textract, da extração nativa,
+    já indexada ou não, ou a exceção da página que falhou).
+    Retorna (resultados_pagina, erro).
     """
-    Processa uma lista de arquivos PNG usando AWS Textract
+    resultados_pagina = []
+    erro = None
+    try:
+        # A página falhou no Textract
+        if isinstance(response, Exception):
+            raise response
+
+        if response:  # Verifica se response foi populado com sucesso
+            # Aceita também um TextractDocument já indexado
+            document = as_document(response)
+            with span(EXTRACAO, arquivo=os.path.basename(nome), blocos=len(document)):
+                resultados_pagina = extrair_resultados_pagina(document)
+
+    except Exception as e:
+        erro = str(e)
+        logger.warning("Erro ao processar a página",
+                       extra={"campos": {"arquivo": nome, "erro": erro}})
 
-    Args:
-        arquivos_png: Lista de caminhos para arquivos PNG
-        aws_config: Configurações AWS (bucket, região, etc.)
+    return resultados_pagina, erro
+
+
+def extrair_resultados_pagina(response, template=None) -> List[Any]:
+    """
+    Extrai os dados de uma resposta do Textract (uma página).
+    Retorna a lista de resultados da página: os dados da tabela de seguros
+    e o objeto com os pares chave-valor.
 
-    Returns:
-        Dict com resultados do processamento
+    Os campos e a tabela vêm do template de extração; sem 'template', a
+    página é classificada pelo seu texto.
     """
+    resultados = []
+
+    # Indexa a resposta uma única vez para todas as funções do parser
+    document = as_document(response)
+
+    if template is None:
+        template = registro_templates.classificar(
+            block['Text'] for block in document.blocks_of('LINE'))
+    logger.debug("Template de extração", extra={"campos": {"template": template.nome}})
+
+    # Pega todas as palavras e suas IDs (mapa do documento, sem cópia:
+    # get_kv_map só consulta).
+    word_map = document.word_map
+
+    # === EXTRAÇÃO DE DADOS DA TABELA DE SEGUROS ===
+    # print("\n=== EXTRAINDO DADOS DA TABELA DE SEGUROS ===")
+
+    # Extrai dados no formato solicitado
+    insurance_data_raw = extract_insurance_table_data(document, template)
+
+    # Filtrar apenas objetos com o valor esperado na coluna de filtro do
+    # template (ex.: "R$" na propriedade "Prêmio Líquido")
+    insurance_data = template.filtrar_linhas(insurance_data_raw)
+
+    # print(f"Encontrados {len(insurance_data)} itens da tabela de seguros")
+
+    # Exibe o resultado no formato JSON solicitado
+    if IMPRIMIR_RESULTADOS:
+        print("\n=== RESULTADO NO FORMATO SOLICITADO ===")
+        print(json.dumps(insurance_data, indent=2, ensure_ascii=False))
+    resultados.append(insurance_data)
+
+    # === PROCESSAMENTO ORIGINAL (para comparação) ===
+    # print("\n=== PROCESSAMENTO ORIGINAL (para comparação) ===")
+
+    # Passa as palavras chaves e os valores chaves para formar um objeto chave-valor.
+    final_map = get_kv_map(document, word_map)
+    # print("\n=== FINAL MAP ===")
+    # print(json.dumps(final_map, indent=2, ensure_ascii=False))
+
+    # Campos do template, associados às chaves extraídas (exatas,
+    # normalizadas ou por aproximação)
+    campos = template.mapear_campos(final_map)
+
+    # Objeto apenas com os campos do template (sem ida e volta por JSON)
+    resultado_objeto = montar_json(template.chaves, campos)
+    if IMPRIMIR_RESULTADOS:
+        print("\n\n=== JSON dos pares chave-valor (método tradicional):")
+        print(json.dumps(resultado_objeto, indent=2, ensure_ascii=False))
+
+    insurance_data.append(resultado_objeto)
+    resultados.append(resultado_objeto)
 
-    if not arquivos_png:
-        return {"success": False, "error": "Nenhum arquivo PNG fornecido"}
-
-    # Configurações padrão (ajuste conforme necessário)
-    if aws_config is None:
-        aws_config = {
-            "region": "us-east-1",
-            "bucket_name": "seu-bucket-s3",  # Configure seu bucket
-            "output_bucket": "seu-bucket-output"  # Configure seu bucket de saída
-        }
-
-        # Inicializar clientes AWS
-        textract = boto3.client(
-            "textract", region_name=aws_config.get("region", "us-east-1"))
-        s3 = boto3.client(
-            "s3", region_name=aws_config.get("region", "us-east-1"))
-
-        resultados = []
-
-        for i, arquivo_png in enumerate(arquivos_png):
-            print(
-                f"Processando arquivo {i+1}/{len(arquivos_png)}: {arquivo_png}")
-
-            try:
-                # Ler o arquivo PNG
-                with open(arquivo_png, 'rb') as file:
-                    arquivo_bytes = file.read()
-
-                # Processar com Textract (usando bytes diretamente, sem S3)
-                response = textract.analyze_document(
-                    Document={
-                        'Bytes': arquivo_bytes
-                    },
-                    FeatureTypes=["FORMS", "TABLES", "LAYOUT"]
-                )
-
-                print(
-                    f"Detectados {len(response['Blocks'])} blocos no arquivo {os.path.basename(arquivo_png)}")
-
-                if response:  # Verifica se response foi populado com sucesso
-
-                    # Pega todas as palavras e suas IDs.
-                    word_map = map_word_id(response)
-
-                    # === EXTRAÇÃO DE DADOS DA TABELA DE SEGUROS ===
-                    # print("\n=== EXTRAINDO DADOS DA TABELA DE SEGUROS ===")
-
-                    # Extrai dados no formato solicitado
-                    insurance_data_raw = extract_insurance_table_data(response)
-
-                    # Filtrar apenas objetos que contêm "R$" na propriedade "Prêmio Líquido"
-                    insurance_data = []
-                    for item in insurance_data_raw:
-                        if isinstance(item, dict) and "Prêmio Líquido" in item:
-                            premio_liquido = str(item["Prêmio Líquido"])
-                            if "R$" in premio_liquido:
-                                insurance_data.append(item)
-
-                    # print(f"Encontrados {len(insurance_data)} itens da tabela de seguros")
-
-                    # Exibe o resultado no formato JSON solicitado
-                    print("\n=== RESULTADO NO FORMATO SOLICITADO ===")
-                    print(json.dumps(insurance_data, indent=2, ensure_ascii=False))
-                    resultados.append(insurance_data)
-
-                    # === PROCESSAMENTO ORIGINAL (para comparação) ===
-                    # print("\n=== PROCESSAMENTO ORIGINAL (para comparação) ===")
-
-                    # Passa as palavras chaves e os valores chaves para formar um objeto chave-valor.
-                    final_map = get_kv_map(response, word_map)
-                    # print("\n=== FINAL MAP ===")
-                    # print(json.dumps(final_map, indent=2, ensure_ascii=False))
-
-                    # TODO Essas chaves devem ser dinâmicas, baseadas no conteúdo do PDF
-                    keys = [
-                        'N° Cotação',
-                        'Vigência',
-                        'N° Proposta/Negócio',
-                        'Tipo Seguro',
-                        'Empresa Parceira',
-                        'Processo SUSEP n°',
-                        'Deseja contratar cobertura do seguro para condutores na faixa etária de 18 a 25 anos que residem com O Principal Condutor?'
-                    ]
-
-                    # Print do JSON formatado de forma legível
-                    print("\n\n=== JSON dos pares chave-valor (método tradicional):")
-                    json_resultado = montar_json(keys, final_map)
-
-                    # Converter string JSON de volta para objeto Python
-                    resultado_objeto = json.loads(json_resultado)
-                    insurance_data.append(resultado_objeto)
-                    resultados.append(resultado_objeto)
-
-            except Exception as e:
-                print(f"Erro ao processar {arquivo_png}: {e}")
-
-        # Exibir resultados consolidados
-        print("\n=== RESULTADOS CONSOLIDADOS ===")
-        if resultados:
-            # Se há múltiplos resultados, mostrar como array
-            print(json.dumps(resultados, indent=2, ensure_ascii=False))
-
-        # Retornar resultado consolidado
-        return {
-            "success": True,
-            "total_arquivos": len(arquivos_png),
-            "resultados": resultados
-        }
+    return resultados
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from benchmarks.bench_parser import respostas_cotacoes
+from benchmarks.sintetico import gerar_resposta
+from services.textract.colunar import codificar, decodificar
+from services.textract.textract import extrair_pagina
+
+
+def _resposta_completa():
+    aleatorio = random.Random(0)
+    resposta = gerar_resposta(300)
+    for block in resposta["Blocks"]:
+        if block["BlockType"] == "WORD":
+            block["Geometry"] = {
+                "BoundingBox": {"Left": aleatorio.random(), "Top": aleatorio.random(),
+                                "Width": 0.1, "Height": 0.02},
+                "Polygon": [{"X": aleatorio.random(), "Y": aleatorio.random()} for _ in range(4)],
+            }
+    return resposta
+
+
+def test_resposta_volta_identica():
+    resposta = _resposta_completa()
+    assert decodificar(codificar(resposta)).para_resposta() == resposta
+
+
+@pytest.mark.parametrize("campo, valor", [
+    ("Query", {"Text": "Qual o prêmio?", "Alias": "premio"}),
+    ("EntityTypes", []),
+    ("Relationships", []),
+    ("Page", 0),
+    ("Text", None),
+    ("Confidence", None),
+    ("Geometry", {"BoundingBox": {"Left": 0.1, "Top": 0.2, "Width": 0.3, "Height": 0.4},
+                  "RotationAngle": 90}),
+    ("Geometry", {"Polygon": [{"X": 0.1, "Y": 0.2}]}),
+])
+def test_campos_fora_das_colunas_sao_preservados(campo, valor):
+    resposta = _resposta_completa()
+    resposta["Blocks"][3][campo] = valor
+    resposta["AnalyzeDocumentModelVersion"] = "1.0"
+    documento = decodificar(codificar(resposta))
+    assert documento.para_resposta() == resposta
+    assert documento.blocks[3][campo] == valor
+
+
+def test_spans_grandes():
+    resposta = {"Blocks": [{"Id": "c", "BlockType": "CELL", "RowIndex": 1, "ColumnIndex": 1,
+                            "RowSpan": 70000, "ColumnSpan": 1}]}
+    assert decodificar(codificar(resposta)).para_resposta() == resposta
+
+
+def test_extracao_igual_a_da_resposta_original():
+    for resposta in respostas_cotacoes(3):
+        assert extrair_pagina(decodificar(codificar(resposta)), "p") == \
+            extrair_pagina(resposta, "p")
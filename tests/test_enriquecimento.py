@@ -0,0 +1,143 @@
+import pytest
+
+from benchmarks.stubs import StubBedrockClient
+from services import enriquecimento
+from services.cache import ResultadoCache
+from services.enriquecimento import (
+    INSTRUCOES, Enriquecedor, SessaoEnriquecimento, estimar_tokens, formatar_pagina)
+
+
+class StubBedrockRegistrado(StubBedrockClient):
+    """
+    Guarda o prompt de cada invocação; 'sem_resposta' são trechos de páginas
+    que o modelo deixa de responder.
+    """
+
+    def __init__(self, sem_resposta=(), **kwargs):
+        super().__init__(latencia_primeiro_token=0, tokens_por_segundo=10 ** 6, **kwargs)
+        self.sem_resposta = sem_resposta
+        self.prompts = []
+
+    def converse_stream(self, modelId, messages, system=None, inferenceConfig=None, **kwargs):
+        prompt = messages[0]["content"][0]["text"]
+        self.prompts.append(prompt)
+        paginas = [pagina for pagina in prompt.split("</pagina>")
+                   if pagina.strip() and not any(trecho in pagina for trecho in self.sem_resposta)]
+        messages = [{"role": "user", "content": [{"text": "</pagina>".join(paginas) + "</pagina>"
+                                                  if paginas else ""}]}]
+        return super().converse_stream(modelId, messages, system, inferenceConfig, **kwargs)
+
+
+@pytest.fixture
+def cache_local(tmp_path, monkeypatch):
+    cache = ResultadoCache(diretorio=str(tmp_path))
+    monkeypatch.setattr(enriquecimento, "cache", cache)
+    return cache
+
+
+@pytest.fixture
+def criar_enriquecedor():
+    criados = []
+
+    def criar(cliente, **kwargs):
+        kwargs.setdefault("espera_ms", 60_000)
+        kwargs.setdefault("usar_cache", False)
+        enriquecedor = Enriquecedor(cliente=cliente, **kwargs)
+        criados.append(enriquecedor)
+        return enriquecedor
+
+    yield criar
+    for enriquecedor in criados:
+        enriquecedor.encerrar()
+
+
+def _texto(numero, linhas=10):
+    return "\n".join(f"Seguradora {numero} cobertura {i} R$ {numero}.{i:03d},00"
+                     for i in range(linhas))
+
+
+def _concluir(textos, enriquecedor):
+    sessao = SessaoEnriquecimento(enriquecedor)
+    for pagina, texto in enumerate(textos, start=1):
+        sessao.adicionar(pagina, texto)
+    return sessao.concluir(timeout=10)
+
+
+def test_lotes_respeitam_o_orcamento_de_tokens(criar_enriquecedor):
+    cliente = StubBedrockRegistrado()
+    tokens_pagina = estimar_tokens(formatar_pagina(0, _texto(1)))
+    # Cabem duas páginas por lote
+    orcamento = 2 * tokens_pagina + tokens_pagina // 2
+    enriquecedor = criar_enriquecedor(
+        cliente, max_tokens_lote=orcamento + estimar_tokens(INSTRUCOES), max_paginas_lote=100)
+
+    resultados = _concluir([_texto(numero) for numero in range(6)], enriquecedor)
+
+    assert [resultado["erro"] for resultado in resultados] == [None] * 6
+    assert len(cliente.prompts) == 3
+    assert all(estimar_tokens(prompt) <= orcamento for prompt in cliente.prompts)
+    assert [resultado["dados"]["seguradora"] for resultado in resultados] == \
+        [_texto(numero).splitlines()[0] for numero in range(6)]
+
+
+def test_lotes_limitados_por_paginas(criar_enriquecedor):
+    cliente = StubBedrockRegistrado()
+    enriquecedor = criar_enriquecedor(cliente, max_paginas_lote=4)
+
+    _concluir([_texto(numero) for numero in range(10)], enriquecedor)
+
+    assert [prompt.count("<pagina ") for prompt in cliente.prompts] == [4, 4, 2]
+
+
+def test_paginas_identicas_sao_coalescidas(criar_enriquecedor):
+    cliente = StubBedrockRegistrado()
+    enriquecedor = criar_enriquecedor(cliente)
+
+    # Só diferem em espaços e maiúsculas
+    resultados = _concluir([_texto(1), _texto(1).upper().replace(" ", "  "), _texto(2)],
+                           enriquecedor)
+
+    assert resultados[0]["dados"] == resultados[1]["dados"]
+    assert cliente.paginas == 2
+    assert enriquecedor.metricas()["coalescidas"] == 1
+
+
+def test_respostas_em_cache_nao_voltam_ao_modelo(criar_enriquecedor, cache_local):
+    cliente = StubBedrockRegistrado()
+    primeiro = criar_enriquecedor(cliente, usar_cache=True)
+    _concluir([_texto(1), _texto(2)], primeiro)
+
+    segundo = criar_enriquecedor(cliente, usar_cache=True)
+    resultados = _concluir([_texto(2), _texto(3)], segundo)
+
+    assert [resultado["cache"] for resultado in resultados] == [True, False]
+    assert cliente.paginas == 3
+    assert segundo.metricas()["hits_cache"] == 1
+
+
+def test_pagina_sem_resposta_falha_e_pode_ser_repetida(criar_enriquecedor):
+    cliente = StubBedrockRegistrado(sem_resposta=("Seguradora 2 ",))
+    enriquecedor = criar_enriquecedor(cliente)
+
+    resultados = _concluir([_texto(1), _texto(2), _texto(3)], enriquecedor)
+
+    assert [resultado["erro"] for resultado in resultados] == \
+        [None, "O modelo não respondeu a página", None]
+    assert enriquecedor.metricas()["falhas"] == 1
+
+    # A página que falhou não fica presa entre as páginas em andamento
+    cliente.sem_resposta = ()
+    [resultado] = _concluir([_texto(2)], enriquecedor)
+    assert resultado["erro"] is None
+
+
+def test_erro_na_invocacao_falha_o_lote(criar_enriquecedor):
+    class StubErro(StubBedrockRegistrado):
+        def converse_stream(self, *args, **kwargs):
+            raise ConnectionError("sem conexão")
+
+    enriquecedor = criar_enriquecedor(StubErro())
+
+    resultados = _concluir([_texto(1), _texto(2)], enriquecedor)
+
+    assert [resultado["erro"] for resultado in resultados] == ["sem conexão"] * 2
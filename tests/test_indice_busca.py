@@ -0,0 +1,38 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.indice_busca import IndiceDocumentos
+
+
+def _resposta(*palavras):
+    return {"Blocks": [{"Id": str(i), "BlockType": "WORD", "Text": palavra, "Confidence": 99.0,
+                        "Page": 1, "Geometry": {}} for i, palavra in enumerate(palavras)]}
+
+
+@pytest.fixture
+def indice(monkeypatch):
+    indice = IndiceDocumentos(max_documentos=2)
+    monkeypatch.setattr("routes.routes.indice_busca", indice)
+    return indice
+
+
+def test_pdf_repetido_vira_alias(indice):
+    assert indice.registrar_documento("a", "a.pdf", hash_pdf="h")
+    indice.adicionar_pagina("a", 1, _resposta("cotação"))
+    assert not indice.registrar_documento("b", "a.pdf", hash_pdf="h")
+    assert [d["process_id"] for d in indice.buscar(["cotacao"], "b")] == ["a"]
+
+
+def test_busca_diferencia_documento_removido_de_desconhecido(indice):
+    for process_id in ("a", "b", "c"):
+        indice.registrar_documento(process_id, f"{process_id}.pdf", hash_pdf=process_id)
+        indice.adicionar_pagina(process_id, 1, _resposta("apólice"))
+
+    assert indice.situacao("a") == "removido"
+    cliente = TestClient(app)
+    assert cliente.get("/search", params={"q": "apolice", "process_id": "a"}).status_code == 410
+    assert cliente.get("/search", params={"q": "apolice", "process_id": "x"}).status_code == 404
+    resposta = cliente.get("/search", params={"q": "apolice", "process_id": "c"})
+    assert resposta.status_code == 200
+    assert [d["process_id"] for d in resposta.json()["documentos"]] == ["c"]
@@ -0,0 +1,91 @@
+import os
+
+from services.indice_vetorial import CodificadorHashing, IndiceVetorial
+
+
+def _resposta(*linhas):
+    return {"Blocks": [{"Id": str(i), "BlockType": "LINE", "Text": linha}
+                       for i, linha in enumerate(linhas)]}
+
+
+def _indice(diretorio, fracao=0.25):
+    indice = IndiceVetorial(str(diretorio), codificador=CodificadorHashing(64),
+                            tamanho_trecho=40, fracao_compactar=fracao)
+    indice.abrir()
+    return indice
+
+
+def _ordem(resultado):
+    return -resultado["score"], resultado["pagina"], resultado["texto"]
+
+
+def _popular(indice):
+    for process_id in ("a", "b", "c"):
+        indice.registrar_documento(process_id, f"{process_id}.pdf", hash_pdf=process_id)
+        for pagina in (1, 2):
+            indice.adicionar_pagina(process_id, pagina, _resposta(
+                f"Apólice {process_id} página {pagina}", "Prêmio líquido R$ 1.234,56",
+                f"Segurado {process_id} cobertura {pagina}"))
+    indice.registrar_documento("a2", "a.pdf", hash_pdf="a")
+
+
+def test_compacta_ao_abrir_sem_os_documentos_removidos(tmp_path):
+    indice = _indice(tmp_path)
+    _popular(indice)
+    total = indice.estatisticas()["trechos"]
+    esperado = indice.consultar("segurado cobertura", k=50, process_id="c")
+    indice.remover_documento("b")
+    assert indice.estatisticas()["trechos_removidos"] == total // 3
+    indice.encerrar()
+    tamanho = os.path.getsize(tmp_path / "trechos.jsonl")
+
+    indice = _indice(tmp_path)
+    estatisticas = indice.estatisticas()
+    assert estatisticas["compactacoes"] == 1
+    assert estatisticas["trechos"] == total - total // 3
+    assert estatisticas["trechos_removidos"] == 0
+    assert os.path.getsize(tmp_path / "trechos.jsonl") < tamanho
+    assert not os.path.exists(tmp_path / "compactacao")
+
+    # Empates de score podem trocar de ordem com as novas posições dos trechos
+    assert sorted(indice.consultar("segurado cobertura", k=50, process_id="c"),
+                  key=_ordem) == sorted(esperado, key=_ordem)
+    assert not indice.contem("b")
+    # O alias continua apontando para o documento original
+    assert indice.contem("a2")
+    assert {r["process_id"] for r in indice.consultar("apólice", k=50)} == {"a", "c"}
+
+    # Novos documentos continuam sendo acrescentados depois da compactação
+    assert indice.registrar_documento("d", "d.pdf", hash_pdf="d")
+    assert indice.adicionar_pagina("d", 1, _resposta("Apólice d sinistro"))
+    assert indice.consultar("sinistro", k=1)[0]["process_id"] == "d"
+
+
+def test_sem_compactacao_abaixo_da_fracao(tmp_path):
+    indice = _indice(tmp_path, fracao=0.5)
+    _popular(indice)
+    indice.remover_documento("b")
+    indice.encerrar()
+
+    indice = _indice(tmp_path, fracao=0.5)
+    assert indice.estatisticas()["compactacoes"] == 0
+    assert indice.estatisticas()["trechos_removidos"] > 0
+
+
+def test_compactacao_confirmada_e_aplicada_na_abertura(tmp_path):
+    indice = _indice(tmp_path, fracao=0)
+    _popular(indice)
+    indice.remover_documento("b")
+    indice.encerrar()
+
+    # Interrompida depois da confirmação: os arquivos novos ainda não foram movidos
+    indice = _indice(tmp_path, fracao=0)
+    indice._aplicar_compactacao = lambda: None
+    indice._compactar()
+    indice.encerrar()
+    assert os.path.isdir(tmp_path / "compactacao")
+
+    indice = _indice(tmp_path, fracao=0)
+    assert not os.path.exists(tmp_path / "compactacao")
+    assert indice.estatisticas()["trechos_removidos"] == 0
+    assert {r["process_id"] for r in indice.consultar("apólice", k=50)} == {"a", "c"}
@@ -0,0 +1,37 @@
+import asyncio
+import mmap
+from tempfile import SpooledTemporaryFile
+
+from fastapi import UploadFile
+
+from services.ingestao import ler_upload, liberar_upload
+
+PDF = b"%PDF-1.4\n" + b"0" * 4096
+
+
+def _upload(conteudo: bytes, max_size: int) -> UploadFile:
+    arquivo = SpooledTemporaryFile(max_size=max_size)
+    arquivo.write(conteudo)
+    arquivo.seek(0)
+    return UploadFile(arquivo, size=len(conteudo), filename="a.pdf")
+
+
+def test_upload_em_memoria_nao_vai_para_o_disco():
+    upload = _upload(PDF, max_size=1024 * 1024)
+    conteudo, _ = asyncio.run(ler_upload(upload))
+
+    assert not upload.file._rolled
+    assert isinstance(conteudo, bytearray) and bytes(conteudo) == PDF
+    liberar_upload(conteudo)
+
+
+def test_upload_em_disco_e_mapeado_e_liberado():
+    upload = _upload(PDF, max_size=1024)
+    assert upload.file._rolled
+    conteudo, _ = asyncio.run(ler_upload(upload))
+
+    assert isinstance(conteudo, memoryview) and bytes(conteudo) == PDF
+    mapa = conteudo.obj
+    assert isinstance(mapa, mmap.mmap)
+    liberar_upload(conteudo)
+    assert mapa.closed
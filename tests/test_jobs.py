@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.jobs import (
+    CONCLUIDO, PROCESSANDO, JobStore, MemoriaJobStore, job_runner)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoriaJobStore()
+    monkeypatch.setattr(job_runner, "store", store)
+    return store
+
+
+def _criar_job(store, status):
+    agora = time.time()
+    store.criar({"id": "job", "status": status, "criado_em": agora, "atualizado_em": agora})
+    store.adicionar_evento("job", "status", {"status": PROCESSANDO})
+    store.adicionar_evento("job", "pagina", {"pagina": 1})
+    if status == CONCLUIDO:
+        store.adicionar_evento("job", "status", {"status": CONCLUIDO})
+
+
+def _ler_eventos(cliente, **headers):
+    inicio = time.monotonic()
+    resposta = cliente.get("/jobs/job/events", headers=headers)
+    return resposta, time.monotonic() - inicio
+
+
+def test_stream_termina_no_evento_final(store):
+    _criar_job(store, CONCLUIDO)
+    resposta, _ = _ler_eventos(TestClient(app))
+    assert resposta.status_code == 200
+    assert [linha for linha in resposta.text.splitlines() if linha.startswith("id:")] == \
+        ["id: 1", "id: 2", "id: 3"]
+
+
+def test_reconexao_depois_do_evento_final_termina(store):
+    _criar_job(store, CONCLUIDO)
+    resposta, duracao = _ler_eventos(TestClient(app), **{"Last-Event-ID": "3"})
+    assert resposta.status_code == 200
+    assert "id:" not in resposta.text
+    assert duracao < 5
+
+
+def test_stream_termina_quando_o_job_expira(store):
+    _criar_job(store, PROCESSANDO)
+
+    def expirar():
+        time.sleep(0.3)
+        store.atualizar("job", status=CONCLUIDO)
+        store.remover_finalizados(time.time() + 1)
+
+    threading.Thread(target=expirar).start()
+    resposta, duracao = _ler_eventos(TestClient(app), **{"Last-Event-ID": "2"})
+    assert resposta.status_code == 200
+    assert "id:" not in resposta.text
+    assert duracao < 5
+
+
+def test_store_incompleto_falha_na_criacao():
+    class StoreIncompleto(JobStore):
+        def criar(self, job):
+            pass
+
+    with pytest.raises(TypeError):
+        StoreIncompleto()
@@ -0,0 +1,33 @@
+from services.textract.parser import as_document, get_kv_map
+
+
+def _palavra(block_id, texto):
+    return {"Id": block_id, "BlockType": "WORD", "Text": texto}
+
+
+def _resposta():
+    return {"Blocks": [
+        _palavra("w1", "Nome"), _palavra("w2", "do"), _palavra("w3", "Segurado:"),
+        _palavra("w4", "Maria"), _palavra("w5", "Silva"), _palavra("w6", "Souza"),
+        # Chave com dois relacionamentos CHILD: vale o último
+        {"Id": "k1", "BlockType": "KEY_VALUE_SET", "EntityTypes": ["KEY"],
+         "Relationships": [{"Type": "CHILD", "Ids": ["w1", "w2"]},
+                           {"Type": "CHILD", "Ids": ["w3"]},
+                           {"Type": "VALUE", "Ids": ["v1"]}]},
+        # Valor com dois relacionamentos CHILD: vale o primeiro
+        {"Id": "v1", "BlockType": "KEY_VALUE_SET", "EntityTypes": ["VALUE"],
+         "Relationships": [{"Type": "CHILD", "Ids": ["w4", "w5"]},
+                           {"Type": "CHILD", "Ids": ["w6"]}]},
+    ]}
+
+
+def test_kv_map_usa_o_ultimo_child_da_chave_e_o_primeiro_do_valor():
+    document = as_document(_resposta())
+    assert get_kv_map(document, document.word_map) == {"Segurado": "Maria Silva"}
+
+
+def test_kv_map_chave_sem_valor():
+    resposta = _resposta()
+    resposta["Blocks"][6]["Relationships"].pop()
+    document = as_document(resposta)
+    assert get_kv_map(document, document.word_map) == {"Segurado": ""}
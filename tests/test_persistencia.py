@@ -0,0 +1,63 @@
+from benchmarks.stubs import StubDynamoDB
+from models import RAGPaginaModel
+from services.persistencia import PersistenciaService, montar_itens_paginas
+
+
+def _itens(quantidade, arquivo_id="doc"):
+    paginas = [{"pagina": i, "resultados": [{"Campo": f"valor {i}"}]} for i in range(quantidade)]
+    return montar_itens_paginas(arquivo_id, "doc.pdf", "titulo", paginas)
+
+
+def test_reenvia_apenas_os_itens_nao_processados():
+    with StubDynamoDB(modelos=(RAGPaginaModel,), taxa_nao_processados=0.5) as dynamodb:
+        servico = PersistenciaService(max_tentativas=20, backoff_base=0)
+        assert servico.salvar(_itens(25)) == 25
+
+    metricas = servico.metricas()
+    assert metricas["gravados"] == 25
+    assert metricas["falhas"] == 0
+    assert len(dynamodb.tabelas["RAGPaginas"]) == 25
+    # Cada item é gravado uma única vez: nada de reenviar o lote inteiro
+    assert dynamodb.itens_gravados == 25
+    assert dynamodb.chamadas["BatchWriteItem"] == metricas["lotes"] == metricas["retentativas"] + 1
+
+
+def test_metricas_batem_com_a_tabela_quando_as_tentativas_acabam():
+    with StubDynamoDB(modelos=(RAGPaginaModel,), taxa_nao_processados=0.9) as dynamodb:
+        servico = PersistenciaService(max_tentativas=5, backoff_base=0)
+        gravados = servico.salvar(_itens(25))
+
+    metricas = servico.metricas()
+    assert dynamodb.chamadas["BatchWriteItem"] == 5
+    assert gravados == metricas["gravados"] == len(dynamodb.tabelas["RAGPaginas"])
+    assert metricas["falhas"] == 25 - gravados > 0
+
+
+def test_erro_na_chamada_repete_o_lote_inteiro():
+    with StubDynamoDB(modelos=(RAGPaginaModel,)) as dynamodb:
+        chamar = dynamodb.chamar
+        erros = []
+
+        def falha_uma_vez(operacao, kwargs):
+            if operacao == "BatchWriteItem" and not erros:
+                erros.append(operacao)
+                raise ConnectionError("conexão perdida")
+            return chamar(operacao, kwargs)
+
+        dynamodb.chamar = falha_uma_vez
+        servico = PersistenciaService(max_tentativas=3, backoff_base=0)
+        assert servico.salvar(_itens(30)) == 30
+
+    assert len(dynamodb.tabelas["RAGPaginas"]) == 30
+    assert servico.metricas()["retentativas"] == 1
+
+
+def test_write_behind_grava_a_fila_ao_encerrar():
+    with StubDynamoDB(modelos=(RAGPaginaModel,)) as dynamodb:
+        servico = PersistenciaService(intervalo_flush=0.05)
+        for item in _itens(40):
+            servico.enfileirar(item)
+        servico.encerrar()
+
+    assert len(dynamodb.tabelas["RAGPaginas"]) == 40
+    assert servico.metricas()["na_fila"] == 0
@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from benchmarks.sintetico import gerar_resposta
+from benchmarks.stubs import StubClientError, StubTextractClient
+from services.textract.scheduler import TextractScheduler, TokenBucket, agendamento
+
+
+@pytest.fixture
+def criar_scheduler():
+    criados = []
+
+    def criar(**kwargs):
+        kwargs.setdefault("backoff_base", 0.001)
+        scheduler = TextractScheduler(**kwargs)
+        criados.append(scheduler)
+        return scheduler
+
+    yield criar
+    for scheduler in criados:
+        scheduler.encerrar()
+
+
+class StubLatenciaPorPagina(StubTextractClient):
+    """
+    As primeiras páginas demoram mais: as respostas chegam fora de ordem.
+    """
+
+    def analyze_document(self, Document, FeatureTypes=None, **kwargs):
+        time.sleep(0.02 * (10 - len(Document['Bytes'])))
+        return super().analyze_document(Document, FeatureTypes, **kwargs)
+
+
+class StubFalhaTransitoria(StubTextractClient):
+    def __init__(self, falhas, **kwargs):
+        super().__init__(**kwargs)
+        self.falhas = falhas
+
+    def analyze_document(self, Document, FeatureTypes=None, **kwargs):
+        with self._lock:
+            self.falhas -= 1
+            falhar = self.falhas >= 0
+        if falhar:
+            raise StubClientError("InternalServerError")
+        return super().analyze_document(Document, FeatureTypes, **kwargs)
+
+
+def test_respostas_na_ordem_das_paginas(criar_scheduler):
+    textract = StubLatenciaPorPagina(latencia=0, n_blocks=20)
+    scheduler = criar_scheduler(max_em_voo=4, tps=0)
+    paginas = [b"x" * tamanho for tamanho in range(1, 10)]
+
+    respostas = scheduler.analisar_documentos(textract, paginas, ["TABLES"])
+
+    assert respostas == [gerar_resposta(20, seed=len(pagina)) for pagina in paginas]
+    assert textract.pico_em_voo <= 4
+
+
+def test_throttling_repetido_ate_o_sucesso(criar_scheduler):
+    textract = StubTextractClient(latencia=0, taxa_throttling=0.5, n_blocks=5, seed=1)
+    scheduler = criar_scheduler(max_em_voo=2, tps=0, max_tentativas=50)
+
+    respostas = scheduler.analisar_documentos(textract, [b"a", b"bb", b"ccc"], ["TABLES"])
+
+    assert not any(isinstance(resposta, Exception) for resposta in respostas)
+    assert textract.throttles > 0
+    assert scheduler.throttles == textract.throttles
+    assert scheduler.chamadas == textract.chamadas == 3 + textract.throttles
+
+
+def test_tentativas_esgotadas_devolvem_a_excecao(criar_scheduler):
+    textract = StubTextractClient(latencia=0, taxa_throttling=1.0, n_blocks=5)
+    scheduler = criar_scheduler(max_em_voo=1, tps=0, max_tentativas=3)
+
+    [resposta] = scheduler.analisar_documentos(textract, [b"a"], ["TABLES"])
+
+    assert isinstance(resposta, StubClientError)
+    assert textract.chamadas == 3
+    assert scheduler.throttles == 2
+
+
+def test_erro_nao_transitorio_nao_e_repetido(criar_scheduler):
+    class StubInvalido(StubTextractClient):
+        def analyze_document(self, Document, FeatureTypes=None, **kwargs):
+            self.chamadas += 1
+            raise StubClientError("InvalidParameterException")
+
+    textract = StubInvalido(latencia=0)
+    scheduler = criar_scheduler(max_em_voo=1, tps=0)
+
+    [resposta] = scheduler.analisar_documentos(textract, [b"a"], ["TABLES"])
+
+    assert isinstance(resposta, StubClientError)
+    assert textract.chamadas == 1
+
+
+def test_falha_transitoria_repetida(criar_scheduler):
+    textract = StubFalhaTransitoria(falhas=2, latencia=0, n_blocks=5)
+    scheduler = criar_scheduler(max_em_voo=1, tps=0)
+
+    [resposta] = scheduler.analisar_documentos(textract, [b"a"], ["TABLES"])
+
+    assert resposta == gerar_resposta(5, seed=1)
+    assert scheduler.erros_transitorios == 2
+    assert scheduler.throttles == 0
+
+
+def test_token_bucket_cadencia_as_chamadas(criar_scheduler):
+    textract = StubTextractClient(latencia=0, n_blocks=5)
+    scheduler = criar_scheduler(max_em_voo=8, tps=20)
+
+    inicio = time.monotonic()
+    respostas = scheduler.analisar_documentos(textract, [b"p"] * 40, ["TABLES"])
+    duracao = time.monotonic() - inicio
+
+    assert not any(isinstance(resposta, Exception) for resposta in respostas)
+    # 20 tokens iniciais; as outras 20 chamadas esperam a reposição (20/s)
+    assert duracao >= 0.9
+
+
+def test_token_bucket_sem_rajada_fica_abaixo_da_cota(criar_scheduler):
+    # Em qualquer janela de 1 s passam no máximo 'capacidade' + 'taxa' chamadas
+    textract = StubTextractClient(latencia=0, tps_maximo=22, n_blocks=5)
+    scheduler = criar_scheduler(max_em_voo=8, tps=20)
+    scheduler.bucket = TokenBucket(20, capacidade=1)
+
+    respostas = scheduler.analisar_documentos(textract, [b"p"] * 30, ["TABLES"])
+
+    assert not any(isinstance(resposta, Exception) for resposta in respostas)
+    assert textract.throttles == 0
+
+
+def test_documentos_dividem_a_cota(criar_scheduler):
+    scheduler = criar_scheduler(max_em_voo=1, tps=0)
+    ordem = []
+
+    def chamar(documento):
+        time.sleep(0.01)
+        ordem.append(documento)
+        return documento
+
+    with agendamento("grande"):
+        grandes = [scheduler.submeter(chamar, documento="grande") for _ in range(6)]
+    with agendamento("pequeno"):
+        pequenos = [scheduler.submeter(chamar, documento="pequeno") for _ in range(2)]
+    for future in grandes + pequenos:
+        future.result()
+
+    # O documento pequeno não espera o grande terminar
+    assert ordem.index("pequeno") < 4
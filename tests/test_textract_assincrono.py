@@ -0,0 +1,118 @@
+import pytest
+
+from benchmarks.pdfs import gerar_cotacao
+from benchmarks.stubs import StubS3Client, StubTextractClient
+from services.aws import ClientesAWS
+from services.textract import assincrono
+from services.textract.assincrono import (
+    TextractAssincronoError, aguardar_conclusao, analisar_pdf, iniciar_analise,
+    respostas_por_pagina)
+
+
+class StubPaginasAusentes(StubTextractClient):
+    """
+    Conclui com PARTIAL_SUCCESS e sem os blocos das páginas informadas.
+    """
+
+    def __init__(self, ausentes, **kwargs):
+        super().__init__(**kwargs)
+        self.ausentes = set(ausentes)
+
+    def _blocos_job(self, job):
+        return [block for block in super()._blocos_job(job)
+                if block["Page"] not in self.ausentes]
+
+    def get_document_analysis(self, JobId, **kwargs):
+        resposta = super().get_document_analysis(JobId, **kwargs)
+        if resposta["JobStatus"] == "SUCCEEDED":
+            resposta["JobStatus"] = "PARTIAL_SUCCESS"
+        return resposta
+
+
+@pytest.fixture
+def clientes(monkeypatch):
+    def registrar(textract):
+        clientes = ClientesAWS()
+        clientes.registrar("textract", textract)
+        clientes.registrar("s3", textract.s3)
+        monkeypatch.setattr(assincrono, "clientes_aws", clientes)
+        return clientes
+
+    # Várias chamadas GetDocumentAnalysis por página e páginas divididas entre chamadas
+    monkeypatch.setattr(assincrono, "TEXTRACT_ASYNC_MAX_RESULTADOS", 8)
+    monkeypatch.setattr(assincrono, "TEXTRACT_ASYNC_INTERVALO", 0.01)
+    return registrar
+
+
+def _stub(classe=StubTextractClient, **kwargs):
+    return classe(s3=StubS3Client(), latencia=0, latencia_job=0, latencia_job_pagina=0,
+                  n_blocks=20, **kwargs)
+
+
+def _iniciar(textract, paginas):
+    textract.s3.put_object(Bucket="b", Key="doc.pdf", Body=gerar_cotacao(paginas))
+    job_id = iniciar_analise({"Bucket": "b", "Name": "doc.pdf"}, textract)
+    return job_id, aguardar_conclusao(job_id, textract, intervalo=0.01)
+
+
+def test_paginas_completas_atravessando_o_next_token(monkeypatch):
+    monkeypatch.setattr(assincrono, "TEXTRACT_ASYNC_MAX_RESULTADOS", 8)
+    textract = _stub()
+    job_id, primeira = _iniciar(textract, 3)
+
+    paginas = list(respostas_por_pagina(job_id, primeira, textract))
+
+    blocos = textract._blocos_job(textract._jobs[job_id])
+    assert [numero for numero, _ in paginas] == [1, 2, 3]
+    for numero, resposta in paginas:
+        assert resposta["Blocks"] == [block for block in blocos if block["Page"] == numero]
+    # Uma chamada para o status e as demais seguindo o NextToken
+    assert textract.chamadas_get == -(-len(blocos) // 8)
+
+
+def test_analisar_pdf_entrega_as_paginas_em_ordem(clientes):
+    textract = _stub()
+    clientes(textract)
+
+    paginas = list(analisar_pdf(gerar_cotacao(3), "doc.pdf", 3, bucket="b", manter_pdf=False))
+
+    assert [indice for indice, _ in paginas] == [0, 1, 2]
+    assert all(isinstance(resposta, dict) for _, resposta in paginas)
+    # O PDF sai do bucket quando não deve ser mantido
+    assert textract.s3.objetos == {}
+
+
+def test_paginas_ausentes_no_sucesso_parcial(clientes):
+    textract = _stub(StubPaginasAusentes, ausentes={2, 4})
+    clientes(textract)
+
+    paginas = dict(analisar_pdf(gerar_cotacao(4), "doc.pdf", 4, bucket="b", manter_pdf=True))
+
+    assert sorted(paginas) == [0, 1, 2, 3]
+    assert isinstance(paginas[1], TextractAssincronoError)
+    assert isinstance(paginas[3], TextractAssincronoError)
+    assert all(block["Page"] == 1 for block in paginas[0]["Blocks"])
+    assert all(block["Page"] == 3 for block in paginas[2]["Blocks"])
+    assert ("b", "doc.pdf") in textract.s3.objetos
+
+
+def test_tempo_esgotado():
+    textract = StubTextractClient(s3=StubS3Client(), latencia=0, latencia_job=60)
+    textract.s3.put_object(Bucket="b", Key="doc.pdf", Body=gerar_cotacao(1))
+    job_id = iniciar_analise({"Bucket": "b", "Name": "doc.pdf"}, textract)
+
+    with pytest.raises(TextractAssincronoError, match="não concluída"):
+        aguardar_conclusao(job_id, textract, timeout=0.05, intervalo=0.01)
+
+
+def test_job_com_falha():
+    class StubFalha(StubTextractClient):
+        def get_document_analysis(self, JobId, **kwargs):
+            return {"JobStatus": "FAILED", "StatusMessage": "documento inválido"}
+
+    textract = StubFalha(s3=StubS3Client(), latencia=0)
+    textract.s3.put_object(Bucket="b", Key="doc.pdf", Body=gerar_cotacao(1))
+    job_id = iniciar_analise({"Bucket": "b", "Name": "doc.pdf"}, textract)
+
+    with pytest.raises(TextractAssincronoError, match="FAILED"):
+        aguardar_conclusao(job_id, textract, intervalo=0.01)
@@ -1,7 +1,8 @@
-import json
-
-
-def montar_json(keys: list, final_map: dict) -> str:
+def montar_json(keys: list, final_map: dict) -> dict:
+    """
+    Monta o objeto apenas com as chaves especificadas, na ordem de 'keys'.
+    Retorna o dicionário (a serialização acontece uma única vez, na resposta).
+    """
 
     # Criar um novo dicionário apenas com as chaves especificadas
     filtered_map = {}
@@ -12,6 +13,4 @@ def montar_json(keys: list, final_map: dict) -> str:
         else:
             continue
 
-    json_output = json.dumps(filtered_map, indent=2, ensure_ascii=False)
-
-    return json_output
+    return filtered_map
@@ -0,0 +1,37 @@
+import json
+import os
+
+from fastapi.responses import JSONResponse
+
+# orjson é opcional: quando instalado, serializa as respostas bem mais rápido
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Permite desligar o orjson mesmo quando instalado
+RESPOSTA_ORJSON = os.environ.get("RESPOSTA_ORJSON", "true").lower() == "true"
+
+
+def serializar(conteudo) -> bytes:
+    """
+    Serializa o conteúdo em JSON compacto (UTF-8), com orjson se disponível.
+    Valores não serializáveis viram texto.
+    """
+    if orjson is not None and RESPOSTA_ORJSON:
+        return orjson.dumps(conteudo, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":"),
+                      default=str).encode("utf-8")
+
+
+class RespostaJSON(JSONResponse):
+    """
+    Resposta JSON serializada uma única vez por 'serializar'.
+
+    Retornar uma instância diretamente da rota também evita o
+    'jsonable_encoder' do FastAPI, que percorre todo o resultado antes da
+    serialização.
+    """
+
+    def render(self, content) -> bytes:
+        return serializar(content)